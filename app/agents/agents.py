@@ -4,11 +4,13 @@ from typing import List, Dict, Any, Optional
 import json
 from openai import OpenAI
 import os
-import requests
 import logging
-import uuid # 이미지 파일명 생성을 위해 추가
 
 import time
+from app.utils import timing # 실측 오디오 길이
+from app.core import tracing # TTS 요청/품질 검증 스팬
+from app.core import metrics # OpenAI 지연/오류, TTS 재시도, Whisper 점수
+from app.utils.image_engine import ImageEngine # 비동기 DALL·E 엔진 (씬 동시 생성)
 try:
     from .quality_validator import AudioQualityValidator
     QUALITY_VALIDATOR_AVAILABLE = True
@@ -24,6 +26,15 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
+TTS_ATTEMPTS = metrics.REGISTRY.counter(
+    "tts_attempts_total", "TTS generation attempts by result (passed, below_threshold, unvalidated, error).", ("result",)
+)
+TTS_RETRIES = metrics.REGISTRY.counter("tts_retries_total", "TTS attempts beyond the first for a scene.")
+WHISPER_SCORE = metrics.REGISTRY.histogram(
+    "whisper_validation_score", "Overall Whisper-based narration quality score per validated attempt.",
+    (), (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0)
+)
+
 class ConceptGeneratorAgent:
     """
     브랜드 + 키워드 → 광고 스토리보드(컨셉) 생성기
@@ -82,14 +93,15 @@ class ConceptGeneratorAgent:
         logger.info(f"ConceptGeneratorAgent: Sending prompt to OpenAI:\n{prompt}")
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an expert ad copywriter. Generate a JSON-formatted three-scene storyboard. Ensure the response is valid JSON. ONLY return the JSON object, no additional text, no markdown code block."}, # JSON 형식 강제 강화
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"} # JSON 응답 형식 요청
-            )
+            with metrics.openai_request("chat"):
+                response = self.client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {"role": "system", "content": "You are an expert ad copywriter. Generate a JSON-formatted three-scene storyboard. Ensure the response is valid JSON. ONLY return the JSON object, no additional text, no markdown code block."}, # JSON 형식 강제 강화
+                        {"role": "user", "content": prompt}
+                    ],
+                    response_format={"type": "json_object"} # JSON 응답 형식 요청
+                )
 
             content = response.choices[0].message.content
             logger.info(f"ConceptGeneratorAgent: Received raw response from OpenAI:\n{content}")
@@ -152,72 +164,86 @@ class ImageGeneratorAgent:
             logger.info("✅ OpenAI API key found for ImageGeneratorAgent. Initializing real OpenAI client.")
             print("✅ ImageGeneratorAgent: 실제 API 모드로 설정됨")
             self.client = OpenAI(api_key=final_api_key)
+            self.image_engine = ImageEngine(api_key=final_api_key) # 씬 동시 생성 엔진
             self.mock_mode = False
         # --- mock_mode 설정 끝 ---
 
         self.images_dir = images_dir
+        self.last_stats: Dict[str, Any] = {}
         os.makedirs(self.images_dir, exist_ok=True) # 폴더가 없으면 생성
 
-    def generate_images(self, storyboard: Dict[str, Any], style_preference: str) -> List[Dict[str, Any]]:
-        print(f"🚀 ImageGeneratorAgent.generate_images 호출됨 (mock_mode: {self.mock_mode})")
-        
-        # --- mock_mode일 경우 즉시 더미 데이터 반환 ---
-        if self.mock_mode:
-            logger.info("ImageGeneratorAgent: Returning mock images.")
-            print("🎭 Mock 이미지 데이터 반환 중...")
-            mock_images = []
-            scenes = storyboard.get("scenes", [])
-            for i, scene in enumerate(scenes):
-                # 실제 이미지 파일은 생성되지 않고, 더미 URL만 반환
-                mock_images.append({
-                    "scene": scene.get("name", f"Mock Scene {i+1}"),
-                    "file": None,
-                    "url": f"https://via.placeholder.com/1024x1024?text=Mock+Image+{i+1}+for+{scene.get('name', 'Scene')}"
-                })
-            return mock_images
-        # --- mock_mode가 아닐 경우 실제 API 호출 ---
+    def _mock_images(self, storyboard: Dict[str, Any]) -> List[Dict[str, Any]]:
+        logger.info("ImageGeneratorAgent: Returning mock images.")
+        print("🎭 Mock 이미지 데이터 반환 중...")
+        mock_images = []
+        scenes = storyboard.get("scenes", [])
+        for i, scene in enumerate(scenes):
+            # 실제 이미지 파일은 생성되지 않고, 더미 URL만 반환
+            mock_images.append({
+                "scene": scene.get("name", f"Mock Scene {i+1}"),
+                "file": None,
+                "url": f"https://via.placeholder.com/1024x1024?text=Mock+Image+{i+1}+for+{scene.get('name', 'Scene')}"
+            })
+        return mock_images
 
-        print("✅ 실제 DALL-E 3 API 호출 시작...")
-        results = []
+    def _scene_items(self, storyboard: Dict[str, Any], style_preference: str) -> List[Dict[str, Any]]:
+        """스토리보드 씬 → 이미지 엔진 요청 항목."""
         scenes = storyboard.get("scenes", [])
         if not scenes:
             logger.warning("ImageGeneratorAgent: No scenes found in storyboard. Skipping image generation.")
             return []
 
+        items = []
         for scene in scenes:
             base_prompt = scene.get("description", "")
             prompt = f"{base_prompt}, in a {style_preference} style. High quality, detailed, realistic, suitable for advertisement."
-
             logger.info(f"⏳ Generating image for scene '{scene.get('name', 'Unknown')}' with prompt: {prompt}")
+            items.append({"name": scene.get("name", "Unknown"), "prompt": prompt})
+        return items
+
+    def _finish_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for result in results:
+            if result.get("file"):
+                logger.info(f"✅ Image generated and saved: {result['file']} ({result['latency']['total_s']}s)")
+            else: # 이미지 생성 실패 시 더미 URL 반환 (선택 사항)
+                logger.error(f"❌ ImageGeneratorAgent Error: Failed to generate image for scene '{result['scene']}': {result.get('error')}")
+                result["url"] = "https://via.placeholder.com/1024x1024?text=Image+Error"
+        self.last_stats = self.image_engine.last_stats # 동시 실행 통계 (벽시계 vs 순차 합계)
 
-            try:
-                resp = self.client.images.generate(
-                    model="dall-e-3",
-                    prompt=prompt,
-                    n=1,
-                    size="1024x1024",
-                    quality="standard",
-                    style="vivid"
-                )
-                url = resp.data[0].url
-                img_data = requests.get(url).content
+        print("✅ 실제 DALL-E 3 API 호출 완료!")
+        return results
+
+    def generate_images(self, storyboard: Dict[str, Any], style_preference: str) -> List[Dict[str, Any]]:
+        print(f"🚀 ImageGeneratorAgent.generate_images 호출됨 (mock_mode: {self.mock_mode})")
+        
+        # --- mock_mode일 경우 즉시 더미 데이터 반환 ---
+        if self.mock_mode:
+            return self._mock_images(storyboard)
+        # --- mock_mode가 아닐 경우 실제 API 호출 ---
 
-                filename = f"{uuid.uuid4()}.png" # uuid import 필요
-                path = os.path.join(self.images_dir, filename)
+        print("✅ 실제 DALL-E 3 API 호출 시작...")
+        items = self._scene_items(storyboard, style_preference)
+        if not items:
+            return []
 
-                with open(path, 'wb') as f:
-                    f.write(img_data)
+        # 모든 씬을 동시에 요청 (커넥션 풀 공유, b64_json 또는 스트리밍 다운로드). 이벤트 루프 안에서 호출되면 작업 스레드에서 실행
+        return self._finish_results(self.image_engine.generate_many_sync(items, self.images_dir))
 
-                results.append({"scene": scene.get("name", "Unknown"), "file": path, "url": url})
-                logger.info(f"✅ Image generated and saved: {path}")
+    async def generate_images_async(self, storyboard: Dict[str, Any], style_preference: str) -> List[Dict[str, Any]]:
+        """비동기 호출자용 generate_images: 호출자의 이벤트 루프에서 이미지 엔진을 await (루프를 막지 않음)."""
+        print(f"🚀 ImageGeneratorAgent.generate_images_async 호출됨 (mock_mode: {self.mock_mode})")
+        if self.mock_mode:
+            return self._mock_images(storyboard)
 
-            except Exception as e:
-                logger.error(f"❌ ImageGeneratorAgent Error: Failed to generate image for scene '{scene.get('name', 'Unknown')}': {e}")
-                # 이미지 생성 실패 시 더미 URL 반환 (선택 사항)
-                results.append({"scene": scene.get("name", "Unknown"), "file": None, "url": f"https://via.placeholder.com/1024x1024?text=Image+Error"})
-        
-        print("✅ 실제 DALL-E 3 API 호출 완료!")
-        return results
+        print("✅ 실제 DALL-E 3 API 호출 시작...")
+        items = self._scene_items(storyboard, style_preference)
+        if not items:
+            return []
+        try:
+            results = await self.image_engine.generate_many(items, self.images_dir)
+        finally:
+            await self.image_engine.aclose() # 에이전트는 요청마다 생성되므로 이 루프의 커넥션 풀을 닫음
+        return self._finish_results(results)
 
 # 🆕 ===== 여기서부터 새로 추가된 클래스 =====
 
@@ -256,6 +282,7 @@ class EnhancedAudioGeneratorAgent:
         self.audio_dir = audio_dir
         self.enable_quality_validation = enable_quality_validation and QUALITY_VALIDATOR_AVAILABLE
         self.max_retry_attempts = max_retry_attempts
+        self.request_timeout = 60.0 # TTS 요청당 기본 타임아웃 (초)
         os.makedirs(self.audio_dir, exist_ok=True)
         
         # 품질 검증기 초기화
@@ -273,7 +300,8 @@ class EnhancedAudioGeneratorAgent:
                 print("⚠️ 품질 검증기를 사용할 수 없습니다")
 
     def generate_narrations_with_validation(self, storyboard: Dict[str, Any], voice: str = "alloy", 
-                                          min_quality_score: float = 0.8) -> List[Dict[str, Any]]:
+                                          min_quality_score: float = 0.8,
+                                          cancel_event: Optional[Any] = None) -> List[Dict[str, Any]]:
         """
         품질 검증이 포함된 내레이션 생성
         
@@ -281,6 +309,7 @@ class EnhancedAudioGeneratorAgent:
             storyboard: 스토리보드 데이터
             voice: TTS 음성 옵션
             min_quality_score: 최소 품질 점수 (0.0 ~ 1.0)
+            cancel_event: `is_set()`을 제공하는 취소 신호. 설정되면 남은 씬/재시도를 건너뜀
             
         Returns:
             List[Dict]: 품질 검증 결과가 포함된 음성 파일 정보
@@ -306,6 +335,10 @@ class EnhancedAudioGeneratorAgent:
         for i, scene in enumerate(scenes):
             scene_name = scene.get("name", f"Scene {i+1}")
             narration_text = scene.get("narration", "")
+
+            if cancel_event is not None and cancel_event.is_set():
+                print("🛑 취소 요청으로 남은 내레이션 생성을 중단합니다.")
+                break
             
             if not narration_text:
                 logger.warning(f"씬 '{scene_name}'에 내레이션 텍스트가 없습니다.")
@@ -315,7 +348,7 @@ class EnhancedAudioGeneratorAgent:
             
             # 품질 검증을 통한 음성 생성 (재시도 포함)
             audio_result = self._generate_audio_with_retry(
-                scene_name, narration_text, voice, min_quality_score, i+1
+                scene_name, narration_text, voice, min_quality_score, i+1, cancel_event
             )
             
             results.append(audio_result)
@@ -325,7 +358,8 @@ class EnhancedAudioGeneratorAgent:
         return results
     
     def _generate_audio_with_retry(self, scene_name: str, narration_text: str, voice: str, 
-                                 min_quality_score: float, scene_number: int) -> Dict[str, Any]:
+                                 min_quality_score: float, scene_number: int,
+                                 cancel_event: Optional[Any] = None) -> Dict[str, Any]:
         """
         재시도 로직이 포함된 음성 생성
         """
@@ -334,36 +368,54 @@ class EnhancedAudioGeneratorAgent:
         best_score = 0.0
         
         while attempts <= self.max_retry_attempts:
+            if cancel_event is not None and cancel_event.is_set(): # 재시도 사이 취소 확인
+                print(f"  🛑 취소 요청으로 재시도를 중단합니다.")
+                break
             attempts += 1
             attempt_suffix = f"_attempt_{attempts}" if attempts > 1 else ""
+            if attempts > 1:
+                TTS_RETRIES.inc()
             
             print(f"  🎤 시도 {attempts}/{self.max_retry_attempts + 1}: 음성 생성 중...")
             
             try:
                 # TTS 음성 생성
-                audio_result = self._generate_single_audio(
-                    scene_name, narration_text, voice, scene_number, attempt_suffix
-                )
+                with tracing.span("tts.request", attempt=attempts, voice=voice):
+                    audio_result = self._generate_single_audio(
+                        scene_name, narration_text, voice, scene_number, attempt_suffix,
+                        timeout=self._request_timeout(cancel_event)
+                    )
                 
                 if not audio_result.get("file"):
                     print(f"  ❌ 시도 {attempts}: 음성 파일 생성 실패")
+                    TTS_ATTEMPTS.inc(result="error")
                     continue
                 
                 # 품질 검증 실행
                 if self.enable_quality_validation and self.quality_validator:
-                    validation_result = self.quality_validator.validate_audio_quality(
-                        audio_result["file"], narration_text, min_quality_score
-                    )
+                    with tracing.span("whisper.validate", attempt=attempts) as validate_span:
+                        validation_result = self.quality_validator.validate_audio_quality(
+                            audio_result["file"], narration_text, min_quality_score
+                        )
+                        validate_span.set_attribute("score", round(validation_result.get("overall_score", 0.0), 3))
                     
                     audio_result["quality_validation"] = validation_result
+                    decoded_duration = (validation_result.get("audio_quality") or {}).get("duration")
+                    if decoded_duration: # 검증 시 이미 디코딩한 오디오의 실제 길이 우선 사용
+                        audio_result["duration"] = float(decoded_duration)
+                        audio_result["duration_source"] = "decoded"
                     current_score = validation_result.get("overall_score", 0.0)
+                    if validation_result.get("available") and "error" not in validation_result:
+                        WHISPER_SCORE.observe(current_score)
                     
                     print(f"  📊 시도 {attempts}: 품질 점수 {current_score:.3f}")
                     
                     # 품질 검증 통과
                     if validation_result.get("passed", False):
                         print(f"  ✅ 시도 {attempts}: 품질 검증 통과!")
+                        TTS_ATTEMPTS.inc(result="passed")
                         return audio_result
+                    TTS_ATTEMPTS.inc(result="below_threshold")
                     
                     # 최고 점수 결과 보관
                     if current_score > best_score:
@@ -375,15 +427,20 @@ class EnhancedAudioGeneratorAgent:
                     # 재시도 전 잠시 대기
                     if attempts <= self.max_retry_attempts:
                         print(f"  ⏳ 재시도 전 대기 중...")
-                        time.sleep(1)
+                        if cancel_event is not None:
+                            cancel_event.wait(1) # 취소 시 즉시 깨어남
+                        else:
+                            time.sleep(1)
                         
                 else:
                     # 품질 검증 비활성화 시 바로 반환
                     print(f"  ✅ 시도 {attempts}: 품질 검증 없이 완료")
+                    TTS_ATTEMPTS.inc(result="unvalidated")
                     return audio_result
                     
             except Exception as e:
                 print(f"  ❌ 시도 {attempts}: 오류 발생 - {e}")
+                TTS_ATTEMPTS.inc(result="error")
                 audio_result = {
                     "scene": scene_name,
                     "narration": narration_text,
@@ -411,19 +468,27 @@ class EnhancedAudioGeneratorAgent:
                 "quality_validation": {"available": False, "passed": False}
             }
     
+    def _request_timeout(self, cancel_event: Optional[Any]) -> float:
+        """TTS 요청 타임아웃: 기본값과 작업 데드라인까지 남은 시간 중 짧은 값."""
+        remaining = cancel_event.remaining() if hasattr(cancel_event, "remaining") else None
+        return self.request_timeout if remaining is None else max(1.0, min(self.request_timeout, remaining))
+
     def _generate_single_audio(self, scene_name: str, narration_text: str, voice: str, 
-                              scene_number: int, attempt_suffix: str = "") -> Dict[str, Any]:
+                              scene_number: int, attempt_suffix: str = "",
+                              timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         단일 음성 파일 생성
         """
         try:
             # OpenAI TTS API 호출
-            response = self.client.audio.speech.create(
-                model="tts-1",  # 또는 "tts-1-hd"
-                voice=voice,
-                input=narration_text,
-                response_format="mp3"
-            )
+            with metrics.openai_request("tts"):
+                response = self.client.audio.speech.create(
+                    model="tts-1",  # 또는 "tts-1-hd"
+                    voice=voice,
+                    input=narration_text,
+                    response_format="mp3",
+                    timeout=timeout or self.request_timeout
+                )
             
             # 파일명 생성
             safe_scene_name = "".join(c for c in scene_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
@@ -435,11 +500,13 @@ class EnhancedAudioGeneratorAgent:
                 for chunk in response.iter_bytes():
                     f.write(chunk)
             
+            measured_duration = timing.probe_duration(file_path) # 헤더 기반 실측 (실패 시 글자 수 추정)
             return {
                 "scene": scene_name,
                 "narration": narration_text,
                 "file": file_path,
-                "duration": self._estimate_duration(narration_text),
+                "duration": measured_duration or self._estimate_duration(narration_text),
+                "duration_source": "probed" if measured_duration else "estimated",
                 "voice": voice,
                 "size_mb": os.path.getsize(file_path) / (1024 * 1024),
                 "generated_at": time.time()
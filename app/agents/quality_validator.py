@@ -8,6 +8,8 @@ import logging
 import numpy as np
 from pathlib import Path
 
+from app.core import tracing # 모델 로드/STT/오디오 분석 스팬
+
 # librosa import 처리 (선택적)
 try:
     import librosa
@@ -29,11 +31,12 @@ class AudioQualityValidator:
         print(f"  - Librosa 사용 가능: {LIBROSA_AVAILABLE}")
 
         try:
-            self.whisper_model = WhisperModel(
-                whisper_model,
-                device="cpu",  # GPU 사용 시 "cuda"
-                compute_type="int8"
-            )
+            with tracing.span("whisper.load", model=whisper_model):
+                self.whisper_model = WhisperModel(
+                    whisper_model,
+                    device="cpu",  # GPU 사용 시 "cuda"
+                    compute_type="int8"
+                )
             self.available = True
             print("✅ AudioQualityValidator: faster-whisper 모델 로드 완료")
         except Exception as e:
@@ -62,7 +65,8 @@ class AudioQualityValidator:
         print(f"🔍 음성 품질 검증 시작: {Path(audio_file_path).name}")
         try:
             # 1. STT
-            transcription_result = self._transcribe_audio(audio_file_path)
+            with tracing.span("whisper.transcribe"):
+                transcription_result = self._transcribe_audio(audio_file_path)
 
             # 2. 텍스트 유사도
             similarity_result = self._calculate_text_similarity(
@@ -71,7 +75,8 @@ class AudioQualityValidator:
             )
 
             # 3. 오디오 품질 분석
-            audio_quality_result = self._analyze_audio_quality(audio_file_path)
+            with tracing.span("audio.analysis", librosa=LIBROSA_AVAILABLE):
+                audio_quality_result = self._analyze_audio_quality(audio_file_path)
 
             # 4. 종합 점수
             overall_score = self._calculate_overall_score(
@@ -0,0 +1,257 @@
+# app/core/admission.py - 단계별 실측 비용 기반 어드미션 컨트롤 및 부하 차단
+
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+# 단계별 기본 비용 (실측 이력이 쌓이기 전 사용하는 사전값)
+# - video/bgm: 영상 1초당 GPU 초 (품질별), 나머지: 작업당 벽시계 초
+DEFAULT_STAGE_COSTS: Dict[str, float] = {
+    "concept": 8.0, # LLM 컨셉 생성
+    "tts": 20.0, # TTS + Whisper 검증 (재시도 포함 평균)
+    "video:fast": 4.0, # CogVideoX 'fast' 품질, 영상 1초당
+    "video:balanced": 8.0, # CogVideoX 'balanced' 품질, 영상 1초당
+    "video:high": 14.0, # CogVideoX 'high' 품질, 영상 1초당
+    "bgm": 1.2, # Riffusion BGM, 영상 1초당
+    "images": 25.0, # DALL·E 스틸 생성 (씬 병렬, GPU 없는 노드의 영상 대체)
+    "compose": 15.0 # 최종 FFmpeg 합성 (compose:stills는 Ken Burns 모션 렌더링, :abr는 스트리밍 렌디션 인코딩 포함)
+}
+
+GPU_STAGES = ("video", "bgm") # GPU 예산을 소모하는 단계
+PER_SECOND_STAGES = ("video", "bgm") # 영상 길이에 비례하는 단계
+
+@dataclass
+class AdmissionDecision:
+    """어드미션 결과: accepted(대기열 등록) 또는 rejected(부하 차단)."""
+    accepted: bool
+    cost_gpu_seconds: float # 이 요청의 예상 GPU 비용
+    backlog_gpu_seconds: float # 등록 시점의 미처리 GPU 작업량 (이 요청 제외)
+    queue_position: int # GPU 대기열 순번 (0 = 즉시 실행)
+    eta_seconds: float # 예상 완료까지 남은 시간
+    retry_after: Optional[int] = None # 거절 시 재시도 권장 시간 (초)
+
+    @property
+    def estimated_completion(self) -> str:
+        return (datetime.now() + timedelta(seconds=self.eta_seconds)).isoformat(timespec="seconds")
+
+@dataclass
+class _Ticket:
+    """어드미션된 작업의 비용 추적 정보."""
+    task_id: str
+    stages: "OrderedDict[str, float]" # 단계 → 예상 소요 시간 (실행 순서)
+    admitted_at: float = field(default_factory=time.monotonic)
+    done: set = field(default_factory=set) # 완료된 단계
+    remaining_override: Dict[str, float] = field(default_factory=dict) # 진행 중 단계의 실측 남은 시간
+    gpu_started: bool = False
+
+    def remaining(self, stage: str) -> float:
+        if stage in self.done:
+            return 0.0
+        return self.remaining_override.get(stage, self.stages.get(stage, 0.0))
+
+    def remaining_gpu(self) -> float:
+        return sum(self.remaining(s) for s in self.stages if s.split(":")[0] in GPU_STAGES)
+
+    def remaining_total(self) -> float:
+        return sum(self.remaining(s) for s in self.stages)
+
+class StageTimingHistory:
+    """단계별 소요 시간의 지수이동평균(EWMA) 이력: JSON 파일로 영속화."""
+
+    def __init__(self, path: Optional[str] = None, alpha: float = 0.3):
+        self.path = path
+        self.alpha = alpha # 최신 측정값 가중치
+        self.values: Dict[str, float] = dict(DEFAULT_STAGE_COSTS)
+        self.samples: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.values.update(data.get("values", {}))
+            self.samples.update(data.get("samples", {}))
+        except Exception as e:
+            print(f"⚠️ 단계 타이밍 이력 로드 실패 (기본값 사용): {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"values": self.values, "samples": self.samples}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path) # 원자적 교체
+        except Exception as e:
+            print(f"⚠️ 단계 타이밍 이력 저장 실패: {e}")
+
+    def get(self, key: str) -> float:
+        return self.values.get(key, DEFAULT_STAGE_COSTS.get(key.split(":")[0], 0.0))
+
+    def record(self, key: str, value: float):
+        """측정값 반영 (첫 측정은 사전값을 대체)."""
+        with self._lock:
+            count = self.samples.get(key, 0)
+            previous = self.get(key)
+            self.values[key] = value if count == 0 else (1 - self.alpha) * previous + self.alpha * value
+            self.samples[key] = count + 1
+            self._save()
+
+class AdmissionController:
+    """
+    요청 비용(품질 등급, 길이, BGM 여부)을 실측 단계 타이밍으로 추정하고,
+    미처리 GPU 작업량이 예산을 넘으면 Retry-After와 함께 거절합니다.
+    GPU 단계는 슬롯 수만큼만 동시에 실행됩니다.
+    """
+
+    def __init__(self, max_backlog_gpu_seconds: float = 3600.0, gpu_slots: int = 1,
+                 history: Optional[StageTimingHistory] = None):
+        self.max_backlog_gpu_seconds = max_backlog_gpu_seconds # 허용 가능한 최대 GPU 백로그
+        self.gpu_slots = max(1, gpu_slots)
+        self.history = history or StageTimingHistory()
+        self._tickets: "OrderedDict[str, _Ticket]" = OrderedDict() # 어드미션 순서 유지
+        self._lock = threading.Lock()
+        self._gpu_semaphore: Optional[asyncio.Semaphore] = None # 이벤트 루프에서 지연 생성
+
+    # ── 비용 추정 ───────────────────────────────
+    def estimate_stages(self, request_data: Dict[str, Any]) -> "OrderedDict[str, float]":
+        """요청의 단계별 예상 소요 시간 (실행 순서)."""
+        duration = float(request_data.get("duration", 30))
+        quality = request_data.get("video_quality", "balanced")
+        stages: "OrderedDict[str, float]" = OrderedDict()
+        stages["concept"] = self.history.get("concept")
+        stages["tts"] = self.history.get("tts")
+        stills = request_data.get("video_engine") == "stills" # GPU 비용 없는 스틸 + Ken Burns 경로
+        if stills:
+            stages["images"] = self.history.get("images")
+        else:
+            stages[f"video:{quality}"] = self.history.get(f"video:{quality}") * duration
+        if request_data.get("enable_bgm", False) and request_data.get("bgm_mode", "library") == "generative": # 라이브러리 BGM은 GPU 비용 없음
+            stages["bgm"] = self.history.get("bgm") * duration
+        stages[self.compose_stage(request_data)] = self.history.get(self.compose_stage(request_data))
+        return stages
+
+    @staticmethod
+    def compose_stage(request_data: Dict[str, Any]) -> str:
+        """최종 합성 단계 비용 키: 스틸 모션 렌더링(:stills), 스트리밍 렌디션 인코딩(:abr)은 따로 실측."""
+        key = "compose:stills" if request_data.get("video_engine") == "stills" else "compose"
+        return f"{key}:abr" if request_data.get("stream_formats") else key
+
+    def estimate_cost(self, request_data: Dict[str, Any]) -> float:
+        """요청의 예상 GPU 비용 (GPU 초)."""
+        stages = self.estimate_stages(request_data)
+        return sum(v for k, v in stages.items() if k.split(":")[0] in GPU_STAGES)
+
+    @property
+    def outstanding_gpu_seconds(self) -> float:
+        with self._lock:
+            return sum(t.remaining_gpu() for t in self._tickets.values())
+
+    # ── 어드미션 ─────────────────────────────────
+    def admit(self, task_id: str, request_data: Dict[str, Any]) -> AdmissionDecision:
+        """요청 수락/거절 결정. 수락 시 백로그에 등록."""
+        stages = self.estimate_stages(request_data)
+        cost = sum(v for k, v in stages.items() if k.split(":")[0] in GPU_STAGES)
+        with self._lock:
+            backlog = sum(t.remaining_gpu() for t in self._tickets.values())
+            queue_position = sum(1 for t in self._tickets.values() if not t.gpu_started and t.remaining_gpu() > 0) # GPU 슬롯을 기다리는 작업만 (실행 중/GPU 불필요 작업 제외)
+            gpu_wait = backlog / self.gpu_slots if cost > 0 else 0.0 # GPU를 쓰지 않는 작업(스틸 전용)은 백로그를 기다리지 않음
+            if cost == 0:
+                queue_position = 0
+            if cost > 0 and backlog > 0 and backlog + cost > self.max_backlog_gpu_seconds:
+                # 백로그가 예산 이하로 줄어들 때까지의 시간 (GPU 슬롯 병렬 처리 고려)
+                retry_after = int((backlog + cost - self.max_backlog_gpu_seconds) / self.gpu_slots) + 1
+                return AdmissionDecision(False, cost, backlog, queue_position,
+                                         eta_seconds=gpu_wait + sum(stages.values()),
+                                         retry_after=retry_after)
+            ticket = _Ticket(task_id, stages)
+            self._tickets[task_id] = ticket
+        return AdmissionDecision(True, cost, backlog, queue_position,
+                                 eta_seconds=gpu_wait + sum(stages.values()))
+
+    def release(self, task_id: str):
+        """작업 종료(완료/실패/취소) 시 백로그에서 제거."""
+        with self._lock:
+            self._tickets.pop(task_id, None)
+
+    # ── GPU 슬롯 ────────────────────────────────
+    async def acquire_gpu(self, task_id: str):
+        """GPU 슬롯 획득 (대기열 순서대로)."""
+        if self._gpu_semaphore is None:
+            self._gpu_semaphore = asyncio.Semaphore(self.gpu_slots)
+        await self._gpu_semaphore.acquire()
+        with self._lock:
+            if task_id in self._tickets:
+                self._tickets[task_id].gpu_started = True
+
+    def release_gpu(self, task_id: str):
+        if self._gpu_semaphore is not None:
+            self._gpu_semaphore.release()
+
+    def gpu_queue_position(self, task_id: str) -> int:
+        """GPU 대기열에서 앞선 작업 수."""
+        with self._lock:
+            ahead = 0
+            for tid, ticket in self._tickets.items():
+                if tid == task_id:
+                    break
+                if ticket.remaining_gpu() > 0:
+                    ahead += 1
+            return ahead
+
+    # ── 진행 및 실측 반영 ─────────────────────────
+    def record_stage(self, task_id: str, stage: str, seconds: float, duration: Optional[float] = None):
+        """단계 완료 시 실측 시간을 이력에 반영하고 작업의 남은 비용 갱신."""
+        value = seconds / duration if stage.split(":")[0] in PER_SECOND_STAGES and duration else seconds
+        self.history.record(stage, value)
+        with self._lock:
+            ticket = self._tickets.get(task_id)
+            if ticket is not None:
+                ticket.done.add(stage)
+                ticket.remaining_override.pop(stage, None)
+
+    def update_remaining(self, task_id: str, stage: str, remaining_seconds: float):
+        """진행 중 단계의 실측 남은 시간 반영 (예: 디노이징 ETA)."""
+        with self._lock:
+            ticket = self._tickets.get(task_id)
+            if ticket is not None and stage in ticket.stages:
+                ticket.remaining_override[stage] = max(0.0, remaining_seconds)
+
+    def estimated_completion(self, task_id: str) -> Optional[str]:
+        """현재 백로그와 남은 단계 비용 기준 예상 완료 시각 (ISO 형식)."""
+        with self._lock:
+            ticket = self._tickets.get(task_id)
+            if ticket is None:
+                return None
+            wait = 0.0
+            if not ticket.gpu_started: # GPU 대기 중이면 앞선 작업들의 GPU 잔여량만큼 대기
+                for tid, other in self._tickets.items():
+                    if tid == task_id:
+                        break
+                    wait += other.remaining_gpu()
+                wait /= self.gpu_slots
+            remaining = wait + ticket.remaining_total()
+        return (datetime.now() + timedelta(seconds=remaining)).isoformat(timespec="seconds")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """현재 어드미션 상태 요약 (헬스 체크/모니터링용)."""
+        with self._lock:
+            tickets = list(self._tickets.values())
+        return {
+            "outstanding_gpu_seconds": round(sum(t.remaining_gpu() for t in tickets), 1),
+            "max_backlog_gpu_seconds": self.max_backlog_gpu_seconds,
+            "gpu_slots": self.gpu_slots,
+            "admitted_tasks": len(tickets),
+            "gpu_running": sum(1 for t in tickets if t.gpu_started and t.remaining_gpu() > 0),
+            "stage_estimates": {k: round(v, 2) for k, v in self.history.values.items()}
+        }
@@ -0,0 +1,273 @@
+# app/core/artifacts.py - 산출물 수명 관리: 파일별 크기/마지막 접근 인덱스 + 용량 한도(LRU)·TTL 정리
+#
+# 관리 대상 풀:
+#   tasks       - generated/<종류>/<작업 ID>/ (종류: audio, videos, images, bgm, final, streams). 작업 단위로 정리
+#   scene_cache - 씬 클립/나레이션/스틸 캐시. 파일 단위 LRU (조회 적중 시 접근 시각 갱신)
+#   scratch     - test_audio/, data/output 등 테스트/목업 출력. 파일 단위 TTL
+# generated/bgm_library, generated/image_store 등 그 밖의 경로는 관리하지 않습니다 (자체 인덱스가 있는 저장소).
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Callable, Tuple
+
+from app.core.task_control import remove_artifact_dirs
+
+TASK_KINDS = ("audio", "videos", "images", "bgm", "final", "streams") # 작업별 산출물 디렉토리 종류
+INTERMEDIATE_KINDS = ("audio", "videos", "images", "bgm") # 최종 렌더링 후 필요 없는 중간 산출물
+GB = 1024 ** 3
+
+@dataclass(frozen=True)
+class PoolPolicy:
+    quota_bytes: Optional[int] = None # 초과 시 오래 접근하지 않은 그룹부터 삭제
+    ttl_s: Optional[float] = None # 마지막 접근 후 이 시간이 지나면 삭제
+    grace_s: float = 3600.0 # 최근 접근한 그룹은 한도 초과여도 삭제하지 않음 (진행 중 작업이 쓰는 캐시 보호)
+
+def _policy_from_env(prefix: str, quota_gb: Optional[float], ttl_hours: Optional[float]) -> PoolPolicy:
+    quota = os.getenv(f"{prefix}_QUOTA_GB")
+    ttl = os.getenv(f"{prefix}_TTL_HOURS")
+    quota_gb = float(quota) if quota else quota_gb
+    ttl_hours = float(ttl) if ttl else ttl_hours
+    return PoolPolicy(quota_bytes=int(quota_gb * GB) if quota_gb else None, ttl_s=ttl_hours * 3600 if ttl_hours else None)
+
+class ArtifactManager:
+    """
+    산출물 인덱스(경로 → 풀, 그룹, 크기, 마지막 접근)와 주기적 정리.
+    요청 처리 경로(touch/usage)는 메모리만 사용하고, 디렉토리 순회와 삭제는 백그라운드 스레드에서 실행합니다.
+    """
+
+    def __init__(self, generated_dir: str, scene_cache_dir: str, scratch_dirs: List[str],
+                 index_path: Optional[str] = None, policies: Optional[Dict[str, PoolPolicy]] = None,
+                 is_pinned: Callable[[str], bool] = lambda task_id: False,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        self.generated_dir = os.path.abspath(generated_dir)
+        self.scene_cache_dir = os.path.abspath(scene_cache_dir)
+        self.scratch_dirs = [os.path.abspath(d) for d in scratch_dirs]
+        self.index_path = index_path or os.path.join(self.generated_dir, "artifact_index.json")
+        self.policies = policies or {
+            "tasks": _policy_from_env("ARTIFACT_TASKS", 20.0, 24 * 7),
+            "scene_cache": _policy_from_env("ARTIFACT_SCENE_CACHE", 10.0, 24 * 30),
+            "scratch": _policy_from_env("ARTIFACT_SCRATCH", None, 24)
+        }
+        self.is_pinned = is_pinned # 진행 중인 작업 ID면 True (정리 대상에서 제외)
+        self.on_evict = on_evict # 작업 산출물이 정리된 뒤 호출 (작업 ID)
+        self._records: Dict[str, Dict[str, Any]] = {} # 경로 → {"pool", "group", "size", "last_access"}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_gc: Optional[Dict[str, Any]] = None
+        self._gc_task: Optional[asyncio.Task] = None
+        self._load()
+
+    # ── 인덱스 ──────────────────────────────────
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self._records = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self._records = {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._records)
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": snapshot}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path) # 원자적 교체
+
+    def classify(self, path: str) -> Optional[Tuple[str, str]]:
+        """경로 → (풀, 그룹). 관리 대상이 아니면 None. 작업 풀의 그룹은 작업 ID, 나머지는 파일 경로."""
+        path = os.path.abspath(path)
+        if path.startswith(self.scene_cache_dir + os.sep):
+            return "scene_cache", path
+        for scratch in self.scratch_dirs:
+            if path.startswith(scratch + os.sep):
+                return "scratch", path
+        if path.startswith(self.generated_dir + os.sep):
+            parts = os.path.relpath(path, self.generated_dir).split(os.sep)
+            if len(parts) >= 3 and parts[0] in TASK_KINDS: # <종류>/<작업 ID>/<파일...>
+                return "tasks", parts[1]
+        return None
+
+    def _record_file(self, path: str, last_access: Optional[float] = None) -> bool:
+        placement = self.classify(path)
+        if placement is None:
+            return False
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return False
+        existing = self._records.get(path)
+        self._records[path] = {
+            "pool": placement[0], "group": placement[1], "size": stat_result.st_size,
+            "last_access": last_access or (existing or {}).get("last_access") or stat_result.st_mtime
+        }
+        return True
+
+    def track(self, path: str):
+        """파일 또는 디렉토리(하위 파일 전체)를 방금 사용한 것으로 등록."""
+        now = time.time()
+        files = [path] if os.path.isfile(path) else [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+        with self._lock:
+            for file_path in files:
+                self._dirty |= self._record_file(os.path.abspath(file_path), now)
+
+    def touch(self, path: str):
+        """접근 시각 갱신 (다운로드/캐시 적중·저장). 인덱스에 있으면 메모리만 갱신하고 다음 정리 주기에 저장."""
+        path = os.path.abspath(path)
+        with self._lock:
+            record = self._records.get(path)
+            if record is not None:
+                record["last_access"] = time.time()
+                self._dirty = True
+            else: # 새 파일 (캐시 저장 등): 한 번만 stat
+                self._dirty |= self._record_file(path, time.time())
+
+    def scan(self):
+        """관리 대상 디렉토리를 순회해 인덱스에 없는 파일 추가(접근 시각 = 수정 시각), 사라진 파일 제거."""
+        roots = [os.path.join(self.generated_dir, kind) for kind in TASK_KINDS] + [self.scene_cache_dir] + self.scratch_dirs
+        seen = set()
+        for root_dir in roots:
+            for root, _, names in os.walk(root_dir):
+                for name in names:
+                    if name.endswith((".tmp", ".part")): # 쓰는 중인 임시 파일
+                        continue
+                    seen.add(os.path.join(root, name))
+        with self._lock:
+            for path in [p for p in self._records if p not in seen]:
+                del self._records[path]
+                self._dirty = True
+            for path in seen:
+                self._dirty |= self._record_file(path)
+
+    # ── 정리 ──────────────────────────────────────
+    def task_dirs(self, task_id: str, kinds: Tuple[str, ...] = TASK_KINDS) -> List[str]:
+        return [os.path.join(self.generated_dir, kind, task_id) for kind in kinds]
+
+    def _remove_group(self, pool: str, group: str) -> int:
+        """그룹 삭제 후 확보한 바이트 수 반환 (작업 그룹은 모든 종류의 디렉토리)."""
+        with self._lock:
+            paths = [p for p, r in self._records.items() if r["pool"] == pool and r["group"] == group]
+            freed = sum(self._records[p]["size"] for p in paths)
+            for path in paths:
+                del self._records[path]
+            self._dirty = True
+        if pool == "tasks":
+            freed = remove_artifact_dirs(self.task_dirs(group)) # 인덱스에 아직 없는 파일까지 포함한 실제 확보량
+            if self.on_evict:
+                self.on_evict(group)
+        else:
+            try:
+                os.remove(group)
+            except OSError:
+                pass
+        return freed
+
+    def release_intermediates(self, task_id: str, keep_path: str) -> int:
+        """최종 렌더링을 디스크에 확정(fsync)한 뒤 작업의 중간 산출물 삭제. 확보한 바이트 수 반환."""
+        with open(keep_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return 0
+            os.fsync(f.fileno())
+        directories = self.task_dirs(task_id, INTERMEDIATE_KINDS)
+        prefixes = tuple(os.path.abspath(d) + os.sep for d in directories)
+        with self._lock:
+            for path in [p for p in self._records if p.startswith(prefixes)]:
+                del self._records[path]
+            self._dirty = True
+        return remove_artifact_dirs(directories)
+
+    def _groups(self, pool: str) -> List[Dict[str, Any]]:
+        groups: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for record in self._records.values():
+                if record["pool"] != pool:
+                    continue
+                group = groups.setdefault(record["group"], {"group": record["group"], "size": 0, "last_access": 0.0})
+                group["size"] += record["size"]
+                group["last_access"] = max(group["last_access"], record["last_access"])
+        return sorted(groups.values(), key=lambda g: g["last_access"]) # 오래된 것부터
+
+    def collect(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """TTL 만료 그룹 삭제 후, 풀 용량이 한도를 넘으면 LRU 순으로 삭제. 정리 보고서 반환."""
+        started = time.perf_counter()
+        now = now or time.time()
+        self.scan()
+        report: Dict[str, Any] = {"evicted": [], "freed_bytes": 0}
+        for pool, policy in self.policies.items():
+            groups = self._groups(pool)
+            total = sum(g["size"] for g in groups)
+            for group in groups:
+                idle_s = now - group["last_access"]
+                if idle_s < policy.grace_s or (pool == "tasks" and self.is_pinned(group["group"])):
+                    continue
+                expired = policy.ttl_s is not None and idle_s > policy.ttl_s
+                over_quota = policy.quota_bytes is not None and total > policy.quota_bytes
+                if not (expired or over_quota):
+                    continue
+                freed = self._remove_group(pool, group["group"])
+                total -= group["size"]
+                report["freed_bytes"] += freed
+                report["evicted"].append({"pool": pool, "group": group["group"], "bytes": freed,
+                                          "reason": "ttl" if expired else "quota", "idle_s": round(idle_s)})
+        self.save()
+        report.update(at=now, duration_ms=round((time.perf_counter() - started) * 1000, 1))
+        self._last_gc = report
+        if report["evicted"]:
+            print(f"🧹 산출물 정리: {len(report['evicted'])}개 그룹, {report['freed_bytes'] / (1024 * 1024):.1f}MB 확보")
+        return report
+
+    # ── 보고 / 백그라운드 ─────────────────────────────
+    def usage(self) -> Dict[str, Any]:
+        """풀별 디스크 사용량과 한도 (메모리 인덱스 기준, 헬스 체크용)."""
+        pools: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for record in self._records.values():
+                pool = pools.setdefault(record["pool"], {"bytes": 0, "files": 0, "groups": set()})
+                pool["bytes"] += record["size"]
+                pool["files"] += 1
+                pool["groups"].add(record["group"])
+        report = {}
+        for name, policy in self.policies.items():
+            pool = pools.get(name, {"bytes": 0, "files": 0, "groups": set()})
+            report[name] = {
+                "used_mb": round(pool["bytes"] / (1024 * 1024), 1), "used_bytes": pool["bytes"], "files": pool["files"], "groups": len(pool["groups"]),
+                "quota_mb": round(policy.quota_bytes / (1024 * 1024)) if policy.quota_bytes else None,
+                "ttl_hours": round(policy.ttl_s / 3600, 1) if policy.ttl_s else None
+            }
+        try:
+            disk = shutil.disk_usage(self.generated_dir)
+            free_mb = round(disk.free / (1024 * 1024))
+        except OSError:
+            free_mb = None
+        last_gc = self._last_gc
+        return {
+            "pools": report,
+            "disk_free_mb": free_mb,
+            "last_gc": {k: last_gc[k] for k in ("at", "duration_ms", "freed_bytes")} | {"evicted": len(last_gc["evicted"])} if last_gc else None
+        }
+
+    async def start(self, interval_s: float = 600.0):
+        """주기적 정리 시작 (첫 정리는 즉시: 기존 파일 인덱싱 포함)."""
+        async def loop():
+            while True:
+                try:
+                    await asyncio.to_thread(self.collect)
+                except Exception as e:
+                    print(f"⚠️ 산출물 정리 실패: {e}")
+                await asyncio.sleep(interval_s)
+        if self._gc_task is None:
+            self._gc_task = asyncio.create_task(loop())
+
+    async def stop(self):
+        if self._gc_task is not None:
+            self._gc_task.cancel()
+            self._gc_task = None
+        await asyncio.to_thread(self.save)
@@ -0,0 +1,98 @@
+# app/core/capabilities.py - 시스템 기능(FFmpeg, Whisper, librosa 등) 가용성 캐시 레지스트리
+
+import time
+import asyncio
+import threading
+import importlib.util
+from typing import Dict, Any, Callable, Optional
+
+ProbeFn = Callable[[], Dict[str, Any]] # {"available": bool, ...상세 정보} 반환
+
+class CapabilityRegistry:
+    """
+    기능 가용성을 시작 시 한 번 조사하고 TTL 주기로 백그라운드에서 갱신하는 레지스트리.
+    헬스 체크는 메모리의 스냅샷만 읽으므로 프로세스 생성이나 무거운 임포트가 없습니다.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds # 재조사 주기 (초)
+        self._probes: Dict[str, ProbeFn] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._probed_at: Optional[float] = None # 마지막 조사 시각 (time.time)
+        self._lock = threading.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, probe: ProbeFn):
+        """기능 조사 함수 등록."""
+        self._probes[name] = probe
+
+    def refresh(self) -> Dict[str, Dict[str, Any]]:
+        """등록된 모든 조사 함수 실행 (동기, 백그라운드 스레드에서 호출)."""
+        results = {}
+        for name, probe in self._probes.items():
+            started = time.perf_counter()
+            try:
+                result = dict(probe())
+            except Exception as e: # 조사 실패는 '사용 불가'로 기록
+                result = {"available": False, "error": str(e)}
+            result["probe_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            results[name] = result
+        with self._lock:
+            self._results = results
+            self._probed_at = time.time()
+        return results
+
+    def _ensure_probed(self):
+        if self._probed_at is None: # 스타트업 이전 접근 (스크립트 등): 한 번만 동기 조사
+            self.refresh()
+
+    @property
+    def probed(self) -> bool:
+        return self._probed_at is not None
+
+    def get(self, name: str) -> bool:
+        """기능 사용 가능 여부 (캐시)."""
+        self._ensure_probed()
+        return bool(self._results.get(name, {}).get("available", False))
+
+    def detail(self, name: str) -> Dict[str, Any]:
+        """기능 조사 상세 결과 (캐시)."""
+        self._ensure_probed()
+        return dict(self._results.get(name, {}))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """전체 조사 결과 및 조사 시각."""
+        self._ensure_probed()
+        with self._lock:
+            return {
+                "probed_at": self._probed_at,
+                "age_seconds": round(time.time() - self._probed_at, 1) if self._probed_at else None,
+                "ttl_seconds": self.ttl_seconds,
+                "capabilities": {k: dict(v) for k, v in self._results.items()}
+            }
+
+    # ── 백그라운드 갱신 ──────────────────────────
+    async def start(self):
+        """최초 조사 후 TTL 주기 백그라운드 갱신 시작 (FastAPI startup 이벤트에서 호출)."""
+        await asyncio.to_thread(self.refresh)
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.ttl_seconds)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"⚠️ 기능 가용성 갱신 실패: {e}")
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+def module_probe(module_name: str) -> ProbeFn:
+    """모듈을 임포트하지 않고 설치 여부만 확인하는 조사 함수 생성."""
+    def probe() -> Dict[str, Any]:
+        return {"available": importlib.util.find_spec(module_name) is not None}
+    return probe
@@ -0,0 +1,226 @@
+# app/core/delivery.py - 산출물 전송 계층: 사전 계산 메타데이터 인덱스 + 강한 ETag + 조건부 GET(304) + Range + 제로 카피 전송
+#
+# 작업이 완료될 때 파일의 크기/수정 시각/SHA-256을 한 번 계산해 인덱스에 올려 두므로,
+# 다운로드 요청마다 os.stat/exists나 작업 기록 조회가 없습니다. 파일 본문 전송은 서버가 지원하는 방식 중
+# 가장 저렴한 것을 사용합니다: ASGI zerocopy(sendfile) → pathsend → 큰 청크 pread.
+
+import os
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Dict, Tuple
+from urllib.parse import quote
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+HASH_CHUNK_BYTES = 1024 * 1024
+SEND_CHUNK_BYTES = 256 * 1024 # 제로 카피 불가 시 청크 크기 (FileResponse 기본 64KB보다 send 호출 4배 적음)
+TASK_CACHE_CONTROL = "private, max-age=86400" # 작업 산출물: 완료 후 내용이 바뀌지 않음 (재검증은 ETag로)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable" # 콘텐츠 주소 파일 (주소가 곧 내용)
+
+@dataclass(frozen=True)
+class MediaEntry:
+    """전송 대상 파일의 사전 계산 메타데이터."""
+    path: str
+    stat: os.stat_result
+    sha256: str
+    media_type: str
+    filename: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        return self.stat.st_size
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.sha256[:32]}"' # 강한 ETag: 내용 해시 (바이트 단위로 같을 때만 일치)
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.stat.st_mtime, usegmt=True)
+
+def describe_file(path: str, media_type: str, filename: Optional[str] = None) -> MediaEntry:
+    """파일 메타데이터와 내용 해시 계산 (동기: 스레드에서 호출)."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        stat_result = os.fstat(f.fileno()) # 해시한 바로 그 파일의 stat
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            sha.update(chunk)
+    return MediaEntry(path=path, stat=stat_result, sha256=sha.hexdigest(), media_type=media_type, filename=filename)
+
+class MediaIndex:
+    """키(작업 ID, 콘텐츠 주소 등) → MediaEntry. 요청 처리 경로는 메모리 조회만 합니다."""
+
+    def __init__(self):
+        self._entries: Dict[str, MediaEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[MediaEntry]:
+        with self._lock:
+            return self._entries.get(key)
+
+    async def register(self, key: str, path: str, media_type: str, filename: Optional[str] = None) -> MediaEntry:
+        """파일을 해시해 인덱스에 등록 (이벤트 루프를 막지 않도록 스레드에서 계산)."""
+        entry = await asyncio.to_thread(describe_file, path, media_type, filename)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, key: str):
+        """파일 삭제/교체 시 호출."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_prefix(self, prefix: str):
+        """키 접두사가 같은 항목 모두 제거 (작업의 스트리밍 세그먼트 등)."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# ── 조건부 요청 / Range 해석 ────────────────────────────
+def is_not_modified(headers: Headers, entry: MediaEntry) -> bool:
+    """If-None-Match(우선) / If-Modified-Since 검사: 클라이언트 사본이 최신이면 True (→ 304)."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None: # If-None-Match는 약한 비교 (W/ 접두사 무시)
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or entry.etag in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(entry.stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def parse_single_range(headers: Headers, entry: MediaEntry) -> Optional[Tuple[int, int]]:
+    """
+    단일 바이트 범위 [start, end) 반환. 전체 전송이면 None.
+    If-Range가 현재 ETag/수정 시각과 다르거나 형식이 잘못된 Range는 무시합니다 (RFC 9110: 전체 200 응답).
+    여러 범위 요청은 ValueError (호출자가 멀티파트 처리로 넘김).
+    """
+    http_range = headers.get("range")
+    if not http_range:
+        return None
+    if_range = headers.get("if-range")
+    if if_range is not None and if_range not in (entry.etag, entry.last_modified):
+        return None
+    unit, _, spec = http_range.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+    if "," in spec:
+        raise ValueError("multiple ranges")
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+    size = entry.size
+    if not first: # 접미 범위: 마지막 N바이트
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - suffix), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end <= start:
+        return None
+    return start, end
+
+# ── 응답 ──────────────────────────────────────────
+def content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    return f"attachment; filename*=utf-8''{quoted}" if quoted != filename else f'attachment; filename="{filename}"'
+
+class MediaFileResponse(Response):
+    """
+    인덱스 항목 기반 파일 응답: stat/해시를 다시 계산하지 않음.
+    전체/단일 범위는 직접 전송하고, 여러 범위 요청만 Starlette FileResponse(멀티파트)에 위임합니다.
+    """
+
+    def __init__(self, entry: MediaEntry, cache_control: str = TASK_CACHE_CONTROL):
+        self.entry = entry
+        self.cache_control = cache_control
+        self.background = None
+
+    def _headers(self, length: int) -> Dict[str, str]:
+        headers = {
+            "content-type": self.entry.media_type,
+            "content-length": str(length),
+            "accept-ranges": "bytes",
+            "etag": self.entry.etag,
+            "last-modified": self.entry.last_modified,
+            "cache-control": self.cache_control
+        }
+        if self.entry.filename:
+            headers["content-disposition"] = content_disposition(self.entry.filename)
+        return headers
+
+    async def __call__(self, scope, receive, send):
+        headers = Headers(scope=scope)
+        method = scope["method"].upper()
+        if is_not_modified(headers, self.entry):
+            validators = {k: v for k, v in self._headers(0).items() if k in ("etag", "last-modified", "cache-control")}
+            return await Response(status_code=304, headers=validators)(scope, receive, send)
+        try:
+            byte_range = parse_single_range(headers, self.entry)
+        except RangeNotSatisfiable:
+            return await Response(status_code=416, headers={"content-range": f"bytes */{self.entry.size}"})(scope, receive, send)
+        except ValueError: # 여러 범위: multipart/byteranges (드묾)
+            fallback = FileResponse(self.entry.path, media_type=self.entry.media_type, filename=self.entry.filename,
+                                    stat_result=self.entry.stat, headers={"etag": self.entry.etag, "cache-control": self.cache_control})
+            return await fallback(scope, receive, send)
+
+        start, end = byte_range or (0, self.entry.size)
+        response_headers = self._headers(end - start)
+        status = 200
+        if byte_range is not None:
+            status = 206
+            response_headers["content-range"] = f"bytes {start}-{end - 1}/{self.entry.size}"
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in response_headers.items()]})
+        if method == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopy" in extensions: # 서버가 os.sendfile로 커널에서 바로 전송
+            with open(self.entry.path, "rb") as f:
+                await send({"type": "http.response.zerocopy", "file": f, "offset": start, "count": end - start, "more_body": False})
+        elif "http.response.pathsend" in extensions and byte_range is None:
+            await send({"type": "http.response.pathsend", "path": self.entry.path})
+        else:
+            await self._send_chunks(receive, send, start, end)
+
+    async def _send_chunks(self, receive, send, start: int, end: int):
+        """pread 청크 전송 (파일 위치 공유 없음). 클라이언트가 끊으면 즉시 중단."""
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        fd = os.open(self.entry.path, os.O_RDONLY)
+        try:
+            offset = start
+            while offset < end and not disconnected.is_set():
+                chunk = await asyncio.to_thread(os.pread, fd, min(SEND_CHUNK_BYTES, end - offset), offset)
+                if not chunk: # 전송 중 파일이 잘림
+                    break
+                offset += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": offset < end})
+            if offset < end and not disconnected.is_set():
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
+            watcher.cancel()
@@ -0,0 +1,204 @@
+# app/core/metrics.py - 프로세스 내 메트릭 레지스트리와 Prometheus 텍스트 형식(0.0.4) 출력
+#
+# prometheus_client 없이 /metrics를 제공하기 위한 최소 구현입니다. 관측(observe)은 잠금 하나와
+# 버킷 이진 탐색뿐이므로 단계 경계마다 호출해도 비용이 거의 없습니다.
+# 작업 상태별 개수나 디스크 사용량처럼 상태에서 읽는 값은 수집기(collector)가 스크레이프 시점에 게이지로 채웁니다.
+# 수집기는 메모리 조회만 해야 합니다 (수 초 간격 스크레이프 기준).
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, Tuple, List, Sequence, Callable, Iterator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0) # 초 ~ 30분 단계
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Scalar:
+    """레이블별 단일 값 (Counter/Gauge 공통)."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _add(self, amount: float, labels: Dict[str, str]):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Counter(_Scalar):
+    """단조 증가 카운터 (이름은 _total로 끝나게)."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        if amount < 0:
+            raise ValueError("카운터는 감소할 수 없습니다")
+        self._add(amount, labels)
+
+class Gauge(_Scalar):
+    """현재 값 게이지 (진행 중 개수는 inc/dec, 수집기 값은 set)."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self._add(-amount, labels)
+
+class Histogram:
+    """레이블별 누적 버킷 히스토그램."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {} # 레이블 값 → [버킷별 개수..., +Inf 개수, 합계]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value) # value 이상인 첫 버킷 (le는 경계 포함)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """레이블 값 → {"count", "sum"} (요약 표시용)."""
+        with self._lock:
+            return {key: {"count": sum(series[:-1]), "sum": series[-1]} for key, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in series_items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, key, 'le="%s"' % _format_value(bound))
+                lines.append(f"{self.name}_bucket{bucket_labels} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(cumulative)}")
+        return lines
+
+class MetricsRegistry:
+    """이름 → 메트릭. 같은 이름으로 다시 만들면 기존 메트릭 반환 (모듈 재임포트 안전)."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory: Callable[[], object]):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(name, lambda: Gauge(name, documentation, labelnames))
+
+    def register_collector(self, collector: Callable[[], None]):
+        """스크레이프 직전에 호출되어 게이지를 채우는 함수 등록 (예외는 무시하고 이전 값 유지)."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"⚠️ 메트릭 수집기 실패 ({getattr(collector, '__name__', collector)}): {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry() # 프로세스 공용 레지스트리
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ── 여러 모듈이 함께 쓰는 메트릭 ─────────────────
+OPENAI_REQUEST_SECONDS = REGISTRY.histogram(
+    "openai_request_duration_seconds", "OpenAI API call latency by operation (chat, tts, images) and outcome.",
+    ("operation", "outcome"), (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+)
+OPENAI_ERRORS = REGISTRY.counter(
+    "openai_request_errors_total", "Failed OpenAI API calls by operation and exception type.", ("operation", "error")
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "ad_cache_lookups_total", "Cache lookups by cache name and result (hit/miss); hit ratio = hit / all.", ("cache", "result")
+)
+SUBPROCESSES_RUNNING = REGISTRY.gauge(
+    "ad_subprocesses_running", "Pipeline subprocesses (ffmpeg, ...) currently running; ffmpeg concurrency.", ("program",)
+)
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+@contextmanager
+def openai_request(operation: str) -> Iterator[None]:
+    """OpenAI 호출 구간의 지연과 오류 유형 기록 (취소는 오류로 세지 않음)."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException as e:
+        outcome = "cancelled" if "Cancel" in type(e).__name__ else "error"
+        if outcome == "error":
+            OPENAI_ERRORS.inc(operation=operation, error=type(e).__name__)
+        raise
+    finally:
+        OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation, outcome=outcome)
@@ -2,18 +2,19 @@
 
 import os
 import time
-import torch
-import numpy as np
-import soundfile as sf
 from dotenv import load_dotenv
 from typing import List, Dict, Any
 
+from app.utils import audio_utils, bgm_synth # 섹션 병합 유틸리티 / NumPy 절차적 BGM 신디사이저 (기본 오디오 엔진)
+from app.utils import musicgen_engine # 프로세스 공용 MusicGen 엔진
+
 # 음악 생성 라이브러리 시도 (순서대로)
 MUSIC_GENERATOR_TYPE = None
 
 try:
     # 1차 시도: MusicGen (Meta - 매우 안정적)
-    from transformers import AutoProcessor, MusicgenForConditionalGeneration
+    if not musicgen_engine.MUSICGEN_AVAILABLE:
+        raise ImportError("transformers/torch 미설치")
     MUSIC_GENERATOR_TYPE = "musicgen"
     print("🎵 MusicGen (Meta) 감지 - 안정적인 음악 생성")
 except ImportError:
@@ -37,6 +38,8 @@ load_dotenv()
 class MockOpenAIClient:
     """다양한 음악 생성 엔진을 지원하는 클라이언트"""
     
+    SECTION_CROSSFADE_S = 0.5 # 섹션 간 등전력 크로스페이드 길이 (초)
+    
     def __init__(self):
         print("✅ Mock OpenAI client initialized")
         print(f"🎭 음악 생성: {MUSIC_GENERATOR_TYPE.upper()} 엔진 사용")
@@ -56,20 +59,10 @@ class MockOpenAIClient:
                 self._init_basic_audio()
     
     def _init_musicgen(self):
-        """MusicGen 초기화 (Meta)"""
+        """MusicGen 초기화 (Meta): 클라이언트마다 로드하지 않고 프로세스 공용 상주 모델 사용"""
         try:
-            print("🎵 MusicGen 모델 로딩 중...")
-            
-            # MusicGen small 모델 로드 (빠르고 안정적)
-            self.music_processor = AutoProcessor.from_pretrained("facebook/musicgen-small")
-            self.music_generator = MusicgenForConditionalGeneration.from_pretrained("facebook/musicgen-small")
-            
-            # CPU/GPU 자동 선택
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.music_generator = self.music_generator.to(device)
-            
-            print(f"✅ MusicGen 로딩 완료! (디바이스: {device})")
-            
+            self.music_generator = musicgen_engine.get_musicgen_engine()
+            self.music_processor = self.music_generator.processor
         except Exception as e:
             print(f"❌ MusicGen 로딩 실패: {e}")
             self.music_generator = False
@@ -196,49 +189,25 @@ Call-to-Action: Visit your nearest {brand} location
                 }
             ]
             
-            generated_music = []
+            filepath = self._generate_music_track(music_sections, brand_style)
+            engine = MUSIC_GENERATOR_TYPE if MUSIC_GENERATOR_TYPE == "musicgen" else "basic"
             
+            # 섹션 정보는 유지하되 모두 하나의 연속 트랙을 가리킴 (start = 트랙 내 시작 시각)
+            generated_music = []
+            offset = 0.0
             for section in music_sections:
-                try:
-                    # 엔진별 음악 생성
-                    if MUSIC_GENERATOR_TYPE == "musicgen":
-                        filepath = self._generate_music_with_musicgen(
-                            prompt=section["prompt"],
-                            duration=section["duration"]
-                        )
-                    elif MUSIC_GENERATOR_TYPE == "riffusion":
-                        filepath = self._generate_music_with_riffusion(
-                            prompt=section["prompt"],
-                            duration=section["duration"]
-                        )
-                    else:
-                        filepath = self._generate_music_with_basic_audio(
-                            prompt=section["prompt"],
-                            duration=section["duration"]
-                        )
-                    
-                    generated_music.append({
-                        "section": section["name"],
-                        "file_path": filepath,
-                        "duration": section["duration"],
-                        "prompt": section["prompt"],
-                        "style": brand_style,
-                        "engine": MUSIC_GENERATOR_TYPE
-                    })
-                    
-                except Exception as e:
-                    print(f"❌ {section['name']} 음악 생성 실패: {e}")
-                    # 목업으로 대체
-                    generated_music.append({
-                        "section": section["name"],
-                        "file_path": f"data/temp/{section['name']}_music.wav",
-                        "duration": section["duration"],
-                        "prompt": section["prompt"],
-                        "style": brand_style,
-                        "engine": "mock"
-                    })
+                generated_music.append({
+                    "section": section["name"],
+                    "file_path": filepath,
+                    "start": round(offset, 3),
+                    "duration": section["duration"],
+                    "prompt": section["prompt"],
+                    "style": brand_style,
+                    "engine": engine
+                })
+                offset += section["duration"] - self.SECTION_CROSSFADE_S
             
-            print(f"✅ 배경음악 {len(generated_music)}개 생성 완료 ({MUSIC_GENERATOR_TYPE.upper()})")
+            print(f"✅ 배경음악 {len(generated_music)}개 섹션을 단일 트랙으로 생성 완료 ({engine.upper()}): {filepath}")
             return generated_music
             
         except Exception as e:
@@ -271,96 +240,34 @@ Call-to-Action: Visit your nearest {brand} location
         
         return {"brand": brand, "style": style, "mood": mood}
 
-    def _generate_music_with_musicgen(self, prompt: str, duration: float = 10.0) -> str:
-        """MusicGen으로 실제 음악 생성"""
-        print(f"🎼 MusicGen 음악 생성: '{prompt[:50]}...'")
+    def _generate_music_track(self, sections: List[Dict[str, Any]], brand_style: Dict[str, str]) -> str:
+        """섹션들을 생성해 크로스페이드로 이어 붙인 단일 트랙 저장"""
+        prompts = [section["prompt"] for section in sections]
+        durations = [section["duration"] for section in sections]
         
-        try:
-            # 출력 디렉토리 생성
-            output_dir = "data/output"
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # MusicGen으로 음악 생성
-            inputs = self.music_processor(
-                text=[prompt],
-                padding=True,
-                return_tensors="pt",
-            )
-            
-            # 음악 생성 (duration 초)
-            audio_values = self.music_generator.generate(**inputs, max_new_tokens=int(duration * 50))  # 대략적인 토큰 수
-            
-            # 오디오 데이터 추출
-            audio_data = audio_values[0, 0].cpu().numpy()
-            
-            # 파일명 생성
-            safe_prompt = "".join(c for c in prompt if c.isalnum() or c in (' ', '-', '_'))[:30]
-            filename = f"musicgen_{safe_prompt.replace(' ', '_')}.wav"
-            filepath = os.path.join(output_dir, filename)
-            
-            # WAV 파일로 저장
-            sample_rate = self.music_generator.config.audio_encoder.sampling_rate
-            sf.write(filepath, audio_data, sample_rate)
-            
-            print(f"✅ MusicGen 음악 생성 완료: {filepath}")
-            return filepath
-            
-        except Exception as e:
-            print(f"❌ MusicGen 음악 생성 실패: {e}")
-            raise e
-
-    def _generate_music_with_basic_audio(self, prompt: str, duration: float = 10.0) -> str:
-        """기본 오디오 합성으로 음악 생성"""
-        print(f"🎼 기본 오디오 합성: '{prompt[:50]}...'")
+        clips = None
+        if MUSIC_GENERATOR_TYPE == "musicgen":
+            # 세 섹션을 한 번의 generate 호출로 배치 생성
+            print(f"🎼 MusicGen 섹션 {len(sections)}개 배치 생성: '{prompts[0][:50]}...'")
+            try:
+                clips = self.music_generator.generate_sections(prompts, durations)
+                sample_rate = self.music_generator.sample_rate
+                print(f"📊 MusicGen 통계: {self.music_generator.last_stats}")
+            except Exception as e: # 배치 생성 실패 시 트랙 전체를 목업으로 버리지 않고 절차적 신디사이저로 렌더링
+                print(f"⚠️ MusicGen 생성 실패, 절차적 신디사이저로 대체: {e}")
+        if clips is None:
+            # Riffusion 섹션 생성기는 구현되어 있지 않으므로 기본 엔진도 절차적 신디사이저 사용
+            print(f"🎼 기본 오디오 합성: '{prompts[0][:50]}...'")
+            sample_rate = bgm_synth.SAMPLE_RATE
+            clips = [bgm_synth.render_bgm(duration, prompt=prompt, sample_rate=sample_rate) for prompt, duration in zip(prompts, durations)]
         
-        try:
-            # 출력 디렉토리 생성
-            output_dir = "data/output"
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # 프롬프트 기반 음악 스타일 결정
-            sample_rate = 44100
-            audio_length = int(duration * sample_rate)
-            t = np.linspace(0, duration, audio_length)
-            
-            # 프롬프트에 따른 주파수 선택
-            if "cozy" in prompt.lower() or "warm" in prompt.lower():
-                # 따뜻한 화음
-                base_freqs = [220, 330, 440]  # A3, E4, A4
-            elif "upbeat" in prompt.lower() or "energetic" in prompt.lower():
-                # 활기찬 화음
-                base_freqs = [262, 330, 392]  # C4, E4, G4
-            else:
-                # 편안한 화음
-                base_freqs = [196, 294, 392]  # G3, D4, G4
-            
-            # 화음 생성
-            audio = np.zeros(audio_length)
-            for i, freq in enumerate(base_freqs):
-                amplitude = 0.15 / (i + 1)  # 점점 작은 볼륨
-                # 약간의 변조 추가 (더 자연스럽게)
-                modulation = 1 + 0.1 * np.sin(2 * np.pi * 0.5 * t)
-                audio += amplitude * np.sin(2 * np.pi * freq * t * modulation)
-            
-            # 페이드 인/아웃
-            fade_samples = int(1.0 * sample_rate)
-            audio[:fade_samples] *= np.linspace(0, 1, fade_samples)
-            audio[-fade_samples:] *= np.linspace(1, 0, fade_samples)
-            
-            # 파일명 생성
-            safe_prompt = "".join(c for c in prompt if c.isalnum() or c in (' ', '-', '_'))[:30]
-            filename = f"basic_audio_{safe_prompt.replace(' ', '_')}.wav"
-            filepath = os.path.join(output_dir, filename)
-            
-            # WAV 파일로 저장
-            sf.write(filepath, audio, sample_rate)
-            
-            print(f"✅ 기본 오디오 합성 완료: {filepath}")
-            return filepath
-            
-        except Exception as e:
-            print(f"❌ 기본 오디오 합성 실패: {e}")
-            raise e
+        track = audio_utils.crossfade_concat(clips, sample_rate, self.SECTION_CROSSFADE_S)
+        
+        output_dir = "data/output"
+        os.makedirs(output_dir, exist_ok=True)
+        safe_style = "".join(c for c in brand_style["style"] if c.isalnum() or c in (' ', '-', '_'))[:30]
+        filename = f"{MUSIC_GENERATOR_TYPE}_{safe_style.replace(' ', '_')}_{int(time.time())}.wav"
+        return audio_utils.write_wav(os.path.join(output_dir, filename), track, sample_rate)
 
     def _generate_mock_music(self) -> List[Dict[str, Any]]:
         """목업 음악 데이터 생성"""
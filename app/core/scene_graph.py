@@ -0,0 +1,227 @@
+# app/core/scene_graph.py - 멀티 씬 광고 구성: 씬 모델, 씬 단위 캐시, 단일 FFmpeg 합성 그래프(xfade + 씬별 나레이션 배치)
+#
+# 씬마다 클립/나레이션을 따로 만들고 내용 해시로 캐시하므로, 한 씬만 수정하면 그 씬만 다시 렌더링됩니다.
+# 최종 합성은 클립 정렬(리타이밍/패딩) → xfade 전환 → 씬 시작 시각에 나레이션 배치 → BGM 더킹까지 한 번의 인코딩으로 처리합니다.
+# GPU가 없으면 클립 대신 스틸 이미지에 Ken Burns 모션을 적용해 같은 그래프로 합성합니다.
+
+import os
+import json
+import shutil
+import hashlib
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from app.utils import audio_mixer, timing, ken_burns
+from app.core import metrics
+
+MIN_SCENE_SECONDS = 3.0 # 씬 최소 길이 (LLM 응답 보정 시)
+DEFAULT_TRANSITION_S = 0.5 # 씬 사이 xfade 길이
+SCENE_CACHE_DIR = os.getenv("SCENE_CACHE_DIR", os.path.join(os.getcwd(), "generated", "scene_cache"))
+
+@dataclass
+class Scene:
+    """광고 한 장면: 시간 구간, 영상 설명(영문), 나레이션(한국어)."""
+    index: int
+    name: str
+    duration_s: float
+    visual_description: str
+    narration: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "duration": self.duration_s,
+                "visual_description": self.visual_description, "narration": self.narration}
+
+def _normalize_durations(durations: List[float], total_s: float) -> List[float]:
+    """씬 길이 합을 광고 길이에 맞춤 (비율 유지, 최소 길이 보장, 0.1초 단위)."""
+    durations = [max(MIN_SCENE_SECONDS, float(d or 0)) for d in durations]
+    scale = total_s / sum(durations)
+    scaled = [round(d * scale, 1) for d in durations]
+    scaled[-1] = round(total_s - sum(scaled[:-1]), 1) # 반올림 오차는 마지막 씬이 흡수
+    return scaled
+
+def scenes_from_concept(concept: Dict[str, Any], total_s: float) -> List[Scene]:
+    """LLM 컨셉(또는 사용자 편집 스토리보드)의 scenes를 씬 목록으로. 없으면 통합 나레이션/영상 설명으로 단일 씬."""
+    raw = [s for s in (concept.get("scenes") or []) if isinstance(s, dict) and s.get("narration")
+           and (s.get("visual_description") or s.get("description"))]
+    if not raw:
+        return [Scene(0, "Ad", float(total_s), concept.get("visual_description", ""), concept.get("narration", ""))]
+    durations = _normalize_durations([s.get("duration") or total_s / len(raw) for s in raw], float(total_s))
+    return [
+        Scene(i, s.get("name") or f"Scene {i + 1}", durations[i],
+              s.get("visual_description") or s.get("description"), s["narration"])
+        for i, s in enumerate(raw)
+    ]
+
+# ── 씬 단위 캐시 ────────────────────────────────
+def content_key(**fields: Any) -> str:
+    """렌더링 입력 필드의 해시 (같은 입력 = 같은 산출물)."""
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+class SceneCache:
+    """씬 클립/나레이션 캐시: <root>/<kind>/<key><ext>. 작업 디렉토리 밖에 있어 작업 정리 시에도 유지됩니다."""
+
+    def __init__(self, root: str = SCENE_CACHE_DIR, on_access: Optional[Callable[[str], None]] = None):
+        self.root = root
+        self.on_access = on_access # 적중/저장 시 호출 (산출물 관리자의 LRU 접근 시각 갱신)
+
+    def _path(self, kind: str, key: str, ext: str) -> str:
+        return os.path.join(self.root, kind, f"{key}{ext}")
+
+    def lookup(self, kind: str, key: str, ext: str) -> Optional[str]:
+        path = self._path(kind, key, ext)
+        hit = os.path.exists(path) and os.path.getsize(path) > 0
+        metrics.record_cache_lookup(f"scene_{kind}", hit) # scene_narrations / scene_stills / scene_clips
+        if not hit:
+            return None
+        if self.on_access:
+            self.on_access(path)
+        return path
+
+    def store(self, kind: str, key: str, source_path: str) -> str:
+        """산출물을 캐시에 등록 (하드 링크, 불가하면 복사). 실패해도 원본 경로는 그대로 사용 가능."""
+        path = self._path(kind, key, os.path.splitext(source_path)[1])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            try:
+                os.link(source_path, tmp_path)
+            except OSError: # 다른 파일시스템 등
+                shutil.copy2(source_path, tmp_path)
+            os.replace(tmp_path, path) # 원자적 교체 (동시 작업이 같은 씬을 만들어도 안전)
+        except OSError as e:
+            print(f"⚠️ 씬 캐시 저장 실패 ({kind}/{key}): {e}")
+            return source_path
+        if self.on_access:
+            self.on_access(path)
+        return path
+
+# ── 합성 그래프 ─────────────────────────────────
+@dataclass
+class SceneMedia:
+    """합성에 들어가는 씬별 산출물과 실측 길이."""
+    scene: Scene
+    clip_path: str
+    clip_s: Optional[float]
+    narration_path: str
+    narration_s: float
+    narration_loudness: Dict[str, Any] = field(default_factory=dict)
+    motion: Optional[str] = None # 스틸 이미지 씬: Ken Burns 모션 (clip_path는 이미지, clip_s는 무시)
+
+@dataclass(frozen=True)
+class CompositionSettings:
+    width: int = 720 # CogVideoX-2b 기본 해상도
+    height: int = 480
+    fps: float = 8.0
+    transition: str = "fade" # xfade 전환 종류
+    transition_s: float = DEFAULT_TRANSITION_S
+
+def _slot_seconds(durations: List[float], transition_s: float) -> List[float]:
+    """씬별 영상 슬롯 길이: 다음 씬과 겹치는 전환 구간만큼 더 길게 (마지막 씬 제외)."""
+    return [d + (transition_s if i < len(durations) - 1 else 0.0) for i, d in enumerate(durations)]
+
+def xfade_chain(durations: List[float], settings: CompositionSettings = CompositionSettings(),
+                output_label: str = "video_out") -> List[str]:
+    """[v0]..[v{n-1}] 슬롯을 xfade로 잇는 필터 목록. 각 오프셋 = 지금까지 이어진 길이 - 전환 길이."""
+    n = len(durations)
+    if n == 1:
+        return [f"[v0]null[{output_label}]"]
+    transition_s = settings.transition_s
+    slots = _slot_seconds(durations, transition_s)
+    graph, current, length = [], "[v0]", slots[0]
+    for i in range(1, n):
+        label = f"[{output_label}]" if i == n - 1 else f"[x{i}]"
+        graph.append(f"{current}[v{i}]xfade=transition={settings.transition}:duration={transition_s}:"
+                     f"offset={length - transition_s:.3f}{label}")
+        current, length = label, length - transition_s + slots[i]
+    return graph
+
+def _video_chain(input_index: int, clip_s: Optional[float], slot_s: float, settings: CompositionSettings,
+                 motion: Optional[str] = None,
+                 motion_settings: ken_burns.MotionSettings = ken_burns.DEFAULT_MOTION) -> Tuple[str, float, float]:
+    """씬 영상 슬롯 필터 ([i:v] → [v{i}]), setpts 배율, 패딩 길이."""
+    if motion: # 스틸: zoompan이 슬롯 길이만큼 프레임 생성
+        retime, pad_s = 1.0, 0.0
+        video_filters = [ken_burns.motion_filter(motion, slot_s, settings.fps, settings.width, settings.height, motion_settings)]
+    else:
+        retime, pad_s = timing.fit_video(slot_s, clip_s)
+        video_filters = []
+        if abs(retime - 1.0) > 1e-3:
+            video_filters.append(f"setpts={retime}*PTS")
+        video_filters += [
+            f"fps={settings.fps}",
+            f"scale={settings.width}:{settings.height}:force_original_aspect_ratio=decrease",
+            f"pad={settings.width}:{settings.height}:(ow-iw)/2:(oh-ih)/2",
+            "setsar=1", "format=yuv420p"
+        ]
+        if pad_s > 0:
+            video_filters.append(f"tpad=stop_mode=clone:stop_duration={pad_s:.3f}")
+    # 타임스탬프 재설정은 프레임레이트를 가변으로 표시하므로 마지막에 고정 fps로 되돌림 (xfade는 CFR 입력 필요)
+    video_filters.append(f"trim=duration={slot_s:.3f},setpts=PTS-STARTPTS,fps={settings.fps}")
+    return f"[{input_index}:v]{','.join(video_filters)}[v{input_index}]", retime, pad_s
+
+def build_slideshow_graph(images: List[str], durations: List[float],
+                          settings: CompositionSettings = CompositionSettings(),
+                          motion_settings: ken_burns.MotionSettings = ken_burns.DEFAULT_MOTION) -> Tuple[List[str], str]:
+    """스틸 이미지만으로 된 영상 그래프 (나레이션/BGM 없음, 출력 [video_out]). 벤치마크/단독 렌더링용."""
+    input_args: List[str] = []
+    for path in images:
+        input_args += ken_burns.still_input_args(path)
+    slots = _slot_seconds(durations, settings.transition_s if len(images) > 1 else 0.0)
+    graph = [_video_chain(i, None, slots[i], settings, ken_burns.motion_for(i), motion_settings)[0] for i in range(len(images))]
+    return input_args, ";".join(graph + xfade_chain(durations, settings))
+
+def build_scene_graph(media: List[SceneMedia], total_s: float, bgm_path: Optional[str] = None,
+                      bgm_loudness: Optional[Dict[str, Any]] = None,
+                      settings: CompositionSettings = CompositionSettings(),
+                      mix: audio_mixer.MixSettings = audio_mixer.DEFAULT_MIX) -> Tuple[List[str], str, List[Dict[str, Any]]]:
+    """
+    씬 목록의 FFmpeg 입력 인자, filter_complex, 씬별 정렬 계획 반환.
+    출력 라벨: [video_out], [audio_mix]. 입력 순서: 클립 0..n-1, 나레이션 n..2n-1, BGM 2n.
+    """
+    n = len(media)
+    transition_s = settings.transition_s if n > 1 else 0.0
+    input_args: List[str] = []
+    for m in media:
+        input_args += ken_burns.still_input_args(m.clip_path) if m.motion else ["-i", m.clip_path]
+    for m in media:
+        input_args += ["-i", m.narration_path]
+    if bgm_path:
+        input_args += audio_mixer.bgm_input_args(bgm_path)
+
+    graph: List[str] = []
+    plans: List[Dict[str, Any]] = []
+    start_s = 0.0
+    voice_labels = []
+    slots = _slot_seconds([m.scene.duration_s for m in media], transition_s)
+    for i, m in enumerate(media):
+        video_graph, retime, pad_s = _video_chain(i, m.clip_s, slots[i], settings, m.motion)
+        graph.append(video_graph)
+
+        # 나레이션: 씬 구간 안에 맞춰 가속/배치 후 씬 시작 시각만큼 지연, 씬별 정규화
+        plan = timing.plan_alignment(m.scene.duration_s, m.narration_s, None)
+        plan.voice_delay_s += start_s
+        gain = audio_mixer.gain_db(m.narration_loudness.get("integrated_lufs", audio_mixer.SILENCE_LUFS), mix.voice_target_lufs)
+        voice_chain = timing.voice_filter(plan)
+        graph.append(
+            f"[{n + i}:a]{voice_chain + ',' if voice_chain else ''}"
+            f"atrim=end={start_s + m.scene.duration_s:.3f}," # 한계를 넘는 나레이션은 다음 씬과 겹치지 않게 절단
+            f"aformat=sample_fmts=fltp:sample_rates={mix.sample_rate}:channel_layouts=stereo,volume={gain:.2f}dB[a{i}]"
+        )
+        voice_labels.append(f"[a{i}]")
+        plans.append(dict(plan.to_dict(), scene=m.scene.name, start_s=round(start_s, 3), motion=m.motion,
+                          video_retime=retime, video_pad_s=round(pad_s, 3), voice_gain_db=round(gain, 2)))
+        start_s += m.scene.duration_s
+
+    graph += xfade_chain([m.scene.duration_s for m in media], settings) # 영상 전환 체인
+
+    # 나레이션 버스 → BGM 더킹 믹스 (씬별로 이미 정규화했으므로 버스 게인은 0dB)
+    if n == 1:
+        graph.append(f"{voice_labels[0]}anull[voice_bus]")
+    else:
+        graph.append(f"{''.join(voice_labels)}amix=inputs={n}:duration=longest:normalize=0[voice_bus]")
+    graph.append(audio_mixer.build_mix_filter(
+        total_s, "voice_bus", {"integrated_lufs": mix.voice_target_lufs},
+        bgm_input=2 * n if bgm_path else None, bgm_loudness=bgm_loudness, settings=mix
+    ))
+    return input_args, ";".join(graph), plans
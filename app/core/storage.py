@@ -0,0 +1,464 @@
+# app/core/storage.py - 산출물 객체 저장소: 로컬 파일 시스템 / S3 호환(MinIO 등) 백엔드
+#
+# 모든 작성자(TTS 나레이션, 씬 클립/스틸, BGM, 최종 영상, 스트리밍 렌디션)는 로컬 디스크에 파일을 만든 뒤
+# generated/ 기준 상대 경로를 키로 저장소에 올립니다. 로컬 백엔드는 파일이 이미 제자리에 있으므로 추가 작업이 없고,
+# S3 백엔드는 멀티파트로 올려 다운로드를 사전 서명 URL로 넘기므로 API 노드와 GPU 노드를 따로 늘릴 수 있습니다.
+# 최종 영상은 인코딩 중에 파일 끝을 따라가며(tail) 파트 단위로 올려, 인코딩이 끝나면 업로드도 거의 끝나 있습니다.
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import mimetypes
+import importlib.util
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List
+
+# boto3 (선택적): S3 백엔드 사용 시에만 필요. 설치 여부만 확인하고 임포트는 S3Storage 생성 시점으로 미룸 (local 기본값에서 API 시작 시간에 영향 없음)
+BOTO3_AVAILABLE = importlib.util.find_spec("boto3") is not None
+
+STORAGE_BACKEND = os.getenv("ARTIFACT_STORAGE", "local") # local | s3
+STORAGE_ROOT = os.path.join(os.getcwd(), "generated") # 키 기준 디렉토리 (키 = 이 디렉토리 기준 상대 경로)
+S3_PART_BYTES = int(float(os.getenv("ARTIFACT_S3_PART_MB", "8")) * 1024 * 1024) # 멀티파트 파트 크기 (S3 최소 5MB, 마지막 파트 제외)
+PRESIGN_TTL_SECONDS = int(os.getenv("ARTIFACT_PRESIGN_TTL_SECONDS", "3600")) # 다운로드 사전 서명 URL 유효 시간
+UPLOAD_WORKERS = int(os.getenv("ARTIFACT_UPLOAD_WORKERS", "4")) # 백그라운드 업로드 스레드 수
+TAIL_POLL_SECONDS = 0.25 # 인코딩 중인 파일 크기 확인 주기
+DELIVERY_RECORD = "delivery.json" # final/<작업 ID>/ 아래 다운로드 기록 (다른 노드가 작업 기록 없이 다운로드 제공)
+
+@dataclass(frozen=True)
+class StoredObject:
+    key: str
+    size: int
+    uploaded: bool # 이번 호출에서 실제로 전송했는지 (로컬 백엔드/이미 있는 콘텐츠 주소 객체는 False)
+
+class ObjectWriter(ABC):
+    """순차 쓰기 객체: write()로 이어 붙이고 complete()로 확정, 실패 시 abort()."""
+
+    @abstractmethod
+    def write(self, data: bytes):
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete(self) -> StoredObject:
+        raise NotImplementedError
+
+    @abstractmethod
+    def abort(self):
+        raise NotImplementedError
+
+class ArtifactStorage(ABC):
+    """저장소 공통 인터페이스. 키는 항상 '/' 구분 상대 경로 (예: final/<작업 ID>/final_ad.mp4). 추상 메서드를 빠뜨린 백엔드는 생성 시점에 TypeError."""
+    backend = "base"
+    remote = False # True면 다운로드를 사전 서명 URL로 리다이렉트
+
+    def __init__(self, root: str = STORAGE_ROOT):
+        self.root = os.path.abspath(root)
+
+    def key_for(self, path: str) -> str:
+        """로컬 파일 경로 → 저장소 키. 루트 밖의 파일은 ValueError."""
+        relative = os.path.relpath(os.path.abspath(path), self.root)
+        if relative.startswith(".."):
+            raise ValueError(f"저장소 루트 밖의 파일: {path}")
+        return relative.replace(os.sep, "/")
+
+    @abstractmethod
+    def put_file(self, path: str, key: Optional[str] = None, content_type: Optional[str] = None,
+                 skip_existing: bool = False) -> StoredObject:
+        raise NotImplementedError
+
+    @abstractmethod
+    def open_writer(self, key: str, content_type: Optional[str] = None) -> ObjectWriter:
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_bytes(self, key: str) -> Optional[bytes]:
+        """객체 내용 (없으면 None). 매니페스트/다운로드 기록처럼 작은 객체용."""
+        raise NotImplementedError
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> StoredObject:
+        writer = self.open_writer(key, content_type)
+        try:
+            writer.write(data)
+            return writer.complete()
+        except BaseException:
+            writer.abort()
+            raise
+
+    def presigned_url(self, key: str, filename: Optional[str] = None, content_type: Optional[str] = None,
+                      expires_s: int = PRESIGN_TTL_SECONDS) -> Optional[str]:
+        """직접 다운로드 URL (로컬 백엔드는 None: API 서버가 파일을 전송)."""
+        return None
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> int:
+        """접두사 아래 객체 모두 삭제 후 삭제한 객체 수 반환."""
+        raise NotImplementedError
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "remote": self.remote}
+
+# ── 로컬 파일 시스템 ────────────────────────────────
+class _LocalWriter(ObjectWriter):
+    def __init__(self, key: str, path: str):
+        self.key = key
+        self.path = path
+        self.tmp_path = f"{path}.{threading.get_ident()}.part"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(self.tmp_path, "wb")
+        self._size = 0
+
+    def write(self, data: bytes):
+        self._file.write(data)
+        self._size += len(data)
+
+    def complete(self) -> StoredObject:
+        self._file.close()
+        os.replace(self.tmp_path, self.path) # 원자적 교체
+        return StoredObject(key=self.key, size=self._size, uploaded=True)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+class LocalStorage(ArtifactStorage):
+    """generated/ 디렉토리가 곧 저장소 (단일 노드 기본값). 작성자가 만든 파일은 이미 제자리에 있음."""
+    backend = "local"
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, *key.split("/")))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"잘못된 저장소 키: {key}")
+        return path
+
+    def put_file(self, path, key=None, content_type=None, skip_existing=False) -> StoredObject:
+        key = key or self.key_for(path)
+        target = self._path(key)
+        if os.path.abspath(path) != target and not (skip_existing and os.path.exists(target)):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(path, target)
+            return StoredObject(key=key, size=os.path.getsize(target), uploaded=True)
+        return StoredObject(key=key, size=os.path.getsize(target), uploaded=False)
+
+    def open_writer(self, key, content_type=None) -> ObjectWriter:
+        return _LocalWriter(key, self._path(key))
+
+    def exists(self, key) -> bool:
+        return os.path.exists(self._path(key))
+
+    def read_bytes(self, key) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete_prefix(self, prefix) -> int:
+        path = self._path(prefix.rstrip("/"))
+        if os.path.isdir(path):
+            count = sum(len(files) for _, _, files in os.walk(path))
+            shutil.rmtree(path, ignore_errors=True)
+            return count
+        if os.path.exists(path):
+            os.remove(path)
+            return 1
+        return 0
+
+    def describe(self) -> Dict[str, Any]:
+        return dict(super().describe(), root=self.root)
+
+# ── S3 호환 (AWS S3, MinIO 등) ─────────────────────────
+class _S3MultipartWriter(ObjectWriter):
+    """파트 크기만큼 모일 때마다 upload_part (메모리에는 파트 하나만 보관)."""
+
+    def __init__(self, storage: "S3Storage", key: str, content_type: Optional[str]):
+        self.storage = storage
+        self.key = key
+        self.content_type = content_type
+        self._buffer = bytearray()
+        self._parts: List[Dict[str, Any]] = []
+        self._size = 0
+        self._upload_id: Optional[str] = None
+
+    def _flush(self, data: bytes):
+        client, bucket, object_key = self.storage.client, self.storage.bucket, self.storage.object_key(self.key)
+        if self._upload_id is None:
+            extra = {"ContentType": self.content_type} if self.content_type else {}
+            self._upload_id = client.create_multipart_upload(Bucket=bucket, Key=object_key, **extra)["UploadId"]
+        number = len(self._parts) + 1
+        response = client.upload_part(Bucket=bucket, Key=object_key, UploadId=self._upload_id, PartNumber=number, Body=bytes(data))
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    def write(self, data: bytes):
+        self._buffer += data
+        self._size += len(data)
+        part_bytes = self.storage.part_bytes
+        while len(self._buffer) >= part_bytes:
+            self._flush(self._buffer[:part_bytes])
+            del self._buffer[:part_bytes]
+
+    def complete(self) -> StoredObject:
+        client, bucket, object_key = self.storage.client, self.storage.bucket, self.storage.object_key(self.key)
+        if self._upload_id is None: # 파트 하나 미만: 단일 PUT
+            extra = {"ContentType": self.content_type} if self.content_type else {}
+            client.put_object(Bucket=bucket, Key=object_key, Body=bytes(self._buffer), **extra)
+        else:
+            if self._buffer or not self._parts:
+                self._flush(self._buffer) # 마지막 파트는 최소 크기 제한 없음
+            client.complete_multipart_upload(Bucket=bucket, Key=object_key, UploadId=self._upload_id,
+                                             MultipartUpload={"Parts": self._parts})
+        self._buffer = bytearray()
+        return StoredObject(key=self.key, size=self._size, uploaded=True)
+
+    def abort(self):
+        if self._upload_id is not None: # 미완료 파트가 버킷 용량을 차지하지 않도록 정리
+            try:
+                self.storage.client.abort_multipart_upload(Bucket=self.storage.bucket, Key=self.storage.object_key(self.key),
+                                                           UploadId=self._upload_id)
+            except Exception as e:
+                print(f"⚠️ 멀티파트 업로드 중단 실패 ({self.key}): {e}")
+            self._upload_id = None
+        self._buffer = bytearray()
+
+class S3Storage(ArtifactStorage):
+    """S3 호환 객체 저장소. 자격 증명은 boto3 표준 방식(AWS_ACCESS_KEY_ID 등)으로 읽음."""
+    backend = "s3"
+    remote = True
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 prefix: str = "", part_bytes: int = S3_PART_BYTES, root: str = STORAGE_ROOT):
+        if not BOTO3_AVAILABLE:
+            raise RuntimeError("S3 저장소 사용 불가: boto3가 설치되지 않았습니다.")
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config as BotoConfig
+        super().__init__(root)
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.prefix = prefix.strip("/")
+        self.part_bytes = max(5 * 1024 * 1024, part_bytes)
+        self.client = boto3.client( # 클라이언트는 스레드 안전: 업로드 스레드가 커넥션 풀 공유
+            "s3", endpoint_url=endpoint_url, region_name=region,
+            config=BotoConfig(max_pool_connections=max(10, UPLOAD_WORKERS * 4), retries={"max_attempts": 5, "mode": "standard"},
+                              s3={"addressing_style": "path" if endpoint_url else "auto"}) # MinIO 등은 경로 방식
+        )
+        self._transfer = TransferConfig(multipart_threshold=self.part_bytes, multipart_chunksize=self.part_bytes, max_concurrency=4)
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put_file(self, path, key=None, content_type=None, skip_existing=False) -> StoredObject:
+        key = key or self.key_for(path)
+        size = os.path.getsize(path)
+        if skip_existing and self.exists(key): # 콘텐츠 주소 키(씬 캐시): 다른 작업이 이미 올림
+            return StoredObject(key=key, size=size, uploaded=False)
+        extra = {"ContentType": content_type} if content_type else None
+        self.client.upload_file(path, self.bucket, self.object_key(key), ExtraArgs=extra, Config=self._transfer) # 큰 파일은 병렬 멀티파트
+        return StoredObject(key=key, size=size, uploaded=True)
+
+    def open_writer(self, key, content_type=None) -> ObjectWriter:
+        return _S3MultipartWriter(self, key, content_type)
+
+    def exists(self, key) -> bool:
+        from botocore.exceptions import ClientError # 생성 시 이미 로드됨
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def read_bytes(self, key) -> Optional[bytes]:
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))["Body"].read()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def presigned_url(self, key, filename=None, content_type=None, expires_s=PRESIGN_TTL_SECONDS) -> Optional[str]:
+        from app.core.delivery import content_disposition # 다운로드 응답과 같은 파일명 인코딩
+        params: Dict[str, Any] = {"Bucket": self.bucket, "Key": self.object_key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = content_disposition(filename)
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_s) # 로컬 서명 계산 (네트워크 없음)
+
+    def delete_prefix(self, prefix) -> int:
+        deleted = 0
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.object_key(prefix)):
+            objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if objects: # 요청당 최대 1000개 (페이지 크기와 같음)
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+                deleted += len(objects)
+        return deleted
+
+    def describe(self) -> Dict[str, Any]:
+        return dict(super().describe(), bucket=self.bucket, endpoint_url=self.endpoint_url, prefix=self.prefix,
+                    part_mb=round(self.part_bytes / (1024 * 1024), 1))
+
+# ── 인코딩 중 업로드 ─────────────────────────────────
+class TailUpload:
+    """
+    쓰는 중인 파일의 끝을 따라가며 파트 단위로 업로드 (run은 스레드에서 실행). finish() 후 남은 부분을 올리고 확정합니다.
+    파일은 덧붙이기만 된다고 가정하므로(조각화 MP4 등) 업로드한 바이트의 SHA-256을 결과에 넣어 호출자가 최종 파일과 비교합니다.
+    """
+
+    def __init__(self, storage: ArtifactStorage, path: str, key: str, content_type: Optional[str] = None,
+                 part_bytes: int = S3_PART_BYTES):
+        self.storage = storage
+        self.path = path
+        self.key = key
+        self.content_type = content_type
+        self.part_bytes = part_bytes
+        self._finished = threading.Event()
+        self._aborted = threading.Event()
+        self._finished_at: Optional[float] = None
+
+    def finish(self):
+        """작성 완료 (프로세스 종료 후 호출)."""
+        self._finished_at = time.perf_counter()
+        self._finished.set()
+
+    def abort(self):
+        """작성 실패/취소: 올린 파트 폐기."""
+        self._aborted.set()
+        self._finished.set()
+
+    def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        while not os.path.exists(self.path):
+            if self._finished.wait(TAIL_POLL_SECONDS):
+                return {"aborted": True}
+        writer = self.storage.open_writer(self.key, self.content_type)
+        sha = hashlib.sha256()
+        offset, first_part_s = 0, None
+        try:
+            with open(self.path, "rb") as f:
+                while not self._aborted.is_set():
+                    done = self._finished.is_set() # 크기 확인 전에 읽어야 종료 직전에 쓰인 바이트를 놓치지 않음
+                    available = os.path.getsize(self.path) - offset
+                    if available >= self.part_bytes or (done and available > 0):
+                        chunk = os.pread(f.fileno(), available if done else available - available % self.part_bytes, offset)
+                        sha.update(chunk)
+                        writer.write(chunk)
+                        offset += len(chunk)
+                        first_part_s = first_part_s or time.perf_counter() - started
+                        continue
+                    if done:
+                        break
+                    self._finished.wait(TAIL_POLL_SECONDS)
+            if self._aborted.is_set():
+                writer.abort()
+                return {"aborted": True}
+            stored = writer.complete()
+        except BaseException:
+            writer.abort()
+            raise
+        completed = time.perf_counter()
+        return {"aborted": False, "key": stored.key, "size": stored.size, "sha256": sha.hexdigest(),
+                "first_part_s": round(first_part_s or 0.0, 2), "elapsed_s": round(completed - started, 2),
+                "after_finish_s": round(completed - (self._finished_at or completed), 2)} # 인코딩 종료 후 남은 업로드 시간
+
+class UploadBatch:
+    """작업 하나의 백그라운드 업로드 묶음: submit은 즉시 반환, wait에서 모두 끝났는지 확인."""
+
+    def __init__(self, storage: ArtifactStorage, executor: ThreadPoolExecutor):
+        self.storage = storage
+        self.executor = executor
+        self._futures: List[Future] = []
+
+    def submit(self, path: Optional[str], content_type: Optional[str] = None, skip_existing: bool = False):
+        if not path or not self.storage.remote: # 로컬 백엔드: 작성자가 만든 파일이 이미 저장소에 있음
+            return
+        content_type = content_type or mimetypes.guess_type(path)[0]
+        self._futures.append(self.executor.submit(self.storage.put_file, path, None, content_type, skip_existing))
+
+    def submit_dir(self, directory: str, content_types: Optional[Dict[str, str]] = None):
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                self.submit(os.path.join(root, name), (content_types or {}).get(os.path.splitext(name)[1]))
+
+    async def wait(self) -> Dict[str, Any]:
+        """제출한 업로드 완료 대기. 하나라도 실패하면 예외 (중간 산출물 삭제 전에 호출)."""
+        futures, self._futures = self._futures, []
+        stored = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        uploaded = [item for item in stored if item.uploaded]
+        return {"objects": len(stored), "uploaded": len(uploaded), "uploaded_bytes": sum(item.size for item in uploaded)}
+
+    def cancel(self):
+        for future in self._futures: # 시작 전 업로드만 취소됨 (진행 중인 파일은 끝까지 전송)
+            future.cancel()
+        self._futures = []
+
+    async def drain(self):
+        """대기 중인 업로드는 취소하고 진행 중인 업로드 종료를 기다림 (실패 무시). 작업 취소 후 원격 정리 전에 호출."""
+        futures = [future for future in self._futures if not future.cancel()]
+        self._futures = []
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in futures), return_exceptions=True)
+
+# ── 다운로드 기록 ───────────────────────────────────
+def delivery_record_key(task_id: str) -> str:
+    return f"final/{task_id}/{DELIVERY_RECORD}"
+
+def write_delivery_record(storage: ArtifactStorage, task_id: str, record: Dict[str, Any]):
+    """최종 영상 키/파일명/해시/스트리밍 매니페스트 기록 (작업 기록이 없는 API 노드가 다운로드를 제공할 때 사용)."""
+    storage.put_bytes(delivery_record_key(task_id), json.dumps(record, ensure_ascii=False).encode("utf-8"), "application/json")
+
+def read_delivery_record(storage: ArtifactStorage, task_id: str) -> Optional[Dict[str, Any]]:
+    data = storage.read_bytes(delivery_record_key(task_id))
+    return json.loads(data) if data else None
+
+# ── 프로세스 공용 저장소 ─────────────────────────────
+_storage: Optional[ArtifactStorage] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_storage_lock = threading.Lock()
+
+def create_storage(backend: str = STORAGE_BACKEND) -> ArtifactStorage:
+    if backend == "local":
+        return LocalStorage()
+    if backend == "s3":
+        bucket = os.getenv("ARTIFACT_S3_BUCKET")
+        if not bucket:
+            raise RuntimeError("ARTIFACT_STORAGE=s3 사용 시 ARTIFACT_S3_BUCKET이 필요합니다.")
+        return S3Storage(bucket, endpoint_url=os.getenv("ARTIFACT_S3_ENDPOINT_URL") or None,
+                         region=os.getenv("ARTIFACT_S3_REGION") or None, prefix=os.getenv("ARTIFACT_S3_PREFIX", ""))
+    raise ValueError(f"지원하지 않는 저장소 백엔드: {backend} (지원: local, s3)")
+
+def get_storage() -> ArtifactStorage:
+    """프로세스 공용 저장소 (ARTIFACT_STORAGE 설정에 따라 첫 호출 시 생성)."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = create_storage()
+        return _storage
+
+def new_upload_batch() -> UploadBatch:
+    """공용 업로드 스레드 풀을 쓰는 업로드 묶음."""
+    global _executor
+    with _storage_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, UPLOAD_WORKERS), thread_name_prefix="artifact-upload")
+    return UploadBatch(get_storage(), _executor)
+
+def shutdown_storage():
+    """서버 종료 시 업로드 스레드 정리 (진행 중인 업로드는 끝까지 전송)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
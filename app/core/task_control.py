@@ -0,0 +1,199 @@
+# app/core/task_control.py - 작업 취소 및 데드라인 관리
+
+import os
+import time
+import shutil
+import asyncio
+import threading
+import subprocess
+from typing import Dict, Any, Optional, List, Awaitable, TypeVar
+
+from app.core import tracing, metrics
+
+T = TypeVar("T")
+
+class TaskCancelledError(Exception):
+    """작업이 사용자 요청으로 취소되었거나 데드라인을 초과했을 때 발생하는 예외."""
+
+    def __init__(self, reason: str, stage: Optional[str] = None):
+        self.reason = reason # "cancelled" 또는 "deadline_exceeded"
+        self.stage = stage # 취소가 감지된 단계
+        message = "작업이 취소되었습니다" if reason == "cancelled" else "작업 데드라인을 초과했습니다"
+        super().__init__(f"{message} (단계: {stage})" if stage else message)
+
+class TaskContext:
+    """
+    작업 단위 취소/데드라인 컨텍스트.
+
+    - 스레드에서 실행되는 코드(디노이징 루프, TTS 재시도, Riffusion 세그먼트)는 `is_set()`으로 협조적 취소를 확인합니다.
+    - 비동기 코드는 `guard()`로 감싸 취소/데드라인 시 즉시 빠져나옵니다.
+    - FFmpeg 등 하위 프로세스는 `run_process()`로 실행해 취소 시 강제 종료됩니다.
+    """
+
+    def __init__(self, task_id: str, deadline_seconds: Optional[float] = None):
+        self.task_id = task_id
+        self.created_at = time.monotonic()
+        self.deadline = self.created_at + deadline_seconds if deadline_seconds else None # 단조 시계 기준 마감 시각
+        self.reason: Optional[str] = None # 취소 사유
+        self._thread_event = threading.Event() # 워커 스레드용 취소 신호
+        self._async_event: Optional[asyncio.Event] = None # 이벤트 루프용 취소 신호 (지연 생성)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None # _async_event가 속한 이벤트 루프
+        self._processes: set = set() # 실행 중인 하위 프로세스
+        self._lock = threading.Lock()
+        self.finished = False # 작업 코루틴 종료 여부
+
+    # ── 상태 조회 ───────────────────────────────
+    def remaining(self) -> Optional[float]:
+        """데드라인까지 남은 시간 (초). 데드라인이 없으면 None."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def is_set(self) -> bool:
+        """취소되었거나 데드라인을 넘겼는지 여부 (threading.Event 호환 인터페이스)."""
+        if self._thread_event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self._mark("deadline_exceeded")
+            return True
+        return False
+
+    def check(self, stage: Optional[str] = None):
+        """취소 상태면 TaskCancelledError 발생: 단계 경계에서 호출."""
+        if self.is_set():
+            raise TaskCancelledError(self.reason or "cancelled", stage)
+
+    def timeout_for(self, default: float) -> float:
+        """기본 타임아웃과 남은 데드라인 중 짧은 값 반환."""
+        remaining = self.remaining()
+        return default if remaining is None else max(0.1, min(default, remaining))
+
+    def wait(self, seconds: float) -> bool:
+        """취소 가능한 대기 (time.sleep 대체). 취소되면 True 반환."""
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        self._thread_event.wait(seconds)
+        return self.is_set()
+
+    # ── 취소 ───────────────────────────────────
+    def _mark(self, reason: str):
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+            self._thread_event.set()
+            processes = list(self._processes)
+        for proc in processes: # 실행 중인 하위 프로세스 즉시 종료
+            try:
+                proc.kill()
+            except Exception:
+                pass
+        event, loop = self._async_event, self._loop
+        if event is not None:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            try:
+                if running is loop:
+                    event.set()
+                else: # 워커 스레드(디노이징 콜백, TTS 재시도의 is_set 데드라인 판정): asyncio.Event는 스레드 안전하지 않음
+                    loop.call_soon_threadsafe(event.set)
+            except RuntimeError: # 이벤트 루프가 이미 닫힘
+                pass
+
+    def cancel(self, reason: str = "cancelled"):
+        """작업 취소 요청 (이벤트 루프 스레드 또는 워커 스레드에서 호출 가능)."""
+        self._mark(reason)
+
+    # ── 실행 래퍼 ───────────────────────────────
+    async def guard(self, awaitable: Awaitable[T], stage: Optional[str] = None, timeout: Optional[float] = None) -> T:
+        """코루틴을 취소 신호/데드라인과 경쟁시켜 실행. 취소되면 내부 작업도 중단."""
+        self.check(stage)
+        if self._async_event is None:
+            self._loop = asyncio.get_running_loop() # 다른 스레드의 _mark가 이 루프로 set을 넘기도록 이벤트보다 먼저 기록
+            self._async_event = asyncio.Event()
+            if self._thread_event.is_set():
+                self._async_event.set()
+
+        work = asyncio.ensure_future(awaitable)
+        waiter = asyncio.ensure_future(self._async_event.wait())
+        limit = self.remaining()
+        if timeout is not None:
+            limit = timeout if limit is None else min(timeout, limit)
+        try:
+            done, _ = await asyncio.wait({work, waiter}, timeout=limit, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+
+        if work in done:
+            return work.result()
+
+        work.cancel() # 취소 또는 타임아웃: 진행 중인 작업 중단
+        self.check(stage) # 취소/데드라인이면 TaskCancelledError
+        raise asyncio.TimeoutError(f"{stage or '작업'} 시간 초과 ({timeout}초)")
+
+    async def run_process(self, cmd: List[str], timeout: float = 300, stage: Optional[str] = None,
+                          check: bool = True) -> subprocess.CompletedProcess:
+        """취소 가능한 하위 프로세스 실행 (subprocess.run(capture_output=True, text=True) 호환 결과)."""
+        self.check(stage)
+        effective_timeout = self.timeout_for(timeout)
+        program = os.path.basename(cmd[0])
+
+        def _run() -> subprocess.CompletedProcess:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            metrics.SUBPROCESSES_RUNNING.inc(program=program) # 취소로 호출자가 먼저 돌아가도 프로세스 종료까지 집계
+            with self._lock:
+                self._processes.add(proc)
+            try:
+                if self._thread_event.is_set(): # 등록 직전에 취소된 경우
+                    proc.kill()
+                stdout, stderr = proc.communicate(timeout=effective_timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                raise
+            finally:
+                metrics.SUBPROCESSES_RUNNING.dec(program=program)
+                with self._lock:
+                    self._processes.discard(proc)
+            if self.is_set():
+                raise TaskCancelledError(self.reason or "cancelled", stage)
+            if check and proc.returncode != 0:
+                raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+            return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+        with tracing.span(f"subprocess.{program}", stage=stage or "",
+                          timeout_s=round(effective_timeout, 1) if effective_timeout else None) as process_span:
+            result = await self.guard(asyncio.to_thread(_run), stage=stage)
+            process_span.set_attribute("returncode", result.returncode)
+            return result
+
+def remove_artifact_dirs(paths: List[str]) -> int:
+    """부분 생성물 디렉토리 삭제 후 확보된 디스크 용량(바이트) 반환."""
+    freed = 0
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    freed += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        shutil.rmtree(path, ignore_errors=True)
+    return freed
+
+def build_cancellation_report(task: Dict[str, Any], freed_bytes: int, reason: str) -> Dict[str, Any]:
+    """취소로 확보된 용량 보고서 생성: 디스크 및 건너뛴 GPU 작업량 추정."""
+    denoising = task.get("denoising") or {}
+    skipped_steps = max(0, denoising.get("total_steps", 0) - denoising.get("step", 0)) if denoising else None
+    return {
+        "reason": reason,
+        "stage": task.get("current_step"),
+        "progress_at_cancel": task.get("progress", 0),
+        "freed_disk_bytes": freed_bytes,
+        "freed_disk_mb": round(freed_bytes / (1024 * 1024), 2),
+        "skipped_denoising_steps": skipped_steps,
+        "estimated_gpu_seconds_freed": denoising.get("eta_s") if denoising else None
+    }
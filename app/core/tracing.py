@@ -0,0 +1,173 @@
+# app/core/tracing.py - 파이프라인 단계 추적: OpenTelemetry 방식 스팬 + 작업별 타이밍 분해 + 단계 지연 히스토그램
+#
+# `with tracing.span("tts.request", scene=...)`로 감싼 구간은 현재 작업 트레이스에 부모/자식 관계로 기록되고,
+# 이름별 지연이 ad_stage_duration_seconds 히스토그램(/metrics)에 누적됩니다. 현재 스팬은 contextvars로 전달되므로
+# asyncio 태스크와 asyncio.to_thread 워커 스레드에서도 부모가 유지됩니다.
+# opentelemetry-api가 설치되어 있으면 같은 스팬을 OpenTelemetry 트레이서로도 내보냅니다 (SDK/익스포터 설정은 배포 환경 몫).
+
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Iterator
+
+from app.core import metrics
+
+# OpenTelemetry 임포트 (선택적): 없으면 내부 기록만 함.
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.trace import Status, StatusCode
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+MAX_SPANS_PER_TRACE = 500 # 작업 하나에 보관할 스팬 수 상한 (넘으면 단계 합계만 갱신)
+
+STAGE_SECONDS = metrics.REGISTRY.histogram(
+    "ad_stage_duration_seconds", "Wall-clock duration of ad pipeline stages by span name and outcome.",
+    ("stage", "status"), metrics.STAGE_BUCKETS
+)
+
+_tracer = otel_trace.get_tracer("ai-ad-creator") if OTEL_AVAILABLE else None
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time: float # epoch 초
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    duration_s: Optional[float] = None
+    status: str = "ok" # ok | error | cancelled
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {"name": self.name, "span_id": self.span_id, "parent_id": self.parent_id,
+                "offset_s": round(self.start_time - origin, 3), "duration_s": self.duration_s,
+                "status": self.status, "error": self.error, "attributes": self.attributes}
+
+class Trace:
+    """작업 하나의 스팬 모음 (여러 스레드에서 동시에 추가됨)."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.started_at = time.time()
+        self.spans: List[Span] = []
+        self.stages: Dict[str, Dict[str, float]] = {} # 이름 → {"count", "total_s", "max_s"}
+        self._lock = threading.Lock()
+        self._tokens = None
+        self.root: Optional[Span] = None
+
+    def add(self, span: Span):
+        with self._lock:
+            stage = self.stages.setdefault(span.name, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            stage["count"] += 1
+            stage["total_s"] += span.duration_s
+            stage["max_s"] = max(stage["max_s"], span.duration_s)
+            if len(self.spans) < MAX_SPANS_PER_TRACE:
+                self.spans.append(span)
+
+    def breakdown(self) -> Dict[str, Any]:
+        """단계별 합계(동시 실행 구간은 겹쳐 합산)와 시작 순 스팬 목록."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_time)
+            stages = {name: {"count": int(v["count"]), "total_s": round(v["total_s"], 3), "max_s": round(v["max_s"], 3)}
+                      for name, v in sorted(self.stages.items(), key=lambda item: -item[1]["total_s"])}
+        return {"trace_id": self.trace_id, "total_s": self.root.duration_s if self.root else None,
+                "stages": stages, "spans": [span.to_dict(self.started_at) for span in spans]}
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("ad_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("ad_span", default=None)
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+def _classify(error: BaseException) -> str:
+    if isinstance(error, asyncio.CancelledError) or "Cancel" in type(error).__name__: # TaskCancelledError, GenerationCancelled
+        return "cancelled"
+    return "error"
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    단계 스팬. 이름은 고정 문자열(예: "cogvideox.denoise")로 두고 씬 이름 등 가변 값은 속성으로 넘깁니다
+    (이름이 히스토그램 레이블이 되므로). 예외는 상태를 기록한 뒤 그대로 전파됩니다.
+    """
+    parent = _current_span.get()
+    trace = _current_trace.get()
+    record = Span(name=name, trace_id=trace.trace_id if trace else (parent.trace_id if parent else _new_id(16)),
+                  span_id=_new_id(8), parent_id=parent.span_id if parent else None, start_time=time.time(),
+                  attributes=dict(attributes))
+    token = _current_span.set(record)
+    otel_scope = _tracer.start_as_current_span(name, attributes={k: v for k, v in attributes.items()
+                                                                 if isinstance(v, (str, bool, int, float))}) if _tracer else None
+    otel_span = otel_scope.__enter__() if otel_scope else None
+    started = time.perf_counter()
+    error: Optional[BaseException] = None
+    try:
+        yield record
+    except BaseException as e:
+        error = e
+        record.status = _classify(e)
+        record.error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        record.duration_s = round(time.perf_counter() - started, 4)
+        _current_span.reset(token)
+        STAGE_SECONDS.observe(record.duration_s, stage=name, status=record.status)
+        if trace is not None:
+            trace.add(record)
+        if otel_span is not None:
+            for key, value in record.attributes.items():
+                if isinstance(value, (str, bool, int, float)):
+                    otel_span.set_attribute(key, value)
+            if record.status == "error":
+                otel_span.set_status(Status(StatusCode.ERROR, record.error or ""))
+            otel_scope.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+
+def record(name: str, started: float, status: str = "ok", **attributes: Any) -> Span:
+    """
+    이미 끝난 구간을 현재 스팬의 자식으로 기록 (started는 time.perf_counter() 값).
+    대체 경로가 여러 겹인 긴 블록처럼 with로 감싸기 어려운 곳에서 사용합니다 (OpenTelemetry로는 내보내지 않음).
+    """
+    duration = time.perf_counter() - started
+    parent = _current_span.get()
+    trace = _current_trace.get()
+    finished = Span(name=name, trace_id=trace.trace_id if trace else (parent.trace_id if parent else _new_id(16)),
+                    span_id=_new_id(8), parent_id=parent.span_id if parent else None, start_time=time.time() - duration,
+                    attributes=dict(attributes), duration_s=round(duration, 4), status=status)
+    STAGE_SECONDS.observe(finished.duration_s, stage=name, status=status)
+    if trace is not None:
+        trace.add(finished)
+    return finished
+
+def begin_trace(trace_id: str, name: str, **attributes: Any) -> Trace:
+    """
+    현재 컨텍스트에 작업 트레이스와 루트 스팬 시작 (함수 본문 전체를 with로 감싸기 어려운 긴 작업용).
+    반드시 같은 태스크에서 end_trace로 닫아야 합니다.
+    """
+    trace = Trace(trace_id)
+    trace_token = _current_trace.set(trace)
+    root_scope = span(name, **attributes)
+    trace.root = root_scope.__enter__()
+    trace._tokens = (trace_token, root_scope)
+    return trace
+
+def end_trace(trace: Trace, status: str = "ok", error: Optional[str] = None) -> Dict[str, Any]:
+    """루트 스팬을 작업 결과 상태로 닫고 컨텍스트를 복원한 뒤 타이밍 분해 반환."""
+    trace_token, root_scope = trace._tokens
+    trace.root.status = status
+    trace.root.error = error[:300] if error else None
+    root_scope.__exit__(None, None, None)
+    _current_trace.reset(trace_token)
+    return trace.breakdown()
@@ -4,9 +4,14 @@ import os # OS 기능 (파일/경로 조작)
 import subprocess # 외부 프로세스 실행 (FFmpeg 등)
 import math # 수학 함수 (나눗셈 올림 등) - 추가 임포트
 import shutil # 파일/디렉토리 조작용 임포트 추가
+import time # 단계별 소요 시간 측정
+import asyncio # 파이프라인을 워커 스레드에서 실행 (이벤트 루프 블로킹 방지)
+import threading # 동시 실행 BGM 작업 중단 신호
 from pathlib import Path # 파일 시스템 경로 객체 지향적 처리
 from datetime import datetime # 날짜/시간 처리
-from typing import Optional, Dict, Any, List # 타입 힌트
+from typing import Optional, Dict, Any, List, Callable # 타입 힌트
+
+from app.core import tracing # 단계 스팬 (파이프라인 로드/디노이징/내보내기/BGM)
 
 # PyTorch 임포트 및 가용성 플래그: 딥러닝 프레임워크 PyTorch 로드.
 try:
@@ -44,17 +49,11 @@ except ImportError as e:
     IMAGEIO_AVAILABLE = False # 실패 시 False
     print(f"❌ ImageIO 로드 실패: {e}")
 
-# SoundFile 임포트 및 가용성 플래그: 오디오 파일 저장 라이브러리 (Riffusion 결과 저장에 필요).
-try:
-    import soundfile as sf # soundfile 라이브러리 임포트 시도 (sf 별칭)
-    SOUNDFILE_AVAILABLE = True # 성공 시 True
-except ImportError as e:
-    SOUNDFILE_AVAILABLE = False # 실패 시 False
-    print(f"❌ SoundFile 로드 실패 (Riffusion BGM 저장 불가): {e}")
-    print("📌 'pip install soundfile'을 실행하세요.")
+# 메모리 내 오디오 버퍼 처리 (세그먼트 크로스페이드 병합 및 단일 저장, soundfile이 없으면 wave 모듈로 저장)
+from app.utils import audio_utils
 
-# BGM 생성 전체 가용성 플래그: Riffusion 파이프라인과 SoundFile 모두 있어야 BGM 생성 가능.
-BGM_GENERATION_AVAILABLE = RIFFUSION_PIPELINE_AVAILABLE and SOUNDFILE_AVAILABLE # Riffusion BGM 생성 가능 여부 최종 판단
+# BGM 생성 전체 가용성 플래그: 저장은 audio_utils가 맡으므로 Riffusion 파이프라인만 있으면 BGM 생성 가능.
+BGM_GENERATION_AVAILABLE = RIFFUSION_PIPELINE_AVAILABLE # Riffusion BGM 생성 가능 여부 최종 판단
 
 # CogVideoX-2b 전체 가용성 확인: PyTorch, Diffusers, ImageIO 모두 있어야 CogVideoX 기능 활성화.
 COGVIDEODX_AVAILABLE = TORCH_AVAILABLE and DIFFUSERS_AVAILABLE and IMAGEIO_AVAILABLE # CogVideoX-2b 기능 가능 여부 최종 판단
@@ -72,14 +71,74 @@ else:
         print("pip install --upgrade huggingface-hub diffusers transformers accelerate")
     if not IMAGEIO_AVAILABLE: # ImageIO가 없으면 설치 가이드
         print("pip install imageio imageio-ffmpeg")
-    if not SOUNDFILE_AVAILABLE: # SoundFile이 없으면 설치 가이드
-        print("pip install soundfile")
+
+class GenerationCancelled(Exception):
+    """디노이징 단계 사이에서 협조적 취소가 요청되었을 때 발생하는 예외."""
+    pass
+
+class _AnyEvent:
+    """여러 취소 신호 중 하나라도 설정되면 설정된 것으로 보는 `is_set()` 래퍼."""
+
+    def __init__(self, *events):
+        self.events = [event for event in events if event is not None]
+
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self.events)
+
+def get_device_memory_gb() -> Dict[str, float]:
+    """현재 GPU 메모리 사용량 (GB) 조회: CUDA 미사용 시 0으로 반환."""
+    if TORCH_AVAILABLE and torch.cuda.is_available():
+        return {
+            "allocated_gb": round(torch.cuda.memory_allocated() / (1024**3), 2), # 할당된 메모리
+            "reserved_gb": round(torch.cuda.memory_reserved() / (1024**3), 2), # 예약된 메모리
+            "max_allocated_gb": round(torch.cuda.max_memory_allocated() / (1024**3), 2) # 최대 할당 (high-water mark)
+        }
+    return {"allocated_gb": 0.0, "reserved_gb": 0.0, "max_allocated_gb": 0.0}
+
+def get_device_memory_bytes() -> Dict[str, Dict[str, int]]:
+    """장치별 GPU 메모리 (바이트, /metrics용): {"cuda:0": {"allocated", "reserved", "max_allocated"}}. CUDA 미사용 시 빈 dict."""
+    if not (TORCH_AVAILABLE and torch.cuda.is_available()):
+        return {}
+    return {
+        f"cuda:{index}": {
+            "allocated": torch.cuda.memory_allocated(index),
+            "reserved": torch.cuda.memory_reserved(index),
+            "max_allocated": torch.cuda.max_memory_allocated(index) # 마지막 reset_peak_memory_stats 이후 high-water mark
+        }
+        for index in range(torch.cuda.device_count())
+    }
+
+def frames_to_uint8(video_frames) -> Any:
+    """
+    파이프라인 출력 프레임(배치 리스트, 텐서, 배열, PIL 목록)을 (F, H, W, C) uint8 배열로 변환.
+    export_to_video 실패 시 대체 저장 경로에서 사용합니다. float은 최댓값이 1 이하면 [0, 1] 범위로 보고 255를 곱합니다.
+    """
+    import numpy as np # 대체 저장 경로에서만 필요
+    frames_data = video_frames[0] if isinstance(video_frames, list) and len(video_frames) > 0 else video_frames # 첫 번째 배치
+    if hasattr(frames_data, 'cpu'): # PyTorch 텐서
+        frames = frames_data.cpu().numpy()
+    elif hasattr(frames_data, 'numpy'):
+        frames = frames_data.numpy()
+    else:
+        frames = np.array(frames_data)
+    if frames.ndim == 5: # (B, F, H, W, C) -> (F, H, W, C)
+        frames = frames[0]
+    if frames.dtype in (np.float32, np.float64) and frames.max() <= 1.0:
+        frames = (frames * 255).astype(np.uint8) # [0, 1] → [0, 255]
+    elif frames.dtype != np.uint8:
+        frames = frames.astype(np.uint8) # 이미 0-255 범위인 float 또는 기타 정수 타입
+    return frames
 
 class CogVideoXGenerator:
     """CogVideoX-2b Text-to-Video 생성기: 비디오 및 BGM 생성 로직."""
 
     MODEL_ID_COGVIDEODX = "THUDM/CogVideoX-2b" # CogVideoX 모델 ID
     RIFFUSION_MODEL_ID = "riffusion/riffusion-beta" # Riffusion 모델 ID
+    RIFFUSION_SAMPLE_RATE = 44100 # Riffusion 출력 샘플레이트
+    RIFFUSION_BATCH_SIZE = int(os.getenv("RIFFUSION_BATCH_SIZE", "4")) # 파이프라인 호출당 생성할 세그먼트 수 (VRAM에 맞춰 조정)
+    RIFFUSION_CROSSFADE_S = 0.5 # 세그먼트 사이 등전력 크로스페이드 길이 (초)
+    # 같은 GPU에서 디노이징과 BGM을 동시에 실행하기 위해 필요한 최소 여유 VRAM (GB)
+    RIFFUSION_CONCURRENT_MIN_FREE_GB = float(os.getenv("RIFFUSION_CONCURRENT_MIN_FREE_GB", "10"))
 
     def __init__(self, output_dir: str = "generated/videos", bgm_dir: str = "generated/bgm"):
         self.output_dir = Path(output_dir) # 비디오 출력 디렉토리 경로
@@ -92,6 +151,7 @@ class CogVideoXGenerator:
         self.is_initialized = False # CogVideoX 파이프라인 초기화 여부 플래그
         self.riffusion_initialized = False # Riffusion 파이프라인 초기화 여부 플래그
         self.model_id = self.MODEL_ID_COGVIDEODX # 사용할 CogVideoX 모델 ID
+        self.last_generation_stats: Dict[str, Any] = {} # 마지막 생성의 단계별 타이밍 통계
         print(f"🔄 설정된 비디오 모델: {self.model_id}")
 
         if not COGVIDEODX_AVAILABLE: # CogVideoX 의존성이 불완전하면 경고
@@ -275,8 +335,8 @@ class CogVideoXGenerator:
                 print("    3. HuggingFace 캐시 삭제 후 재시도")
                 return False
 
-    def initialize_riffusion_pipeline(self) -> bool:
-        """Riffusion 파이프라인 초기화: BGM 생성을 위한 모델 로드."""
+    def initialize_riffusion_pipeline(self, device: Optional[str] = None) -> bool:
+        """Riffusion 파이프라인 초기화: BGM 생성을 위한 모델 로드 (device 미지정 시 기본 GPU + CPU 오프로딩)."""
         global RIFFUSION_PIPELINE_AVAILABLE # 전역 플래그를 수정할 수 있도록 global 선언
 
         if not RIFFUSION_PIPELINE_AVAILABLE: # 상단에서 Diffusers 모듈이 아예 로드되지 않았다면
@@ -301,9 +361,10 @@ class CogVideoXGenerator:
                 use_safetensors=True, # 안전한 가중치 파일 형식 사용
                 trust_remote_code=True, # Riffusion 모델도 custom code를 포함할 수 있으므로 추가
             )
-            device = torch.device("cuda") # 장치 지정 (GPU)
-            self.riffusion_pipeline = self.riffusion_pipeline.to(device) # 파이프라인을 GPU로 이동
-            
+            target_device = torch.device(device or "cuda") # 장치 지정 (GPU, 보조 GPU가 있으면 cuda:1)
+            self.riffusion_pipeline = self.riffusion_pipeline.to(target_device) # 파이프라인을 GPU로 이동
+            dedicated_device = target_device.index not in (None, 0) # 비디오와 다른 전용 GPU 여부
+
             # Riffusion 파이프라인 최적화 (필요시)
             if hasattr(self.riffusion_pipeline, 'enable_xformers_memory_efficient_attention'): # xFormers 최적화
                 try:
@@ -311,12 +372,12 @@ class CogVideoXGenerator:
                     print("✅ Riffusion xFormers 메모리 효율 어텐션 활성화")
                 except Exception:
                     print("⚠️ Riffusion xFormers 미설치 - 기본 어텐션 사용")
-            if hasattr(self.riffusion_pipeline, 'enable_model_cpu_offload'): # CPU 오프로딩
+            if not dedicated_device and hasattr(self.riffusion_pipeline, 'enable_model_cpu_offload'): # CPU 오프로딩 (비디오와 GPU 공유 시)
                 self.riffusion_pipeline.enable_model_cpu_offload()
                 print("✅ Riffusion CPU 오프로딩 활성화")
 
             self.riffusion_initialized = True # Riffusion 파이프라인 초기화 완료 플래그
-            print("✅ Riffusion GPU 파이프라인 초기화 완료")
+            print(f"✅ Riffusion GPU 파이프라인 초기화 완료 ({target_device})")
             return True
 
         except Exception as e: # Riffusion 초기화 실패
@@ -326,9 +387,10 @@ class CogVideoXGenerator:
             print("    2. HuggingFace 캐시 삭제 후 재시도")
             return False
 
-    async def generate_riffusion_bgm(self, prompt: str, duration: int) -> Optional[str]: # BGM 생성 함수 (비동기)
-        """Riffusion 모델로 배경 음악 생성: 여러 세그먼트 생성 후 FFmpeg으로 병합."""
-        if not self.initialize_riffusion_pipeline(): # Riffusion 파이프라인 초기화 시도
+    async def generate_riffusion_bgm(self, prompt: str, duration: int, cancel_event: Optional[Any] = None,
+                                     device: Optional[str] = None) -> Optional[str]: # BGM 생성 함수 (비동기)
+        """Riffusion 모델로 배경 음악 생성: 세그먼트를 배치로 생성해 메모리에서 등전력 크로스페이드로 이어 붙인 뒤 한 번만 저장."""
+        if not await asyncio.to_thread(self.initialize_riffusion_pipeline, device): # Riffusion 파이프라인 초기화 (모델 로드는 워커 스레드에서)
             return None # 초기화 실패 시 None 반환
 
         global BGM_GENERATION_AVAILABLE # 전역 변수 BGM_GENERATION_AVAILABLE 사용
@@ -338,61 +400,149 @@ class CogVideoXGenerator:
 
         print(f"🎶 Riffusion BGM 생성 시작 (프롬프트: '{prompt}', 길이: {duration}초)")
         try:
-            audio_segments_paths = [] # 생성된 오디오 세그먼트 경로 리스트
             segment_duration_s = 5 # Riffusion이 한 번에 생성하는 오디오 길이 (약 5초)
-            num_segments_to_generate = math.ceil(duration / segment_duration_s) # 필요한 세그먼트 개수 계산
-
-            for i in range(num_segments_to_generate): # 필요한 만큼 세그먼트 반복 생성
-                print(f"    Riffusion 세그먼트 {i+1}/{num_segments_to_generate} 생성 중...")
-                # Riffusion 파이프라인 호출 (오디오 데이터 반환)
-                riff = self.riffusion_pipeline(prompt=prompt).audios[0] 
-                
-                segment_path = self.bgm_dir / f"riffusion_segment_{datetime.now().strftime('%Y%m%d%H%M%S')}_{i}.wav" # 세그먼트 파일 경로
-                sf.write(str(segment_path), riff, samplerate=44100) # WAV 파일로 저장
-                audio_segments_paths.append(str(segment_path))
-
-            if len(audio_segments_paths) > 1: # 여러 세그먼트가 생성되면 FFmpeg으로 병합
-                combined_bgm_path = self.bgm_dir / f"riffusion_combined_{datetime.now().strftime('%Y%m%d%H%M%S')}.wav" # 최종 병합 파일 경로
-                concat_list_path = self.bgm_dir / f"concat_list_{datetime.now().strftime('%Y%m%d%H%M%S')}.txt" # FFmpeg concat 리스트 파일
-
-                with open(concat_list_path, "w") as f: # concat 리스트 파일 생성
-                    for audio_seg_path in audio_segments_paths:
-                        f.write(f"file '{Path(audio_seg_path).resolve()}'\n") # 각 오디오 파일의 절대 경로 기록
-                
-                ffmpeg_cmd_concat = [ # FFmpeg concat 명령
-                    "ffmpeg", "-y",
-                    "-f", "concat", # concat demuxer 사용 (파일 목록을 입력으로 받음)
-                    "-safe", "0", # 안전 모드 비활성화 (필요시 - 경로에 특수문자가 있을 경우)
-                    "-i", str(concat_list_path), # concat 리스트 파일 입력
-                    "-c", "copy", # 스트림 복사 (재인코딩 없이 빠르게 병합)
-                    str(combined_bgm_path) # 출력 파일
-                ]
-                
-                subprocess.run(ffmpeg_cmd_concat, capture_output=True, text=True, check=True, timeout=180) # FFmpeg 실행 및 타임아웃
-                
-                for audio_seg_path in audio_segments_paths: # 임시 세그먼트 파일 삭제
-                    os.remove(audio_seg_path)
-                os.remove(concat_list_path) # concat 리스트 파일 삭제
-
-                return str(combined_bgm_path) # 병합된 BGM 경로 반환
-            else: # 세그먼트가 하나뿐인 경우 그대로 반환
-                return str(audio_segments_paths[0])
+            crossfade_s = self.RIFFUSION_CROSSFADE_S
+            # 크로스페이드 겹침만큼 줄어드는 길이를 고려한 필요 세그먼트 개수
+            num_segments_to_generate = max(1, math.ceil((duration - crossfade_s) / (segment_duration_s - crossfade_s)))
+            batch_size = max(1, self.RIFFUSION_BATCH_SIZE)
+
+            segments: List[Any] = [] # 생성된 세그먼트 (numpy 버퍼)
+            started = time.perf_counter()
+            while len(segments) < num_segments_to_generate:
+                if cancel_event is not None and cancel_event.is_set(): # 배치 사이 취소 확인
+                    raise GenerationCancelled(f"Riffusion 세그먼트 {len(segments)}/{num_segments_to_generate} 생성 후 취소되었습니다.")
+                batch = min(batch_size, num_segments_to_generate - len(segments))
+                print(f"    Riffusion 세그먼트 {len(segments)+1}-{len(segments)+batch}/{num_segments_to_generate} 배치 생성 중...")
+                # 한 번의 파이프라인 호출로 여러 세그먼트 생성 (워커 스레드에서 실행해 이벤트 루프 블로킹 방지)
+                result = await asyncio.to_thread(self.riffusion_pipeline, prompt=[prompt] * batch)
+                segments.extend(result.audios[:batch])
+
+            combined = audio_utils.crossfade_concat(segments, self.RIFFUSION_SAMPLE_RATE, crossfade_s) # 이음매 없는 병합
+            combined = audio_utils.fit_to_duration(combined, self.RIFFUSION_SAMPLE_RATE, duration, crossfade_s=crossfade_s) # 정확한 길이로 맞춤
+            combined_bgm_path = self.bgm_dir / f"riffusion_combined_{datetime.now().strftime('%Y%m%d%H%M%S')}.wav" # 최종 파일 경로
+            audio_utils.write_wav(combined_bgm_path, combined, self.RIFFUSION_SAMPLE_RATE) # 한 번만 저장
+            print(f"✅ Riffusion BGM 생성 완료: {num_segments_to_generate}개 세그먼트, {time.perf_counter() - started:.1f}초")
+            return str(combined_bgm_path) # 병합된 BGM 경로 반환
+        except GenerationCancelled:
+            self._release_device_memory()
+            raise
         except Exception as e: # BGM 생성 실패 시
             print(f"❌ Riffusion BGM 생성 실패: {e}")
             return None # 실패 시 None 반환
 
+    def _select_bgm_device(self) -> Optional[str]:
+        """디노이징과 동시에 BGM을 생성할 장치 선택: 보조 GPU → 여유 VRAM이 충분한 같은 GPU → None (순차 실행)."""
+        if not (TORCH_AVAILABLE and torch.cuda.is_available()):
+            return None
+        if torch.cuda.device_count() > 1: # 보조 GPU에서 완전히 병렬 실행
+            return "cuda:1"
+        try:
+            free_bytes, _ = torch.cuda.mem_get_info(0)
+        except Exception:
+            return None
+        if free_bytes / (1024**3) >= self.RIFFUSION_CONCURRENT_MIN_FREE_GB: # 같은 GPU에서 겹쳐 실행
+            return "cuda:0"
+        return None
+
+    async def _run_bgm(self, prompt: str, duration: int, cancel_event: Optional[Any],
+                       device: Optional[str], mode: str) -> Optional[str]:
+        """BGM 생성 후 장치/모드/소요 시간을 통계에 기록."""
+        started = time.perf_counter()
+        try:
+            with tracing.span("riffusion.bgm", mode=mode, device=device or "cuda", duration_s=duration):
+                return await self.generate_riffusion_bgm(prompt, duration, cancel_event=cancel_event, device=device)
+        finally:
+            self.last_generation_stats["bgm"] = {
+                "mode": mode, # "concurrent" (디노이징과 겹침) 또는 "sequential"
+                "device": device or "cuda",
+                "started_at": started,
+                "finished_at": time.perf_counter(),
+                "wall_s": round(time.perf_counter() - started, 2)
+            }
+
+    async def _abandon_bgm_task(self, bgm_task: Optional[asyncio.Task], bgm_stop: threading.Event):
+        """비디오 생성 실패/취소 시 동시 실행 중인 BGM 작업 중단 (다음 배치 경계에서 멈춤)."""
+        if bgm_task is None:
+            return
+        bgm_stop.set()
+        try:
+            await bgm_task
+        except Exception:
+            pass
+
+    def _build_step_callback(self, total_steps: int,
+                             progress_callback: Optional[Callable[[Dict[str, Any]], None]],
+                             cancel_event: Optional[Any]) -> Callable:
+        """diffusers `callback_on_step_end`용 콜백 생성: 단계별 타이밍/메모리 보고 및 취소 확인."""
+        started_at = time.perf_counter() # 디노이징 시작 시각
+        step_times: List[float] = [] # 단계별 소요 시간 (초)
+        last_tick = [started_at] # 직전 단계 종료 시각 (클로저에서 갱신)
+        self.last_generation_stats = {"total_steps": total_steps, "step_times": step_times}
+
+        def on_step_end(pipe, step_index: int, timestep, callback_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+            now = time.perf_counter()
+            step_times.append(now - last_tick[0]) # 이번 단계 소요 시간 기록
+            last_tick[0] = now
+
+            completed = step_index + 1 # 완료된 단계 수
+            elapsed = now - started_at # 경과 시간
+            avg_step = elapsed / completed # 평균 단계 시간
+            eta = avg_step * max(0, total_steps - completed) # 남은 예상 시간
+
+            if progress_callback:
+                try:
+                    progress_callback({
+                        "step": completed,
+                        "total_steps": total_steps,
+                        "step_time_s": round(step_times[-1], 3),
+                        "elapsed_s": round(elapsed, 2),
+                        "eta_s": round(eta, 2),
+                        "memory": get_device_memory_gb()
+                    })
+                except Exception as cb_error: # 진행 콜백 오류가 생성 자체를 중단시키지 않도록 함
+                    print(f"⚠️ 진행 콜백 오류 (무시): {cb_error}")
+
+            if cancel_event is not None and cancel_event.is_set(): # 단계 사이 협조적 취소
+                print(f"🛑 디노이징 {completed}/{total_steps}단계에서 취소 요청 감지")
+                raise GenerationCancelled(f"디노이징 {completed}/{total_steps}단계에서 취소되었습니다.")
+            return callback_kwargs
+
+        return on_step_end
+
+    def _release_device_memory(self):
+        """취소/실패 후 GPU 메모리 즉시 반환."""
+        if TORCH_AVAILABLE:
+            import gc
+            gc.collect() # 중간 텐서 참조 해제
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache() # CUDA 캐시 비우기
+
     async def generate_video_from_prompt(self, # 비디오 생성 함수 (비동기)
                                          prompt: str,
                                          duration: int = 30,
                                          quality: str = "balanced",
                                          enable_bgm: bool = False,
-                                         bgm_prompt: Optional[str] = None) -> Optional[tuple[str, Optional[str]]]:
-        """텍스트 프롬프트로 CogVideoX-2b 비디오 생성 (BGM 선택적 추가)."""
+                                         bgm_prompt: Optional[str] = None,
+                                         bgm_duration: Optional[int] = None,
+                                         progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                         cancel_event: Optional[Any] = None) -> Optional[tuple[str, Optional[str]]]:
+        """
+        텍스트 프롬프트로 CogVideoX-2b 비디오 생성 (BGM 선택적 추가).
+
+        Args:
+            bgm_duration: BGM 길이 (기본값: duration). 멀티 씬 광고에서 한 씬 클립과 함께 광고 전체 길이의 BGM을 만들 때 사용
+            progress_callback: 디노이징 단계마다 호출 (step, total_steps, step_time_s, elapsed_s, eta_s, memory)
+            cancel_event: `is_set()`을 제공하는 취소 신호 (예: threading.Event). 설정되면 다음 단계 경계에서 GenerationCancelled 발생
+        """
         if not COGVIDEODX_AVAILABLE: # CogVideoX 사용 불가하면 실패
             print("❌ CogVideoX-2b 기본 의존성 누락으로 비디오 생성이 불가능합니다.")
             return None, None
 
-        if not self.initialize_pipeline(): # CogVideoX 파이프라인 초기화 시도
+        initialized = self.is_initialized
+        if not initialized: # CogVideoX 파이프라인 초기화 시도 (첫 호출의 가중치 로드만 스팬으로 기록)
+            with tracing.span("cogvideox.pipeline_load", model=self.model_id):
+                initialized = self.initialize_pipeline()
+        if not initialized:
             return None, None # 초기화 실패 시 None 반환
 
         if TORCH_AVAILABLE: # GPU 메모리 정리 (파이프라인 실행 전)
@@ -403,6 +553,7 @@ class CogVideoXGenerator:
             gc.collect() # 가비지 컬렉션 실행
 
         generation_params = self._get_quality_params_cogvideox(quality) # 품질에 따른 생성 파라미터 설정
+        bgm_duration = bgm_duration or duration
 
         base_fps = 8 # 기본 FPS (초당 프레임 수)
         num_frames = int(duration * base_fps) # 총 프레임 수 계산
@@ -415,18 +566,52 @@ class CogVideoXGenerator:
         print(f"🎬 CogVideoX-2b 비디오 생성 시작 (프롬프트: '{prompt}')") # 시작 메시지
         print(f"📋 설정: {generation_params['num_inference_steps']}단계, {num_frames}프레임, {base_fps}fps, 예상 길이: {actual_expected_duration:.1f}초")
 
+        if cancel_event is not None and cancel_event.is_set(): # 시작 전에 이미 취소된 경우
+            raise GenerationCancelled("비디오 생성 시작 전에 취소되었습니다.")
+
+        bgm_task: Optional[asyncio.Task] = None # 디노이징과 동시 실행되는 BGM 작업
+        bgm_stop = threading.Event() # 비디오 실패 시 BGM 작업 중단 신호
         try:
             generator = torch.Generator(device="cuda").manual_seed(42) # GPU용 난수 생성기 (결과 재현성 위함)
+            if torch.cuda.is_available():
+                torch.cuda.reset_peak_memory_stats() # 이번 생성의 메모리 high-water mark 측정용
+
+            step_callback = self._build_step_callback( # 단계별 진행/취소 콜백
+                generation_params['num_inference_steps'], progress_callback, cancel_event
+            )
 
-            video_frames = self.pipeline( # CogVideoX 파이프라인 호출 (비디오 프레임 생성)
-                prompt=prompt, # 텍스트 프롬프트
-                num_inference_steps=generation_params['num_inference_steps'], # 추론 단계 수
-                guidance_scale=generation_params['guidance_scale'], # 가이던스 스케일 (생성 품질/프롬프트 일치도)
-                width=generation_params['width'], # 비디오 너비
-                height=generation_params['height'], # 비디오 높이
-                num_frames=num_frames, # 생성할 프레임 수
-                generator=generator, # 난수 생성기
-            ).frames # 생성된 비디오 프레임 (리스트 형태)
+            # BGM은 프롬프트에만 의존하므로 디노이징과 겹쳐 실행 (장치 여유가 없으면 비디오 이후 순차 실행)
+            if enable_bgm and BGM_GENERATION_AVAILABLE:
+                bgm_device = self._select_bgm_device()
+                if bgm_device is not None:
+                    print(f"🎶 BGM을 디노이징과 동시에 생성합니다 ({bgm_device})")
+                    bgm_task = asyncio.create_task(self._run_bgm(
+                        bgm_prompt or prompt, bgm_duration, _AnyEvent(cancel_event, bgm_stop), bgm_device, "concurrent"
+                    ))
+            denoise_started = time.perf_counter()
+
+            # 파이프라인은 수 분간 블로킹되므로 워커 스레드에서 실행: 이벤트 루프가 상태 조회에 응답할 수 있음.
+            with tracing.span("cogvideox.denoise", steps=generation_params['num_inference_steps'], frames=num_frames,
+                              width=generation_params['width'], height=generation_params['height']):
+                video_frames = (await asyncio.to_thread(
+                    self.pipeline, # CogVideoX 파이프라인 호출 (비디오 프레임 생성)
+                    prompt=prompt, # 텍스트 프롬프트
+                    num_inference_steps=generation_params['num_inference_steps'], # 추론 단계 수
+                    guidance_scale=generation_params['guidance_scale'], # 가이던스 스케일 (생성 품질/프롬프트 일치도)
+                    width=generation_params['width'], # 비디오 너비
+                    height=generation_params['height'], # 비디오 높이
+                    num_frames=num_frames, # 생성할 프레임 수
+                    generator=generator, # 난수 생성기
+                    callback_on_step_end=step_callback, # 단계별 진행 보고 및 취소 확인
+                )).frames # 생성된 비디오 프레임 (리스트 형태)
+
+            step_times = self.last_generation_stats.get("step_times", [])
+            self.last_generation_stats.update({
+                "denoise_total_s": round(time.perf_counter() - denoise_started, 2), # VAE 디코딩 포함 전체 시간
+                "avg_step_s": round(sum(step_times) / len(step_times), 3) if step_times else None,
+                "memory": get_device_memory_gb()
+            })
+            print(f"⏱️ 디노이징 통계: 평균 {self.last_generation_stats['avg_step_s']}초/단계, 총 {self.last_generation_stats['denoise_total_s']}초")
 
             if TORCH_AVAILABLE and torch.cuda.is_available(): # GPU 메모리 재정리 (생성 후)
                 torch.cuda.empty_cache()
@@ -436,6 +621,7 @@ class CogVideoXGenerator:
             output_video_path = self.output_dir / f"cogvideox_generated_{int(actual_expected_duration)}s_{timestamp}.mp4" # 출력 비디오 경로
 
             # 🔧 수정된 비디오 저장 부분 (리스트 프레임 처리)
+            export_started = time.perf_counter() # 대체 저장 경로까지 포함한 내보내기 시간 (cogvideox.export 스팬)
             try:
                 # CogVideoX 출력 데이터 구조 분석
                 print(f"🔍 비디오 프레임 타입: {type(video_frames)}")
@@ -487,50 +673,10 @@ class CogVideoXGenerator:
                 # 대체 방법: imageio를 직접 사용
                 try:
                     import imageio
-                    import numpy as np
                     
-                    # 프레임 데이터 추출 및 변환
-                    if isinstance(video_frames, list) and len(video_frames) > 0:
-                        frames_data = video_frames[0]  # 리스트의 첫 번째 요소
-                    else:
-                        frames_data = video_frames
-                    
-                    # PyTorch 텐서를 numpy로 변환
-                    if hasattr(frames_data, 'cpu'):
-                        frames = frames_data.cpu().numpy()
-                    elif hasattr(frames_data, 'numpy'):
-                        frames = frames_data.numpy()
-                    else:
-                        frames = np.array(frames_data)
-                    
-                    print(f"🔍 대체 방법 - 원본 프레임 형태: {frames.shape}, 타입: {frames.dtype}")
-                    
-                    # 데이터 타입 정규화
-                    if frames.dtype == np.float32 or frames.dtype == np.float64:
-                        if frames.max() <= 1.0:
-                            # 0-1 범위를 0-255로 변환
-                            frames = (frames * 255).astype(np.uint8)
-                            print("🔄 float [0-1] 범위를 uint8 [0-255]로 변환")
-                        else:
-                            # 이미 0-255 범위인 float
-                            frames = frames.astype(np.uint8)
-                            print("🔄 float을 uint8로 변환")
-                    elif frames.dtype != np.uint8:
-                        # 기타 정수 타입을 uint8로 변환
-                        frames = frames.astype(np.uint8)
-                        print(f"🔄 {frames.dtype}을 uint8로 변환")
-                    
-                    # 차원 조정
-                    if len(frames.shape) == 5:
-                        # (batch, frames, height, width, channels) -> (frames, height, width, channels)
-                        frames = frames[0]
-                        print("🔄 배치 차원 제거: (B,F,H,W,C) -> (F,H,W,C)")
-                    elif len(frames.shape) == 4:
-                        # (frames, height, width, channels) - 이미 올바른 형태
-                        print("✅ 올바른 차원: (F,H,W,C)")
-                    else:
+                    frames = frames_to_uint8(video_frames) # 배치/텐서/dtype 정규화
+                    if frames.ndim != 4:
                         print(f"⚠️ 예상치 못한 차원: {frames.shape}")
-                    
                     print(f"🔍 최종 프레임 형태: {frames.shape}, 타입: {frames.dtype}")
                     
                     # imageio로 비디오 저장
@@ -554,28 +700,7 @@ class CogVideoXGenerator:
                         frames_dir = self.output_dir / f"temp_frames_{timestamp}"
                         frames_dir.mkdir(exist_ok=True)
                         
-                        # 프레임 데이터 추출
-                        if isinstance(video_frames, list) and len(video_frames) > 0:
-                            frames_data = video_frames[0]
-                        else:
-                            frames_data = video_frames
-                            
-                        if hasattr(frames_data, 'cpu'):
-                            frames = frames_data.cpu().numpy()
-                        elif hasattr(frames_data, 'numpy'):
-                            frames = frames_data.numpy()
-                        else:
-                            frames = np.array(frames_data)
-                        
-                        # 차원 및 타입 조정
-                        if len(frames.shape) == 5:
-                            frames = frames[0]
-                        
-                        if frames.dtype != np.uint8:
-                            if frames.max() <= 1.0:
-                                frames = (frames * 255).astype(np.uint8)
-                            else:
-                                frames = frames.astype(np.uint8)
+                        frames = frames_to_uint8(video_frames) # 프레임 데이터 추출 및 uint8 변환
                         
                         # 각 프레임을 PNG 이미지로 저장
                         frame_paths = []
@@ -608,26 +733,42 @@ class CogVideoXGenerator:
                         print(f"❌ 모든 비디오 저장 방법 실패: {final_error}")
                         raise Exception(f"비디오 저장 완전 실패 - export_to_video: {export_error}, imageio: {fallback_error}, ffmpeg: {final_error}")
 
+            tracing.record("cogvideox.export", export_started, frames=num_frames, fps=base_fps)
             file_size = output_video_path.stat().st_size / (1024*1024) # 파일 크기 (MB)
             actual_frames = len(video_frames) # 실제 생성된 프레임 수
             actual_duration = actual_frames / base_fps # 실제 생성된 비디오 길이
 
             print(f"✅ CogVideoX-2b 비디오 생성 완료: {output_video_path}") # 성공 메시지
             print(f"📊 결과: {actual_frames}프레임, {actual_duration:.1f}초, {file_size:.1f}MB")
+            self.last_generation_stats["video_duration_s"] = actual_duration # 최종 합성 길이 정렬에 사용
+            self.last_generation_stats["video_fps"] = base_fps
 
             bgm_output_path = None # BGM 출력 경로 초기화
-            if enable_bgm and BGM_GENERATION_AVAILABLE: # BGM 활성화 및 가용성 체크
-                actual_bgm_prompt = bgm_prompt if bgm_prompt else prompt # BGM 프롬프트 결정 (명시된 프롬프트 또는 비디오 프롬프트)
-                bgm_output_path = await self.generate_riffusion_bgm(actual_bgm_prompt, duration) # BGM 생성 (await 필요)
-                
-                if not bgm_output_path: # BGM 생성 실패 시
-                    print("⚠️ Riffusion BGM 생성 실패. BGM 없이 최종 영상 합성.")
+            video_done = time.perf_counter()
+            if bgm_task is not None: # 동시 실행 중인 BGM 결과 대기 (대부분 이미 완료)
+                bgm_output_path = await bgm_task
+                bgm_task = None
+            elif enable_bgm and BGM_GENERATION_AVAILABLE: # 장치 여유가 없으면 비디오 이후 순차 생성
+                bgm_output_path = await self._run_bgm(bgm_prompt or prompt, bgm_duration, cancel_event, None, "sequential")
             else: # BGM 비활성화 또는 Riffusion 불가 시
                 print("⚠️ 배경 음악 기능이 비활성화되었거나 Riffusion이 사용 불가능합니다.")
 
+            bgm_stats = self.last_generation_stats.get("bgm")
+            if bgm_stats: # 비디오 완료 이후 BGM 때문에 추가로 기다린 시간 (크리티컬 패스 기여분)
+                bgm_stats["critical_path_s"] = round(max(0.0, bgm_stats.pop("finished_at") - max(video_done, bgm_stats.pop("started_at"))), 2)
+                print(f"⏱️ BGM 통계: {bgm_stats['mode']} ({bgm_stats['device']}), {bgm_stats['wall_s']}초 중 크리티컬 패스 {bgm_stats['critical_path_s']}초")
+            if enable_bgm and not bgm_output_path: # BGM 생성 실패 시
+                print("⚠️ Riffusion BGM 생성 실패. BGM 없이 최종 영상 합성.")
+
             return str(output_video_path), bgm_output_path # 비디오 경로와 BGM 경로 반환 (튜플)
 
+        except GenerationCancelled: # 취소 시 GPU를 즉시 반환하고 호출자에게 전달
+            await self._abandon_bgm_task(bgm_task, bgm_stop)
+            self._release_device_memory()
+            print("🛑 CogVideoX-2b 비디오 생성이 취소되어 GPU 메모리를 반환했습니다.")
+            raise
         except Exception as e: # 비디오 생성 중 예외 처리
+            await self._abandon_bgm_task(bgm_task, bgm_stop)
             print(f"❌ CogVideoX-2b 비디오 생성 중 오류: {e}")
             raise # 예외 다시 발생 (호출자에게 전달)
 
@@ -0,0 +1,155 @@
+# app/utils/audio_mixer.py - 라우드니스 정규화 + 사이드체인 더킹 오디오 믹서 (FFmpeg 필터 그래프 생성)
+#
+# 나레이션/BGM의 EBU R128 라우드니스를 한 번만 측정해 산출물 옆 사이드카 파일(<오디오>.loudness.json)에 캐시하고,
+# 측정값으로 계산한 고정 게인 + 음성 구간 더킹 + BGM 루프/패딩을 최종 합성 FFmpeg 한 번에 적용합니다.
+# (loudnorm 2패스 방식처럼 정규화용 중간 인코딩을 따로 만들지 않음)
+
+import os
+import re
+import json
+import math
+import subprocess
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any, List, Union
+
+from app.core import metrics
+
+LOUDNESS_SIDECAR_SUFFIX = ".loudness.json"
+SILENCE_LUFS = -70.0 # 측정 불가(무음) 시 사용할 라우드니스
+MAX_GAIN_DB = 20.0 # 정규화 게인 제한 (무음/잡음 과증폭 방지)
+
+@dataclass(frozen=True)
+class MixSettings:
+    """믹스 목표값 및 더킹 파라미터."""
+    voice_target_lufs: float = -16.0 # 나레이션 목표 라우드니스 (온라인 광고 기준)
+    bgm_target_lufs: float = -30.0 # BGM 목표 라우드니스 (더킹 전)
+    duck_threshold: float = 0.02 # 사이드체인 임계값 (선형 진폭)
+    duck_ratio: float = 6.0 # 음성 구간 BGM 압축비
+    duck_attack_ms: float = 20.0
+    duck_release_ms: float = 350.0
+    fade_out_s: float = 1.0 # 광고 끝 BGM 페이드아웃
+    sample_rate: int = 48000
+    limiter: float = 0.95 # 최종 피크 제한 (선형)
+
+DEFAULT_MIX = MixSettings()
+
+def _sidecar_path(path: str) -> str:
+    return path + LOUDNESS_SIDECAR_SUFFIX
+
+def _parse_loudnorm_json(stderr: str) -> Dict[str, Any]:
+    """loudnorm(print_format=json) 분석 출력에서 마지막 JSON 블록 추출."""
+    match = re.search(r"\{[^{}]*\"input_i\"[^{}]*\}", stderr, re.S)
+    if not match:
+        raise ValueError("loudnorm 분석 결과를 찾을 수 없습니다.")
+    raw = json.loads(match.group(0))
+
+    def _num(key: str, default: float) -> float:
+        try:
+            value = float(raw.get(key, default))
+        except (TypeError, ValueError):
+            return default
+        return value if math.isfinite(value) else default # 무음이면 "-inf"
+
+    return {
+        "integrated_lufs": _num("input_i", SILENCE_LUFS),
+        "true_peak_dbtp": _num("input_tp", SILENCE_LUFS),
+        "lra": _num("input_lra", 0.0),
+        "threshold_lufs": _num("input_thresh", SILENCE_LUFS)
+    }
+
+def measure_loudness(path: str, timeout: float = 120) -> Dict[str, Any]:
+    """
+    EBU R128 라우드니스 측정 (사이드카 캐시).
+    파일 크기/수정 시각이 같으면 캐시를 그대로 사용하므로 같은 산출물은 한 번만 디코딩합니다.
+    측정에 실패하면 게인이 0이 되도록 무음 값과 오류를 반환합니다.
+    """
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime}
+    sidecar = _sidecar_path(path)
+    try:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("source") == fingerprint:
+            metrics.record_cache_lookup("loudness", True)
+            return cached["loudness"]
+    except (OSError, ValueError, KeyError):
+        pass
+    metrics.record_cache_lookup("loudness", False)
+
+    try:
+        metrics.SUBPROCESSES_RUNNING.inc(program="ffmpeg")
+        try:
+            result = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-nostats", "-i", path,
+                 "-af", "loudnorm=print_format=json", "-f", "null", "-"],
+                capture_output=True, text=True, timeout=timeout, check=True
+            )
+        finally:
+            metrics.SUBPROCESSES_RUNNING.dec(program="ffmpeg")
+        loudness = _parse_loudnorm_json(result.stderr)
+    except (subprocess.SubprocessError, OSError, ValueError) as e: # 측정 실패 → 게인 0으로 믹스 (캐시하지 않음)
+        print(f"⚠️ 라우드니스 측정 실패 ({os.path.basename(path)}): {e}")
+        return {"integrated_lufs": SILENCE_LUFS, "true_peak_dbtp": SILENCE_LUFS, "lra": 0.0,
+                "threshold_lufs": SILENCE_LUFS, "error": str(e)}
+    try:
+        with open(sidecar, "w", encoding="utf-8") as f:
+            json.dump({"source": fingerprint, "loudness": loudness}, f)
+    except OSError as e: # 읽기 전용 위치 등: 캐시 없이 진행
+        print(f"⚠️ 라우드니스 캐시 저장 실패: {e}")
+    return loudness
+
+def gain_db(measured_lufs: float, target_lufs: float) -> float:
+    """목표 라우드니스까지의 게인 (±MAX_GAIN_DB 제한)."""
+    if measured_lufs <= SILENCE_LUFS:
+        return 0.0
+    return max(-MAX_GAIN_DB, min(MAX_GAIN_DB, target_lufs - measured_lufs))
+
+def _source(stream: Union[int, str]) -> str:
+    """입력 번호(int)는 해당 입력의 오디오 스트림, 문자열은 필터 그래프 내부 라벨."""
+    return f"[{stream}:a]" if isinstance(stream, int) else f"[{stream}]"
+
+def build_mix_filter(duration: float, voice_input: Union[int, str], voice_loudness: Dict[str, Any],
+                     bgm_input: Optional[Union[int, str]] = None, bgm_loudness: Optional[Dict[str, Any]] = None,
+                     settings: MixSettings = DEFAULT_MIX, output_label: str = "audio_mix",
+                     voice_prefilter: str = "") -> str:
+    """
+    나레이션(+BGM) 믹스 filter_complex 문자열.
+    - 나레이션: 길이 정렬 필터(voice_prefilter, 예: atempo/adelay) → 정규화 게인 → 목표 길이까지 무음 패딩
+    - BGM: 입력 측 -stream_loop로 반복된 스트림을 정규화, 목표 길이로 절단 후 페이드아웃
+    - 나레이션을 사이드체인으로 BGM 압축(더킹), 합산 후 리미터
+    """
+    fmt = f"aformat=sample_fmts=fltp:sample_rates={settings.sample_rate}:channel_layouts=stereo"
+    voice_gain = gain_db(voice_loudness["integrated_lufs"], settings.voice_target_lufs)
+    prefilter = f"{voice_prefilter}," if voice_prefilter else ""
+    voice_chain = f"{_source(voice_input)}{prefilter}{fmt},volume={voice_gain:.2f}dB,apad=whole_dur={duration},atrim=0:{duration}"
+    if bgm_input is None:
+        return f"{voice_chain},alimiter=limit={settings.limiter}[{output_label}]"
+
+    bgm_gain = gain_db((bgm_loudness or {}).get("integrated_lufs", SILENCE_LUFS), settings.bgm_target_lufs)
+    fade_start = max(0.0, duration - settings.fade_out_s)
+    return ";".join([
+        f"{voice_chain},asplit=2[voice][voice_sc]",
+        f"{_source(bgm_input)}{fmt},volume={bgm_gain:.2f}dB,atrim=0:{duration},asetpts=PTS-STARTPTS,"
+        f"afade=t=out:st={fade_start}:d={settings.fade_out_s}[bgm]",
+        f"[bgm][voice_sc]sidechaincompress=threshold={settings.duck_threshold}:ratio={settings.duck_ratio}:"
+        f"attack={settings.duck_attack_ms}:release={settings.duck_release_ms}[bgm_ducked]",
+        f"[voice][bgm_ducked]amix=inputs=2:duration=first:normalize=0,alimiter=limit={settings.limiter}[{output_label}]"
+    ])
+
+def bgm_input_args(bgm_path: str) -> List[str]:
+    """BGM 입력 인자: 디먹서 단계에서 무한 반복 (길이는 필터 그래프의 atrim이 결정)."""
+    return ["-stream_loop", "-1", "-i", bgm_path]
+
+def mix_report(voice_loudness: Union[Dict[str, Any], List[Dict[str, Any]]], bgm_loudness: Optional[Dict[str, Any]],
+               settings: MixSettings = DEFAULT_MIX) -> Dict[str, Any]:
+    """작업 결과에 기록할 믹스 정보 (나레이션이 씬별 목록이면 voice도 목록)."""
+    def _voice(loudness: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(loudness, gain_db=round(gain_db(loudness["integrated_lufs"], settings.voice_target_lufs), 2))
+
+    report = {
+        "settings": asdict(settings),
+        "voice": [_voice(item) for item in voice_loudness] if isinstance(voice_loudness, list) else _voice(voice_loudness)
+    }
+    if bgm_loudness is not None:
+        report["bgm"] = dict(bgm_loudness, gain_db=round(gain_db(bgm_loudness["integrated_lufs"], settings.bgm_target_lufs), 2))
+    return report
@@ -0,0 +1,106 @@
+# app/utils/audio_utils.py - 메모리 내 오디오 버퍼 처리 유틸리티 (크로스페이드 병합, 길이 맞춤, 단일 저장)
+
+import wave
+from pathlib import Path
+from typing import List, Sequence, Union
+
+import numpy as np
+
+# SoundFile 임포트 (선택적): 없으면 표준 wave 모듈로 16비트 PCM 저장.
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+def as_float32_frames(audio: np.ndarray) -> np.ndarray:
+    """오디오 배열을 (샘플, 채널) 형태의 float32로 정규화 (모노는 채널 1개)."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim == 1:
+        return audio[:, None]
+    if audio.ndim == 2 and audio.shape[0] < audio.shape[1] and audio.shape[0] <= 8: # (채널, 샘플) → (샘플, 채널)
+        return np.ascontiguousarray(audio.T)
+    return audio
+
+def equal_power_curves(length: int):
+    """등전력 크로스페이드 곡선 (fade_out, fade_in): cos² + sin² = 1로 겹침 구간의 음량 유지."""
+    t = np.linspace(0.0, np.pi / 2, length, dtype=np.float32)[:, None]
+    return np.cos(t), np.sin(t)
+
+def crossfade_concat(segments: Sequence[np.ndarray], sample_rate: int, crossfade_s: float = 0.5) -> np.ndarray:
+    """
+    세그먼트들을 등전력 크로스페이드로 이어 붙임.
+    최종 길이의 출력 버퍼를 한 번만 할당하고 겹침 구간만 곡선을 곱해 누적합니다.
+    """
+    frames: List[np.ndarray] = [as_float32_frames(seg) for seg in segments if len(seg)]
+    if not frames:
+        return np.zeros((0, 1), dtype=np.float32)
+    channels = max(f.shape[1] for f in frames)
+    frames = [np.repeat(f, channels, axis=1) if f.shape[1] == 1 and channels > 1 else f for f in frames]
+
+    # 겹침 길이는 가장 짧은 세그먼트의 절반을 넘지 않음
+    overlap = int(min(crossfade_s * sample_rate, min(len(f) for f in frames) // 2))
+    total = sum(len(f) for f in frames) - overlap * (len(frames) - 1)
+    out = np.zeros((total, channels), dtype=np.float32)
+    fade_out, fade_in = equal_power_curves(overlap) if overlap > 0 else (None, None)
+
+    pos = 0
+    for i, seg in enumerate(frames):
+        if i == 0 or overlap == 0:
+            out[pos:pos + len(seg)] += seg
+        else:
+            out[pos:pos + overlap] *= fade_out # 앞 세그먼트 꼬리 페이드아웃
+            out[pos:pos + overlap] += seg[:overlap] * fade_in # 다음 세그먼트 머리 페이드인
+            out[pos + overlap:pos + len(seg)] = seg[overlap:]
+        pos += len(seg) - overlap
+    return out
+
+def fit_to_duration(audio: np.ndarray, sample_rate: int, duration_s: float,
+                    fade_out_s: float = 1.0, crossfade_s: float = 0.5) -> np.ndarray:
+    """정확한 길이로 맞춤: 짧으면 크로스페이드 루프, 길면 잘라낸 뒤 끝부분 페이드아웃."""
+    audio = as_float32_frames(audio)
+    target = int(round(duration_s * sample_rate))
+    if len(audio) == 0 or target <= 0:
+        return np.zeros((max(0, target), audio.shape[1] if audio.ndim == 2 else 1), dtype=np.float32)
+    if len(audio) < target: # 이음매 없는 루프
+        overlap = min(crossfade_s * sample_rate, len(audio) // 2)
+        repeats = int(np.ceil((target - overlap) / max(1, len(audio) - overlap)))
+        audio = crossfade_concat([audio] * max(1, repeats), sample_rate, crossfade_s)
+    audio = audio[:target].copy()
+    fade_len = min(int(fade_out_s * sample_rate), len(audio))
+    if fade_len > 0:
+        audio[-fade_len:] *= np.linspace(1.0, 0.0, fade_len, dtype=np.float32)[:, None]
+    return audio
+
+def tile_to_length(audio: np.ndarray, length: int, fade_out: int = 0) -> np.ndarray:
+    """이음매 없는 루프 버퍼를 샘플 단위 정확한 길이로 반복/절단 (끝부분 선형 페이드아웃 선택)."""
+    audio = as_float32_frames(audio)
+    out = np.resize(audio, (max(0, length), audio.shape[1])) # 행(샘플) 단위로 순환 반복
+    fade_out = min(fade_out, len(out))
+    if fade_out > 0:
+        out[-fade_out:] *= np.linspace(1.0, 0.0, fade_out, dtype=np.float32)[:, None]
+    return out
+
+def read_wav(path: Union[str, Path]):
+    """WAV 파일을 (샘플, 채널) float32 버퍼와 샘플레이트로 읽기."""
+    if SOUNDFILE_AVAILABLE:
+        audio, sample_rate = sf.read(str(path), dtype="float32", always_2d=True)
+        return audio, sample_rate
+    with wave.open(str(path), "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        sample_rate = wav_file.getframerate()
+        pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype="<i2")
+    return pcm.reshape(-1, channels).astype(np.float32) / 32768.0, sample_rate
+
+def write_wav(path: Union[str, Path], audio: np.ndarray, sample_rate: int) -> str:
+    """오디오 버퍼를 WAV로 한 번에 저장 (16비트 PCM)."""
+    audio = np.clip(as_float32_frames(audio), -1.0, 1.0)
+    if SOUNDFILE_AVAILABLE:
+        sf.write(str(path), audio, samplerate=sample_rate, subtype="PCM_16")
+    else:
+        with wave.open(str(path), "wb") as wav_file:
+            wav_file.setnchannels(audio.shape[1])
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes((audio * 32767).astype("<i2").tobytes())
+    return str(path)
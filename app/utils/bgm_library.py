@@ -0,0 +1,239 @@
+# app/utils/bgm_library.py - 사전 렌더링 BGM 라이브러리 (스타일/템포/키 인덱스, 요청 시 정확한 길이로 루프/절단)
+#
+# 오프라인 빌드:
+#   python -m app.utils.bgm_library build            # 기본 변형(템포 3 × 키 2)으로 스타일별 루프 베드 생성
+#   python -m app.utils.bgm_library list             # 인덱스 요약 출력
+#
+# 요청 시에는 인덱스에서 스타일에 맞는 베드를 고르고 밀리초 단위 길이로 반복/절단만 하므로 생성 모델이 필요 없습니다.
+
+import os
+import json
+import time
+import zlib
+import argparse
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils import audio_utils, bgm_synth
+
+DEFAULT_LIBRARY_DIR = os.getenv("BGM_LIBRARY_DIR", os.path.join(os.getcwd(), "generated", "bgm_library"))
+INDEX_FILENAME = "index.json"
+INDEX_VERSION = 1
+
+DEFAULT_TEMPO_FACTORS = (0.9, 1.0, 1.1) # 스타일 기본 템포 대비 변형
+DEFAULT_KEY_SHIFTS = (0, 2) # 반음 단위 조옮김
+MIN_LOOP_SECONDS = 8.0 # 루프 베드 최소 길이 (코드 진행 단위로 올림)
+LOOP_CROSSFADE_S = 0.05 # 루프 이음매 크로스페이드 길이
+
+# 스타일 어휘 → 라이브러리 스타일: style_preference, bgm_style, MockOpenAIClient._analyze_music_style 결과를 모두 수용
+STYLE_ALIASES: Dict[str, str] = {
+    "auto": bgm_synth.DEFAULT_STYLE,
+    "modern": "모던하고 깔끔한",
+    "smooth ambient": "모던하고 깔끔한",
+    "calm professional": "모던하고 깔끔한",
+    "cozy warm acoustic": "따뜻하고 아늑한",
+    "comfortable inviting": "따뜻하고 아늑한",
+    "warm": "따뜻하고 아늑한",
+    "minimal": "미니멀하고 프리미엄한",
+    "premium": "미니멀하고 프리미엄한",
+    "upbeat contemporary": "역동적이고 에너지",
+    "energetic positive": "역동적이고 에너지",
+    "energetic": "역동적이고 에너지",
+    "romantic": "감성적이고 로맨틱",
+    "emotional": "감성적이고 로맨틱",
+}
+
+# 스타일별 분위기 태그 (인덱스 검색/표시용)
+STYLE_MOODS: Dict[str, str] = {
+    "모던하고 깔끔한": "calm professional",
+    "따뜻하고 아늑한": "comfortable inviting",
+    "미니멀하고 프리미엄한": "minimal premium",
+    "역동적이고 에너지": "energetic positive",
+    "감성적이고 로맨틱": "emotional romantic",
+}
+
+def resolve_library_style(style_preference: Optional[str] = None, bgm_style: Optional[str] = None,
+                          prompt: Optional[str] = None) -> str:
+    """요청의 스타일 어휘를 라이브러리 스타일로 변환: bgm_style(auto 제외) → style_preference → 프롬프트 키워드 순."""
+    for candidate in (bgm_style if bgm_style != "auto" else None, style_preference):
+        if not candidate:
+            continue
+        if candidate in bgm_synth.STYLE_PRESETS:
+            return candidate
+        alias = STYLE_ALIASES.get(candidate.strip().lower())
+        if alias:
+            return alias
+    return bgm_synth.resolve_style_name(None, " ".join(filter(None, (bgm_style, style_preference, prompt))))
+
+def render_loop_bed(style: bgm_synth.SynthStyle, sample_rate: int = bgm_synth.SAMPLE_RATE,
+                    min_seconds: float = MIN_LOOP_SECONDS) -> np.ndarray:
+    """코드 진행 경계에 맞춘 이음매 없는 루프 베드 렌더링: 루프 끝 직후 구간을 시작부에 크로스페이드."""
+    cycle_s = bgm_synth.progression_seconds(style)
+    loop_len = int(round(cycle_s * max(1, int(np.ceil(min_seconds / cycle_s))) * sample_rate))
+    xfade = int(LOOP_CROSSFADE_S * sample_rate)
+    synth = bgm_synth.ProceduralBGMSynth(style, sample_rate)
+    rendered = np.concatenate(list(synth.render_blocks((loop_len + xfade) / sample_rate, fade_s=0.0)))
+    loop = rendered[:loop_len].copy()
+    fade_out, fade_in = audio_utils.equal_power_curves(xfade)
+    # 루프 마지막 샘플 다음에는 loop[0]이 재생되므로, 시작부를 '루프 끝 직후' 신호에서 원래 시작부로 전환
+    loop[:xfade] = rendered[loop_len:loop_len + xfade] * fade_out + loop[:xfade] * fade_in
+    return loop
+
+class BGMLibrary:
+    """사전 렌더링 BGM 베드 인덱스: 오프라인 빌드, 스타일 기반 선택, 정확한 길이 렌더링."""
+
+    def __init__(self, root: str = DEFAULT_LIBRARY_DIR, cache_size: int = 8):
+        self.root = Path(root)
+        self.cache_size = cache_size # 디코딩된 베드 메모리 캐시 개수
+        self._index: Optional[Dict[str, Any]] = None
+        self._index_mtime: Optional[float] = None
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / INDEX_FILENAME
+
+    # ── 인덱스 ──────────────────────────────────
+    def load(self) -> Dict[str, Any]:
+        """인덱스 로드 (파일이 갱신되었으면 다시 읽음). 없으면 빈 인덱스."""
+        try:
+            mtime = self.index_path.stat().st_mtime
+        except OSError:
+            return {"version": INDEX_VERSION, "entries": []}
+        with self._lock:
+            if self._index is None or mtime != self._index_mtime:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+                self._index_mtime = mtime
+                self._cache.clear()
+            return self._index
+
+    @property
+    def available(self) -> bool:
+        return bool(self.load().get("entries"))
+
+    def summary(self) -> Dict[str, Any]:
+        """스타일별 베드 수 등 인덱스 요약."""
+        index = self.load()
+        styles: Dict[str, int] = {}
+        for entry in index.get("entries", []):
+            styles[entry["style"]] = styles.get(entry["style"], 0) + 1
+        return {
+            "available": bool(index.get("entries")),
+            "total_beds": len(index.get("entries", [])),
+            "styles": styles,
+            "created_at": index.get("created_at"),
+            "aliases": sorted(STYLE_ALIASES)
+        }
+
+    # ── 오프라인 빌드 ───────────────────────────
+    def build(self, styles: Optional[Sequence[str]] = None,
+              tempo_factors: Sequence[float] = DEFAULT_TEMPO_FACTORS,
+              key_shifts: Sequence[int] = DEFAULT_KEY_SHIFTS,
+              sample_rate: int = bgm_synth.SAMPLE_RATE,
+              min_seconds: float = MIN_LOOP_SECONDS) -> Dict[str, Any]:
+        """스타일 × 템포 × 키 조합의 루프 베드를 렌더링하고 인덱스를 원자적으로 교체."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        entries: List[Dict[str, Any]] = []
+        started = time.perf_counter()
+        for style_name in styles or list(bgm_synth.STYLE_PRESETS):
+            base = bgm_synth.STYLE_PRESETS[style_name]
+            for tempo_factor in tempo_factors:
+                for key_shift in key_shifts:
+                    ratio = 2 ** (key_shift / 12)
+                    style = replace(base, bpm=round(base.bpm * tempo_factor, 1),
+                                    chords=tuple(tuple(f * ratio for f in chord) for chord in base.chords))
+                    bed = render_loop_bed(style, sample_rate, min_seconds)
+                    bed_id = f"{zlib.crc32(style_name.encode('utf-8')):08x}_{int(style.bpm)}bpm_k{key_shift:+d}"
+                    filename = f"{bed_id}.wav"
+                    audio_utils.write_wav(self.root / filename, bed, sample_rate)
+                    entries.append({
+                        "id": bed_id,
+                        "style": style_name,
+                        "mood": STYLE_MOODS.get(style_name, ""),
+                        "bpm": style.bpm,
+                        "key_shift": key_shift,
+                        "loop_s": round(len(bed) / sample_rate, 3),
+                        "sample_rate": sample_rate,
+                        "path": filename # 라이브러리 디렉토리 기준 상대 경로
+                    })
+                    print(f"  🎼 {style_name} {style.bpm}bpm 키{key_shift:+d}: {len(bed) / sample_rate:.1f}초 루프")
+        index = {
+            "version": INDEX_VERSION,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "entries": entries
+        }
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path) # 원자적 교체
+        print(f"✅ BGM 라이브러리 빌드 완료: {len(entries)}개 베드, {time.perf_counter() - started:.1f}초 ({self.root})")
+        return index
+
+    # ── 요청 시 선택/렌더링 ─────────────────────
+    def select(self, style_preference: Optional[str] = None, bgm_style: Optional[str] = None,
+               prompt: Optional[str] = None, seed: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """스타일에 맞는 베드 선택. seed(예: 작업 ID)로 변형 중 하나를 결정적으로 골라 광고마다 다양성 확보."""
+        entries = self.load().get("entries", [])
+        if not entries:
+            return None
+        style_name = resolve_library_style(style_preference, bgm_style, prompt)
+        candidates = [e for e in entries if e["style"] == style_name] or entries
+        pick = zlib.crc32((seed or "").encode("utf-8")) % len(candidates)
+        return candidates[pick]
+
+    def _load_bed(self, entry: Dict[str, Any]) -> np.ndarray:
+        with self._lock:
+            bed = self._cache.get(entry["id"])
+            if bed is not None:
+                self._cache.move_to_end(entry["id"])
+                return bed
+        bed, _ = audio_utils.read_wav(self.root / entry["path"])
+        with self._lock:
+            self._cache[entry["id"]] = bed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return bed
+
+    def render(self, entry: Dict[str, Any], duration_ms: int, output_path: str, fade_out_ms: int = 1000) -> str:
+        """베드를 밀리초 단위 정확한 길이로 반복/절단해 저장."""
+        sample_rate = entry["sample_rate"]
+        length = int(round(duration_ms * sample_rate / 1000))
+        audio = audio_utils.tile_to_length(self._load_bed(entry), length, fade_out=int(fade_out_ms * sample_rate / 1000))
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        return audio_utils.write_wav(output_path, audio, sample_rate)
+
+_library: Optional[BGMLibrary] = None
+
+def get_library() -> BGMLibrary:
+    """프로세스 공용 라이브러리 인스턴스."""
+    global _library
+    if _library is None:
+        _library = BGMLibrary()
+    return _library
+
+def main():
+    parser = argparse.ArgumentParser(description="사전 렌더링 BGM 라이브러리 관리")
+    parser.add_argument("command", choices=["build", "list"])
+    parser.add_argument("--dir", default=DEFAULT_LIBRARY_DIR, help="라이브러리 디렉토리")
+    parser.add_argument("--tempos", default=",".join(map(str, DEFAULT_TEMPO_FACTORS)), help="템포 배율 목록 (쉼표 구분)")
+    parser.add_argument("--keys", default=",".join(map(str, DEFAULT_KEY_SHIFTS)), help="조옮김 반음 목록 (쉼표 구분)")
+    parser.add_argument("--min-seconds", type=float, default=MIN_LOOP_SECONDS, help="루프 최소 길이 (초)")
+    args = parser.parse_args()
+
+    library = BGMLibrary(args.dir)
+    if args.command == "build":
+        library.build(tempo_factors=[float(t) for t in args.tempos.split(",")],
+                      key_shifts=[int(k) for k in args.keys.split(",")],
+                      min_seconds=args.min_seconds)
+    print(json.dumps(library.summary(), ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# app/utils/bgm_synth.py - NumPy 기반 절차적 BGM 신디사이저 (Riffusion/MusicGen 미사용 시 CPU 폴백)
+#
+# 코드 진행 × 리듬 엔벨로프 × 웨이브테이블 오실레이터 뱅크를 블록 단위로 float32 렌더링합니다.
+# FFmpeg 프로세스 없이 30초 스테레오 BGM을 수십 밀리초에 생성하며, 메모리 사용량은 블록 크기로 제한됩니다.
+
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+# SoundFile 임포트 (선택적): 없으면 표준 wave 모듈로 16비트 PCM 스트리밍 저장.
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+SAMPLE_RATE = 44100 # 기본 샘플레이트
+WAVETABLE_SIZE = 8192 # 웨이브테이블 한 주기 샘플 수 (최근접 조회 오차 ≈ -60dB)
+BLOCK_SIZE = 8192 # 렌더링 블록 크기 (샘플)
+
+@dataclass(frozen=True)
+class SynthStyle:
+    """스타일별 음악 설정: 코드 진행(Hz), 템포, 리듬 강세, 음색, 에코."""
+    chords: Tuple[Tuple[float, float, float], ...] # (근음, 3음, 5음) 주파수
+    bpm: float # 템포
+    rhythm: Tuple[float, ...] # 박자별 강세 (한 마디)
+    volume: float # 기본 음량
+    harmonics: Tuple[float, ...] # 웨이브테이블 배음 크기 (1배음부터)
+    decay: float # 박자 내 감쇠 속도 (클수록 스타카토)
+    echo_delay_s: float # 에코 지연 (초)
+    echo_feedback: float # 에코 피드백 (0~1)
+    stereo_delay_ms: float = 12.0 # 오른쪽 채널 하스 지연 (스테레오 폭)
+    beats_per_chord: int = 4 # 코드당 박자 수
+
+# 스타일별 설정: 기존 FFmpeg lavfi 화음 그래프의 코드 진행/음량을 그대로 계승
+STYLE_PRESETS: Dict[str, SynthStyle] = {
+    "모던하고 깔끔한": SynthStyle(
+        chords=((261.63, 329.63, 392.00), (220.00, 277.18, 329.63), (196.00, 246.94, 293.66), (261.63, 329.63, 392.00)),
+        bpm=100, rhythm=(1.0, 0.7, 0.5, 0.7), volume=0.25, harmonics=(1.0, 0.35, 0.15, 0.08),
+        decay=2.5, echo_delay_s=0.5, echo_feedback=0.15),
+    "따뜻하고 아늑한": SynthStyle(
+        chords=((220.00, 277.18, 329.63), (196.00, 246.94, 293.66), (261.63, 329.63, 392.00), (174.61, 220.00, 261.63)),
+        bpm=80, rhythm=(1.0, 0.8, 0.6, 0.8), volume=0.3, harmonics=(1.0, 0.5, 0.2),
+        decay=1.5, echo_delay_s=0.8, echo_feedback=0.25),
+    "미니멀하고 프리미엄한": SynthStyle(
+        chords=((130.81, 164.81, 196.00), (146.83, 185.00, 220.00), (164.81, 207.65, 246.94), (130.81, 164.81, 196.00)),
+        bpm=72, rhythm=(1.0, 0.6, 0.4, 0.6), volume=0.2, harmonics=(1.0, 0.2, 0.05),
+        decay=1.2, echo_delay_s=0.4, echo_feedback=0.1),
+    "역동적이고 에너지": SynthStyle(
+        chords=((146.83, 185.00, 220.00), (164.81, 207.65, 246.94), (196.00, 246.94, 293.66), (146.83, 185.00, 220.00)),
+        bpm=124, rhythm=(1.0, 0.9, 0.8, 0.9), volume=0.35, harmonics=(1.0, 0.6, 0.4, 0.25, 0.15),
+        decay=4.0, echo_delay_s=0.3, echo_feedback=0.2, beats_per_chord=2),
+    "감성적이고 로맨틱": SynthStyle(
+        chords=((174.61, 220.00, 261.63), (196.00, 246.94, 293.66), (220.00, 277.18, 329.63), (174.61, 220.00, 261.63)),
+        bpm=68, rhythm=(1.0, 0.7, 0.5, 0.7), volume=0.28, harmonics=(1.0, 0.3, 0.1),
+        decay=1.0, echo_delay_s=1.0, echo_feedback=0.3),
+}
+DEFAULT_STYLE = "모던하고 깔끔한"
+
+# 영문 프롬프트 키워드 → 스타일 (MusicGen/Riffusion 프롬프트 재사용)
+_PROMPT_KEYWORDS = (
+    (("cozy", "warm", "acoustic"), "따뜻하고 아늑한"),
+    (("upbeat", "energetic", "dynamic"), "역동적이고 에너지"),
+    (("romantic", "emotional"), "감성적이고 로맨틱"),
+    (("minimal", "premium", "luxury"), "미니멀하고 프리미엄한"),
+)
+
+def resolve_style_name(style_preference: Optional[str] = None, prompt: Optional[str] = None) -> str:
+    """스타일 이름 또는 프롬프트 키워드로 스타일 이름 선택 (없으면 기본 스타일)."""
+    if style_preference in STYLE_PRESETS:
+        return style_preference
+    text = (prompt or "").lower()
+    for keywords, style_name in _PROMPT_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return style_name
+    return DEFAULT_STYLE
+
+def resolve_style(style_preference: Optional[str] = None, prompt: Optional[str] = None) -> SynthStyle:
+    """스타일 이름 또는 프롬프트 키워드로 설정 선택 (없으면 기본 스타일)."""
+    return STYLE_PRESETS[resolve_style_name(style_preference, prompt)]
+
+def progression_seconds(style: SynthStyle) -> float:
+    """코드 진행 한 바퀴 길이 (초): 루프 길이를 음악적 경계에 맞출 때 사용."""
+    return len(style.chords) * style.beats_per_chord * 60.0 / style.bpm
+
+def build_wavetable(harmonics: Tuple[float, ...], size: int = WAVETABLE_SIZE) -> np.ndarray:
+    """배음 가산 합성으로 한 주기 웨이브테이블 생성 (보간용 가드 샘플 1개 포함, 피크 1로 정규화)."""
+    phase = np.arange(size + 1, dtype=np.float64) / size
+    table = sum(amp * np.sin(2 * np.pi * (k + 1) * phase) for k, amp in enumerate(harmonics))
+    return (table / np.max(np.abs(table))).astype(np.float32)
+
+class ProceduralBGMSynth:
+    """
+    블록 스트리밍 절차적 신디사이저.
+    오실레이터 뱅크(코드 3음 + 베이스)의 위상을 블록 사이에 이어가므로 블록 경계에 이음매가 없습니다.
+    모노로 합성한 뒤 하스(Haas) 지연으로 스테레오 폭을 만들어 보이스 수를 절반으로 줄입니다.
+    """
+
+    def __init__(self, style: SynthStyle, sample_rate: int = SAMPLE_RATE, block_size: int = BLOCK_SIZE):
+        self.style = style
+        self.sample_rate = sample_rate
+        self.echo_delay = max(1, int(style.echo_delay_s * sample_rate))
+        self.block_size = min(block_size, self.echo_delay) # 블록 ≤ 에코 지연이면 피드백을 블록 단위로 벡터화 가능
+        self.stereo_delay = max(1, int(style.stereo_delay_ms / 1000 * sample_rate))
+        self.wavetable = build_wavetable(style.harmonics)
+        self.bass_table = build_wavetable((1.0, 0.25)) # 부드러운 베이스 음색
+
+        chords = np.asarray(style.chords, dtype=np.float64) # (코드 수, 3)
+        # 코드별 샘플당 위상 증가량: 코드 3음 + 근음 한 옥타브 아래 베이스 → (코드 수, 4)
+        self.increments = np.concatenate([chords, chords[:, :1] / 2], axis=1) / sample_rate
+        # 근음이 가장 크게 (기존 lavfi 그래프와 동일한 1.0/0.9/0.8 비율), 베이스는 지속음
+        self.voice_gains = np.array([1.0, 0.9, 0.8], dtype=np.float32) / 3.0
+        self.bass_gain = np.float32(0.35)
+
+    @staticmethod
+    def _segments(start: int, n: int, period: float) -> Iterator[Tuple[int, int, int, int]]:
+        """블록 [start, start+n)을 주기(박자/코드) 경계로 나눔: (블록 내 위치, 길이, 주기 번호, 주기 내 오프셋)."""
+        pos = 0
+        while pos < n:
+            sample = start + pos
+            number = int(sample // period)
+            seg = max(1, min(n, int(np.ceil((number + 1) * period)) - start) - pos)
+            yield pos, seg, number, int(sample - number * period)
+            pos += seg
+
+    @staticmethod
+    def _lookup(table: np.ndarray, phase: np.ndarray) -> np.ndarray:
+        """위상 [0, 1) → 웨이브테이블 샘플 (최근접 조회)."""
+        index = phase * np.float32(WAVETABLE_SIZE)
+        return table[index.astype(np.int32)]
+
+    def _oscillators(self, start: int, n: int, phases: np.ndarray, chord_samples: float):
+        """블록 구간의 코드음 합(모노)과 베이스 생성. 코드가 바뀌는 지점에서 구간을 나눠 주파수를 상수로 유지."""
+        chord_mix = np.empty(n, dtype=np.float32)
+        bass = np.empty(n, dtype=np.float32)
+        for pos, seg, chord_number, _ in self._segments(start, n, chord_samples):
+            increments = self.increments[chord_number % len(self.style.chords)]
+            steps = np.arange(seg, dtype=np.float32)
+            # 위상 = 시작 위상 + 증가량 × 샘플 (누적합 없이 해석적으로 계산)
+            phase = steps[None, :] * increments.astype(np.float32)[:, None]
+            phase += phases.astype(np.float32)[:, None]
+            phase -= np.floor(phase) # [0, 1) 범위로 감싸기
+            chord_mix[pos:pos + seg] = self.voice_gains @ self._lookup(self.wavetable, phase[:3])
+            bass[pos:pos + seg] = self._lookup(self.bass_table, phase[3])
+            phases = (phases + increments * seg) % 1.0 # 다음 구간 시작 위상 (float64로 누적 오차 방지)
+        return chord_mix, bass, phases
+
+    def render_blocks(self, duration: float, fade_s: float = 1.0) -> Iterator[np.ndarray]:
+        """(블록, 2) float32 스테레오 블록을 순서대로 생성."""
+        style = self.style
+        sr = self.sample_rate
+        total = int(round(duration * sr))
+        beat_samples = 60.0 / style.bpm * sr # 박자 길이 (샘플)
+        chord_samples = beat_samples * style.beats_per_chord # 코드 길이 (샘플)
+        accents = np.asarray(style.rhythm, dtype=np.float32)
+        fade_len = max(1, int(fade_s * sr))
+        gain = np.float32(style.volume * 2.0)
+        feedback = np.float32(style.echo_feedback)
+        # 한 박자 엔벨로프 곡선: 짧은 어택 후 지수 감쇠
+        beat_pos = np.arange(int(np.ceil(beat_samples)) + 1, dtype=np.float32) / np.float32(beat_samples)
+        beat_shape = np.minimum(np.float32(1.0), beat_pos * 50) * np.exp(-style.decay * beat_pos)
+
+        phases = np.zeros(self.increments.shape[1], dtype=np.float64) # 오실레이터별 위상
+        echo_ring = np.zeros(self.echo_delay, dtype=np.float32) # 최근 출력 (에코 피드백용)
+        ring_pos = 0
+        haas_tail = np.zeros(self.stereo_delay, dtype=np.float32) # 오른쪽 채널 지연 버퍼
+
+        for start in range(0, total, self.block_size):
+            n = min(self.block_size, total - start)
+            chord_mix, bass, phases = self._oscillators(start, n, phases, chord_samples)
+
+            # 리듬 엔벨로프: 미리 계산한 한 박자 곡선에 박자별 강세를 곱해 구간 단위로 채움
+            envelope = np.empty(n, dtype=np.float32)
+            for pos, seg, beat_number, offset in self._segments(start, n, beat_samples):
+                envelope[pos:pos + seg] = accents[beat_number % len(accents)] * beat_shape[offset:offset + seg]
+
+            mono = chord_mix * envelope
+            mono += self.bass_gain * bass
+
+            # 피드백 에코: y[n] = x[n] + fb * y[n - D] (블록 ≤ D 이므로 링 버퍼에서 최대 두 구간으로 읽기)
+            first = min(n, self.echo_delay - ring_pos)
+            mono[:first] += feedback * echo_ring[ring_pos:ring_pos + first]
+            echo_ring[ring_pos:ring_pos + first] = mono[:first]
+            if first < n:
+                mono[first:] += feedback * echo_ring[:n - first]
+                echo_ring[:n - first] = mono[first:]
+            ring_pos = (ring_pos + n) % self.echo_delay
+
+            # 전체 페이드 인/아웃
+            if start < fade_len:
+                mono *= np.minimum(1.0, (start + np.arange(n, dtype=np.float32)) / fade_len)
+            if start + n > total - fade_len:
+                mono *= np.minimum(1.0, (total - start - np.arange(n, dtype=np.float32)) / fade_len)
+
+            mono *= gain
+            np.tanh(mono, out=mono) # 소프트 클리핑으로 피크 제한
+            mono *= np.float32(0.5)
+
+            # 하스 스테레오: 오른쪽 채널을 수 밀리초 지연
+            delayed = np.concatenate([haas_tail, mono])
+            block = np.empty((n, 2), dtype=np.float32)
+            block[:, 0] = mono
+            block[:, 1] = delayed[:n]
+            haas_tail = delayed[n:]
+            yield block
+
+    def render(self, duration: float) -> np.ndarray:
+        """전체 길이를 하나의 버퍼로 렌더링 (출력 버퍼 1회 할당)."""
+        out = np.empty((int(round(duration * self.sample_rate)), 2), dtype=np.float32)
+        pos = 0
+        for block in self.render_blocks(duration):
+            out[pos:pos + len(block)] = block
+            pos += len(block)
+        return out
+
+    def write(self, path: Union[str, Path], duration: float) -> str:
+        """블록 단위로 WAV 파일에 스트리밍 저장 (메모리 사용량 = 블록 크기)."""
+        if SOUNDFILE_AVAILABLE:
+            with sf.SoundFile(str(path), "w", samplerate=self.sample_rate, channels=2, subtype="PCM_16") as out:
+                for block in self.render_blocks(duration):
+                    out.write(block)
+        else:
+            with wave.open(str(path), "wb") as out:
+                out.setnchannels(2)
+                out.setsampwidth(2)
+                out.setframerate(self.sample_rate)
+                for block in self.render_blocks(duration):
+                    out.writeframes((np.clip(block, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+        return str(path)
+
+def render_bgm(duration: float, style_preference: Optional[str] = None, prompt: Optional[str] = None,
+               sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """스타일/프롬프트에 맞는 BGM을 (샘플, 2) float32 버퍼로 렌더링."""
+    return ProceduralBGMSynth(resolve_style(style_preference, prompt), sample_rate).render(duration)
+
+def write_bgm(path: Union[str, Path], duration: float, style_preference: Optional[str] = None,
+              prompt: Optional[str] = None, sample_rate: int = SAMPLE_RATE) -> str:
+    """스타일/프롬프트에 맞는 BGM을 WAV 파일로 스트리밍 저장하고 경로 반환."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    return ProceduralBGMSynth(resolve_style(style_preference, prompt), sample_rate).write(path, duration)
@@ -0,0 +1,257 @@
+# app/utils/image_derivatives.py - 생성 이미지 후처리: 썸네일/웹 변형(WebP, AVIF) + 지각 해시(dHash) 기반 중복 제거 저장소
+#
+# 이미지는 지각 해시로 주소가 정해지는 저장소(<root>/<phash 앞 2자리>/<phash>/)에 한 번만 저장되고,
+# 거의 같은 이미지(해밍 거리 ≤ NEAR_DUPLICATE_BITS)는 작업이 달라도 기존 항목을 재사용합니다.
+# 디코딩/리사이즈/인코딩은 CPU 작업이므로 Pillow 프로세스 풀에서 실행합니다.
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, List, Container
+
+from app.core import metrics
+
+# Pillow 임포트 (선택적): 없으면 후처리 단계를 건너뜀.
+try:
+    from PIL import Image, features
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(os.getcwd(), "generated", "image_store"))
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv("IMAGE_DERIVATIVE_WORKERS", str(min(4, os.cpu_count() or 1))))
+NEAR_DUPLICATE_BITS = 5 # 64비트 dHash 해밍 거리 임계값 (재인코딩/미세 노이즈 수준)
+DERIVATIVE_SIZES = {"thumb": 256, "preview": 768} # 변형 이름 → 긴 변 픽셀
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+_BANDS = 8 # 해시를 8비트 밴드 8개로 나눠 후보 검색 (거리 ≤ 7이면 적어도 한 밴드는 일치)
+
+def avif_supported() -> bool:
+    return PIL_AVAILABLE and bool(features.check("avif"))
+
+# ── 프로세스 풀 작업 (최상위 함수: 피클 가능) ──────────────
+def dhash(image: "Image.Image", hash_size: int = 8) -> int:
+    """차이 해시: 9x8 그레이스케일에서 인접 픽셀 밝기 비교 64비트."""
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+def fingerprint(path: str) -> Dict[str, Any]:
+    """파일 SHA-256(완전 일치) + dHash(근사 일치) + 원본 크기."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    with Image.open(path) as image:
+        image.draft("RGB", (256, 256)) # JPEG은 축소 디코딩 (PNG는 무시됨)
+        phash = dhash(image)
+        width, height = image.size
+    return {"sha256": sha.hexdigest(), "phash": f"{phash:016x}", "width": width, "height": height}
+
+def render_derivatives(path: str, out_dir: str, sizes: Dict[str, int], avif: bool) -> Dict[str, Dict[str, Any]]:
+    """원본 복사 + 크기별 WebP(+AVIF) 변형 생성. 변형 이름(예: thumb.webp) → 파일 정보."""
+    os.makedirs(out_dir, exist_ok=True)
+    variants: Dict[str, Dict[str, Any]] = {}
+    original_name = f"original{os.path.splitext(path)[1].lower() or '.png'}"
+    original_path = os.path.join(out_dir, original_name)
+    try:
+        os.link(path, original_path) # 같은 파일시스템이면 하드 링크 (씬 캐시와 원본 공유)
+    except OSError:
+        shutil.copyfile(path, original_path)
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        variants[original_name] = {"file": original_name, "width": image.width, "height": image.height,
+                                   "bytes": os.path.getsize(original_path)}
+        for name, long_edge in sizes.items():
+            resized = image.copy()
+            resized.thumbnail((long_edge, long_edge), Image.Resampling.LANCZOS) # 비율 유지, 확대하지 않음
+            encodings = [("webp", {"quality": WEBP_QUALITY, "method": 4})]
+            if avif:
+                encodings.append(("avif", {"quality": AVIF_QUALITY, "speed": 6}))
+            for fmt, options in encodings:
+                file_name = f"{name}.{fmt}"
+                tmp_path = os.path.join(out_dir, f".{file_name}.tmp")
+                try:
+                    resized.save(tmp_path, format=fmt.upper(), **options)
+                except Exception as e: # AVIF 인코더 옵션 미지원 등 → 해당 형식만 건너뜀
+                    print(f"⚠️ {file_name} 인코딩 실패: {e}")
+                    continue
+                os.replace(tmp_path, os.path.join(out_dir, file_name))
+                variants[file_name] = {"file": file_name, "width": resized.width, "height": resized.height,
+                                       "bytes": os.path.getsize(os.path.join(out_dir, file_name))}
+    return variants
+
+# ── 저장소 ──────────────────────────────────────────
+def _hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class ImageStore:
+    """지각 해시 주소 이미지 저장소: index.json(phash → 항목) + 밴드 인덱스로 근사 중복 검색."""
+
+    def __init__(self, root: str = IMAGE_STORE_DIR, workers: int = IMAGE_DERIVATIVE_WORKERS,
+                 sizes: Optional[Dict[str, int]] = None, near_bits: int = NEAR_DUPLICATE_BITS):
+        self.root = root
+        self.sizes = sizes or dict(DERIVATIVE_SIZES)
+        self.near_bits = near_bits
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(root, "index.json")
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._by_sha: Dict[str, str] = {}
+        self._bands: List[Dict[int, set]] = [dict() for _ in range(_BANDS)]
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+        except (OSError, ValueError):
+            self.entries = {}
+        for phash, entry in self.entries.items():
+            self._register(phash, entry)
+
+    def _save(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._index_path) # 원자적 교체
+
+    def _register(self, phash: str, entry: Dict[str, Any]):
+        value = int(phash, 16)
+        self._by_sha[entry["sha256"]] = phash
+        for band in range(_BANDS):
+            self._bands[band].setdefault((value >> (band * 8)) & 0xFF, set()).add(phash)
+
+    def _unregister(self, phash: str):
+        """변형 생성에 실패한 항목을 sha/밴드 인덱스에서 제거 (entries에서 빼기 전에 호출)."""
+        entry = self.entries.get(phash)
+        if entry and self._by_sha.get(entry["sha256"]) == phash:
+            del self._by_sha[entry["sha256"]]
+        value = int(phash, 16)
+        for band in range(_BANDS):
+            bucket = self._bands[band].get((value >> (band * 8)) & 0xFF)
+            if bucket is not None:
+                bucket.discard(phash)
+
+    def _usable(self, phash: str, pending: Container[str] = ()) -> bool:
+        """변형이 준비된 항목이거나 같은 묶음에서 생성 중인 항목 (다른 등록의 pending 항목은 변형이 비어 있음)."""
+        entry = self.entries.get(phash)
+        return entry is not None and (entry.get("status") == "ready" or phash in pending)
+
+    def find_similar(self, phash: str, pending: Container[str] = ()) -> Optional[str]:
+        """해밍 거리 ≤ near_bits인 기존 항목의 phash (가장 가까운 것, 준비된 항목과 pending에 있는 항목만)."""
+        value = int(phash, 16)
+        candidates = set()
+        for band in range(_BANDS):
+            candidates |= self._bands[band].get((value >> (band * 8)) & 0xFF, set())
+        candidates = {other for other in candidates if self._usable(other, pending)}
+        best = min(candidates, key=lambda other: _hamming(value, int(other, 16)), default=None)
+        if best is not None and _hamming(value, int(best, 16)) <= self.near_bits:
+            return best
+        return None
+
+    def entry_dir(self, phash: str) -> str:
+        return os.path.join(self.root, phash[:2], phash)
+
+    def variant_path(self, phash: str, variant: str) -> Optional[str]:
+        """콘텐츠 주소(phash/변형 이름)의 파일 경로. 없으면 None."""
+        entry = self.entries.get(phash)
+        if not entry or entry.get("status") != "ready" or variant not in entry["variants"]:
+            return None
+        return os.path.join(self.entry_dir(phash), entry["variants"][variant]["file"])
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: 서버의 스레드/이벤트 루프 상태를 복제하지 않음 (실행 스크립트에 if __name__ == "__main__" 가드 필요)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def ingest(self, paths: List[str], source: str = "") -> List[Dict[str, Any]]:
+        """
+        이미지들을 저장소에 등록하고 입력 순서대로 {"phash", "deduplicated", "variants", ...} 반환.
+        새 이미지는 변형을 생성하고, 완전/근사 중복은 기존 항목을 재사용합니다 (같은 묶음 안의 중복 포함).
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        started = time.perf_counter()
+        prints = await asyncio.gather(*(loop.run_in_executor(pool, fingerprint, path) for path in paths))
+
+        outcomes: List[Dict[str, Any]] = []
+        jobs: Dict[str, "asyncio.Future"] = {}
+        created: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for path, fp in zip(paths, prints):
+                match = self._by_sha.get(fp["sha256"])
+                if match is None or not self._usable(match, jobs):
+                    match = self.find_similar(fp["phash"], jobs)
+                metrics.record_cache_lookup("image_derivatives", bool(match)) # 중복 이미지는 변형을 다시 만들지 않음
+                if match:
+                    self.entries[match].setdefault("sources", []).append(source)
+                    outcomes.append({"phash": match, "deduplicated": True, "distance": _hamming(int(fp["phash"], 16), int(match, 16))})
+                    continue
+                entry = {"sha256": fp["sha256"], "width": fp["width"], "height": fp["height"], "status": "pending",
+                         "variants": {}, "sources": [source], "created_at": time.time()}
+                self.entries[fp["phash"]] = created[fp["phash"]] = entry
+                self._register(fp["phash"], entry) # 같은 묶음의 이후 이미지가 이 항목과 매칭되도록 즉시 등록
+                jobs[fp["phash"]] = loop.run_in_executor(
+                    pool, render_derivatives, path, self.entry_dir(fp["phash"]), self.sizes, avif_supported()
+                )
+                outcomes.append({"phash": fp["phash"], "deduplicated": False, "distance": 0})
+
+        rendered = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        with self._lock:
+            for phash, variants in zip(jobs.keys(), rendered):
+                entry = created[phash]
+                if isinstance(variants, Exception): # 실패 항목은 다음 요청에서 다시 생성되도록 인덱스에서도 제거
+                    print(f"⚠️ 이미지 변형 생성 실패 ({phash}): {variants}")
+                    if not self._usable(phash): # 같은 이미지를 동시에 등록한 요청이 먼저 성공했으면 그 항목 유지
+                        self._unregister(phash)
+                        self.entries.pop(phash, None)
+                    continue
+                entry.update(status="ready", variants=variants)
+                self.entries[phash] = entry # 동시 등록 요청의 실패로 제거됐어도 복원
+                self._register(phash, entry)
+            self._save()
+        print(f"🖼️ 이미지 후처리: {len(paths)}장 중 신규 {len(jobs)}장, 중복 {len(paths) - len(jobs)}장 ({time.perf_counter() - started:.2f}초)")
+        return [dict(outcome, variants=self.entries.get(outcome["phash"], {}).get("variants", {})) for outcome in outcomes]
+
+    def ingest_sync(self, paths: List[str], source: str = "") -> List[Dict[str, Any]]:
+        """동기 호출자(CLI 스크립트)용: 전용 이벤트 루프에서 등록."""
+        return asyncio.run(self.ingest(paths, source))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+_store: Optional[ImageStore] = None
+_store_lock = threading.Lock()
+
+def get_image_store() -> ImageStore:
+    """프로세스 공용 이미지 저장소 (프로세스 풀은 첫 등록 시 시작)."""
+    global _store
+    if not PIL_AVAILABLE:
+        raise RuntimeError("이미지 후처리 사용 불가: Pillow가 설치되지 않았습니다.")
+    with _store_lock:
+        if _store is None:
+            _store = ImageStore()
+        return _store
+
+def shutdown_image_store():
+    """서버 종료 시 프로세스 풀 정리 (저장소를 쓰지 않았으면 아무것도 하지 않음)."""
+    if _store is not None:
+        _store.shutdown()
@@ -0,0 +1,187 @@
+# app/utils/image_engine.py - 비동기 DALL·E 이미지 엔진 (씬 동시 요청, 커넥션 풀 공유, 청크 스트리밍 다운로드, 이미지별 지연 기록)
+#
+# 기본 응답 형식은 b64_json: 이미지 바이트가 API 응답에 포함되어 URL 다운로드 왕복이 없습니다.
+# url 형식이면 같은 커넥션 풀의 스트리밍 GET으로 임시 파일에 청크 단위로 기록한 뒤 원자적으로 교체합니다.
+
+import os
+import time
+import uuid
+import base64
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+
+from app.core import metrics # OpenAI 이미지 API 지연/오류
+
+# httpx / OpenAI 비동기 클라이언트 임포트 (선택적): openai SDK가 httpx에 의존하므로 보통 함께 설치됨.
+try:
+    import httpx
+    from openai import AsyncOpenAI
+    IMAGE_ENGINE_AVAILABLE = True
+except ImportError:
+    IMAGE_ENGINE_AVAILABLE = False
+
+IMAGE_MODEL = os.getenv("IMAGE_MODEL", "dall-e-3")
+IMAGE_RESPONSE_FORMAT = os.getenv("IMAGE_RESPONSE_FORMAT", "b64_json") # b64_json(왕복 1회) / url(스트리밍 다운로드)
+IMAGE_MAX_CONCURRENCY = int(os.getenv("IMAGE_MAX_CONCURRENCY", "4")) # 동시 생성 요청 수 (계정 분당 이미지 한도 고려)
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+class ImageEngine:
+    """
+    씬 이미지들을 동시에 생성하는 엔진. HTTP 클라이언트(커넥션 풀)는 이벤트 루프마다 하나를 만들어
+    API 호출과 이미지 다운로드가 함께 재사용합니다 (다른 루프의 클라이언트는 건드리지 않음).
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: str = IMAGE_MODEL, size: str = "1024x1024",
+                 quality: str = "standard", style: Optional[str] = "vivid",
+                 response_format: str = IMAGE_RESPONSE_FORMAT, max_concurrency: int = IMAGE_MAX_CONCURRENCY,
+                 request_timeout_s: float = 120.0, download_timeout_s: float = 60.0):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.model = model
+        self.size = size
+        self.quality = quality
+        self.style = style
+        self.response_format = response_format
+        self.max_concurrency = max(1, max_concurrency)
+        self.request_timeout_s = request_timeout_s
+        self.download_timeout_s = download_timeout_s
+        self._clients_by_loop = weakref.WeakKeyDictionary() # 이벤트 루프 → (httpx, AsyncOpenAI)
+        self.last_stats: Dict[str, Any] = {}
+
+    def _clients(self):
+        """현재 이벤트 루프용 (httpx, AsyncOpenAI) 쌍. httpx 클라이언트는 루프에 묶이므로 루프마다 따로 생성."""
+        loop = asyncio.get_running_loop()
+        clients = self._clients_by_loop.get(loop)
+        if clients is None or clients[0].is_closed:
+            http = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.request_timeout_s, connect=10.0),
+                limits=httpx.Limits(max_connections=self.max_concurrency * 2, max_keepalive_connections=self.max_concurrency),
+                follow_redirects=True
+            )
+            clients = (http, AsyncOpenAI(api_key=self.api_key, http_client=http, max_retries=2))
+            self._clients_by_loop[loop] = clients
+        return clients
+
+    async def aclose(self):
+        """현재 이벤트 루프의 커넥션 풀 닫기."""
+        clients = self._clients_by_loop.pop(asyncio.get_running_loop(), None)
+        if clients is not None and not clients[0].is_closed:
+            await clients[0].aclose()
+
+    async def _download(self, url: str, path: str) -> int:
+        """스트리밍 다운로드 (청크 단위 기록, 전체 이미지를 메모리에 올리지 않음). 기록한 바이트 수 반환."""
+        http, _ = self._clients()
+        tmp_path = f"{path}.part"
+        written = 0
+        try:
+            async with http.stream("GET", url, timeout=self.download_timeout_s) as response:
+                response.raise_for_status()
+                with open(tmp_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                        f.write(chunk)
+                        written += len(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return written
+
+    @staticmethod
+    def _write_b64(data: str, path: str) -> int:
+        raw = base64.b64decode(data)
+        tmp_path = f"{path}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
+        return len(raw)
+
+    async def generate_one(self, prompt: str, output_path: str, name: str = "") -> Dict[str, Any]:
+        """이미지 한 장 생성 후 output_path에 저장. 결과에 단계별 지연(API/다운로드)과 바이트 수 기록."""
+        _, client = self._clients()
+        params = {"model": self.model, "prompt": prompt, "n": 1, "size": self.size, "quality": self.quality}
+        if self.style and self.model == "dall-e-3":
+            params["style"] = self.style
+        if self.response_format:
+            params["response_format"] = self.response_format
+        started = time.perf_counter()
+        with metrics.openai_request("images"):
+            response = await client.images.generate(**params)
+        api_s = time.perf_counter() - started
+        item = response.data[0]
+        if getattr(item, "b64_json", None):
+            size_bytes = await asyncio.to_thread(self._write_b64, item.b64_json, output_path)
+        else:
+            size_bytes = await self._download(item.url, output_path)
+        total_s = time.perf_counter() - started
+        return {
+            "scene": name,
+            "file": output_path,
+            "url": getattr(item, "url", None),
+            "revised_prompt": getattr(item, "revised_prompt", None),
+            "latency": {"api_s": round(api_s, 3), "download_s": round(total_s - api_s, 3),
+                        "total_s": round(total_s, 3), "bytes": size_bytes}
+        }
+
+    async def generate_many(self, items: List[Dict[str, Any]], output_dir: str) -> List[Dict[str, Any]]:
+        """
+        items: [{"name", "prompt", "filename"(선택)}] 순서대로의 결과 목록.
+        동시 요청 수는 max_concurrency로 제한하며, 한 장이 실패해도 나머지는 계속 (실패 항목은 file=None, error 기록).
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(item: Dict[str, Any]) -> Dict[str, Any]:
+            path = os.path.join(output_dir, item.get("filename") or f"{uuid.uuid4().hex}.png")
+            async with semaphore:
+                try:
+                    return await self.generate_one(item["prompt"], path, item.get("name", ""))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"❌ 이미지 생성 실패 ('{item.get('name', '')}'): {e}")
+                    return {"scene": item.get("name", ""), "file": None, "url": None, "error": str(e)}
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(run(item) for item in items))
+        wall_s = time.perf_counter() - started
+        latencies = [r["latency"]["total_s"] for r in results if r.get("latency")]
+        self.last_stats = {
+            "images": len(items),
+            "failed": sum(1 for r in results if not r.get("file")),
+            "wall_s": round(wall_s, 3),
+            "serial_s": round(sum(latencies), 3), # 순차 실행했다면 걸렸을 시간
+            "max_latency_s": max(latencies) if latencies else None,
+            "response_format": self.response_format,
+            "concurrency": self.max_concurrency
+        }
+        print(f"🖼️ 이미지 {len(items)}장 생성: {wall_s:.1f}초 (순차 합계 {self.last_stats['serial_s']:.1f}초, 실패 {self.last_stats['failed']}장)")
+        return list(results)
+
+    def generate_many_sync(self, items: List[Dict[str, Any]], output_dir: str) -> List[Dict[str, Any]]:
+        """
+        동기 호출자(에이전트, CLI 스크립트)용: 전용 이벤트 루프에서 실행하고 그 루프의 커넥션 풀을 닫음.
+        이미 이벤트 루프가 도는 스레드에서 호출되면 asyncio.run을 쓸 수 없으므로 작업 스레드에서 실행 (비동기 호출자는 generate_many를 await).
+        """
+        async def run():
+            try:
+                return await self.generate_many(items, output_dir)
+            finally:
+                await self.aclose()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError: # 실행 중인 루프 없음
+            return asyncio.run(run())
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-engine") as executor:
+            return executor.submit(asyncio.run, run()).result()
+
+_engine: Optional[ImageEngine] = None
+
+def get_image_engine() -> ImageEngine:
+    """프로세스 공용 이미지 엔진 (서버 이벤트 루프에서 커넥션 풀을 계속 재사용)."""
+    global _engine
+    if not IMAGE_ENGINE_AVAILABLE:
+        raise RuntimeError("이미지 엔진 사용 불가: openai/httpx가 설치되지 않았습니다.")
+    if _engine is None:
+        _engine = ImageEngine()
+    return _engine
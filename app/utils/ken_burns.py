@@ -0,0 +1,61 @@
+# app/utils/ken_burns.py - 스틸 이미지 Ken Burns 모션 (FFmpeg zoompan 필터 체인 생성, CPU 전용)
+#
+# GPU가 없는 노드에서 DALL·E 스틸을 씬 클립 대신 사용할 때, 이미지 한 장(단일 프레임 입력)을
+# zoompan으로 씬 길이만큼의 프레임으로 펼칩니다. 이미지 반복 디코딩(-loop 1)이 없고 모든 씬이 한 번의 인코딩에 들어갑니다.
+
+from dataclasses import dataclass
+from typing import List
+
+DEFAULT_FPS = 24.0 # 스틸 모션 출력 프레임레이트 (CogVideoX의 8fps로는 줌/팬이 끊겨 보임)
+MOTIONS = ("zoom_in", "pan_right", "zoom_out", "pan_left", "pan_up") # 씬 순서대로 순환 (연속 씬이 같은 움직임이 되지 않도록)
+
+@dataclass(frozen=True)
+class MotionSettings:
+    max_zoom: float = 1.15 # 최대 확대 배율 (팬 모션은 이 배율로 고정하고 이동)
+    oversample: float = 1.5 # zoompan 입력 해상도 배율 (정수 픽셀 반올림에 의한 떨림 완화, 높을수록 느림)
+    ease: bool = True # smoothstep 가감속
+
+DEFAULT_MOTION = MotionSettings()
+
+def motion_for(index: int) -> str:
+    """씬 번호별 기본 모션."""
+    return MOTIONS[index % len(MOTIONS)]
+
+def _even(value: float) -> int:
+    return max(2, int(round(value / 2)) * 2) # yuv420p는 짝수 크기 필요
+
+def motion_filter(motion: str, duration_s: float, fps: float, width: int, height: int,
+                  settings: MotionSettings = DEFAULT_MOTION) -> str:
+    """
+    단일 프레임 이미지 입력을 duration_s 길이의 width x height 영상으로 만드는 필터 체인.
+    출력 화면비로 먼저 잘라 내고(cover), oversample 배율 해상도에서 zoompan을 적용합니다.
+    """
+    if motion not in MOTIONS:
+        raise ValueError(f"지원하지 않는 모션: {motion} (지원: {', '.join(MOTIONS)})")
+    frames = max(1, int(round(duration_s * fps)))
+    source_w, source_h = _even(width * settings.oversample), _even(height * settings.oversample)
+    t = f"(on/{max(1, frames - 1)})" # 0 → 1 진행도 (on = 출력 프레임 번호)
+    progress = f"({t}*{t}*(3-2*{t}))" if settings.ease else t
+    zoom_range = round(settings.max_zoom - 1.0, 4)
+    center_x, center_y = "iw/2-(iw/zoom/2)", "ih/2-(ih/zoom/2)"
+
+    if motion == "zoom_in":
+        zoom, x, y = f"1+{zoom_range}*{progress}", center_x, center_y
+    elif motion == "zoom_out":
+        zoom, x, y = f"{settings.max_zoom}-{zoom_range}*{progress}", center_x, center_y
+    elif motion == "pan_right":
+        zoom, x, y = f"{settings.max_zoom}", f"(iw-iw/zoom)*{progress}", center_y
+    elif motion == "pan_left":
+        zoom, x, y = f"{settings.max_zoom}", f"(iw-iw/zoom)*(1-{progress})", center_y
+    else: # pan_up
+        zoom, x, y = f"{settings.max_zoom}", center_x, f"(ih-ih/zoom)*(1-{progress})"
+
+    return (
+        f"scale={source_w}:{source_h}:force_original_aspect_ratio=increase,crop={source_w}:{source_h},"
+        f"zoompan=z='{zoom}':x='{x}':y='{y}':d={frames}:s={width}x{height}:fps={fps},"
+        "setsar=1,format=yuv420p"
+    )
+
+def still_input_args(image_path: str) -> List[str]:
+    """스틸 입력 인자: 단일 프레임으로 읽음 (프레임 수는 zoompan의 d가 결정)."""
+    return ["-i", image_path]
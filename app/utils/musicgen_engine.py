@@ -0,0 +1,130 @@
+# app/utils/musicgen_engine.py - 프로세스 상주 MusicGen 엔진 (섹션 배치 생성, CPU 동적 양자화, 텍스트 인코더 출력 재사용)
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Sequence, Tuple
+
+import numpy as np
+
+# PyTorch / Transformers 임포트 (선택적): 없으면 엔진 사용 불가.
+try:
+    import torch
+    from transformers import AutoProcessor, MusicgenForConditionalGeneration
+    from transformers.modeling_outputs import BaseModelOutput
+    MUSICGEN_AVAILABLE = True
+except ImportError:
+    MUSICGEN_AVAILABLE = False
+
+MUSICGEN_MODEL_ID = os.getenv("MUSICGEN_MODEL_ID", "facebook/musicgen-small")
+# 동적 int8 양자화 (CPU 전용, GPU에서는 항상 건너뜀): auto / 1: CPU에서만 int8 동적 양자화 / 0: 사용 안 함
+MUSICGEN_QUANTIZE = os.getenv("MUSICGEN_QUANTIZE", "auto").lower()
+ENCODER_CACHE_SIZE = 16 # 프롬프트 묶음별 텍스트 인코더 출력 캐시 개수
+
+class MusicGenEngine:
+    """
+    프로세스 전체가 공유하는 MusicGen 모델.
+    여러 섹션 프롬프트를 한 번의 generate 호출로 배치 생성하고, 같은 프롬프트 묶음의 T5 인코더 출력은 재사용합니다.
+    """
+
+    def __init__(self, model_id: str = MUSICGEN_MODEL_ID, device: Optional[str] = None, quantize: str = MUSICGEN_QUANTIZE):
+        self.model_id = model_id
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.quantize = quantize
+        self.quantized = False
+        self.processor = None
+        self.model = None
+        self._encoder_cache: "OrderedDict[Tuple[str, ...], Dict[str, Any]]" = OrderedDict()
+        self._generate_lock = threading.Lock() # 모델 하나를 여러 스레드가 공유하므로 generate 직렬화
+        self.last_stats: Dict[str, Any] = {}
+
+    def load(self):
+        """모델/프로세서 로드 (CPU에서는 Linear 레이어 동적 int8 양자화 선택)."""
+        started = time.perf_counter()
+        self.processor = AutoProcessor.from_pretrained(self.model_id)
+        model = MusicgenForConditionalGeneration.from_pretrained(self.model_id)
+        model.eval()
+        if self.device == "cpu" and self.quantize in ("auto", "1", "true"):
+            try:
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                self.quantized = True
+            except Exception as e: # 양자화 백엔드 미지원 플랫폼 → fp32 유지
+                print(f"⚠️ MusicGen 동적 양자화 실패, fp32로 실행: {e}")
+        self.model = model.to(self.device)
+        print(f"✅ MusicGen 로딩 완료! (디바이스: {self.device}, int8: {self.quantized}, {time.perf_counter() - started:.1f}초)")
+        return self
+
+    @property
+    def sample_rate(self) -> int:
+        return self.model.config.audio_encoder.sampling_rate
+
+    @property
+    def frame_rate(self) -> int:
+        return self.model.config.audio_encoder.frame_rate # 초당 오디오 토큰 수
+
+    def _encode(self, prompts: Tuple[str, ...]) -> Dict[str, Any]:
+        """프롬프트 묶음의 텍스트 인코더 출력 (캐시). generate 내부와 같은 방식으로 CFG용 무조건부 절반을 덧붙임."""
+        cached = self._encoder_cache.get(prompts)
+        if cached is not None:
+            self._encoder_cache.move_to_end(prompts)
+            return cached
+        inputs = self.processor(text=list(prompts), padding=True, return_tensors="pt").to(self.device)
+        with torch.inference_mode():
+            hidden = self.model.text_encoder(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).last_hidden_state
+        attention_mask = inputs["attention_mask"]
+        if (self.model.generation_config.guidance_scale or 1.0) > 1.0:
+            hidden = torch.cat([hidden, torch.zeros_like(hidden)], dim=0)
+            attention_mask = torch.cat([attention_mask, torch.zeros_like(attention_mask)], dim=0)
+        encoded = {
+            "input_ids": inputs["input_ids"], # 배치 크기 결정용 (인코더는 다시 실행되지 않음)
+            "attention_mask": attention_mask,
+            "encoder_outputs": BaseModelOutput(last_hidden_state=hidden)
+        }
+        self._encoder_cache[prompts] = encoded
+        while len(self._encoder_cache) > ENCODER_CACHE_SIZE:
+            self._encoder_cache.popitem(last=False)
+        return encoded
+
+    def generate_sections(self, prompts: Sequence[str], durations: Sequence[float]) -> List[np.ndarray]:
+        """섹션 프롬프트들을 한 번의 generate 호출로 생성하고 섹션별 길이로 잘라 모노 float32 배열 목록 반환."""
+        prompts = tuple(prompts)
+        max_new_tokens = int(np.ceil(max(durations) * self.frame_rate))
+        started = time.perf_counter()
+        with self._generate_lock:
+            encoder_reused = prompts in self._encoder_cache
+            try:
+                model_inputs = self._encode(prompts)
+                with torch.inference_mode():
+                    audio_values = self.model.generate(**model_inputs, do_sample=True, max_new_tokens=max_new_tokens)
+            except Exception as e: # transformers 버전 차이 등으로 encoder_outputs 거부 → 캐시 항목 제거 후 generate가 직접 인코딩 (1회 재시도)
+                print(f"⚠️ 인코더 출력 재사용 불가, 기본 경로로 재시도: {e}")
+                self._encoder_cache.pop(prompts, None)
+                encoder_reused = False
+                model_inputs = dict(self.processor(text=list(prompts), padding=True, return_tensors="pt").to(self.device))
+                with torch.inference_mode():
+                    audio_values = self.model.generate(**model_inputs, do_sample=True, max_new_tokens=max_new_tokens)
+        audio = audio_values[:, 0].float().cpu().numpy() # (섹션, 샘플)
+        self.last_stats = {
+            "sections": len(prompts),
+            "max_new_tokens": max_new_tokens,
+            "encoder_reused": encoder_reused,
+            "generate_s": round(time.perf_counter() - started, 2),
+            "quantized": self.quantized,
+            "device": self.device
+        }
+        return [audio[i, :int(round(duration * self.sample_rate))] for i, duration in enumerate(durations)]
+
+_engine: Optional[MusicGenEngine] = None
+_engine_lock = threading.Lock()
+
+def get_musicgen_engine() -> MusicGenEngine:
+    """프로세스 공용 MusicGen 엔진 (최초 호출 시 한 번만 로드)."""
+    global _engine
+    if not MUSICGEN_AVAILABLE:
+        raise RuntimeError("MusicGen 사용 불가: torch/transformers가 설치되지 않았습니다.")
+    with _engine_lock:
+        if _engine is None:
+            print("🎵 MusicGen 모델 로딩 중...")
+            _engine = MusicGenEngine().load()
+        return _engine
@@ -0,0 +1,95 @@
+# app/utils/streaming.py - 적응형 스트리밍 패키징 (HLS/DASH): 최종 합성 필터 그래프에서 분기해 CMAF 렌디션 생성
+#
+# 최종 MP4 인코딩과 같은 FFmpeg 실행 안에서 [video_out]/[audio_mix]를 split/asplit으로 나눠
+# 해상도별 렌디션을 추가 인코딩합니다 (디코딩/필터 그래프 한 번). dash 먹서가 fMP4(CMAF) 세그먼트를 쓰고
+# hls_playlist 옵션으로 같은 세그먼트를 가리키는 HLS 플레이리스트도 만들므로 HLS와 DASH가 세그먼트를 공유합니다.
+
+import os
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple
+
+STREAM_FORMATS = ("hls", "dash")
+MANIFESTS = {"hls": "master.m3u8", "dash": "manifest.mpd"} # 형식 → 매니페스트 파일명
+MEDIA_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".mpd": "application/dash+xml",
+    ".m4s": "video/iso.segment"
+}
+
+@dataclass(frozen=True)
+class Rendition:
+    name: str
+    height: int
+    video_kbps: int
+
+LADDER = ( # 낮은 화질부터 (원본보다 큰 렌디션은 만들지 않음)
+    Rendition("240p", 240, 300),
+    Rendition("360p", 360, 700),
+    Rendition("480p", 480, 1200),
+    Rendition("720p", 720, 2500),
+    Rendition("1080p", 1080, 4500)
+)
+
+@dataclass(frozen=True)
+class PackagingSettings:
+    formats: Tuple[str, ...] = ("hls",)
+    segment_s: float = 2.0 # 세그먼트 길이 (첫 세그먼트만 받으면 재생 시작)
+    max_renditions: int = 3 # 원본 이하 해상도 중 상위 N개
+    audio_kbps: int = 128
+    preset: str = "veryfast" # 렌디션 인코딩 프리셋 (최종 MP4는 medium 유지)
+
+@dataclass
+class PackagingPlan:
+    filter: str # 합성 그래프 뒤에 이어 붙일 split/scale 필터
+    main_video: str # 최종 MP4가 매핑할 레이블
+    main_audio: str
+    output_args: List[str] # 패키징 출력 인자 (최종 MP4 출력 뒤에 추가)
+    renditions: List[Rendition] = field(default_factory=list)
+    manifests: Dict[str, str] = field(default_factory=dict) # 형식 → 매니페스트 파일명
+
+def select_renditions(source_height: int, settings: PackagingSettings = PackagingSettings()) -> List[Rendition]:
+    """원본 높이 이하의 렌디션 중 상위 max_renditions개 (원본이 가장 작은 단계보다 작으면 원본 높이 하나)."""
+    fitting = [r for r in LADDER if r.height <= source_height]
+    if not fitting:
+        return [Rendition(f"{source_height}p", source_height, LADDER[0].video_kbps)]
+    return fitting[-max(1, settings.max_renditions):]
+
+def plan_packaging(video_label: str, audio_label: str, height: int, fps: float, duration_s: float,
+                   output_dir: str, settings: PackagingSettings = PackagingSettings()) -> PackagingPlan:
+    """최종 합성 그래프의 영상/오디오 출력을 MP4 + 스트리밍 렌디션으로 나누는 필터와 출력 인자."""
+    formats = [f for f in settings.formats if f in STREAM_FORMATS]
+    if not formats:
+        raise ValueError(f"지원하지 않는 스트리밍 형식: {settings.formats} (지원: {', '.join(STREAM_FORMATS)})")
+    renditions = select_renditions(height, settings)
+    count = len(renditions)
+    split_labels = "".join(f"[v_split{i}]" for i in range(count))
+    filters = [
+        f"[{video_label}]split={count + 1}[v_main]{split_labels}",
+        f"[{audio_label}]asplit=2[a_main][a_stream]"
+    ]
+    for i, rendition in enumerate(renditions):
+        scale = "null" if rendition.height == height else f"scale=-2:{rendition.height}"
+        filters.append(f"[v_split{i}]{scale},setsar=1,format=yuv420p[v_stream{i}]")
+
+    gop = max(1, int(round(fps * settings.segment_s))) # 세그먼트마다 키프레임 (세그먼트 경계 = GOP 경계)
+    args: List[str] = []
+    for i in range(count):
+        args += ["-map", f"[v_stream{i}]"]
+    args += ["-map", "[a_stream]", "-c:v", "libx264", "-preset", settings.preset, "-profile:v", "main"]
+    for i, rendition in enumerate(renditions): # VBV 제한: 대역폭 추정이 렌디션 선택에 맞도록
+        args += [f"-b:v:{i}", f"{rendition.video_kbps}k", f"-maxrate:v:{i}", f"{int(rendition.video_kbps * 1.1)}k",
+                 f"-bufsize:v:{i}", f"{rendition.video_kbps * 2}k"]
+    args += [
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        "-c:a", "aac", "-b:a", f"{settings.audio_kbps}k",
+        "-t", str(duration_s),
+        "-f", "dash", "-seg_duration", str(settings.segment_s), "-use_template", "1", "-use_timeline", "1",
+        "-adaptation_sets", "id=0,streams=v id=1,streams=a",
+        "-init_seg_name", "init_$RepresentationID$.m4s", "-media_seg_name", "chunk_$RepresentationID$_$Number%05d$.m4s",
+        "-hls_playlist", "1" if "hls" in formats else "0", "-hls_master_name", MANIFESTS["hls"],
+        os.path.join(output_dir, MANIFESTS["dash"])
+    ]
+    return PackagingPlan(
+        filter=";".join(filters), main_video="[v_main]", main_audio="[a_main]", output_args=args,
+        renditions=renditions, manifests={f: MANIFESTS[f] for f in formats}
+    )
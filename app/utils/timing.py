@@ -0,0 +1,126 @@
+# app/utils/timing.py - 나레이션/영상 길이 정렬 엔진 (실측 길이 기반 atempo, 리드인 배치, 영상 리타이밍/패딩 계획)
+#
+# 계획은 최종 합성 FFmpeg 필터 그래프에 그대로 삽입되므로 길이 보정을 위한 추가 인코딩이 없습니다.
+
+import re
+import subprocess
+import importlib.util
+from dataclasses import dataclass, asdict, field
+from typing import Optional, Dict, Any, List
+
+# SoundFile (선택적): WAV/FLAC/MP3(libsndfile 1.1+) 헤더로 길이 측정. numpy/libsndfile 로드를 피하려고 첫 측정 때 임포트
+SOUNDFILE_AVAILABLE = importlib.util.find_spec("soundfile") is not None
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+def probe_duration(path: str, timeout: float = 30) -> Optional[float]:
+    """미디어 길이(초) 측정: soundfile 헤더 → FFmpeg 컨테이너 헤더 순. 실패 시 None."""
+    if SOUNDFILE_AVAILABLE:
+        try:
+            import soundfile as sf # libsndfile 로드 실패(OSError)도 FFmpeg로 대체
+            info = sf.info(path)
+            if info.frames > 0:
+                return info.frames / info.samplerate
+        except Exception: # 미지원 포맷(mp4 등) → FFmpeg
+            pass
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True, timeout=timeout)
+    except (subprocess.SubprocessError, OSError):
+        return None
+    match = _DURATION_RE.search(result.stderr) # 출력 파일 없이 실행하면 헤더만 출력하고 종료 코드 1
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+@dataclass(frozen=True)
+class TimingLimits:
+    """정렬 한계값."""
+    lead_in_s: float = 0.3 # 나레이션 시작 전 여백
+    tail_s: float = 0.7 # 나레이션 종료 후 여백 (BGM 페이드아웃 구간)
+    max_tempo: float = 1.15 # 자연스럽게 들리는 최대 가속
+    hard_max_tempo: float = 1.25 # 여백을 모두 써도 넘칠 때 허용하는 최대 가속
+    min_tempo: float = 0.95 # 구간보다 약간 짧은 나레이션의 최대 감속 (이 배율로도 못 채우면 감속 없이 BGM으로 채움)
+    max_video_retime: float = 1.5 # 짧은 영상의 최대 슬로모션 배율 (초과분은 마지막 프레임 유지)
+
+DEFAULT_LIMITS = TimingLimits()
+
+@dataclass
+class AlignmentPlan:
+    """나레이션/영상을 목표 길이에 맞추는 계획."""
+    target_s: float
+    narration_s: float
+    video_s: Optional[float]
+    tempo: float = 1.0 # 나레이션 atempo 배율 (>1 가속)
+    voice_delay_s: float = 0.0 # 나레이션 시작 지연
+    truncated_s: float = 0.0 # 한계를 넘어 잘리는 나레이션 길이
+    video_retime: float = 1.0 # setpts 배율 (>1 슬로모션)
+    video_pad_s: float = 0.0 # 마지막 프레임 유지 길이
+    notes: List[str] = field(default_factory=list)
+
+    @property
+    def fitted_narration_s(self) -> float:
+        return self.narration_s / self.tempo
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["fitted_narration_s"] = round(self.fitted_narration_s, 3)
+        return data
+
+def plan_alignment(target_s: float, narration_s: float, video_s: Optional[float] = None,
+                   limits: TimingLimits = DEFAULT_LIMITS) -> AlignmentPlan:
+    """실측 나레이션/영상 길이로 정렬 계획 수립."""
+    plan = AlignmentPlan(target_s=target_s, narration_s=narration_s, video_s=video_s)
+    available = max(0.1, target_s - limits.lead_in_s - limits.tail_s)
+
+    if narration_s > available: # 길면 가속 → 부족하면 여백 사용 → 그래도 넘치면 잘림
+        plan.tempo = min(limits.max_tempo, narration_s / available)
+        plan.voice_delay_s = limits.lead_in_s
+        if narration_s / plan.tempo > available + 1e-6:
+            plan.tempo = max(plan.tempo, min(limits.hard_max_tempo, narration_s / target_s))
+            plan.voice_delay_s = max(0.0, min(limits.lead_in_s, target_s - narration_s / plan.tempo))
+            plan.notes.append("여백 축소")
+        overflow = plan.voice_delay_s + narration_s / plan.tempo - target_s
+        if overflow > 0:
+            plan.truncated_s = round(overflow * plan.tempo, 3)
+            plan.notes.append(f"나레이션 {plan.truncated_s:.2f}초 잘림")
+    else: # 구간에 거의 맞으면 약간 감속해 채우고, 그보다 짧으면 원래 속도로 리드인 뒤에 배치 (남는 구간은 BGM)
+        ratio = narration_s / available
+        plan.tempo = ratio if ratio >= limits.min_tempo else 1.0
+        plan.voice_delay_s = limits.lead_in_s
+
+    plan.video_retime, plan.video_pad_s = fit_video(target_s, video_s, limits)
+    if plan.video_pad_s > 0:
+        plan.notes.append(f"마지막 프레임 {plan.video_pad_s:.1f}초 유지")
+    plan.tempo = round(plan.tempo, 4)
+    return plan
+
+def fit_video(target_s: float, video_s: Optional[float], limits: TimingLimits = DEFAULT_LIMITS):
+    """짧은 영상을 목표 길이로: (setpts 배율, 마지막 프레임 유지 길이). 슬로모션 우선, 초과분은 패딩."""
+    if not video_s or video_s >= target_s - 0.05:
+        return 1.0, 0.0
+    retime = round(min(limits.max_video_retime, target_s / video_s), 4)
+    return retime, max(0.0, target_s - video_s * retime)
+
+def voice_filter(plan: AlignmentPlan) -> str:
+    """나레이션 필터 체인 (atempo + 지연). 변경이 없으면 빈 문자열."""
+    filters = []
+    if abs(plan.tempo - 1.0) > 1e-3:
+        filters.append(f"atempo={plan.tempo}") # 0.5~2.0 범위: 한계값 내에서 단일 atempo로 충분
+    if plan.voice_delay_s > 0:
+        filters.append(f"adelay={int(plan.voice_delay_s * 1000)}:all=1")
+    return ",".join(filters)
+
+def video_filter(plan: AlignmentPlan, video_input: int = 0, fps: Optional[float] = None,
+                 output_label: str = "video_out") -> Optional[str]:
+    """영상 리타이밍/패딩 filter_complex 구간. 변경이 없으면 None (원본 스트림 매핑)."""
+    filters = []
+    if abs(plan.video_retime - 1.0) > 1e-3:
+        filters.append(f"setpts={plan.video_retime}*PTS")
+        if fps:
+            filters.append(f"fps={fps}") # 리타이밍 후 원래 프레임레이트 유지 (프레임 복제)
+    if plan.video_pad_s > 0:
+        filters.append(f"tpad=stop_mode=clone:stop_duration={plan.video_pad_s:.3f}")
+    if not filters:
+        return None
+    return f"[{video_input}:v]{','.join(filters)}[{output_label}]"
@@ -0,0 +1,79 @@
+# benchmarks/_common.py - 벤치마크 스크립트 공용: 결과 JSON 저장, 이전 결과와 비교(회귀 시 종료 코드 1), 실행 환경 정보
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, Any, List, Optional, Callable
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """선형 보간 백분위수 (q: 0~100, numpy 기본 방식)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def add_report_arguments(parser: argparse.ArgumentParser, threshold: float, min_delta: float, min_delta_help: str):
+    """--json / --compare / --threshold / --min-delta 인자 추가."""
+    parser.add_argument("--json", dest="json_path", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON (회귀 시 종료 코드 1)")
+    parser.add_argument("--threshold", type=float, default=threshold, help=f"회귀 판정 비율 (기본 {threshold:.0%}%)")
+    parser.add_argument("--min-delta", type=float, default=min_delta, help=min_delta_help)
+
+def print_compare_header(old: Dict[str, Any], new: Dict[str, Any], threshold: float):
+    """비교 대상 커밋과, 실행 설정/플랫폼이 다르면 경고 출력."""
+    print(f"\n📈 비교: {(old.get('git_commit') or '?')[:10]} → {(new.get('git_commit') or '?')[:10]} (임계값 {threshold:.0%})")
+    old_config, new_config = old.get("config", {}), new.get("config", {})
+    changed = sorted(k for k in set(old_config) | set(new_config) if old_config.get(k) != new_config.get(k))
+    if old.get("platform") and new.get("platform") and old["platform"] != new["platform"]:
+        changed.append("platform")
+    if changed:
+        print(f"⚠️ 실행 설정이 다릅니다 ({', '.join(changed)}): 비교가 정확하지 않을 수 있습니다.")
+
+def compare_values(old: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]], key: str, threshold: float,
+                   min_delta: float, title: str, unit: str, precision: int = 2, width: int = 28) -> List[str]:
+    """이름별 값(작을수록 좋음) 비교 표 출력. 회귀 목록 반환 (작은 절대 차이는 잡음으로 무시)."""
+    regressions: List[str] = []
+    print(f"{title:<{width}}{'이전(' + unit + ')':>12}{'현재(' + unit + ')':>12}{'변화':>9}")
+    for name, item in new.items():
+        before = old.get(name)
+        if not before:
+            print(f"{name:<{width}}{'-':>12}{item[key]:>12.{precision}f}{'new':>9}")
+            continue
+        change = (item[key] - before[key]) / before[key] if before[key] else 0.0
+        flag = ""
+        if change > threshold and item[key] - before[key] > min_delta:
+            regressions.append(f"{name} {before[key]:.{precision}f}{unit} → {item[key]:.{precision}f}{unit}")
+            flag = " ⚠️"
+        print(f"{name:<{width}}{before[key]:>12.{precision}f}{item[key]:>12.{precision}f}{change:>+8.0%}{flag}")
+    for name in sorted(set(old) - set(new)):
+        print(f"{name:<{width}}{old[name][key]:>12.{precision}f}{'-':>12}{'없음':>9}")
+    return regressions
+
+def finish_report(args: argparse.Namespace, report: Dict[str, Any],
+                  compare: Callable[[Dict[str, Any], Dict[str, Any], float, float], List[str]]):
+    """--json이면 결과 저장, --compare면 이전 결과와 비교해 회귀 시 종료 코드 1."""
+    if args.json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_path)), exist_ok=True)
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_path}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold, args.min_delta)
+        if regressions:
+            print("❌ 성능 회귀: " + "; ".join(regressions))
+            sys.exit(1)
+        print("✅ 회귀 없음")
@@ -0,0 +1,196 @@
+# benchmarks/cpu_hot_paths.py - 요청마다 실행되는 CPU 경로 마이크로벤치마크 (기준 JSON 비교로 회귀 감지)
+#
+# 사용법:
+#   python benchmarks/cpu_hot_paths.py                                      # 전체 케이스
+#   python benchmarks/cpu_hot_paths.py --only prompt,frames --rounds 20
+#   python benchmarks/cpu_hot_paths.py --json generated/bench/cpu_base.json # 기준 저장
+#   python benchmarks/cpu_hot_paths.py --compare generated/bench/cpu_base.json --threshold 0.2
+#
+# 케이스:
+#   prompt.optimize     - main.optimize_zeroscope_prompt_enhanced (프리셋 브랜드 5개 + 범용 브랜드, 씬 3개 분량)
+#   prompt.validate     - main.validate_brand_prompt (강화 필요/불필요 프롬프트 혼합)
+#   similarity.text     - AudioQualityValidator._calculate_text_similarity (30초 한국어 나레이션 vs STT 흉내 변형문)
+#   audio.analysis      - AudioQualityValidator._analyze_audio_quality (30초 24kHz 음성형 WAV, librosa 필요)
+#   bgm.synth           - bgm_synth.render_bgm 30초 (기존 _generate_music_with_basic_audio를 대체한 절차적 신디사이저)
+#   frames.to_uint8     - CogVideoX_2b_utils.frames_to_uint8 (240프레임 float32 [0, 1] → uint8, 대체 저장 경로)
+# 선택 의존성(faster-whisper, librosa)이 없으면 해당 케이스는 건너뛰고 JSON의 skipped에 이유를 남깁니다.
+# 각 케이스는 한 라운드가 --min-round 초 이상이 되도록 호출 횟수를 맞추고, 라운드별 호출당 시간의 최솟값을 비교합니다
+# (timeit과 같은 기준: 다른 프로세스 간섭은 시간을 늘리기만 하므로 최솟값이 가장 안정적).
+# --compare는 최솟값이 --threshold 이상 느려진 케이스가 있으면 종료 코드 1을 반환합니다.
+
+import os
+import sys
+import time
+import wave
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Tuple
+
+import numpy as np
+
+from _common import PROJECT_ROOT, git_commit, add_report_arguments, print_compare_header, compare_values, finish_report
+
+sys.path.insert(0, PROJECT_ROOT)
+
+# 30초 분량 광고 나레이션 (씬 3개, TTS 기준 초당 약 7~8음절)
+NARRATION_KO = (
+    "매일 아침, 출근길은 언제나 바쁘게 시작됩니다. 알람을 끄고, 커피를 챙기고, 지하철에 몸을 싣는 순간까지 "
+    "우리는 단 1분도 허투루 쓰지 않죠. 그래서 준비했습니다. 한 번 충전으로 이틀을 버티는 배터리, "
+    "손끝 하나로 열리는 잠금 해제, 그리고 어떤 조명에서도 선명한 카메라까지. "
+    "바쁜 당신의 하루가 조금 더 가벼워지도록, 새로운 갤럭시와 함께 오늘을 시작하세요. "
+    "지금 가까운 매장에서 직접 만나보세요. 삼성, 당신의 내일을 먼저 생각합니다."
+)
+# STT 흉내: 문장부호 누락, 띄어쓰기/동음 오인식, 숫자 표기 차이
+TRANSCRIPT_KO = (
+    "매일 아침 출근길은 언제나 바쁘게 시작됩니다 알람을 끄고 커피를 챙기고 지하철에 몸을 싣는 순간까지 "
+    "우리는 단 일 분도 허투루 쓰지 않죠 그래서 준비했습니다 한번 충전으로 이틀을 버티는 배터리 "
+    "손끝 하나로 열리는 잠금해제 그리고 어떤 조명에서도 선명한 카메라까지 "
+    "바쁜 당신의 하루가 조금 더 가벼워 지도록 새로운 갤럭시와 함께 오늘을 시작하세요 "
+    "지금 가까운 매장에서 직접 만나 보세요 삼성 당신의 내일을 먼저 생각합니다"
+)
+SCENE_VISUALS = (
+    "busy morning commute, person checking smartphone on subway platform, soft sunrise light",
+    "close-up of phone unlocking with fingerprint, battery indicator full, clean studio background",
+    "night street photography with vivid colors, smartphone camera viewfinder, confident smile",
+)
+GENERIC_BRAND = ("브리즈랩", "출근길 필수템, 빠른 충전, 가벼운 무게", "미니멀하고 프리미엄한")
+
+def make_speech_wav(path: str, duration: float = 30.0, sample_rate: int = 24000) -> str:
+    """TTS 출력과 비슷한 30초 모노 WAV: 피치가 움직이는 배음 음절 + 단어 사이 짧은 무음."""
+    rng = np.random.default_rng(7)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    pitch = 180 + 25 * np.sin(2 * np.pi * 0.4 * t) # 억양
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = (0.5 - 0.5 * np.cos(2 * np.pi * 4.0 * t)) ** 2 # 초당 4음절 포락선
+    pauses = np.repeat(rng.random(int(duration * 2)) > 0.15, sample_rate // 2)[:t.size] # 0.5초 단위 무음 구간
+    signal = 0.25 * voiced * syllables * pauses + 0.003 * rng.standard_normal(t.size)
+    with wave.open(path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes((np.clip(signal, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+    return path
+
+def build_cases(args: argparse.Namespace, workdir: str) -> Tuple[Dict[str, Callable[[], Any]], Dict[str, str]]:
+    """케이스 이름 → 인자 없는 호출 함수, 그리고 건너뛴 케이스 → 이유."""
+    cases: Dict[str, Callable[[], Any]] = {}
+    skipped: Dict[str, str] = {}
+
+    # main 임포트 시 generated/ 등 상대 경로가 만들어지므로 작업 디렉토리에서 임포트
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import main as app_main # noqa: E402
+    finally:
+        os.chdir(cwd)
+    brands = [(brand, preset["keywords"], preset["style"]) for brand, preset in app_main.BRAND_PRESETS.items()] + [GENERIC_BRAND]
+
+    def optimize_prompts():
+        for brand, keywords, style in brands:
+            for visual in SCENE_VISUALS:
+                app_main.optimize_zeroscope_prompt_enhanced(brand, visual, keywords, style)
+    cases["prompt.optimize"] = optimize_prompts
+
+    prompts = [(brand, app_main.optimize_zeroscope_prompt_enhanced(brand, visual, keywords, style) if i % 2 else visual)
+               for brand, keywords, style in brands for i, visual in enumerate(SCENE_VISUALS)]
+
+    def validate_prompts():
+        for brand, prompt in prompts:
+            app_main.validate_brand_prompt(brand, prompt)
+    cases["prompt.validate"] = validate_prompts
+
+    try:
+        from app.agents import quality_validator
+    except ImportError as e:
+        skipped["similarity.text"] = skipped["audio.analysis"] = f"quality_validator 임포트 실패: {e}"
+    else:
+        validator = quality_validator.AudioQualityValidator.__new__(quality_validator.AudioQualityValidator) # Whisper 모델 로드 없이 분석 메서드만 사용
+        cases["similarity.text"] = lambda: validator._calculate_text_similarity(NARRATION_KO, TRANSCRIPT_KO)
+        if quality_validator.LIBROSA_AVAILABLE:
+            speech_path = make_speech_wav(os.path.join(workdir, "narration_30s.wav"))
+            cases["audio.analysis"] = lambda: validator._analyze_audio_quality(speech_path)
+        else:
+            skipped["audio.analysis"] = "librosa 없음"
+
+    from app.utils import bgm_synth
+    cases["bgm.synth"] = lambda: bgm_synth.render_bgm(args.audio_seconds, "역동적이고 에너지")
+
+    from app.utils import CogVideoX_2b_utils
+    width, height = (int(v) for v in args.frame_size.lower().split("x"))
+    frames = [np.random.default_rng(0).random((1, args.frames, height, width, 3), dtype=np.float32)] # 파이프라인 출력 형식 (배치 리스트)
+    cases["frames.to_uint8"] = lambda: CogVideoX_2b_utils.frames_to_uint8(frames)
+    return cases, skipped
+
+def measure(func: Callable[[], Any], rounds: int, min_round_s: float, warmup: int) -> Dict[str, Any]:
+    """호출 횟수를 라운드당 min_round_s 이상으로 맞춘 뒤 라운드별 호출당 시간(ms) 통계."""
+    for _ in range(warmup):
+        func()
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round_s or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_round_s / max(elapsed, 1e-9) * 1.2))
+    samples = [elapsed / number * 1000]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number * 1000)
+    return {"number": number, "rounds": len(samples), "min_ms": round(min(samples), 4),
+            "median_ms": round(statistics.median(samples), 4), "mean_ms": round(statistics.fmean(samples), 4),
+            "stdev_ms": round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0}
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float, min_delta_ms: float) -> List[str]:
+    """케이스별 최솟값 비교. 회귀 목록 반환."""
+    print_compare_header(old, new, threshold)
+    return compare_values(old.get("cases", {}), new["cases"], "min_ms", threshold, min_delta_ms, "케이스", "ms", precision=3, width=20)
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU 경로 마이크로벤치마크")
+    parser.add_argument("--only", help="이름에 포함된 문자열로 케이스 선택 (쉼표 구분, 예: prompt,frames)")
+    parser.add_argument("--rounds", type=int, default=10, help="케이스별 측정 라운드 수")
+    parser.add_argument("--min-round", type=float, default=0.2, help="라운드 최소 시간 (초, 빠른 함수는 여러 번 호출)")
+    parser.add_argument("--warmup", type=int, default=1, help="측정 전 호출 횟수")
+    parser.add_argument("--frames", type=int, default=240, help="frames.to_uint8 프레임 수")
+    parser.add_argument("--frame-size", default="720x480", help="frames.to_uint8 프레임 크기 (CogVideoX-2b 출력 720x480)")
+    parser.add_argument("--audio-seconds", type=float, default=30.0, help="bgm.synth 렌더링 길이 (초)")
+    add_report_arguments(parser, threshold=0.2, min_delta=0.005, min_delta_help="회귀로 볼 최소 최솟값 증가 (ms)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="cpu_bench_") as workdir:
+        with open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(devnull): # 임포트/호출 로그는 측정 대상이 아님 (출력 비용은 devnull 쓰기로 일정)
+                cases, skipped = build_cases(args, workdir)
+            selected = {name: func for name, func in cases.items()
+                        if not args.only or any(part.strip() in name for part in args.only.split(","))}
+            print(f"⏱️ CPU 경로 마이크로벤치마크: {len(selected)}개 케이스, 라운드 {args.rounds} (CPU {os.cpu_count()}코어, NumPy {np.__version__})")
+            results: Dict[str, Dict[str, Any]] = {}
+            print(f"{'케이스':<20}{'호출/라운드':>12}{'최소(ms)':>12}{'중앙값(ms)':>13}{'표준편차':>10}")
+            for name, func in selected.items():
+                with contextlib.redirect_stdout(devnull):
+                    results[name] = measure(func, args.rounds, args.min_round, args.warmup)
+                r = results[name]
+                print(f"{name:<20}{r['number']:>12}{r['min_ms']:>12.3f}{r['median_ms']:>13.3f}{r['stdev_ms']:>10.3f}")
+    for name, reason in skipped.items():
+        print(f"⏭️ {name}: 건너뜀 ({reason})")
+
+    report = {
+        "benchmark": "cpu_hot_paths", "git_commit": git_commit(), "created_at": datetime.now().isoformat(),
+        "python": sys.version.split()[0], "numpy": np.__version__, "platform": platform.platform(), "cpu_count": os.cpu_count(),
+        "config": {k: getattr(args, k) for k in ("rounds", "min_round", "frames", "frame_size", "audio_seconds")},
+        "cases": results, "skipped": skipped
+    }
+    finish_report(args, report, compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+# benchmarks/e2e_pipeline.py - 오프라인 전체 파이프라인 벤치마크 (가짜 OpenAI 서버 + CPU 디퓨전 스텁 + 실제 FFmpeg)
+#
+# 사용법:
+#   python benchmarks/e2e_pipeline.py                                     # 동시 클라이언트 2명 x 2작업, cogvideox 스텁, 30초 광고
+#   python benchmarks/e2e_pipeline.py --clients 4 --jobs 3 --engine stills --duration 15
+#   python benchmarks/e2e_pipeline.py --cache warm --latency chat=1.5,tts=0.6,images=4
+#   python benchmarks/e2e_pipeline.py --json generated/bench/e2e_new.json --compare generated/bench/e2e_base.json
+#
+# 실제 /api/v1/ads/create-complete 엔드포인트 함수로 접수하고 process_complete_ad_generation을 그대로 실행합니다
+# (어드미션, GPU 슬롯, 데드라인, 씬 캐시, 단계 추적 포함). 외부 의존성만 로컬 대역으로 바꿉니다.
+#   OpenAI    - 스레드 HTTP 서버가 chat/completions, audio/speech, images/generations 응답 (OPENAI_BASE_URL로 연결, 지연은 --latency)
+#   CogVideoX - 작은 잠재 텐서를 NumPy로 반복 갱신하는 CPU 스텁 (단계 콜백/취소/통계 형식 동일, 프레임은 FFmpeg로 인코딩)
+#   FFmpeg    - 실제 바이너리 (라우드니스 측정, 최종 합성)
+# 결과: 단계별 p50/p95 (작업 트레이스 기준), 작업/분, 대기 시간, 최대 RSS, 캐시 적중률.
+# --compare는 이전 커밋의 JSON과 비교해 p95/처리량이 --threshold 이상 나빠지면 종료 코드 1을 반환합니다.
+# 나레이션은 합성 톤이므로 faster-whisper 검증은 기본 비활성화 (--whisper로 켜면 낮은 점수로 재시도가 발생합니다).
+
+import os
+import re
+import sys
+import json
+import time
+import types
+import base64
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import platform
+import threading
+import subprocess
+import contextlib
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional, Tuple
+
+from _common import PROJECT_ROOT, percentile, git_commit, add_report_arguments, print_compare_header, compare_values, finish_report
+
+# 브랜드 프리셋과 겹치는 요청 조합 (클라이언트/작업 순서대로 순환)
+REQUEST_MIX = (
+    ("Nike", "러닝화, 경량 쿠셔닝, 도심 러닝"),
+    ("Apple", "아이폰 카메라, 야간 촬영, 일상 기록"),
+    ("Samsung", "폴더블폰, 멀티태스킹, 출근길"),
+    ("Starbucks", "시즌 음료, 따뜻한 라떼, 주말 아침"),
+)
+
+# CogVideoXGenerator._get_quality_params_cogvideox와 같은 단계 수/해상도
+STUB_QUALITY = {
+    "fast": {"steps": 20, "width": 320, "height": 320},
+    "balanced": {"steps": 30, "width": 384, "height": 384},
+    "high": {"steps": 40, "width": 448, "height": 448},
+}
+STUB_FPS = 8 # CogVideoX 출력 FPS
+LATENT_CHANNELS = 16 # CogVideoX-2b VAE 잠재 채널 수
+SPEECH_CHARS_PER_SECOND = 7.0 # 한국어 나레이션 발화 속도 근사 (가짜 TTS 길이)
+
+def parse_latency(spec: str) -> Dict[str, float]:
+    """"chat=0.8,tts=0.3,images=2" → 엔드포인트별 인위 지연 (초)."""
+    latency = {"chat": 0.0, "tts": 0.0, "images": 0.0}
+    for part in filter(None, spec.split(",")):
+        name, _, value = part.partition("=")
+        if name.strip() not in latency:
+            raise ValueError(f"알 수 없는 엔드포인트: {name} (chat/tts/images)")
+        latency[name.strip()] = float(value)
+    return latency
+
+# ── 가짜 OpenAI 서버 ─────────────────────────────
+class FakeOpenAIServer:
+    """OpenAI REST 응답 형식을 흉내내는 로컬 서버. 음성/이미지는 FFmpeg로 만들고 입력별로 캐시합니다."""
+
+    def __init__(self, latency: Dict[str, float], assets_dir: str):
+        self.latency = latency
+        self.assets_dir = assets_dir
+        self.calls: Dict[str, int] = {"chat": 0, "tts": 0, "images": 0}
+        self._lock = threading.Lock()
+        self._asset_locks: Dict[str, threading.Lock] = {}
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        os.makedirs(assets_dir, exist_ok=True)
+
+    # 응답 생성 ----------------------------------
+    def _asset(self, name: str, command: List[str]) -> str:
+        """FFmpeg로 자산을 한 번만 생성 (같은 이름의 동시 요청은 대기)."""
+        path = os.path.join(self.assets_dir, name)
+        with self._lock:
+            lock = self._asset_locks.setdefault(name, threading.Lock())
+        with lock:
+            if not os.path.exists(path):
+                subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *command, path], check=True)
+        return path
+
+    def chat(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+        brand = (re.search(r"브랜드:\s*(.+)", prompt) or [None, "Brand"])[1].strip()
+        keywords = (re.search(r"키워드/컨셉:\s*(.+)", prompt) or [None, "new product"])[1].strip()
+        duration = int((re.search(r"길이:\s*(\d+)초", prompt) or [None, "30"])[1])
+        beats = (("Opening", f"{brand}와 함께 시작하는 새로운 하루, {keywords}의 첫 순간을 만나보세요.",
+                  f"{brand} product hero shot in the first frame, {keywords}, morning light, cinematic"),
+                 ("Experience", f"{keywords}, 매일의 작은 변화가 큰 차이를 만듭니다. 지금 바로 느껴보세요.",
+                  f"people using {brand} product in everyday life, {keywords}, dynamic camera"),
+                 ("Closing", f"당신의 일상에 {brand}. 지금 만나보세요.",
+                  f"{brand} logo on clean background with product, {keywords}, soft studio light"))
+        scenes = [{"name": name, "duration": round(duration / len(beats), 2), "narration": narration, "visual_description": visual}
+                  for name, narration, visual in beats]
+        concept = {"narration": " ".join(s["narration"] for s in scenes), "visual_description": scenes[0]["visual_description"], "scenes": scenes}
+        return {
+            "id": f"chatcmpl-{hashlib.sha1(prompt.encode()).hexdigest()[:12]}", "object": "chat.completion",
+            "created": int(time.time()), "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(concept, ensure_ascii=False)}}],
+            "usage": {"prompt_tokens": len(prompt) // 2, "completion_tokens": 400, "total_tokens": len(prompt) // 2 + 400}
+        }
+
+    def speech(self, body: Dict[str, Any]) -> bytes:
+        seconds = min(15.0, max(1.0, round(len(body.get("input", "")) / SPEECH_CHARS_PER_SECOND * 4) / 4)) # 0.25초 단위
+        path = self._asset(f"speech_{seconds:.2f}.mp3", [
+            "-f", "lavfi", "-i", f"sine=frequency=220:beep_factor=2:duration={seconds}",
+            "-ac", "1", "-ar", "24000", "-c:a", "libmp3lame", "-b:a", "64k"
+        ])
+        with open(path, "rb") as f:
+            return f.read()
+
+    def image(self, body: Dict[str, Any], base_url: str) -> Dict[str, Any]:
+        seed = int(hashlib.sha1(body.get("prompt", "").encode("utf-8")).hexdigest()[:8], 16) % (2 ** 31)
+        size = body.get("size", "1024x1024")
+        name = f"image_{seed}_{size}.png"
+        path = self._asset(name, ["-f", "lavfi", "-i", f"gradients=s={size}:seed={seed}:n=6:speed=0", "-frames:v", "1"])
+        if body.get("response_format") == "b64_json":
+            with open(path, "rb") as f:
+                item = {"b64_json": base64.b64encode(f.read()).decode("ascii")}
+        else:
+            item = {"url": f"{base_url}/files/{name}"}
+        item["revised_prompt"] = body.get("prompt")
+        return {"created": int(time.time()), "data": [item]}
+
+    # HTTP ---------------------------------------
+    def start(self) -> str:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # 커넥션 재사용 (httpx 풀)
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                endpoint = {"/v1/chat/completions": "chat", "/v1/audio/speech": "tts",
+                            "/v1/images/generations": "images"}.get(self.path.split("?")[0])
+                if endpoint is None:
+                    return self._send(404, b'{"error": {"message": "not found"}}', "application/json")
+                with server._lock:
+                    server.calls[endpoint] += 1
+                time.sleep(server.latency.get(endpoint, 0.0))
+                try:
+                    if endpoint == "tts":
+                        return self._send(200, server.speech(body), "audio/mpeg")
+                    response = server.chat(body) if endpoint == "chat" else server.image(body, server.base_url.rsplit("/v1", 1)[0])
+                except Exception as e:
+                    message = json.dumps({"error": {"message": str(e), "type": "server_error"}}).encode()
+                    return self._send(500, message, "application/json")
+                self._send(200, json.dumps(response, ensure_ascii=False).encode("utf-8"), "application/json")
+
+            def do_GET(self):
+                path = os.path.join(server.assets_dir, os.path.basename(self.path))
+                if not self.path.startswith("/files/") or not os.path.exists(path):
+                    return self._send(404, b"", "text/plain")
+                with open(path, "rb") as f:
+                    self._send(200, f.read(), "image/png")
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}/v1"
+        return self.base_url
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+# ── CPU 디퓨전 스텁 ──────────────────────────────
+def build_diffusion_stub(step_delay: float) -> types.ModuleType:
+    """
+    app.utils.CogVideoX_2b_utils 대역 모듈. 잠재 텐서 (프레임/4+1, H/8, W/8, 16)를 단계마다 NumPy로 갱신하고
+    (step_delay초는 GPU 대기 시간 흉내), 최근접 업샘플한 RGB 프레임을 FFmpeg로 인코딩합니다.
+    """
+    import numpy as np
+    from app.core import tracing
+
+    module = types.ModuleType("cogvideox_cpu_stub")
+
+    class GenerationCancelled(Exception):
+        pass
+
+    class CogVideoXGenerator:
+        def __init__(self, output_dir: str = "generated/videos", bgm_dir: str = "generated/bgm"):
+            self.output_dir = output_dir
+            os.makedirs(output_dir, exist_ok=True)
+            self.last_generation_stats: Dict[str, Any] = {}
+
+        def _denoise(self, latent, steps: int, progress_callback, cancel_event) -> List[float]:
+            step_times: List[float] = []
+            started = time.perf_counter()
+            for step in range(steps):
+                tick = time.perf_counter()
+                smoothed = (np.roll(latent, 1, axis=1) + np.roll(latent, -1, axis=1) +
+                            np.roll(latent, 1, axis=2) + np.roll(latent, -1, axis=2)) * 0.25
+                latent *= 0.8
+                latent += 0.2 * np.tanh(smoothed)
+                if step_delay:
+                    time.sleep(step_delay)
+                step_times.append(time.perf_counter() - tick)
+                elapsed = time.perf_counter() - started
+                if progress_callback:
+                    progress_callback({"step": step + 1, "total_steps": steps, "step_time_s": round(step_times[-1], 3),
+                                       "elapsed_s": round(elapsed, 2), "eta_s": round(elapsed / (step + 1) * (steps - step - 1), 2),
+                                       "memory": {"allocated_gb": 0.0, "reserved_gb": 0.0, "max_allocated_gb": 0.0}})
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled(f"디노이징 {step + 1}/{steps}단계에서 취소되었습니다.")
+            return step_times
+
+        @staticmethod
+        def _export(latent, num_frames: int, width: int, height: int, path: str):
+            frames = np.repeat(latent[..., :3], 4, axis=0)[:num_frames] # 시간 축 4배 (VAE 시간 압축 역)
+            frames = np.repeat(np.repeat(frames, 8, axis=1), 8, axis=2) # 공간 8배
+            rgb = ((np.tanh(frames) + 1.0) * 127.5).astype(np.uint8)
+            subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                            "-s", f"{width}x{height}", "-r", str(STUB_FPS), "-i", "-",
+                            "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", path],
+                           input=rgb.tobytes(), check=True)
+
+        async def generate_video_from_prompt(self, prompt: str, duration: int = 30, quality: str = "balanced",
+                                             enable_bgm: bool = False, bgm_prompt: Optional[str] = None,
+                                             bgm_duration: Optional[int] = None, progress_callback=None, cancel_event=None):
+            params = STUB_QUALITY.get(quality, STUB_QUALITY["fast"])
+            num_frames = max(16, int(duration * STUB_FPS))
+            seed = int(hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8], 16)
+            latent = np.random.default_rng(seed).standard_normal(
+                (num_frames // 4 + 1, params["height"] // 8, params["width"] // 8, LATENT_CHANNELS), dtype=np.float32)
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled("비디오 생성 시작 전에 취소되었습니다.")
+
+            denoise_started = time.perf_counter()
+            with tracing.span("cogvideox.denoise", steps=params["steps"], frames=num_frames,
+                              width=params["width"], height=params["height"]):
+                step_times = await asyncio.to_thread(self._denoise, latent, params["steps"], progress_callback, cancel_event)
+            self.last_generation_stats = {
+                "total_steps": params["steps"], "step_times": step_times,
+                "denoise_total_s": round(time.perf_counter() - denoise_started, 2),
+                "avg_step_s": round(sum(step_times) / len(step_times), 3),
+                "memory": {"allocated_gb": 0.0, "reserved_gb": 0.0, "max_allocated_gb": 0.0},
+                "video_duration_s": num_frames / STUB_FPS, "video_fps": STUB_FPS
+            }
+
+            path = os.path.join(self.output_dir, f"cogvideox_stub_{seed:08x}_{time.time_ns()}.mp4")
+            with tracing.span("cogvideox.export", frames=num_frames, fps=STUB_FPS):
+                await asyncio.to_thread(self._export, latent, num_frames, params["width"], params["height"], path)
+            return path, None # 생성형 BGM 없음 → 파이프라인이 라이브러리/신디사이저 BGM 사용
+
+    module.CogVideoXGenerator = CogVideoXGenerator
+    module.GenerationCancelled = GenerationCancelled
+    module.get_device_memory_bytes = lambda: {} # /metrics 수집기용 (GPU 없음)
+    return module
+
+# ── 실행 ─────────────────────────────────────────
+def _peak_rss_mb() -> Optional[float]:
+    """이 프로세스(API + 파이프라인)의 최대 RSS (MB). 자식 프로세스 값은 fork 시점 부모 RSS가 섞여 제외합니다."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1 if sys.platform == "darwin" else 1024 # macOS는 바이트, Linux는 KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1024 ** 2, 1)
+
+async def run_job(app, args, client_id: int, index: int, run_id: str) -> Dict[str, Any]:
+    """엔드포인트 함수로 접수 (503이면 Retry-After만큼 대기 후 재시도) → 백그라운드 작업을 이 코루틴에서 실행."""
+    from fastapi import BackgroundTasks, HTTPException
+
+    brand, keywords = REQUEST_MIX[(client_id + index) % len(REQUEST_MIX)]
+    if args.cache == "cold": # 작업마다 다른 컨셉 → 씬 캐시/이미지 중복 제거 미적중
+        keywords = f"{keywords}, 캠페인 {run_id}-{client_id}-{index}"
+    request = app.CompleteAdRequest(brand=brand, keywords=keywords, duration=args.duration, video_quality=args.quality,
+                                     enable_bgm=not args.no_bgm, video_engine=args.engine)
+    background = BackgroundTasks()
+    submitted = time.perf_counter()
+    rejected = 0
+    while True:
+        try:
+            response = await app.create_complete_advertisement(request, background)
+            break
+        except HTTPException as e:
+            if e.status_code != 503:
+                raise
+            rejected += 1
+            await asyncio.sleep(min(float((e.headers or {}).get("Retry-After", 1)), args.max_backoff))
+    if not args.whisper:
+        app.tasks_storage[response.task_id]["request_data"]["enable_quality_validation"] = False
+    await background() # process_complete_ad_generation (서버에서는 응답 후 같은 이벤트 루프에서 실행)
+    latency = time.perf_counter() - submitted
+
+    task = app.tasks_storage[response.task_id]
+    trace = task.get("trace") or {}
+    service = trace.get("total_s") or latency
+    return {"task_id": response.task_id, "client": client_id, "brand": brand, "status": task.get("status"),
+            "error": task.get("error"), "latency_s": round(latency, 3), "service_s": round(service, 3),
+            "queue_s": round(max(0.0, latency - service), 3), "rejected": rejected,
+            "stages": {name: stage["total_s"] for name, stage in trace.get("stages", {}).items()}}
+
+async def run_load(app, args, run_id: str) -> Tuple[List[Dict[str, Any]], float]:
+    """클라이언트 N명이 각자 작업을 연달아 제출 (폐쇄 루프)."""
+    results: List[Dict[str, Any]] = []
+
+    async def client(client_id: int):
+        for index in range(args.jobs):
+            try:
+                results.append(await run_job(app, args, client_id, index, run_id))
+            except Exception as e:
+                results.append({"client": client_id, "status": "client_error", "error": f"{type(e).__name__}: {e}", "stages": {}})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(args.clients)))
+    return results, time.perf_counter() - started
+
+def scrape_counters(text: str, name: str) -> Dict[str, float]:
+    """Prometheus 텍스트에서 한 카운터의 레이블 → 값."""
+    values: Dict[str, float] = {}
+    for line in text.splitlines():
+        if line.startswith(name + "{"):
+            labels, _, value = line[len(name):].rpartition(" ")
+            values[labels] = float(value)
+    return values
+
+def cache_hit_ratios(metrics_text: str) -> Dict[str, Dict[str, float]]:
+    counts: Dict[str, Dict[str, float]] = {}
+    for labels, value in scrape_counters(metrics_text, "ad_cache_lookups_total").items():
+        cache = re.search(r'cache="([^"]*)"', labels).group(1)
+        result = re.search(r'result="([^"]*)"', labels).group(1)
+        counts.setdefault(cache, {"hit": 0.0, "miss": 0.0})[result] = value
+    return {cache: {"lookups": int(c["hit"] + c["miss"]), "hit_ratio": round(c["hit"] / (c["hit"] + c["miss"]), 3)}
+            for cache, c in sorted(counts.items()) if c["hit"] + c["miss"]}
+
+def summarize(results: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+    completed = [r for r in results if r["status"] == "completed"]
+    by_stage: Dict[str, List[float]] = {}
+    for r in completed:
+        for name, seconds in r["stages"].items():
+            by_stage.setdefault(name, []).append(seconds)
+
+    def stats(values: List[float]) -> Dict[str, Any]:
+        return {"count": len(values), "p50_s": round(percentile(values, 50), 3), "p95_s": round(percentile(values, 95), 3),
+                "mean_s": round(sum(values) / len(values), 3), "max_s": round(max(values), 3)}
+
+    statuses: Dict[str, int] = {}
+    for r in results:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    return {
+        "wall_s": round(wall_s, 2),
+        "throughput_jobs_per_min": round(len(completed) / wall_s * 60, 3) if wall_s else 0.0,
+        "jobs": dict(statuses, submitted=len(results), rejected_503=sum(r.get("rejected", 0) for r in results)),
+        "error_rate": round(1 - len(completed) / len(results), 3) if results else None,
+        "latency": {key: stats([r[key] for r in completed]) for key in ("latency_s", "service_s", "queue_s")} if completed else {},
+        "stages": {name: stats(values) for name, values in sorted(by_stage.items(), key=lambda kv: -sum(kv[1]))}
+    }
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float, min_delta_s: float) -> List[str]:
+    """단계 p95와 처리량 비교. 회귀 목록 반환."""
+    print_compare_header(old, new, threshold)
+    regressions = compare_values(old.get("stages", {}), new["stages"], "p95_s", threshold, min_delta_s, "단계 p95", "s")
+    old_tp, new_tp = old.get("throughput_jobs_per_min"), new["throughput_jobs_per_min"]
+    if old_tp:
+        change = (new_tp - old_tp) / old_tp
+        print(f"{'throughput (jobs/min)':<28}{old_tp:>12.2f}{new_tp:>12.2f}{change:>+8.0%}")
+        if change < -threshold:
+            regressions.append(f"throughput {old_tp:.2f} → {new_tp:.2f} jobs/min")
+    return regressions
+
+def _ffmpeg_version() -> Optional[str]:
+    try:
+        return subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True, check=True).stdout.split("\n", 1)[0]
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 전체 파이프라인 벤치마크")
+    parser.add_argument("--clients", type=int, default=2, help="동시 클라이언트 수")
+    parser.add_argument("--jobs", type=int, default=2, help="클라이언트당 연속 작업 수")
+    parser.add_argument("--engine", choices=("cogvideox", "stills"), default="cogvideox", help="영상 방식 (cogvideox는 CPU 스텁)")
+    parser.add_argument("--duration", type=int, choices=(15, 30), default=30, help="광고 길이 (초)")
+    parser.add_argument("--quality", choices=tuple(STUB_QUALITY), default="fast", help="비디오 품질 (스텁 단계 수/해상도)")
+    parser.add_argument("--cache", choices=("cold", "warm"), default="cold", help="cold: 작업마다 다른 컨셉, warm: 같은 조합 반복 (씬 캐시 적중)")
+    parser.add_argument("--no-bgm", action="store_true", help="BGM 비활성화")
+    parser.add_argument("--whisper", action="store_true", help="faster-whisper 나레이션 검증 사용 (설치된 경우)")
+    parser.add_argument("--latency", default="chat=0.8,tts=0.4,images=1.5", help="가짜 OpenAI 엔드포인트별 지연 (초)")
+    parser.add_argument("--step-delay", type=float, default=0.05, help="스텁 디노이징 단계당 추가 대기 (GPU 시간 흉내, 초)")
+    parser.add_argument("--gpu-slots", type=int, default=1, help="ADMISSION_GPU_SLOTS (동시 디노이징 수)")
+    parser.add_argument("--max-backoff", type=float, default=5.0, help="503 재시도 대기 상한 (초)")
+    parser.add_argument("--workdir", help="작업 디렉토리 (generated/ 위치, 기본: 임시 디렉토리 후 삭제)")
+    parser.add_argument("--verbose", action="store_true", help="파이프라인 로그를 표준 출력으로 (기본: workdir/pipeline.log)")
+    add_report_arguments(parser, threshold=0.2, min_delta=0.1, min_delta_help="회귀로 볼 최소 p95 증가 (초)")
+    args = parser.parse_args()
+    if args.json_path:
+        args.json_path = os.path.abspath(args.json_path)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+
+    cleanup = tempfile.TemporaryDirectory(prefix="e2e_bench_") if not args.workdir else contextlib.nullcontext(args.workdir)
+    with cleanup as workdir:
+        workdir = os.path.abspath(workdir)
+        os.makedirs(workdir, exist_ok=True)
+        fake = FakeOpenAIServer(parse_latency(args.latency), os.path.join(workdir, "fake_openai"))
+        # main 임포트 전에 환경 설정: 경로 기본값(generated/, 씬 캐시)은 임포트 시점의 작업 디렉토리 기준
+        os.environ.update({"OPENAI_API_KEY": "sk-offline-benchmark", "OPENAI_BASE_URL": fake.start(),
+                           "ARTIFACT_STORAGE": "local", "ADMISSION_GPU_SLOTS": str(args.gpu_slots)})
+        for name in ("SCENE_CACHE_DIR", "IMAGE_STORE_DIR"):
+            os.environ.pop(name, None)
+        os.chdir(workdir)
+        sys.path.insert(0, PROJECT_ROOT)
+
+        log_path = os.path.join(workdir, "pipeline.log")
+        with open(log_path, "w", encoding="utf-8") as log, \
+                (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(log)):
+            import main as app_main # noqa: E402 (환경 설정 후 임포트)
+            from app.core import metrics # noqa: E402
+            baseline_rss = _peak_rss_mb()
+            if args.engine == "cogvideox":
+                app_main.cog_utils = build_diffusion_stub(args.step_delay)
+                app_main.COGVIDEODX_AVAILABLE = True
+            run_id = datetime.now().strftime("%H%M%S")
+            results, wall_s = asyncio.run(run_load(app_main, args, run_id))
+            metrics_text = metrics.REGISTRY.render()
+        fake.stop()
+
+        summary = summarize(results, wall_s)
+        report = {
+            "benchmark": "e2e_pipeline", "git_commit": git_commit(), "created_at": datetime.now().isoformat(),
+            "python": sys.version.split()[0], "platform": platform.platform(), "cpu_count": os.cpu_count(), "ffmpeg": _ffmpeg_version(),
+            "config": {k: getattr(args, k) for k in ("clients", "jobs", "engine", "duration", "quality", "cache", "no_bgm",
+                                                       "whisper", "latency", "step_delay", "gpu_slots")},
+            **summary,
+            "peak_rss_mb": {"run": _peak_rss_mb(), "after_import": baseline_rss},
+            "cache_hit_ratio": cache_hit_ratios(metrics_text),
+            "openai_calls": dict(fake.calls),
+            "per_job": results
+        }
+        failures = [r for r in results if r["status"] != "completed"]
+        if failures and not args.verbose:
+            print(f"⚠️ 실패 작업 {len(failures)}개 (로그: {log_path}{' - --workdir로 보존' if not args.workdir else ''})")
+
+    print(f"🏁 전체 파이프라인: {args.clients}클라이언트 x {args.jobs}작업, {args.engine} {args.duration}초 {args.quality}, 캐시 {args.cache} (CPU {os.cpu_count()}코어)")
+    print(f"   처리량 {report['throughput_jobs_per_min']:.2f}작업/분, 벽시계 {report['wall_s']:.1f}초, 상태 {report['jobs']}, "
+          f"최대 RSS {report['peak_rss_mb']['run']}MB (임포트 직후 {report['peak_rss_mb']['after_import']}MB)")
+    print(f"{'단계':<28}{'횟수':>6}{'p50(s)':>10}{'p95(s)':>10}{'최대(s)':>10}")
+    for name, stage in list(report["latency"].items()) + list(report["stages"].items()):
+        print(f"{name:<28}{stage['count']:>6}{stage['p50_s']:>10.2f}{stage['p95_s']:>10.2f}{stage['max_s']:>10.2f}")
+    if report["cache_hit_ratio"]:
+        print("♻️ 캐시 적중률: " + ", ".join(f"{k} {v['hit_ratio']:.0%}/{v['lookups']}" for k, v in report["cache_hit_ratio"].items()))
+    for failure in failures[:5]:
+        print(f"❌ {failure.get('task_id', '-')}: {failure['status']} - {str(failure.get('error'))[:200]}")
+
+    finish_report(args, report, compare)
+
+if __name__ == "__main__":
+    main()
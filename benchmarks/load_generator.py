@@ -0,0 +1,356 @@
+# benchmarks/load_generator.py - 배포 서버 부하 테스트 (도착률 기반 비동기 요청 생성 + 상태 API 폴링)
+#
+# 사용법:
+#   python benchmarks/load_generator.py --base-url http://127.0.0.1:8000 --rates 1 --window 300
+#   python benchmarks/load_generator.py --rates 0.5,1,2,4 --window 600 --json generated/bench/load.json   # 포화점 탐색
+#   python benchmarks/load_generator.py --mix "quality=fast:6,balanced:3,high:1;duration=15:1,30:1;bgm=on:3,off:1;engine=stills:1"
+#
+# complete_ad_test.py / cogvideo_tts_test.py는 작업 하나를 requests + time.sleep으로 따라가지만, 이 도구는
+# 개방 루프(open loop)로 목표 도착률(작업/분, 포아송 또는 균등 간격)에 맞춰 작업을 제출하고 응답 속도와 무관하게 계속 제출합니다.
+# 각 작업은 /api/v1/ads/status로 진행을 폴링하고, 종료 후 /api/v1/ads/trace에서 서버 측 처리 시간과 GPU 대기 시간을 가져옵니다.
+# 보고: 단계(도착률)별 처리량, 거절(503)/오류율, 대기 지연(접수 → 처리 시작 + GPU 슬롯 대기), 전체 지연 CDF.
+# 포화 판정: 거절률 또는 오류율 > 5%, 대기 지연 p95 > --queue-slo, 혹은 단계 안에서 지연이 계속 증가(큐 누적). 포화되지 않은 최고 도착률을 포화점 아래 한계로 보고합니다.
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import httpx
+except ImportError: # openai SDK 의존성으로 보통 설치됨
+    sys.exit("httpx가 필요합니다: pip install httpx")
+
+from _common import percentile # 벤치마크 공용 선형 보간 백분위수 (benchmarks/ 스크립트 디렉토리 기준 임포트)
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+DEFAULT_MIX = "quality=fast:5,balanced:4,high:1;duration=15:1,30:1;bgm=on:3,off:1;engine=auto:1"
+FALLBACK_BRANDS = ("Nike", "Apple", "Samsung", "Starbucks")
+KEYWORD_POOL = ("신제품 출시, 일상 속 편리함", "여름 시즌 한정, 시원한 청량감", "프리미엄 품질, 오래가는 내구성",
+                "주말 나들이, 가족과 함께", "출근길 필수템, 빠른 충전", "건강한 습관, 가벼운 시작")
+CDF_POINTS = (0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+
+@dataclass
+class JobRecord:
+    """작업 하나의 클라이언트 측 타임라인 (시각은 부하 시작 기준 초)."""
+    index: int
+    rate_rpm: float
+    request: Dict[str, Any]
+    scheduled_at: float
+    sent_at: Optional[float] = None
+    accepted_at: Optional[float] = None
+    started_at: Optional[float] = None # 폴링에서 처음 queued가 아닌 상태를 본 시각 (폴링 간격만큼 늦을 수 있음)
+    finished_at: Optional[float] = None
+    http_status: Optional[int] = None
+    task_id: Optional[str] = None
+    status: str = "pending" # completed | failed | cancelled | rejected | http_error | timeout | lost
+    error: Optional[str] = None
+    polls: int = 0
+    service_s: Optional[float] = None # 서버 트레이스의 작업 처리 시간
+    gpu_wait_s: Optional[float] = None # 서버 트레이스의 GPU 슬롯 대기
+
+    @property
+    def latency_s(self) -> Optional[float]:
+        return self.finished_at - self.sent_at if self.finished_at is not None and self.sent_at is not None else None
+
+    @property
+    def queue_s(self) -> Optional[float]:
+        return self.started_at - self.accepted_at if self.started_at is not None and self.accepted_at is not None else None
+
+    @property
+    def wait_s(self) -> Optional[float]:
+        """대기 지연: 처리 시작 전 큐 대기 + 처리 중 GPU 슬롯 대기 (트레이스가 없으면 큐 대기만)."""
+        if self.queue_s is None:
+            return None
+        return self.queue_s + (self.gpu_wait_s or 0.0)
+
+def parse_mix(spec: str) -> Dict[str, List[Tuple[str, float]]]:
+    """"quality=fast:5,balanced:1;duration=15:1,30:1" → 차원별 (값, 가중치) 목록."""
+    mix: Dict[str, List[Tuple[str, float]]] = {}
+    for dimension in filter(None, (part.strip() for part in spec.split(";"))):
+        name, _, choices = dimension.partition("=")
+        options = []
+        for choice in choices.split(","):
+            value, _, weight = choice.partition(":")
+            options.append((value.strip(), float(weight or 1)))
+        mix[name.strip()] = options
+    unknown = set(mix) - {"quality", "duration", "bgm", "engine", "voice", "brand"}
+    if unknown:
+        raise ValueError(f"알 수 없는 믹스 차원: {', '.join(sorted(unknown))}")
+    return mix
+
+def _pick(rng: random.Random, options: List[Tuple[str, float]]) -> str:
+    return rng.choices([value for value, _ in options], weights=[weight for _, weight in options])[0]
+
+def build_request(rng: random.Random, mix: Dict[str, List[Tuple[str, float]]], brands: List[str],
+                  index: int, run_id: str, unique: bool) -> Dict[str, Any]:
+    """믹스에서 CompleteAdRequest 본문 하나 생성 (unique면 키워드에 작업 번호를 넣어 씬 캐시 적중을 막음)."""
+    keywords = rng.choice(KEYWORD_POOL)
+    bgm = _pick(rng, mix.get("bgm", [("on", 1)])) # on(라이브러리) | generative(Riffusion) | off
+    if unique:
+        keywords = f"{keywords}, 캠페인 {run_id}-{index}"
+    body = {
+        "brand": _pick(rng, mix["brand"]) if "brand" in mix else rng.choice(brands),
+        "keywords": keywords,
+        "duration": int(_pick(rng, mix.get("duration", [("30", 1)]))),
+        "video_quality": _pick(rng, mix.get("quality", [("balanced", 1)])),
+        "enable_bgm": bgm != "off",
+        "bgm_mode": "generative" if bgm == "generative" else "library",
+        "video_engine": _pick(rng, mix.get("engine", [("auto", 1)])),
+    }
+    if "voice" in mix:
+        body["voice"] = _pick(rng, mix["voice"])
+    return body
+
+class LoadGenerator:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace, mix: Dict[str, List[Tuple[str, float]]], brands: List[str]):
+        self.client = client
+        self.args = args
+        self.mix = mix
+        self.brands = brands
+        self.rng = random.Random(args.seed)
+        self.run_id = datetime.now().strftime("%H%M%S")
+        self.origin = time.monotonic()
+        self._index = 0
+
+    def now(self) -> float:
+        return time.monotonic() - self.origin
+
+    async def _poll(self, record: JobRecord):
+        """종료 상태가 될 때까지 상태 API 폴링 (간격 ±20% 지터로 동기화 방지)."""
+        deadline = record.accepted_at + self.args.job_timeout
+        while self.now() < deadline:
+            await asyncio.sleep(self.args.poll_interval * self.rng.uniform(0.8, 1.2))
+            try:
+                response = await self.client.get(f"/api/v1/ads/status/{record.task_id}")
+            except httpx.HTTPError as e: # 일시적 연결 오류는 다음 폴링에서 재시도
+                record.error = f"poll: {type(e).__name__}"
+                continue
+            record.polls += 1
+            if response.status_code == 404: # 서버 재시작 또는 작업 삭제
+                record.status, record.finished_at = "lost", self.now()
+                return
+            if response.status_code != 200:
+                continue
+            state = response.json()
+            if record.started_at is None and state.get("status") != "queued":
+                record.started_at = self.now()
+            if state.get("status") in TERMINAL_STATUSES:
+                record.status, record.finished_at = state["status"], self.now()
+                record.error = state.get("error")
+                return
+        record.status, record.finished_at = "timeout", self.now()
+        if self.args.cancel_timeouts: # 남은 GPU 작업이 다음 단계를 왜곡하지 않도록 취소
+            try:
+                await self.client.delete(f"/api/v1/ads/{record.task_id}")
+            except httpx.HTTPError:
+                pass
+
+    async def _fetch_trace(self, record: JobRecord):
+        try:
+            response = await self.client.get(f"/api/v1/ads/trace/{record.task_id}")
+        except httpx.HTTPError:
+            return
+        if response.status_code == 200:
+            trace = response.json()["trace"]
+            record.service_s = trace.get("total_s")
+            record.gpu_wait_s = (trace.get("stages", {}).get("gpu.wait") or {}).get("total_s", 0.0)
+
+    async def drive(self, record: JobRecord):
+        """제출 → 폴링 → 트레이스 조회."""
+        record.sent_at = self.now()
+        try:
+            response = await self.client.post("/api/v1/ads/create-complete", json=record.request)
+        except httpx.HTTPError as e:
+            record.status, record.error, record.finished_at = "http_error", f"{type(e).__name__}: {e}", self.now()
+            return
+        record.http_status = response.status_code
+        if response.status_code == 503:
+            record.status, record.finished_at = "rejected", self.now()
+            record.error = f"Retry-After {response.headers.get('Retry-After')}"
+            return
+        if response.status_code != 200:
+            record.status, record.finished_at = "http_error", self.now()
+            record.error = response.text[:300]
+            return
+        record.accepted_at = self.now()
+        record.task_id = response.json()["task_id"]
+        await self._poll(record)
+        if record.status in TERMINAL_STATUSES and self.args.trace:
+            await self._fetch_trace(record)
+
+    async def run_step(self, rate_rpm: float) -> List[JobRecord]:
+        """도착률 하나로 window초 동안 제출하고, 진행 중인 작업이 모두 끝날 때까지 대기."""
+        records: List[JobRecord] = []
+        tasks: List[asyncio.Task] = []
+        step_start = self.now()
+        offset = 0.0
+        while offset < self.args.window:
+            delay = step_start + offset - self.now()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            request = build_request(self.rng, self.mix, self.brands, self._index, self.run_id, not self.args.repeat_content)
+            record = JobRecord(index=self._index, rate_rpm=rate_rpm, request=request, scheduled_at=step_start + offset)
+            self._index += 1
+            records.append(record)
+            tasks.append(asyncio.create_task(self.drive(record)))
+            gap = 60.0 / rate_rpm
+            offset += self.rng.expovariate(1.0 / gap) if self.args.arrival == "poisson" else gap
+        print(f"⏳ {rate_rpm:g}작업/분: {len(records)}개 제출 완료, 진행 중인 작업 대기...")
+        await asyncio.gather(*tasks)
+        return records
+
+def summarize(rate_rpm: float, records: List[JobRecord], args: argparse.Namespace) -> Dict[str, Any]:
+    counts: Dict[str, int] = {}
+    for record in records:
+        counts[record.status] = counts.get(record.status, 0) + 1
+    completed = [r for r in records if r.status == "completed"]
+    submitted = len(records)
+    # 처리량 = 완료 수 / max(첫 제출 → 마지막 완료, 제출 창): 여유가 있으면 도착률, 포화되면 처리 능력에 수렴
+    span = max(max(r.finished_at for r in completed) - min(r.sent_at for r in records), args.window) if completed else None
+
+    def dist(values: List[float]) -> Optional[Dict[str, float]]:
+        values = [v for v in values if v is not None]
+        if not values:
+            return None
+        return {f"p{int(q * 100)}": round(percentile(values, q * 100), 2) for q in CDF_POINTS} | {"max": round(max(values), 2), "count": len(values)}
+
+    errors = sum(counts.get(s, 0) for s in ("failed", "http_error", "timeout", "lost"))
+    summary = {
+        "rate_rpm": rate_rpm,
+        "submitted": submitted,
+        "statuses": counts,
+        "throughput_rpm": round(len(completed) / span * 60, 3) if span else 0.0,
+        "rejection_rate": round(counts.get("rejected", 0) / submitted, 3) if submitted else 0.0,
+        "error_rate": round(errors / submitted, 3) if submitted else 0.0,
+        "latency_s": dist([r.latency_s for r in completed]),
+        "queue_s": dist([r.queue_s for r in records if r.accepted_at is not None]),
+        "service_s": dist([r.service_s for r in completed]),
+        "gpu_wait_s": dist([r.gpu_wait_s for r in completed]),
+        "wait_s": dist([r.wait_s for r in records if r.accepted_at is not None]),
+        "latency_cdf": [[round(v, 2), round((i + 1) / len(completed), 4)]
+                        for i, v in enumerate(sorted(r.latency_s for r in completed))],
+    }
+    reasons = []
+    if summary["rejection_rate"] > 0.05:
+        reasons.append(f"거절 {summary['rejection_rate']:.0%}")
+    if summary["error_rate"] > 0.05:
+        reasons.append(f"오류 {summary['error_rate']:.0%}")
+    if summary["wait_s"] and summary["wait_s"]["p95"] > args.queue_slo:
+        reasons.append(f"대기 p95 {summary['wait_s']['p95']:.0f}s > {args.queue_slo:g}s")
+    # 큐 누적: 도착 순서상 마지막 1/3 작업의 지연이 처음 1/3보다 계속 커지면 처리 능력 초과 (트레이스 없이도 보임)
+    ordered = [r.latency_s for r in sorted(completed, key=lambda r: r.sent_at)]
+    third = len(ordered) // 3
+    growth = (sum(ordered[-third:]) / sum(ordered[:third])) if third else None
+    summary["latency_growth"] = round(growth, 2) if growth else None
+    if growth and growth > args.growth_limit:
+        reasons.append(f"지연 증가 x{growth:.1f}")
+    summary["saturated"] = bool(reasons)
+    summary["saturation_reasons"] = reasons
+    return summary
+
+def print_step(summary: Dict[str, Any]):
+    latency, queue, wait = summary["latency_s"] or {}, summary["queue_s"] or {}, summary["wait_s"] or {}
+    print(f"📊 {summary['rate_rpm']:g}작업/분: 제출 {summary['submitted']}, 상태 {summary['statuses']}, "
+          f"처리량 {summary['throughput_rpm']:.2f}작업/분, 거절 {summary['rejection_rate']:.0%}, 오류 {summary['error_rate']:.0%}"
+          + (f" ⚠️ 포화 ({', '.join(summary['saturation_reasons'])})" if summary["saturated"] else ""))
+    if latency:
+        print("   지연 CDF(s): " + "  ".join(f"{k} {v:.1f}" for k, v in latency.items() if k.startswith("p")))
+    if queue:
+        print(f"   대기(s): p50 {wait['p50']:.1f}  p95 {wait['p95']:.1f}  max {wait['max']:.1f}  (큐 p95 {queue['p95']:.1f}"
+              + (f", GPU 슬롯 p95 {summary['gpu_wait_s']['p95']:.1f})" if summary["gpu_wait_s"] else ")"))
+
+async def fetch_brands(client: httpx.AsyncClient) -> List[str]:
+    try:
+        response = await client.get("/api/v1/brands/presets")
+        brands = response.json().get("supported_brands") if response.status_code == 200 else None
+    except (httpx.HTTPError, ValueError):
+        brands = None
+    return list(brands or FALLBACK_BRANDS)
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.http_timeout, limits=limits) as client:
+        health = await client.get("/health/ready")
+        if health.status_code != 200:
+            print(f"⚠️ 서버가 준비되지 않았습니다 (/health/ready {health.status_code}): {health.text[:200]}")
+        brands = await fetch_brands(client)
+        generator = LoadGenerator(client, args, mix, brands)
+        steps = []
+        for rate in args.rates:
+            records = await generator.run_step(rate)
+            summary = summarize(rate, records, args)
+            print_step(summary)
+            steps.append({"summary": summary, "jobs": [asdict(r) | {"latency_s": r.latency_s, "queue_s": r.queue_s, "wait_s": r.wait_s} for r in records]})
+            if summary["saturated"] and args.stop_on_saturation:
+                print("🛑 포화 감지: 이후 도착률은 건너뜁니다.")
+                break
+            if args.cooldown and rate != args.rates[-1]:
+                await asyncio.sleep(args.cooldown)
+    sustainable = [s["summary"]["rate_rpm"] for s in steps if not s["summary"]["saturated"]]
+    return {"steps": steps, "max_sustainable_rate_rpm": max(sustainable) if sustainable else None,
+            "first_saturated_rate_rpm": next((s["summary"]["rate_rpm"] for s in steps if s["summary"]["saturated"]), None)}
+
+def main():
+    parser = argparse.ArgumentParser(description="광고 생성 API 부하 테스트")
+    parser.add_argument("--base-url", default=os.getenv("AD_API_BASE_URL", "http://127.0.0.1:8000"), help="서버 주소")
+    parser.add_argument("--rates", default="1", help="도착률 목록 (작업/분, 쉼표 구분: 순서대로 단계 실행)")
+    parser.add_argument("--window", type=float, default=300.0, help="단계별 제출 시간 (초)")
+    parser.add_argument("--arrival", choices=("poisson", "uniform"), default="poisson", help="도착 간격 분포")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="요청 믹스 (차원=값:가중치,...;...) 차원: quality, duration, bgm(on/generative/off), engine, voice, brand")
+    parser.add_argument("--repeat-content", action="store_true", help="키워드에 작업 번호를 넣지 않음 (씬 캐시 적중 허용)")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="상태 폴링 간격 (초)")
+    parser.add_argument("--job-timeout", type=float, default=1800.0, help="접수 후 종료까지 기다릴 최대 시간 (초)")
+    parser.add_argument("--cancel-timeouts", action="store_true", help="시간 초과 작업을 DELETE로 취소")
+    parser.add_argument("--no-trace", dest="trace", action="store_false", help="종료 후 서버 트레이스 조회 생략")
+    parser.add_argument("--queue-slo", type=float, default=60.0, help="포화 판정 대기 지연 p95 기준 (초)")
+    parser.add_argument("--growth-limit", type=float, default=1.5, help="포화 판정 지연 증가 배율 (마지막 1/3 / 처음 1/3 작업 평균)")
+    parser.add_argument("--stop-on-saturation", action="store_true", help="포화 단계 이후 도착률 건너뜀")
+    parser.add_argument("--cooldown", type=float, default=0.0, help="단계 사이 대기 (초)")
+    parser.add_argument("--http-timeout", type=float, default=30.0, help="HTTP 요청 타임아웃 (초)")
+    parser.add_argument("--max-connections", type=int, default=100, help="HTTP 커넥션 풀 크기")
+    parser.add_argument("--seed", type=int, default=42, help="도착 간격/믹스 난수 시드")
+    parser.add_argument("--json", dest="json_path", help="결과 JSON 저장 경로 (작업별 타임라인 포함)")
+    args = parser.parse_args()
+    args.rates = [float(r) for r in args.rates.split(",") if r.strip()]
+    if not args.rates or min(args.rates) <= 0:
+        parser.error("--rates는 양수여야 합니다")
+
+    print(f"🚀 부하 테스트: {args.base_url}, 도착률 {args.rates}작업/분 x {args.window:g}초 ({args.arrival}), 믹스 '{args.mix}'")
+    started = time.perf_counter()
+    result = asyncio.run(run(args))
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{'작업/분':>8}{'제출':>6}{'완료':>6}{'처리량':>9}{'거절':>7}{'오류':>7}{'p50(s)':>9}{'p95(s)':>9}{'대기p95':>9}  포화")
+    for step in result["steps"]:
+        s = step["summary"]
+        latency, wait = s["latency_s"] or {}, s["wait_s"] or {}
+        print(f"{s['rate_rpm']:>8g}{s['submitted']:>6}{s['statuses'].get('completed', 0):>6}{s['throughput_rpm']:>9.2f}"
+              f"{s['rejection_rate']:>7.0%}{s['error_rate']:>7.0%}{latency.get('p50', 0):>9.1f}{latency.get('p95', 0):>9.1f}"
+              f"{wait.get('p95', 0):>9.1f}  {'⚠️' if s['saturated'] else '-'}")
+    if result["first_saturated_rate_rpm"] is not None:
+        print(f"📍 포화점: {result['max_sustainable_rate_rpm']}작업/분까지 유지, {result['first_saturated_rate_rpm']}작업/분에서 포화")
+    else:
+        print(f"📍 시험한 도착률에서 포화 없음 (최대 {result['max_sustainable_rate_rpm']}작업/분)")
+
+    if args.json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_path)), exist_ok=True)
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "benchmark": "load_generator", "created_at": datetime.now().isoformat(), "base_url": args.base_url,
+                "elapsed_s": round(elapsed, 1),
+                "config": {k: getattr(args, k) for k in ("rates", "window", "arrival", "mix", "repeat_content", "poll_interval",
+                                                           "job_timeout", "queue_slo", "growth_limit", "seed")},
+                **result
+            }, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_path}")
+
+if __name__ == "__main__":
+    main()
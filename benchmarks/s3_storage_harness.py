@@ -0,0 +1,271 @@
+# benchmarks/s3_storage_harness.py - S3 저장소 백엔드 점검 (로컬 S3 대역 서버: moto, 또는 MinIO 등 실제 엔드포인트)
+#
+# 사용법:
+#   python benchmarks/s3_storage_harness.py                                   # moto 서버를 띄워 점검 (pip install "moto[server]")
+#   python benchmarks/s3_storage_harness.py --endpoint-url http://127.0.0.1:9000 --bucket ai-ad-test   # MinIO 등 (자격 증명은 AWS_* 환경 변수)
+#   python benchmarks/s3_storage_harness.py --json generated/bench/s3_storage.json
+#
+# app.core.storage.S3Storage를 endpoint_url(경로 방식 주소)로 만들어 실제 HTTP 요청으로 다음 경로를 확인합니다:
+#   put_file 단일/멀티파트(upload_file), skip_existing, exists/read_bytes, 멀티파트 writer complete/abort(미완료 업로드 정리),
+#   TailUpload(쓰는 중인 파일 추적 업로드, SHA-256 일치), TailUpload abort, 사전 서명 URL 다운로드(Content-Disposition),
+#   다운로드 기록 왕복, UploadBatch, delete_prefix(1000개 초과 페이지 나눔).
+# 하나라도 실패하면 종료 코드 1을 반환합니다.
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import logging
+import hashlib
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Callable
+
+from _common import PROJECT_ROOT, git_commit
+
+sys.path.insert(0, PROJECT_ROOT)
+
+PART_BYTES = 5 * 1024 * 1024 # S3 최소 파트 크기 (S3Storage도 이보다 작게 만들지 않음)
+
+def start_moto_server(port: int):
+    """moto S3 대역 서버를 스레드로 시작 (더미 자격 증명). port 0이면 빈 포트 사용."""
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit('moto 서버가 필요합니다: pip install "moto[server]" (또는 --endpoint-url로 MinIO 지정)')
+    for name, value in (("AWS_ACCESS_KEY_ID", "testing"), ("AWS_SECRET_ACCESS_KEY", "testing"), ("AWS_DEFAULT_REGION", "us-east-1")):
+        os.environ.setdefault(name, value)
+    with socket.socket() as probe: # ThreadedMotoServer.start()는 포트가 사용 중이면 반환하지 않으므로 미리 확인
+        try:
+            probe.bind(("127.0.0.1", port))
+        except OSError:
+            sys.exit(f"포트 {port}가 사용 중입니다 (--port 0이면 빈 포트 사용)")
+        port = probe.getsockname()[1]
+    logging.getLogger("werkzeug").setLevel(logging.ERROR) # 요청별 접근 로그 숨김
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    return server, f"http://127.0.0.1:{port}"
+
+def write_random(path: str, size: int, seed: int) -> bytes:
+    data = hashlib.sha256(str(seed).encode()).digest() * (size // 32 + 1)
+    data = data[:size]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return data
+
+def build_checks(storage, root: str, delete_objects: int) -> Dict[str, Callable[[], str]]:
+    """점검 이름 → 함수 (실패 시 AssertionError, 성공 시 요약 문자열)."""
+    from concurrent.futures import ThreadPoolExecutor
+    from app.core import storage as storage_module
+    client, bucket = storage.client, storage.bucket
+    checks: Dict[str, Callable[[], str]] = {}
+
+    def put_small():
+        path = os.path.join(root, "tts", "narration.mp3")
+        data = write_random(path, 200 * 1024, 1)
+        stored = storage.put_file(path, content_type="audio/mpeg")
+        assert stored.key == "tts/narration.mp3" and stored.uploaded, stored
+        assert storage.exists(stored.key) and not storage.exists("tts/missing.mp3")
+        assert storage.read_bytes(stored.key) == data and storage.read_bytes("tts/missing.mp3") is None
+        head = client.head_object(Bucket=bucket, Key=storage.object_key(stored.key))
+        assert head["ContentType"] == "audio/mpeg", head["ContentType"]
+        again = storage.put_file(path, skip_existing=True)
+        assert not again.uploaded, "skip_existing인데 다시 업로드됨"
+        return f"{stored.size}B, skip_existing 확인"
+    checks["put_file.single"] = put_small
+
+    def put_multipart():
+        path = os.path.join(root, "scenes", "scene_1.mp4")
+        data = write_random(path, PART_BYTES * 2 + 12345, 2)
+        stored = storage.put_file(path, content_type="video/mp4")
+        head = client.head_object(Bucket=bucket, Key=storage.object_key(stored.key))
+        assert head["ContentLength"] == len(data), head["ContentLength"]
+        assert "-" in head["ETag"], f"멀티파트 ETag가 아님: {head['ETag']}"
+        assert storage.read_bytes(stored.key) == data
+        return f"{len(data) / 1024 / 1024:.1f}MB, ETag {head['ETag'].strip(chr(34))}"
+    checks["put_file.multipart"] = put_multipart
+
+    def writer_complete():
+        data = write_random(os.path.join(root, "writer.bin"), PART_BYTES * 2 + 777, 3)
+        writer = storage.open_writer("final/writer/stream.bin", "application/octet-stream")
+        for offset in range(0, len(data), 1024 * 1024): # 파트 크기보다 작은 조각으로 이어 쓰기
+            writer.write(data[offset:offset + 1024 * 1024])
+        stored = writer.complete()
+        assert stored.size == len(data) and storage.read_bytes(stored.key) == data
+        small = storage.open_writer("final/writer/small.json", "application/json") # 파트 하나 미만: 단일 PUT
+        small.write(b'{"ok": true}')
+        small.complete()
+        assert storage.read_bytes("final/writer/small.json") == b'{"ok": true}'
+        return "파트 3개 + 단일 PUT"
+    checks["writer.complete"] = writer_complete
+
+    def writer_abort():
+        writer = storage.open_writer("final/aborted/stream.bin")
+        writer.write(b"x" * (PART_BYTES + 10)) # 파트 하나를 올린 뒤 중단
+        writer.abort()
+        pending = client.list_multipart_uploads(Bucket=bucket, Prefix=storage.object_key("final/aborted/")).get("Uploads", [])
+        assert not pending, f"미완료 멀티파트 남음: {len(pending)}"
+        assert not storage.exists("final/aborted/stream.bin")
+        return "미완료 업로드 없음"
+    checks["writer.abort"] = writer_abort
+
+    def tail_upload():
+        path = os.path.join(root, "final", "tail", "final_ad.mp4")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tail = storage_module.TailUpload(storage, path, "final/tail/final_ad.mp4", "video/mp4", part_bytes=PART_BYTES)
+        result: Dict[str, Any] = {}
+        runner = threading.Thread(target=lambda: result.update(tail.run()))
+        runner.start()
+        written = hashlib.sha256()
+        with open(path, "wb") as f: # 인코더처럼 조금씩 덧붙이기
+            for i in range(24):
+                chunk = hashlib.sha256(f"tail-{i}".encode()).digest() * 16384 # 512KB
+                f.write(chunk)
+                f.flush()
+                written.update(chunk)
+                time.sleep(0.02)
+        tail.finish()
+        runner.join(60)
+        assert not runner.is_alive(), "TailUpload가 끝나지 않음"
+        assert not result.get("aborted") and result["sha256"] == written.hexdigest(), result
+        with open(path, "rb") as f:
+            assert storage.read_bytes(result["key"]) == f.read()
+        return f"{result['size'] / 1024 / 1024:.1f}MB, 첫 파트 {result['first_part_s']}초, 종료 후 {result['after_finish_s']}초"
+    checks["tail_upload"] = tail_upload
+
+    def tail_abort():
+        path = os.path.join(root, "final", "tail_abort", "final_ad.mp4")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tail = storage_module.TailUpload(storage, path, "final/tail_abort/final_ad.mp4", part_bytes=PART_BYTES)
+        result: Dict[str, Any] = {}
+        runner = threading.Thread(target=lambda: result.update(tail.run()))
+        runner.start()
+        write_random(path, PART_BYTES + 100, 4)
+        time.sleep(0.5) # 첫 파트 업로드 시작
+        tail.abort()
+        runner.join(60)
+        assert result.get("aborted"), result
+        pending = client.list_multipart_uploads(Bucket=bucket, Prefix=storage.object_key("final/tail_abort/")).get("Uploads", [])
+        assert not pending and not storage.exists("final/tail_abort/final_ad.mp4"), "중단한 업로드가 남음"
+        return "파트 폐기 확인"
+    checks["tail_upload.abort"] = tail_abort
+
+    def presign():
+        import httpx
+        data = b"presigned-download-check"
+        storage.put_bytes("final/presign/final_ad.mp4", data, "video/mp4")
+        url = storage.presigned_url("final/presign/final_ad.mp4", filename="나이키_광고.mp4", content_type="video/mp4")
+        response = httpx.get(url, timeout=10)
+        assert response.status_code == 200 and response.content == data, response.status_code
+        disposition = response.headers.get("content-disposition", "")
+        assert "filename*=" in disposition, disposition
+        return f"Content-Disposition: {disposition[:60]}"
+    checks["presigned_url"] = presign
+
+    def delivery_record():
+        record = {"key": "final/record/final_ad.mp4", "filename": "광고.mp4", "sha256": "0" * 64}
+        storage_module.write_delivery_record(storage, "record", record)
+        assert storage_module.read_delivery_record(storage, "record") == record
+        assert storage_module.read_delivery_record(storage, "missing") is None
+        return "왕복 일치"
+    checks["delivery_record"] = delivery_record
+
+    def upload_batch():
+        import asyncio
+        directory = os.path.join(root, "stream", "batch")
+        os.makedirs(directory, exist_ok=True)
+        for i in range(6):
+            write_random(os.path.join(directory, f"segment_{i}.m4s"), 64 * 1024, 10 + i)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            batch = storage_module.UploadBatch(storage, executor)
+            batch.submit_dir(directory)
+            summary = asyncio.run(batch.wait())
+        assert summary["objects"] == 6 and summary["uploaded"] == 6, summary
+        assert all(storage.exists(f"stream/batch/segment_{i}.m4s") for i in range(6))
+        return f"{summary['uploaded']}개 {summary['uploaded_bytes'] // 1024}KB"
+    checks["upload_batch"] = upload_batch
+
+    def delete_prefix():
+        from concurrent.futures import ThreadPoolExecutor as Pool
+        with Pool(max_workers=16) as pool: # 1000개 초과: list_objects_v2 페이지 나눔 + delete_objects 여러 번
+            list(pool.map(lambda i: client.put_object(Bucket=bucket, Key=storage.object_key(f"jobs/cleanup/{i:05d}.bin"), Body=b"x"),
+                          range(delete_objects)))
+        storage.put_bytes("jobs/cleanup_keep/keep.bin", b"keep") # 접두사가 비슷한 다른 작업은 남아야 함
+        deleted = storage.delete_prefix("jobs/cleanup/")
+        assert deleted == delete_objects, f"{deleted} != {delete_objects}"
+        remaining = client.list_objects_v2(Bucket=bucket, Prefix=storage.object_key("jobs/cleanup/")).get("KeyCount", 0)
+        assert remaining == 0 and storage.exists("jobs/cleanup_keep/keep.bin"), remaining
+        return f"{deleted}개 삭제"
+    checks["delete_prefix"] = delete_prefix
+    return checks
+
+def run_checks(checks: Dict[str, Callable[[], str]]) -> List[Dict[str, Any]]:
+    results = []
+    print(f"{'점검':<22}{'결과':>6}{'시간(초)':>10}  세부")
+    for name, check in checks.items():
+        started = time.perf_counter()
+        try:
+            detail, ok = check(), True
+        except Exception as e:
+            detail, ok = f"{type(e).__name__}: {e}", False
+        elapsed = time.perf_counter() - started
+        results.append({"name": name, "ok": ok, "elapsed_s": round(elapsed, 3), "detail": detail})
+        print(f"{name:<22}{'✅' if ok else '❌':>6}{elapsed:>10.2f}  {detail}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="S3 저장소 백엔드 점검 (moto/MinIO)")
+    parser.add_argument("--endpoint-url", help="S3 호환 엔드포인트 (미지정 시 moto 서버를 띄움)")
+    parser.add_argument("--port", type=int, default=0, help="moto 서버 포트 (0: 빈 포트)")
+    parser.add_argument("--bucket", default="ai-ad-harness", help="점검용 버킷 (없으면 생성)")
+    parser.add_argument("--prefix", default="harness", help="객체 키 접두사 (ARTIFACT_S3_PREFIX)")
+    parser.add_argument("--delete-objects", type=int, default=1005, help="delete_prefix 점검 객체 수 (1000 초과면 페이지 나눔)")
+    parser.add_argument("--keep", action="store_true", help="점검 후 접두사 아래 객체를 지우지 않음")
+    parser.add_argument("--json", dest="json_path", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    from app.core.storage import S3Storage, BOTO3_AVAILABLE
+    if not BOTO3_AVAILABLE:
+        sys.exit("boto3가 필요합니다: pip install boto3")
+    server = None
+    endpoint_url = args.endpoint_url
+    if not endpoint_url:
+        server, endpoint_url = start_moto_server(args.port)
+    root = tempfile.mkdtemp(prefix="s3_harness_")
+    prefix = f"{args.prefix}/{datetime.now().strftime('%Y%m%d_%H%M%S')}" # 실행마다 분리 (실제 버킷 재사용 시)
+    try:
+        storage = S3Storage(args.bucket, endpoint_url=endpoint_url, region=os.getenv("AWS_DEFAULT_REGION", "us-east-1"),
+                            prefix=prefix, part_bytes=PART_BYTES, root=root)
+        try:
+            storage.client.head_bucket(Bucket=args.bucket)
+        except Exception:
+            storage.client.create_bucket(Bucket=args.bucket)
+        print(f"🪣 {endpoint_url} / {args.bucket} / {prefix} ({'moto' if server else '외부 엔드포인트'})\n")
+        results = run_checks(build_checks(storage, root, args.delete_objects))
+        if not args.keep:
+            storage.delete_prefix("")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+        if server:
+            server.stop()
+
+    failed = [item["name"] for item in results if not item["ok"]]
+    if args.json_path:
+        report = {"created_at": datetime.now().isoformat(timespec="seconds"), "git_commit": git_commit(),
+                  "endpoint": "moto" if server else endpoint_url, "results": results}
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_path)), exist_ok=True)
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_path}")
+    if failed:
+        print(f"\n❌ 실패: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"\n✅ {len(results)}개 점검 통과")
+
+if __name__ == "__main__":
+    main()
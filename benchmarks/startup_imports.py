@@ -0,0 +1,100 @@
+# benchmarks/startup_imports.py - 서버 시작 시 모듈별 임포트 비용 측정
+#
+# 사용법:
+#   python benchmarks/startup_imports.py                  # main.py 임포트 비용 (상위 25개 모듈)
+#   python benchmarks/startup_imports.py --module app.utils.CogVideoX_2b_utils --top 40
+#   python benchmarks/startup_imports.py --json generated/bench/startup.json
+#
+# `python -X importtime`의 누적 시간을 최상위 패키지 단위로 합산하고, 전체 임포트 시간과 최대 RSS를 함께 기록합니다.
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Dict, Any, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 자식 프로세스에서 임포트 후 최대 RSS(KB) 출력 (resource는 유닉스 전용)
+_CHILD_CODE = """
+import importlib, sys
+importlib.import_module({module!r})
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+except ImportError:
+    rss_kb = -1
+print("__RSS_KB__", rss_kb)
+"""
+
+def run_importtime(module: str) -> Dict[str, Any]:
+    """자식 프로세스에서 모듈을 임포트하며 -X importtime 출력 수집."""
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD_CODE.format(module=module)],
+                            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    wall_s = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} 임포트 실패:\n{result.stderr[-2000:]}")
+
+    rss_kb = -1
+    for line in result.stdout.splitlines():
+        if line.startswith("__RSS_KB__"):
+            rss_kb = int(line.split()[1])
+
+    # 형식: "import time: self [us] | cumulative | imported package"
+    entries: List[Dict[str, Any]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2 # 들여쓰기 = 임포트 깊이
+        entries.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us), "depth": depth})
+
+    return {"module": module, "wall_s": wall_s, "max_rss_mb": rss_kb / 1024 if rss_kb > 0 else None, "entries": entries}
+
+def summarize(entries: List[Dict[str, Any]]) -> Dict[str, float]:
+    """최상위 패키지별 자체 임포트 시간 합계 (ms)."""
+    totals: Dict[str, float] = defaultdict(float)
+    for entry in entries:
+        totals[entry["module"].split(".")[0]] += entry["self_us"] / 1000
+    return dict(sorted(totals.items(), key=lambda kv: kv[1], reverse=True))
+
+def main():
+    parser = argparse.ArgumentParser(description="모듈별 임포트 시간 벤치마크")
+    parser.add_argument("--module", default="main", help="측정할 모듈 (기본: main)")
+    parser.add_argument("--top", type=int, default=25, help="출력할 상위 패키지 수")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 측정 횟수 (최소값 사용)")
+    parser.add_argument("--json", dest="json_path", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    runs = [run_importtime(args.module) for _ in range(max(1, args.repeat))]
+    best = min(runs, key=lambda r: r["wall_s"])
+    per_package = summarize(best["entries"])
+    total_ms = sum(per_package.values())
+
+    print(f"📦 {args.module} 임포트: 전체 {total_ms:.0f}ms (프로세스 {best['wall_s']:.2f}초, 최대 RSS {best['max_rss_mb'] or 0:.0f}MB)")
+    print(f"{'패키지':<32}{'ms':>10}{'비율':>8}")
+    for name, ms in list(per_package.items())[:args.top]:
+        print(f"{name:<32}{ms:>10.1f}{ms / total_ms * 100 if total_ms else 0:>7.1f}%")
+
+    if args.json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_path)), exist_ok=True)
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "module": args.module,
+                "python": sys.version.split()[0],
+                "total_import_ms": round(total_ms, 1),
+                "wall_s": [round(r["wall_s"], 3) for r in runs],
+                "max_rss_mb": best["max_rss_mb"],
+                "per_package_ms": {k: round(v, 1) for k, v in per_package.items()}
+            }, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_path}")
+
+if __name__ == "__main__":
+    main()
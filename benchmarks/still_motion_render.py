@@ -0,0 +1,116 @@
+# benchmarks/still_motion_render.py - 스틸 이미지 폴백 렌더링 CPU 비용 측정 (출력 1초당 렌더링 시간)
+#
+# 사용법:
+#   python benchmarks/still_motion_render.py                          # 3씬 x 10초, 720x480 24fps, oversample 1.0/1.5/2.0
+#   python benchmarks/still_motion_render.py --scenes 5 --duration 30 --fps 30 --size 1280x720
+#   python benchmarks/still_motion_render.py --json generated/bench/still_motion.json
+#
+# 비교 대상:
+#   legacy     - 기존 generate_video_from_image_and_audio 방식: 씬마다 -loop 1 + -tune stillimage (1024x1024, 움직임 없음, 씬별 FFmpeg 실행)
+#   kenburns@N - scene_graph.build_slideshow_graph: 모든 씬 zoompan + xfade를 FFmpeg 한 번으로 (N = zoompan 오버샘플 배율)
+# 합성 스틸(1024x1024 PNG)은 FFmpeg lavfi로 만들므로 네트워크/API가 필요 없습니다.
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+from typing import Dict, Any, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from app.core import scene_graph # noqa: E402
+from app.utils import ken_burns # noqa: E402
+
+_SOURCES = ("testsrc2", "mandelbrot", "smptehdbars", "cellauto", "life") # 씬마다 다른 디테일의 합성 이미지
+
+def make_stills(directory: str, count: int) -> List[str]:
+    """1024x1024 합성 스틸 PNG 생성 (DALL·E 출력과 같은 크기)."""
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"still_{i}.png")
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+                        "-i", f"{_SOURCES[i % len(_SOURCES)]}=size=1024x1024:rate=1",
+                        "-frames:v", "1", path], check=True)
+        paths.append(path)
+    return paths
+
+def _timed(commands: List[List[str]]) -> Dict[str, float]:
+    """명령들을 순서대로 실행하고 벽시계/자식 CPU 시간 측정."""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    for command in commands:
+        subprocess.run(command, check=True, capture_output=True)
+    wall_s = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {"wall_s": wall_s, "cpu_s": (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)}
+
+def legacy_commands(stills: List[str], scene_s: float, output_dir: str, preset: str) -> List[List[str]]:
+    return [[
+        "ffmpeg", "-y", "-loop", "1", "-i", path, "-c:v", "libx264", "-tune", "stillimage", "-preset", preset,
+        "-pix_fmt", "yuv420p", "-t", str(scene_s), "-vf", "scale=1024:1024", os.path.join(output_dir, f"legacy_{i}.mp4")
+    ] for i, path in enumerate(stills)]
+
+def kenburns_command(stills: List[str], scene_s: float, settings: scene_graph.CompositionSettings,
+                     motion: ken_burns.MotionSettings, output_path: str, preset: str) -> List[str]:
+    input_args, graph = scene_graph.build_slideshow_graph(stills, [scene_s] * len(stills), settings, motion)
+    total_s = scene_s * len(stills)
+    return ["ffmpeg", "-y", *input_args, "-filter_complex", graph, "-map", "[video_out]",
+            "-c:v", "libx264", "-preset", preset, "-crf", "23", "-t", str(total_s), output_path]
+
+def main():
+    parser = argparse.ArgumentParser(description="스틸 이미지 폴백 렌더링 벤치마크")
+    parser.add_argument("--scenes", type=int, default=3, help="씬 수")
+    parser.add_argument("--duration", type=float, default=30.0, help="전체 광고 길이 (초)")
+    parser.add_argument("--size", default="720x480", help="Ken Burns 출력 해상도")
+    parser.add_argument("--fps", type=float, default=ken_burns.DEFAULT_FPS, help="Ken Burns 출력 프레임레이트")
+    parser.add_argument("--oversample", type=float, nargs="+", default=[1.0, 1.5, 2.0], help="비교할 zoompan 오버샘플 배율")
+    parser.add_argument("--preset", default="medium", help="x264 프리셋 (최종 합성과 같은 medium 기본)")
+    parser.add_argument("--repeat", type=int, default=2, help="반복 측정 횟수 (최소값 사용)")
+    parser.add_argument("--json", dest="json_path", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    scene_s = args.duration / args.scenes
+    settings = scene_graph.CompositionSettings(width=width, height=height, fps=args.fps)
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="still_bench_") as tmp:
+        stills = make_stills(tmp, args.scenes)
+        variants = [("legacy", legacy_commands(stills, scene_s, tmp, args.preset))]
+        for oversample in args.oversample:
+            motion = ken_burns.MotionSettings(oversample=oversample)
+            variants.append((f"kenburns@{oversample:g}", [kenburns_command(
+                stills, scene_s, settings, motion, os.path.join(tmp, f"kenburns_{oversample:g}.mp4"), args.preset)]))
+
+        for name, commands in variants:
+            best = min((_timed(commands) for _ in range(max(1, args.repeat))), key=lambda r: r["wall_s"])
+            results.append({
+                "variant": name,
+                "ffmpeg_runs": len(commands),
+                "wall_s": round(best["wall_s"], 3),
+                "cpu_s": round(best["cpu_s"], 3),
+                "render_s_per_output_s": round(best["wall_s"] / args.duration, 4), # 출력 1초당 렌더링 시간
+                "cpu_s_per_output_s": round(best["cpu_s"] / args.duration, 4),
+                "realtime_factor": round(args.duration / best["wall_s"], 1) if best["wall_s"] else None
+            })
+
+    print(f"🎞️ 스틸 폴백 렌더링: {args.scenes}씬 x {scene_s:.1f}초, Ken Burns {args.size} {args.fps:g}fps, x264 {args.preset} (CPU {os.cpu_count()}코어)")
+    print(f"{'방식':<16}{'실행':>6}{'벽시계(s)':>12}{'CPU(s)':>10}{'출력1초당(s)':>14}{'실시간배':>10}")
+    for r in results:
+        print(f"{r['variant']:<16}{r['ffmpeg_runs']:>6}{r['wall_s']:>12.2f}{r['cpu_s']:>10.2f}{r['render_s_per_output_s']:>14.3f}{r['realtime_factor'] or 0:>10.1f}")
+
+    if args.json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_path)), exist_ok=True)
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "scenes": args.scenes, "duration_s": args.duration, "size": args.size, "fps": args.fps,
+                "preset": args.preset, "cpu_count": os.cpu_count(), "results": results
+            }, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_path}")
+
+if __name__ == "__main__":
+    main()
@@ -7,20 +7,9 @@
 from dotenv import load_dotenv
 load_dotenv() # .env 파일 로드: 환경변수 (API 키 등) 불러옴.
 
-# PyTorch CUDA 메모리 관리 설정: GPU 메모리 단편화 방지, 대용량 모델 로드 시 유리.
-import os
-os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"
-print("✅ DEBUG: PYTORCH_CUDA_ALLOC_CONF=expandable_segments:True 환경 변수가 설정되었습니다.")
-
-# OpenAI API Key 로드 확인: 디버깅용, 키가 제대로 설정됐는지 즉시 체크.
-_debug_api_key = os.getenv("OPENAI_API_KEY")
-if _debug_api_key:
-    print(f"✅ DEBUG: OpenAI API Key가 환경 변수에서 성공적으로 로드되었습니다!")
-    print(f"DEBUG: 키 시작 부분: {_debug_api_key[:5]}...")
-else:
-    print(f"❌ DEBUG: OpenAI API Key가 환경 변수에서 로드되지 않았습니다.")
-
 # 표준 라이브러리 임포트: Python 기본 기능 모듈들.
+# (CUDA 환경 변수 및 torch/diffusers 등 무거운 ML 모듈은 필요한 워커에서 지연 설정/로드)
+import os # 환경 변수 및 경로
 import sys # 시스템 관련 기능 (경로 조작 등)
 import uuid # 고유 ID 생성 (작업 ID에 활용)
 import asyncio # 비동기 처리 지원
@@ -29,6 +18,10 @@ import json # JSON 데이터 처리
 import math # 수학 함수 (나눗셈 올림 등)
 import time # 시간 관련 (지연 등)
 import shutil # 파일/디렉토리 복사/삭제
+import threading # 지연 로드 동기화
+import importlib.util # 모듈 설치 여부 확인 (임포트 없이)
+import re # 파일명 검증
+import ast # Whisper 모델 목록을 임포트 없이 패키지 소스에서 읽기
 
 from pathlib import Path # 파일 시스템 경로 객체 지향적 처리
 from datetime import datetime # 날짜/시간 처리
@@ -39,7 +32,7 @@ from pydantic import BaseModel, Field # 데이터 유효성 검사, API 요청/
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Request # 웹 API 프레임워크 핵심, 예외, 백그라운드 작업, 요청 객체
 from fastapi.middleware.cors import CORSMiddleware # CORS (교차 출처 자원 공유) 설정
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse # API 응답 타입
+from fastapi.responses import JSONResponse, HTMLResponse, FileResponse, RedirectResponse, Response # API 응답 타입
 from fastapi.templating import Jinja2Templates # HTML 템플릿 렌더링
 
 # 로컬 애플리케이션 모듈 임포트: 프로젝트 내부의 사용자 정의 모듈.
@@ -49,31 +42,82 @@ if str(current_dir) not in sys.path:
 if str(current_dir / "app") not in sys.path:
     sys.path.insert(0, str(current_dir / "app")) # 'app' 서브디렉토리를 Python 검색 경로에 추가 (모듈 임포트 위함)
 
-# CogVideoX-2b 유틸리티 임포트 및 가용성 플래그 설정: T2V 모델 관련 모듈 로드, 성공 여부 플래그 세팅.
-try:
-    import app.utils.CogVideoX_2b_utils as cog_utils # 모듈 자체를 임포트하고 별칭 부여
-    
-    # 이제 CogVideoXGenerator, check_cogvideox_installation 등은 cog_utils. 로 접근합니다.
-    # COGVIDEODX_AVAILABLE 등의 플래그는 cog_utils 모듈 내부에 정의된 것을 사용합니다.
-    COGVIDEODX_AVAILABLE = cog_utils.COGVIDEODX_AVAILABLE # CogVideoX-2b 모델 사용 가능 여부 플래그
-    BGM_GENERATION_AVAILABLE = cog_utils.BGM_GENERATION_AVAILABLE # BGM 생성 가능 여부 플래그
-    RIFFUSION_PIPELINE_AVAILABLE = cog_utils.RIFFUSION_PIPELINE_AVAILABLE # Riffusion 파이프라인 사용 가능 여부 플래그
-    
-    print("✅ CogVideoX-2b utils 모듈 로드 성공")
-except ImportError as e:
-    # 모듈 로드 실패 시 관련 기능 모두 비활성화 및 안내 메시지 출력.
-    COGVIDEODX_AVAILABLE = False # CogVideoX-2b 기능 비활성화
-    BGM_GENERATION_AVAILABLE = False # BGM 생성 기능 비활성화
-    RIFFUSION_PIPELINE_AVAILABLE = False # Riffusion 파이프라인 비활성화
-    print(f"❌ CogVideoX-2b utils 모듈 로드 실패: {e}")
-    print("📌 CogVideoX-2b 기능 없이 기본 이미지+오디오 합성 모드로 실행됩니다.")
-
-# Riffusion BGM 기능 최종 가용성 플래그: Riffusion 파이프라인과 BGM 생성이 모두 가능할 때 활성화.
+# CogVideoX-2b 유틸리티 지연 로드: torch/diffusers/transformers는 영상 생성 워커가 처음 필요로 할 때만 임포트.
+# API 전용 노드는 FastAPI + pydantic만으로 시작하며, 시작 시 가용성 플래그는 패키지 설치 여부로만 판단합니다.
+cog_utils = None # 로드된 app.utils.CogVideoX_2b_utils 모듈 (지연 로드)
+_cog_utils_lock = threading.Lock() # 동시 요청의 중복 로드 방지
+_cog_utils_load_error: Optional[str] = None # 로드 실패 사유
+
+def _modules_installed(*names: str) -> bool:
+    return all(importlib.util.find_spec(name) is not None for name in names)
+
+COGVIDEODX_AVAILABLE = _modules_installed("torch", "diffusers", "imageio", "imageio_ffmpeg") # CogVideoX-2b 의존성 설치 여부 (로드 후 갱신)
+RIFFUSION_PIPELINE_AVAILABLE = _modules_installed("diffusers") # Riffusion 파이프라인 사용 가능 여부 (로드 후 갱신)
+BGM_GENERATION_AVAILABLE = RIFFUSION_PIPELINE_AVAILABLE # BGM 생성 가능 여부 (저장은 audio_utils의 wave 대체 경로 사용, 로드 후 갱신)
+IMAGE_ENGINE_AVAILABLE = _modules_installed("openai", "httpx") # 스틸 + Ken Burns 영상 방식 (DALL·E 이미지 엔진) 의존성 설치 여부
+
+# 시작 시 ML 모듈 선로드 여부: GPU 워커 노드는 AD_PRELOAD_ML=1로 첫 요청 지연을 없앨 수 있음 (백그라운드 스레드에서 로드).
+PRELOAD_ML_MODULES = os.getenv("AD_PRELOAD_ML", "0") == "1"
+
+def load_cog_utils():
+    """CogVideoX-2b 유틸리티 지연 로드: CUDA 환경 설정 후 임포트하고 가용성 플래그를 실제 값으로 갱신."""
+    global cog_utils, _cog_utils_load_error, COGVIDEODX_AVAILABLE, BGM_GENERATION_AVAILABLE, RIFFUSION_PIPELINE_AVAILABLE, RIFFUSION_AVAILABLE
+    with _cog_utils_lock:
+        if cog_utils is not None or _cog_utils_load_error is not None: # 이미 로드(또는 실패)했으면 재시도하지 않음
+            return cog_utils
+        # PyTorch CUDA 메모리 관리 설정: torch 임포트 전에 지정해야 적용됨 (GPU 메모리 단편화 방지).
+        os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+        started = time.perf_counter()
+        try:
+            import app.utils.CogVideoX_2b_utils as module # 모듈 자체를 임포트
+        except ImportError as e:
+            # 모듈 로드 실패 시 관련 기능 모두 비활성화 및 안내 메시지 출력.
+            _cog_utils_load_error = str(e)
+            COGVIDEODX_AVAILABLE = False # CogVideoX-2b 기능 비활성화
+            BGM_GENERATION_AVAILABLE = False # BGM 생성 기능 비활성화
+            RIFFUSION_PIPELINE_AVAILABLE = False # Riffusion 파이프라인 비활성화
+            RIFFUSION_AVAILABLE = False
+            print(f"❌ CogVideoX-2b utils 모듈 로드 실패: {e}")
+            print("📌 CogVideoX-2b 기능 없이 기본 이미지+오디오 합성 모드로 실행됩니다.")
+            return None
+        # COGVIDEODX_AVAILABLE 등의 플래그는 cog_utils 모듈 내부에 정의된 것을 사용합니다.
+        COGVIDEODX_AVAILABLE = module.COGVIDEODX_AVAILABLE
+        BGM_GENERATION_AVAILABLE = module.BGM_GENERATION_AVAILABLE
+        RIFFUSION_PIPELINE_AVAILABLE = module.RIFFUSION_PIPELINE_AVAILABLE
+        RIFFUSION_AVAILABLE = RIFFUSION_PIPELINE_AVAILABLE and BGM_GENERATION_AVAILABLE
+        cog_utils = module
+        print(f"✅ CogVideoX-2b utils 모듈 지연 로드 완료 ({time.perf_counter() - started:.1f}초, Riffusion BGM: {RIFFUSION_AVAILABLE})")
+        return cog_utils
+
+# 작업 취소/데드라인 관리 모듈: 모든 단계(LLM, TTS, 디노이징, BGM, FFmpeg)에 취소 신호 전파.
+from app.core.task_control import TaskContext, TaskCancelledError, remove_artifact_dirs, build_cancellation_report
+# 산출물 수명 관리: 파일별 크기/마지막 접근 인덱스, 풀별 용량 한도(LRU)·TTL 정리, 중간 산출물 해제.
+from app.core.artifacts import ArtifactManager, TASK_KINDS
+# 어드미션 컨트롤: 단계별 실측 비용으로 GPU 백로그를 추적하고 예산 초과 시 부하 차단.
+from app.core.admission import AdmissionController, StageTimingHistory
+# 기능 가용성 레지스트리: FFmpeg/Whisper/librosa를 시작 시 한 번 조사하고 TTL 주기로 백그라운드 갱신.
+from app.core.capabilities import CapabilityRegistry, module_probe
+# 오디오 믹서: EBU R128 라우드니스 측정(사이드카 캐시) + 사이드체인 더킹 필터 그래프 생성 (표준 라이브러리만 사용).
+from app.utils import audio_mixer
+# 길이 정렬 엔진: 실측 나레이션/영상 길이로 atempo·리드인·영상 리타이밍을 계획해 최종 합성 그래프에 삽입.
+from app.utils import timing
+# 멀티 씬 구성: 씬 모델, 씬 단위 클립/나레이션 캐시, 단일 FFmpeg 합성 그래프(xfade 전환 + 씬별 나레이션 배치).
+from app.core import scene_graph
+# Ken Burns 모션: GPU 없는 노드에서 스틸 이미지를 zoompan으로 움직이는 영상으로 (scene_graph 합성에 포함).
+from app.utils import ken_burns
+# 이미지 후처리: 썸네일/WebP·AVIF 변형 생성(Pillow 프로세스 풀) + 지각 해시 중복 제거 저장소 (콘텐츠 주소로 제공).
+from app.utils import image_derivatives
+# 산출물 전송 계층: 완료 시 사전 계산한 메타데이터 인덱스 + 강한 ETag/304 + Range + 제로 카피 전송.
+from app.core import delivery
+# 적응형 스트리밍 패키징: 최종 합성 그래프에서 분기한 HLS/DASH 렌디션 (CMAF 세그먼트 공유).
+from app.utils import streaming
+# 산출물 저장소 (로컬 / S3 호환): 업로드, 사전 서명 다운로드 URL
+from app.core import storage
+# 단계 추적(스팬) 및 메트릭 레지스트리
+from app.core import tracing, metrics
+
+# Riffusion BGM 기능 최종 가용성 플래그: Riffusion 파이프라인과 BGM 생성이 모두 가능할 때 활성화 (로드 후 갱신).
 RIFFUSION_AVAILABLE = RIFFUSION_PIPELINE_AVAILABLE and BGM_GENERATION_AVAILABLE # Riffusion BGM 최종 가용성
-if RIFFUSION_AVAILABLE:
-    print("✅ Riffusion BGM 기능이 활성화되었습니다.")
-else:
-    print("⚠️ Riffusion BGM 기능은 비활성화되었습니다. FFmpeg 기반 향상된 BGM을 사용합니다.")
 
 # ─────────────────────────────────────────────
 # 2) FastAPI 애플리케이션 초기화 (모든 라우트/핸들러 함수보다 먼저 정의되어야 함)
@@ -108,12 +152,133 @@ app.add_middleware(
 def update_task_status(task_id: str, **kwargs):
     """안전한 task 상태 업데이트"""
     if task_id in tasks_storage:
+        if "estimated_completion" not in kwargs and kwargs.get("status") not in ("completed", "failed", "cancelled"):
+            eta = admission_controller.estimated_completion(task_id) # 남은 단계 실측 비용 기반 예상 완료 시각
+            if eta:
+                kwargs["estimated_completion"] = eta
         tasks_storage[task_id].update(kwargs) # 작업 상태 정보 업데이트
         print(f"📊 Task {task_id[:8]}: {kwargs.get('current_step', 'Unknown')} ({kwargs.get('progress', 0)}%)") # 콘솔에 진행 상황 출력
 
 # 비동기 작업 저장소: 현재 진행 중인 작업들의 상태와 결과를 저장하는 딕셔너리.
 tasks_storage: Dict[str, Dict[str, Any]] = {} # 작업 ID를 키로, 작업 상태 딕셔너리를 값으로 저장
 
+# 실행 중인 작업의 취소/데드라인 컨텍스트: 작업 ID → TaskContext
+task_contexts: Dict[str, TaskContext] = {}
+DEFAULT_TASK_DEADLINE_SECONDS = int(os.getenv("AD_TASK_DEADLINE_SECONDS", "1800")) # 요청별 기본 데드라인 (초)
+
+# 어드미션 컨트롤러: 미처리 GPU 초가 예산을 넘으면 Retry-After와 함께 요청 거절.
+admission_controller = AdmissionController(
+    max_backlog_gpu_seconds=float(os.getenv("ADMISSION_MAX_BACKLOG_GPU_SECONDS", "3600")), # 허용 GPU 백로그 (초)
+    gpu_slots=int(os.getenv("ADMISSION_GPU_SLOTS", "1")), # 동시에 실행할 GPU 작업 수
+    history=StageTimingHistory(os.path.join(os.getcwd(), "generated", "stage_timings.json")) # 단계별 실측 이력
+)
+
+# 기능 가용성 레지스트리: 헬스 체크와 엔드포인트는 캐시된 조사 결과만 읽음 (조사 함수는 아래 6) 섹션에서 등록)
+capability_registry = CapabilityRegistry(ttl_seconds=float(os.getenv("CAPABILITY_PROBE_TTL_SECONDS", "300")))
+
+# 다운로드 메타데이터 인덱스: 작업 ID/콘텐츠 주소 → 크기·수정 시각·내용 해시 (요청마다 파일 시스템 조회 없음)
+media_index = delivery.MediaIndex()
+
+def download_filename(task: Dict[str, Any], task_id: str) -> str:
+    """다운로드 파일명 (브랜드_길이sec_ad_작업ID.mp4)."""
+    return f"{task['request_data']['brand']}_{task['request_data']['duration']}sec_ad_{task_id[:8]}.mp4"
+
+def get_task_artifact_dirs(task_id: str) -> List[str]:
+    """작업이 생성하는 모든 산출물 디렉토리 목록."""
+    return [os.path.join(os.getcwd(), "generated", kind, task_id) for kind in TASK_KINDS]
+
+def on_task_artifacts_evicted(task_id: str):
+    """용량 한도/TTL로 작업 산출물이 정리됨: 다운로드 인덱스 무효화 및 작업 기록에 표시 (정리 스레드에서 호출)."""
+    media_index.invalidate(task_id)
+    media_index.invalidate_prefix(f"stream/{task_id}/")
+    if task_id in tasks_storage:
+        tasks_storage[task_id]["artifacts_evicted_at"] = datetime.now().isoformat()
+
+# 산출물 관리자: 진행 중인 작업은 정리하지 않음. 테스트 음성(test_audio)과 목업 클라이언트 출력(data/output)은 TTL 정리
+artifact_manager = ArtifactManager(
+    generated_dir=os.path.join(os.getcwd(), "generated"),
+    scene_cache_dir=scene_graph.SCENE_CACHE_DIR,
+    scratch_dirs=[os.path.join(os.getcwd(), "test_audio"), os.path.join(os.getcwd(), "data", "output")],
+    is_pinned=lambda task_id: task_id in task_contexts and not task_contexts[task_id].finished,
+    on_evict=on_task_artifacts_evicted
+)
+# 산출물 저장소: ARTIFACT_STORAGE=s3면 모든 산출물을 버킷에 올리고 다운로드는 사전 서명 URL로 리다이렉트 (API/GPU 노드 분리)
+artifact_store = storage.get_storage()
+delivery_records: Dict[str, Dict[str, Any]] = {} # 작업 ID → 다운로드 기록 (원격 저장소에서 읽은 것 캐시, 완료 후 바뀌지 않음)
+MAX_DELIVERY_RECORDS = 4096
+
+async def get_delivery_record(task_id: str) -> Optional[Dict[str, Any]]:
+    """원격 저장소의 최종 영상/스트리밍 키. 이 노드의 작업 기록 → 캐시 → 저장소 순으로 조회 (다른 노드가 렌더링한 작업 포함)."""
+    task = tasks_storage.get(task_id)
+    if task is not None:
+        if task.get("status") != "completed":
+            raise HTTPException(status_code=400, detail="작업이 완료되지 않았습니다.")
+        if "final_video" in task["result"]["content"]:
+            return {"key": artifact_store.key_for(task["result"]["content"]["final_video"]), "filename": download_filename(task, task_id),
+                    "media_type": "video/mp4", "streams": {fmt: f"streams/{task_id}/{url.rsplit('/', 1)[-1]}"
+                                                            for fmt, url in task["result"]["content"].get("streams", {}).items()}}
+    if task_id not in delivery_records:
+        record = await asyncio.to_thread(storage.read_delivery_record, artifact_store, task_id)
+        if record is None:
+            return None
+        if len(delivery_records) >= MAX_DELIVERY_RECORDS:
+            delivery_records.pop(next(iter(delivery_records)))
+        delivery_records[task_id] = record
+    return delivery_records[task_id]
+
+def delete_remote_task_artifacts(task_id: str) -> int:
+    """원격 저장소의 작업 산출물 삭제 (씬 캐시 객체는 작업 간 공유이므로 유지). 삭제한 객체 수 반환."""
+    delivery_records.pop(task_id, None)
+    if not artifact_store.remote:
+        return 0
+    return sum(artifact_store.delete_prefix(f"{kind}/{task_id}/") for kind in TASK_KINDS)
+
+ARTIFACT_GC_INTERVAL_SECONDS = float(os.getenv("ARTIFACT_GC_INTERVAL_SECONDS", "600")) # 정리 주기
+RELEASE_INTERMEDIATES = os.getenv("ARTIFACT_RELEASE_INTERMEDIATES", "1") == "1" # 최종 렌더링 확정 후 작업별 중간 산출물 삭제
+
+# /metrics 게이지: 스크레이프 시점에 메모리 상태에서 채움 (파일 시스템 순회/GPU 동기화 없음)
+JOB_STATES = ("queued", "processing", "completed", "failed", "cancelled")
+JOBS = metrics.REGISTRY.gauge("ad_jobs", "Ad generation jobs known to this node by state.", ("state",))
+JOBS_FINISHED = metrics.REGISTRY.counter("ad_jobs_finished_total", "Ad generation jobs finished by final status (throughput).", ("status",))
+ADMISSION_BACKLOG = metrics.REGISTRY.gauge("ad_admission_backlog_gpu_seconds", "Estimated GPU seconds still owed to admitted jobs.")
+ADMISSION_TASKS = metrics.REGISTRY.gauge("ad_admission_admitted_tasks", "Jobs holding an admission ticket (queued or running).")
+GPU_RUNNING = metrics.REGISTRY.gauge("ad_gpu_jobs_running", "Jobs currently holding a GPU slot.")
+ARTIFACT_BYTES = metrics.REGISTRY.gauge("ad_artifact_bytes", "Disk usage of generated/ artifacts by pool (artifact index).", ("pool",))
+ARTIFACT_FILES = metrics.REGISTRY.gauge("ad_artifact_files", "Indexed artifact files by pool.", ("pool",))
+DISK_FREE = metrics.REGISTRY.gauge("ad_disk_free_bytes", "Free space on the generated/ filesystem.")
+DEVICE_MEMORY = metrics.REGISTRY.gauge("ad_device_memory_bytes", "GPU memory by device and kind (allocated, reserved, max_allocated).", ("device", "kind"))
+PROCESS_PEAK_RSS = metrics.REGISTRY.gauge("process_resident_memory_peak_bytes", "Peak resident set size of the API process.")
+
+def collect_runtime_metrics():
+    """작업 상태/어드미션/디스크/메모리 게이지 갱신 (메트릭 수집기)."""
+    counts = dict.fromkeys(JOB_STATES, 0)
+    for task in list(tasks_storage.values()):
+        status = task.get("status", "unknown")
+        counts[status] = counts.get(status, 0) + 1
+    for state, count in counts.items():
+        JOBS.set(count, state=state)
+    admission = admission_controller.snapshot()
+    ADMISSION_BACKLOG.set(admission["outstanding_gpu_seconds"])
+    ADMISSION_TASKS.set(admission["admitted_tasks"])
+    GPU_RUNNING.set(admission["gpu_running"])
+    usage = artifact_manager.usage()
+    for pool, report in usage["pools"].items():
+        ARTIFACT_BYTES.set(report["used_bytes"], pool=pool)
+        ARTIFACT_FILES.set(report["files"], pool=pool)
+    if usage["disk_free_mb"] is not None:
+        DISK_FREE.set(usage["disk_free_mb"] * 1024 * 1024)
+    if cog_utils is not None: # torch는 영상 모듈이 로드된 뒤에만 조회 (스크레이프가 CUDA 초기화를 유발하지 않도록)
+        for device, memory in cog_utils.get_device_memory_bytes().items():
+            for kind, value in memory.items():
+                DEVICE_MEMORY.set(value, device=device, kind=kind)
+    try:
+        import resource # Unix 전용
+        PROCESS_PEAK_RSS.set(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024) # Linux: KB 단위
+    except ImportError:
+        pass
+
+metrics.REGISTRY.register_collector(collect_runtime_metrics)
+
 # AI 워크플로우 지연 초기화 관련 변수: 필요할 때까지 AI 모델 로딩을 미룸.
 ai_workflow = None # AI 워크플로우 인스턴스
 WORKFLOW_AVAILABLE = False # AI 워크플로우 사용 가능 여부 플래그
@@ -151,7 +316,9 @@ async def get_openai_client(): # 비동기 함수로 정의
         import openai # openai 라이브러리 임포트
         api_key = os.getenv("OPENAI_API_KEY") # 환경 변수에서 API 키 로드
         if not api_key:
+            print("❌ OpenAI API Key가 환경 변수에서 로드되지 않았습니다.")
             raise Exception("OpenAI API 키가 설정되지 않았습니다.") # 키 없으면 에러 발생
+        print(f"✅ OpenAI API Key 확인: {api_key[:5]}...") # 첫 클라이언트 생성 시 한 번만 출력
         _openai_client = openai.AsyncOpenAI(api_key=api_key) # AsyncOpenAI로 비동기 클라이언트 생성
     return _openai_client # 생성된(또는 기존) 클라이언트 반환
 
@@ -206,7 +373,10 @@ def get_complete_ad_concept_prompt(brand, keywords, target_audience, style_prefe
 반드시 다음 JSON 형식으로 응답하며, 아래의 모든 지시사항을 철저히 따르세요:
 {{
     "narration": "{brand} 브랜드명 포함한 {duration}초 길이의 상세하고 매력적인 나레이션. 나레이션 내용은 **반드시 한국어로만 작성하고**, {duration}초를 충분히 채울 수 있도록 길이를 조절해주세요.",
-    "visual_description": "{brand} 제품이 첫 장면부터 명확히 나오는 구체적인 영어 영상 설명 (Visual description is for AI video generation, so it must be clear, specific, and in English. Ensure it captures the core concepts and brand identity, especially the product's early appearance.)"
+    "visual_description": "{brand} 제품이 첫 장면부터 명확히 나오는 구체적인 영어 영상 설명 (Visual description is for AI video generation, so it must be clear, specific, and in English. Ensure it captures the core concepts and brand identity, especially the product's early appearance.)",
+    "scenes": [
+        {{"name": "짧은 씬 이름", "duration": 씬 길이(초, 숫자), "visual_description": "이 씬의 구체적인 영어 영상 설명", "narration": "이 씬 구간에 읽을 한국어 나레이션"}}
+    ]
 }}
 
 핵심 요구사항:
@@ -216,6 +386,7 @@ def get_complete_ad_concept_prompt(brand, keywords, target_audience, style_prefe
 4. 첫 3초 안에 {brand} 제품/브랜드가 명확히 노출되도록 영상 설명을 구성해야 합니다.
 5. {keywords}와 직접 연관된 핵심 기능/상황을 나레이션과 영상 설명에 모두 포함하세요.
 6. 제품 중심의 간결하면서도 임팩트 있는 구성을 유지하되, 나레이션 길이를 충분히 확보하세요.
+7. scenes는 광고를 3개의 씬으로 나눈 스토리보드입니다. 씬 duration의 합은 {duration}초이며, 씬별 narration을 이어 붙이면 전체 narration이 되도록 작성하세요. 첫 씬의 visual_description에서 {brand} 제품이 바로 보여야 합니다.
 
 Brand-specific optimization examples:
 - Apple iPhone: "iPhone in hands from first frame, premium design closeup, iOS interface interaction, Apple logo prominent"
@@ -250,17 +421,17 @@ def optimize_zeroscope_prompt_enhanced(brand, visual_description, keywords, styl
             primary_visual = f"{brand_name} vehicle prominently displayed from first frame"
             brand_elements = f"{brand_name} logo clearly visible on vehicle, sleek car design"
             product_actions = "car driving, interior features, vehicle exterior showcase"
-        elif any(keyword in brand_lower for word in ['graphics', 'gpu', 'nvidia', '엔디비아', 'rtx', 'gaming']):
+        elif any(keyword in brand_lower for keyword in ['graphics', 'gpu', 'nvidia', '엔디비아', 'rtx', 'gaming']):
             product_type = "technology"
             primary_visual = f"{brand_name} graphics card prominently displayed from first frame"
             brand_elements = f"{brand_name} logo clearly visible, high-tech gaming setup"
             product_actions = "graphics card installation, gaming performance, RGB lighting"
-        elif any(keyword in brand_lower for word in ['food', 'restaurant', 'mcdonald', '맥도날드', 'kfc', 'burger']):
+        elif any(keyword in brand_lower for keyword in ['food', 'restaurant', 'mcdonald', '맥도날드', 'kfc', 'burger']):
             product_type = "food"
             primary_visual = f"{brand_name} food product prominently displayed from first frame"
             brand_elements = f"{brand_name} logo clearly visible, appetizing food presentation"
             product_actions = "food preparation, eating scene, product showcase"
-        elif any(keyword in brand_lower for word in ['cosmetic', 'beauty', 'makeup', 'skincare', '화장품', '뷰티']):
+        elif any(keyword in brand_lower for keyword in ['cosmetic', 'beauty', 'makeup', 'skincare', '화장품', '뷰티']):
             product_type = "beauty"
             primary_visual = f"{brand_name} beauty product prominently displayed from first frame"
             brand_elements = f"{brand_name} logo clearly visible on packaging, elegant product design"
@@ -319,6 +490,7 @@ def optimize_zeroscope_prompt_enhanced(brand, visual_description, keywords, styl
     if len(optimized_prompt) > 450: # 프롬프트 길이가 너무 길면 핵심 요소만 남김
         essential_elements = [
             brand_info['primary_visual'],
+            visual_description[:200], # 장면 설명은 유지 (씬마다 다른 클립이 나오도록)
             brand_info['brand_elements'],
             brand_info['brand_keywords'],
             style_tech,
@@ -376,8 +548,9 @@ BRAND_PRESETS = {
 }
 
 # 이미지+오디오 합성 함수: T2V 모델(CogVideoX) 실패 시 폴백으로 사용. FFmpeg 활용.
-def generate_video_from_image_and_audio(image_path: str, audio_path: str, output_dir: str):
-    """이미지 파일과 오디오 파일 결합해 MP4 비디오 생성 (FFmpeg 사용)"""
+def generate_video_from_image_and_audio(image_path: str, audio_path: str, output_dir: str,
+                                        motion: str = "zoom_in", size: str = "1024x1024", fps: int = 24):
+    """이미지 파일과 오디오 파일 결합해 Ken Burns 모션이 적용된 MP4 비디오 생성 (FFmpeg 사용). 멀티 씬 광고는 scene_graph 사용."""
     try:
         os.makedirs(output_dir, exist_ok=True) # 출력 디렉토리 생성
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S") # 타임스탬프 생성
@@ -389,29 +562,24 @@ def generate_video_from_image_and_audio(image_path: str, audio_path: str, output
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"오디오 파일을 찾을 수 없습니다: {audio_path}")
 
-        # 오디오 길이 확인: FFprobe로 오디오 파일 길이 측정, 실패 시 기본 10초
-        try:
-            probe_command = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", audio_path]
-            result = subprocess.run(probe_command, capture_output=True, text=True, check=True, timeout=30)
-            audio_duration = float(result.stdout.strip())
-        except Exception:
+        # 오디오 길이 확인: 헤더 기반 측정 (soundfile → FFmpeg), 실패 시 기본 10초
+        audio_duration = timing.probe_duration(audio_path)
+        if not audio_duration:
             audio_duration = 10 # 오디오 길이 측정 실패 시 기본값
             print(f"⚠️ 오디오 길이 확인 실패. 기본값 {audio_duration}초로 설정합니다.")
 
-        command = [ # FFmpeg 명령 구성: 이미지 반복, 오디오 결합, 비디오 인코딩.
+        width, height = (int(v) for v in size.split("x"))
+        command = [ # FFmpeg 명령 구성: 단일 프레임 이미지 → zoompan으로 오디오 길이만큼 프레임 생성, 오디오 결합, 비디오 인코딩.
             "ffmpeg",
-            "-loop", "1", # 이미지를 루프 (반복)
-            "-i", image_path, # 입력 이미지 파일
+            *ken_burns.still_input_args(image_path), # 입력 이미지 파일 (반복 디코딩 없음)
             "-i", audio_path, # 입력 오디오 파일
+            "-filter_complex", f"[0:v]{ken_burns.motion_filter(motion, audio_duration, fps, width, height)}[video_out]", # Ken Burns 모션
+            "-map", "[video_out]", "-map", "1:a",
             "-c:v", "libx264", # 비디오 코덱 설정
-            "-tune", "stillimage", # 스틸 이미지에 최적화된 튜닝
             "-c:a", "aac", # 오디오 코덱 설정
             "-b:a", "192k", # 오디오 비트레이트
-            "-pix_fmt", "yuv420p", # 픽셀 포맷 (호환성 위함)
             "-t", str(audio_duration), # 비디오 길이 (오디오 길이에 맞춤)
-            "-shortest", # 가장 짧은 스트림에 맞춰 종료 (오디오/비디오 중 짧은 것 기준)
             "-y", # 덮어쓰기 허용
-            "-vf", "scale=1024:1024", # 비디오 필터: 1024x1024로 스케일링
             output_path # 출력 파일 경로
         ]
 
@@ -489,6 +657,12 @@ class AdGenerationRequest(BaseModel): # 기존 광고 생성 요청 데이터 
             }
         }
 
+class SceneSpec(BaseModel): # 사용자가 편집한 스토리보드의 씬 (CompleteAdRequest.scenes)
+    name: str = Field(..., description="씬 이름")
+    duration: float = Field(..., gt=0, description="씬 길이(초). 합이 영상 길이와 다르면 비율대로 보정")
+    visual_description: str = Field(..., description="영상 생성용 영어 장면 설명")
+    narration: str = Field(..., description="씬 구간 한국어 나레이션")
+
 class CompleteAdRequest(BaseModel): # 30초 완성 광고 생성 요청 데이터 모델 (FastAPI Request Body 유효성 검사용)
     brand: str = Field(..., description="브랜드명")
     keywords: str = Field(..., description="키워드 또는 문장 (자유 형식)")
@@ -503,7 +677,15 @@ class CompleteAdRequest(BaseModel): # 30초 완성 광고 생성 요청 데이
 
     enable_bgm: bool = Field(default=True, description="BGM 생성 활성화") # BGM 생성 여부
     bgm_prompt: Optional[str] = Field(None, description="배경 음악 생성용 프롬프트 (비어있으면 키워드/브랜드 사용)", example="energetic electronic music for car ad") # BGM 프롬프트 (선택 사항)
-    bgm_style: str = Field(default="auto", description="BGM 스타일") # BGM 스타일 (현재는 bgm_prompt가 우선)
+    bgm_style: str = Field(default="auto", description="BGM 스타일 (auto면 style_preference 사용)") # 라이브러리 베드 선택용 스타일
+    bgm_mode: Literal["library", "generative"] = Field(default="library", description="BGM 방식: library(사전 렌더링 라이브러리, 즉시) 또는 generative(Riffusion 생성, GPU 사용)") # 생성형 BGM은 명시적 선택 시에만
+
+    video_engine: Literal["auto", "cogvideox", "stills"] = Field(default="auto", description="영상 방식: cogvideox(GPU 텍스트-투-비디오), stills(DALL·E 스틸 + Ken Burns 모션, CPU 렌더링), auto(GPU 가능 시 cogvideox)") # GPU 없는 노드용 폴백
+    stream_formats: List[Literal["hls", "dash"]] = Field(default_factory=list, description="적응형 스트리밍 패키징 (최종 인코딩과 함께 HLS/DASH 렌디션 생성, 비어 있으면 MP4만)")
+
+    scenes: Optional[List[SceneSpec]] = Field(None, min_length=1, max_length=6, description="편집한 스토리보드 (지정하면 컨셉 생성을 건너뛰고, 내용이 바뀌지 않은 씬은 캐시된 클립/나레이션을 재사용)") # 이전 결과의 ad_concept.scenes를 수정해 재요청
+
+    deadline_seconds: Optional[int] = Field(None, ge=60, le=7200, description="작업 데드라인(초). 초과 시 모든 단계가 중단되고 부분 산출물이 정리됨 (비어있으면 서버 기본값)") # 요청별 데드라인
 
     class Config: # Pydantic 모델 설정
         json_schema_extra = { # API 문서(Swagger)에 표시될 예시 JSON
@@ -524,6 +706,8 @@ class TaskResponse(BaseModel): # 작업 시작 시 응답 모델
     task_id: str # 생성된 작업 ID
     status: str # 작업 상태 (예: "queued")
     message: str # 사용자에게 보낼 메시지
+    estimated_completion: Optional[str] = None # 예상 완료 시각 (어드미션 시점 백로그 기준)
+    queue_position: Optional[int] = None # GPU 대기열 순번 (0 = 즉시 실행)
 
 class TaskStatusResponse(BaseModel): # 작업 상태 조회 시 응답 모델
     task_id: str # 작업 ID
@@ -605,51 +789,96 @@ async def serve_frontend(request: Request):
 </html>
         """, status_code=200)
 
+WHISPER_DEFAULT_MODELS = ["base", "large", "medium", "small", "tiny"] # 소스에서 목록을 읽지 못할 때 기본값
+
 def get_available_whisper_models():
-    """Whisper 모델 목록 동적 조회: 시스템에 설치된 Whisper 모델 종류 반환."""
-    try:
-        import whisper
-        available = whisper.available_models() # 사용 가능한 Whisper 모델 목록 조회
-        return sorted(list(available)) # 정렬하여 반환
-    except ImportError: # Whisper 모듈이 없으면
+    """Whisper 모델 목록 조회: whisper(와 torch)를 임포트하지 않고 설치된 패키지 소스의 _MODELS 키를 읽음."""
+    spec = importlib.util.find_spec("whisper")
+    if spec is None or not spec.origin: # Whisper 모듈이 없으면
         return [] # 빈 리스트 반환
-    except Exception as e: # 기타 에러 발생 시
-        print(f"Warning: whisper.available_models() 조회 오류: {e}") # 경고 출력
-        return ["tiny", "base", "small", "medium", "large"] # 기본 모델 목록 반환
+    try:
+        with open(spec.origin, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if isinstance(node, (ast.Assign, ast.AnnAssign)) and isinstance(node.value, ast.Dict):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                if any(isinstance(target, ast.Name) and target.id == "_MODELS" for target in targets):
+                    return sorted(key.value for key in node.value.keys if isinstance(key, ast.Constant)) # 정렬하여 반환
+    except (OSError, SyntaxError, ValueError) as e: # 소스 읽기/파싱 실패 시
+        print(f"Warning: Whisper 모델 목록 조회 오류: {e}") # 경고 출력
+    return list(WHISPER_DEFAULT_MODELS) # 기본 모델 목록 반환
 
 def check_ffmpeg_availability():
-    """FFmpeg 설치 여부 확인: 시스템 PATH에 FFmpeg 있는지 체크."""
+    """FFmpeg 설치 여부 확인: 기능 레지스트리의 캐시된 조사 결과 반환."""
+    return capability_registry.get("ffmpeg")
+
+def probe_ffmpeg() -> Dict[str, Any]:
+    """FFmpeg 조사: 시스템 PATH의 FFmpeg 가용성 및 버전 (레지스트리 갱신 시에만 프로세스 실행)."""
     try:
         result = subprocess.run(['ffmpeg', '-version'],
                                  capture_output=True, text=True, check=True, timeout=10) # FFmpeg 버전 명령어 실행
-        return result.returncode == 0 # 성공적으로 실행되면 True 반환
-    except Exception: # 에러 발생 시
-        return False # False 반환
+        first_line = result.stdout.splitlines()[0] if result.stdout else ""
+        return {"available": True, "version": first_line}
+    except Exception as e:
+        return {"available": False, "error": str(e)}
+
+def probe_whisper() -> Dict[str, Any]:
+    """Whisper 조사: 설치 여부와 모델 목록 (임포트 없음: API 프로세스에 torch를 올리지 않음)."""
+    if not module_probe("whisper")()["available"]:
+        return {"available": False, "error": "No module named 'whisper'", "models": []}
+    return {"available": True, "models": get_available_whisper_models()}
+
+capability_registry.register("ffmpeg", probe_ffmpeg)
+capability_registry.register("whisper", probe_whisper)
+capability_registry.register("librosa", module_probe("librosa")) # 임포트 없이 설치 여부만 확인
+
+@app.on_event("startup")
+async def start_capability_probing():
+    """서버 시작 시 기능 가용성 최초 조사 및 백그라운드 갱신 시작."""
+    await capability_registry.start()
+    await artifact_manager.start(ARTIFACT_GC_INTERVAL_SECONDS) # 기존 산출물 인덱싱 + 주기적 용량/TTL 정리
+    if PRELOAD_ML_MODULES: # GPU 워커 노드: 요청 처리를 막지 않고 백그라운드에서 ML 모듈 선로드
+        asyncio.get_running_loop().run_in_executor(None, load_cog_utils)
+    print(f"🔎 기능 가용성 조사 완료: {', '.join(f'{k}={v}' for k, v in ((n, capability_registry.get(n)) for n in ('ffmpeg', 'whisper', 'librosa')))}")
+
+@app.on_event("shutdown")
+async def stop_capability_probing():
+    await capability_registry.stop()
+    await artifact_manager.stop() # 접근 시각 인덱스 저장
+    image_derivatives.shutdown_image_store() # 이미지 후처리 프로세스 풀 종료
+    await asyncio.to_thread(storage.shutdown_storage) # 진행 중인 업로드 완료 대기
+
+def readiness_checks() -> Dict[str, bool]:
+    """30초 완성 광고 생성에 필요한 필수 서비스 상태 (모두 메모리 조회)."""
+    return {
+        "capabilities_probed": capability_registry.probed,
+        "openai_api_key": bool(os.getenv("OPENAI_API_KEY")),
+        "video_engine": COGVIDEODX_AVAILABLE or IMAGE_ENGINE_AVAILABLE, # auto는 CogVideoX가 없으면 스틸로 폴백하므로 둘 중 하나면 처리 가능
+        "ffmpeg": capability_registry.probed and capability_registry.get("ffmpeg")
+    }
+
+@app.get("/health/live") # 라이브니스 엔드포인트: 프로세스 응답 여부만 확인 (로드밸런서용)
+async def liveness_check():
+    """프로세스가 살아 있으면 항상 200."""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/ready") # 레디니스 엔드포인트: 필수 서비스가 준비되었을 때만 200, 아니면 503
+async def readiness_check():
+    """캐시된 기능 조사 결과로 요청 처리 가능 여부 반환."""
+    checks = readiness_checks()
+    ready = all(checks.values())
+    return JSONResponse(status_code=200 if ready else 503, content={"status": "ready" if ready else "not_ready", "checks": checks})
 
 @app.get("/health") # 헬스 체크 엔드포인트: API 서버 및 주요 서비스 상태 반환.
 async def health_check():
     """API 서버의 전반적인 상태 확인"""
     
-    whisper_available = False # Whisper 모델 가용성 초기화
-    whisper_error = None # Whisper 오류 메시지 초기화
-    supported_models = [] # 지원 모델 목록 초기화
-    
-    try: # Whisper 가용성 체크
-        import whisper
-        whisper_available = True
-        supported_models = get_available_whisper_models() # 사용 가능한 Whisper 모델 목록 가져오기
-    except Exception as e:
-        whisper_error = str(e) # 오류 메시지 저장
-        supported_models = [] # 목록 비우기
-    
-    librosa_available = False # Librosa 가용성 초기화
-    try: # Librosa 가용성 체크 (오디오 분석용)
-        import librosa
-        librosa_available = True
-    except Exception:
-        pass # 오류 발생 시 아무것도 하지 않음
-    
-    ffmpeg_available = check_ffmpeg_availability() # FFmpeg 가용성 체크
+    whisper_info = capability_registry.detail("whisper") # 캐시된 Whisper 조사 결과
+    whisper_available = whisper_info.get("available", False)
+    whisper_error = whisper_info.get("error")
+    supported_models = whisper_info.get("models", []) # 사용 가능한 Whisper 모델 목록
+    librosa_available = capability_registry.get("librosa") # Librosa 가용성 (오디오 분석용)
+    ffmpeg_available = capability_registry.get("ffmpeg") # FFmpeg 가용성 (캐시)
     
     return { # 서버 상태를 JSON 응답으로 반환
         "status": "healthy", # 서버 상태
@@ -665,7 +894,7 @@ async def health_check():
             "ffmpeg_video_composition": "ready" if ffmpeg_available else "unavailable", # FFmpeg 비디오 합성 상태
             "cogvideox_text_to_video": "ready" if COGVIDEODX_AVAILABLE else "unavailable", # CogVideoX-2b T2V 상태
             "riffusion_bgm": "ready" if RIFFUSION_AVAILABLE else "unavailable", # Riffusion BGM 상태
-            "enhanced_musical_bgm": "ready" if ffmpeg_available else "unavailable" # FFmpeg 기반 BGM 가용성
+            "enhanced_musical_bgm": "ready" # NumPy 절차적 신디사이저 (FFmpeg 불필요, Riffusion 불가 시 폴백)
         },
         "capabilities": { # 서버의 주요 기능 가용성
             "video_generation": COGVIDEODX_AVAILABLE, # 비디오 생성 가능 여부
@@ -674,7 +903,7 @@ async def health_check():
             "brand_optimization": True, # 브랜드 최적화 기능 사용 여부
             "video_composition": ffmpeg_available, # 비디오 합성 가능 여부
             "complete_30sec_workflow": all([ # 30초 완성 워크플로우 전체 가용성 (모든 필수 서비스 필요)
-                COGVIDEODX_AVAILABLE,
+                COGVIDEODX_AVAILABLE or IMAGE_ENGINE_AVAILABLE, # 영상 방식 하나 이상 (CogVideoX 또는 스틸 폴백)
                 os.getenv("OPENAI_API_KEY"),
                 ffmpeg_available
             ])
@@ -697,10 +926,10 @@ async def health_check():
         },
         "bgm_generation": { # BGM 생성 관련 상세 정보
             "riffusion_available": RIFFUSION_AVAILABLE, # Riffusion 사용 가능 여부
-            "enhanced_musical_bgm_available": ffmpeg_available, # FFmpeg 기반 BGM 사용 가능 여부
-            "chord_based_harmonies": ffmpeg_available, # 화음 기반 BGM 가능 여부 (FFmpeg으로 구현 시)
-            "rhythm_patterns": ffmpeg_available, # 리듬 패턴 가능 여부 (FFmpeg으로 구현 시)
-            "style_specific_harmonies": ffmpeg_available, # 스타일별 화음 가능 여부 (FFmpeg으로 구현 시)
+            "enhanced_musical_bgm_available": True, # 절차적 신디사이저 BGM 사용 가능 여부 (CPU 폴백)
+            "chord_based_harmonies": True, # 화음 기반 BGM 가능 여부
+            "rhythm_patterns": True, # 리듬 패턴 가능 여부
+            "style_specific_harmonies": True, # 스타일별 화음 가능 여부
             "riffusion_model_generation": RIFFUSION_PIPELINE_AVAILABLE, # Riffusion 모델을 통한 생성 가능 여부
             "fallback_system": True, # 폴백 시스템 사용 여부
             "default_bgm_volume": 0.25 # 기본 BGM 볼륨
@@ -718,19 +947,29 @@ async def health_check():
             "에러 핸들링 개선",
             "Task 상태 업데이트 최적화"
         ],
+        "admission": admission_controller.snapshot(), # GPU 백로그 및 단계별 실측 비용
+        "disk_usage": artifact_manager.usage(), # 산출물 풀별 사용량/한도 및 마지막 정리 결과
+        "artifact_storage": artifact_store.describe(), # 저장소 백엔드 (local / s3)
+        "capability_probe": {"probed_at": capability_registry.snapshot()["probed_at"], "ttl_seconds": capability_registry.ttl_seconds}, # 기능 조사 시각
         "active_tasks": len([t for t in tasks_storage.values() if t.get("status") == "processing"]), # 현재 처리 중인 작업 수
         "total_completed_tasks": len([t for t in tasks_storage.values() if t.get("status") == "completed"]) # 총 완료된 작업 수
     }
 
+@app.get("/metrics", include_in_schema=False) # Prometheus 텍스트 형식 메트릭 (작업 상태, 단계/OpenAI 지연, 캐시 적중, 디스크/메모리)
+async def metrics_endpoint():
+    """프로세스 메트릭 레지스트리 출력 (메모리 조회만)."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/api/v1/video/ffmpeg-status") # FFmpeg 상태 엔드포인트: FFmpeg 설치 여부 및 가이드 제공.
 async def get_ffmpeg_status():
     """FFmpeg 설치 상태 확인"""
-    ffmpeg_available = check_ffmpeg_availability() # FFmpeg 가용성 체크
+    ffmpeg_info = capability_registry.detail("ffmpeg") # 캐시된 FFmpeg 조사 결과
+    ffmpeg_available = ffmpeg_info.get("available", False)
     
     return { # FFmpeg 상태를 JSON 응답으로 반환
         "ffmpeg_available": ffmpeg_available, # FFmpeg 사용 가능 여부
         "cogvideox_available": COGVIDEODX_AVAILABLE, # CogVideoX 사용 가능 여부
-        "enhanced_bgm_available": ffmpeg_available, # 향상된 BGM 사용 가능 여부 (FFmpeg 기반)
+        "enhanced_bgm_available": True, # 향상된 BGM 사용 가능 여부 (NumPy 신디사이저, FFmpeg 불필요)
         "install_guide": { # FFmpeg 설치 가이드
             "windows": "winget install --id=Gyan.FFmpeg -e 또는 choco install ffmpeg (관리자 권한)",
             "macos": "brew install ffmpeg (Homebrew 설치 필요)",
@@ -738,6 +977,7 @@ async def get_ffmpeg_status():
             "conda": "conda install -c conda-forge ffmpeg (Conda 환경 내)"
         },
         "test_command": "ffmpeg -version", # 테스트 명령어
+        "version": ffmpeg_info.get("version"), # 조사 시 확인된 FFmpeg 버전
         "message": "FFmpeg 사용 가능 (향상된 BGM 지원)" if ffmpeg_available else "FFmpeg가 설치되지 않았습니다. 위의 가이드를 참조하여 설치해주세요." # 메시지
     }
 
@@ -749,17 +989,9 @@ async def get_ffmpeg_status():
 async def get_quality_validation_settings():
     """음성 품질 검증 시스템의 현재 설정 및 가용성 정보 조회."""
     
-    whisper_available = False # Whisper 가용성 초기화
-    whisper_error = None # 오류 메시지 초기화
-    supported_models = [] # 지원 모델 목록 초기화
-    
-    try: # Whisper 모듈 임포트 및 모델 목록 조회
-        import whisper
-        whisper_available = True
-        supported_models = get_available_whisper_models() # 사용 가능한 Whisper 모델 목록 가져오기
-    except Exception as e:
-        whisper_error = str(e) # 오류 메시지 저장
-        supported_models = [] # 목록 비우기
+    whisper_info = capability_registry.detail("whisper") # 캐시된 Whisper 조사 결과
+    whisper_available = whisper_info.get("available", False)
+    supported_models = whisper_info.get("models", []) # 사용 가능한 Whisper 모델 목록
     
     return QualityValidationSettings( # 품질 검증 설정 반환
         whisper_available=whisper_available, # Whisper 사용 가능 여부
@@ -848,7 +1080,16 @@ async def process_complete_ad_generation(task_id: str, request_data: dict):
     30초 완성 광고 생성을 위한 통합 워크플로우 (CogVideoX-2b + TTS + 향상된 BGM).
     이 함수는 백그라운드에서 실행됩니다.
     """
+    ctx = task_contexts.get(task_id) # 취소/데드라인 컨텍스트 (엔드포인트에서 등록)
+    if ctx is None:
+        ctx = task_contexts[task_id] = TaskContext(task_id, request_data.get("deadline_seconds") or DEFAULT_TASK_DEADLINE_SECONDS)
+    uploads = storage.new_upload_batch() # 작성 즉시 백그라운드 업로드 (로컬 저장소는 아무것도 하지 않음)
+    tail_upload = None # 인코딩 중 최종 영상 업로드 (원격 저장소)
+    trace = tracing.begin_trace(task_id, "ad_generation", engine=request_data.get("video_engine", "cogvideox"),
+                                duration_s=request_data.get("duration"), quality=request_data.get("video_quality", "balanced"))
     try:
+        ctx.check("대기") # 대기 중 취소된 작업은 시작하지 않음
+
         # 워크플로우 초기화: AI 모델/클라이언트가 아직 로드되지 않았다면 로드.
         global ai_workflow
         if ai_workflow is None:
@@ -863,44 +1104,60 @@ async def process_complete_ad_generation(task_id: str, request_data: dict):
         # 에이전트 임포트: 필요한 에이전트(컨셉 생성, 오디오 생성) 클래스 임포트.
         from app.agents.agents import ConceptGeneratorAgent, EnhancedAudioGeneratorAgent # 에이전트 임포트
         
-        # 1. 광고 컨셉 및 나레이션, 영상 설명 생성: LLM(GPT-4o-mini) 호출하여 광고 컨셉 생성.
-        update_task_status(task_id, progress=10, current_step="광고 컨셉 및 나레이션/영상 설명 생성 중...") # 상태 업데이트 (10%)
-        
+        # 1. 광고 컨셉: 편집된 스토리보드가 있으면 그대로 사용, 없으면 LLM(GPT-4o-mini)으로 씬 단위 컨셉 생성.
         keywords_str = request_data["keywords"] # 키워드 문자열 (CompleteAdRequest 기준)
-
-        complete_concept_prompt = get_complete_ad_concept_prompt( # 전체 광고 컨셉 프롬프트 생성
-            request_data["brand"],
-            keywords_str,
-            request_data["target_audience"],
-            request_data["style_preference"],
-            request_data["duration"]
-        )
-
-        # LLM 호출: OpenAI API를 통해 광고 컨셉 (나레이션, 영상 설명) 생성.
-        openai_client = await get_openai_client() # 비동기 OpenAI 클라이언트 가져오기
-        chat_completion = await openai_client.chat.completions.create( # LLM 호출 (await 필요)
-            model="gpt-4o-mini", # 사용할 모델 지정
-            response_format={"type": "json_object"}, # 응답을 JSON 형식으로 받도록 지시
-            messages=[
-                {"role": "system", "content": "You are an expert ad creator. Respond with a JSON object."},
-                {"role": "user", "content": complete_concept_prompt}
-            ],
-            temperature=0.7 # 창의성 조절
-        )
-        try: # LLM 응답 파싱 및 유효성 검사
-            ad_concept = json.loads(chat_completion.choices[0].message.content) # JSON 파싱
-            if not ad_concept or not ad_concept.get("narration") or not ad_concept.get("visual_description"):
-                raise ValueError("LLM 응답에서 나레이션 또는 영상 설명이 누락되었습니다.") # 필수 필드 누락 시 에러
-        except json.JSONDecodeError as e: # JSON 파싱 실패 시
-            raise Exception(f"LLM 응답 JSON 파싱 실패: {e}. 원시 응답: {chat_completion.choices[0].message.content}")
-        except ValueError as e: # 유효성 검사 실패 시
-            raise Exception(f"LLM 응답 유효성 검사 실패: {e}")
-
+        total_s = float(request_data["duration"]) # 최종 광고 길이 (초)
+
+        if request_data.get("scenes"): # 사용자 편집 스토리보드: LLM 호출 없이 진행, 바뀌지 않은 씬은 캐시 재사용
+            update_task_status(task_id, progress=10, current_step="편집된 스토리보드 적용 중...")
+            ad_concept = {
+                "narration": " ".join(scene["narration"] for scene in request_data["scenes"]),
+                "visual_description": request_data["scenes"][0]["visual_description"],
+                "scenes": request_data["scenes"]
+            }
+        else:
+            update_task_status(task_id, progress=10, current_step="광고 컨셉 및 씬별 나레이션/영상 설명 생성 중...") # 상태 업데이트 (10%)
+
+            complete_concept_prompt = get_complete_ad_concept_prompt( # 전체 광고 컨셉 프롬프트 생성
+                request_data["brand"],
+                keywords_str,
+                request_data["target_audience"],
+                request_data["style_preference"],
+                request_data["duration"]
+            )
+
+            # LLM 호출: OpenAI API를 통해 광고 컨셉 (나레이션, 영상 설명, 씬 구성) 생성.
+            stage_started = time.perf_counter() # 단계별 실측 시간 (어드미션 비용 이력에 반영)
+            openai_client = await get_openai_client() # 비동기 OpenAI 클라이언트 가져오기
+            with tracing.span("llm.concept", model="gpt-4o-mini"), metrics.openai_request("chat"):
+                chat_completion = await ctx.guard(openai_client.chat.completions.create( # LLM 호출 (취소/데드라인과 경쟁)
+                    model="gpt-4o-mini", # 사용할 모델 지정
+                    response_format={"type": "json_object"}, # 응답을 JSON 형식으로 받도록 지시
+                    messages=[
+                        {"role": "system", "content": "You are an expert ad creator. Respond with a JSON object."},
+                        {"role": "user", "content": complete_concept_prompt}
+                    ],
+                    temperature=0.7, # 창의성 조절
+                    timeout=ctx.timeout_for(60) # 요청 타임아웃 (데드라인 이내)
+                ), stage="광고 컨셉 생성")
+            try: # LLM 응답 파싱 및 유효성 검사
+                ad_concept = json.loads(chat_completion.choices[0].message.content) # JSON 파싱
+                if not ad_concept or not ad_concept.get("narration") or not ad_concept.get("visual_description"):
+                    raise ValueError("LLM 응답에서 나레이션 또는 영상 설명이 누락되었습니다.") # 필수 필드 누락 시 에러
+            except json.JSONDecodeError as e: # JSON 파싱 실패 시
+                raise Exception(f"LLM 응답 JSON 파싱 실패: {e}. 원시 응답: {chat_completion.choices[0].message.content}")
+            except ValueError as e: # 유효성 검사 실패 시
+                raise Exception(f"LLM 응답 유효성 검사 실패: {e}")
+            admission_controller.record_stage(task_id, "concept", time.perf_counter() - stage_started)
+
+        scenes = scene_graph.scenes_from_concept(ad_concept, total_s) # 씬 길이 합을 광고 길이에 맞춤 (씬 구성이 없으면 단일 씬)
+        ad_concept["scenes"] = [scene.to_dict() for scene in scenes] # 정규화된 스토리보드 (수정 후 scenes로 재요청 가능)
         tasks_storage[task_id]["ad_concept"] = ad_concept # 생성된 컨셉 저장
-        update_task_status(task_id, progress=25, current_step="광고 컨셉 생성 완료") # 상태 업데이트 (25%)
+        tasks_storage[task_id]["scenes"] = ad_concept["scenes"]
+        update_task_status(task_id, progress=25, current_step=f"광고 컨셉 생성 완료 ({len(scenes)}개 씬)") # 상태 업데이트 (25%)
 
-        # 2. 나레이션 음성 생성 및 품질 검증: 생성된 나레이션 텍스트로 음성 파일 생성 및 품질 확인.
-        update_task_status(task_id, progress=30, current_step="고품질 나레이션 음성 생성 및 검증 중...") # 상태 업데이트 (30%)
+        # 2. 씬별 나레이션 음성 생성 및 품질 검증: 영상 생성(GPU)과 겹치도록 워커 스레드에서 동시 실행.
+        update_task_status(task_id, progress=30, current_step=f"씬별 나레이션 음성 생성 시작 ({len(scenes)}개 씬, 영상 생성과 병렬)") # 상태 업데이트 (30%)
         audio_dir = os.path.join(os.getcwd(), "generated/audio", task_id) # 오디오 저장 디렉토리 설정
         os.makedirs(audio_dir, exist_ok=True) # 디렉토리 생성
 
@@ -916,81 +1173,245 @@ async def process_complete_ad_generation(task_id: str, request_data: dict):
             enable_quality_validation=quality_options["enable_quality_validation"],
             max_retry_attempts=quality_options["max_retry_attempts"]
         )
-
-        narration_text = ad_concept["narration"] # 생성된 광고 컨셉에서 나레이션 텍스트 추출
-        
-        temp_storyboard = {"scenes": [{"name": "Ad Narration", "narration": narration_text, "description": ad_concept.get("visual_description", "")}]} # 단일 나레이션을 위한 임시 스토리보드 구조.
-
-        # ✅ 수정: 올바른 메서드 호출 (await 없이 - 동기 함수)
-        validated_audio_result = audio_agent.generate_narrations_with_validation(
-            temp_storyboard, 
-            voice=request_data.get("voice", "nova"),
-            min_quality_score=quality_options["min_quality_score"]
-        )
-        
-        if not validated_audio_result or not validated_audio_result[0].get("file"):
-            raise Exception("나레이션 음성 생성 또는 품질 검증 실패.") # 음성 생성 실패 시 에러
-        
-        audio_path = validated_audio_result[0]["file"] # 생성된 오디오 파일 경로
-        tasks_storage[task_id]["audio_path"] = audio_path # 작업 저장소에 오디오 경로 저장
-        tasks_storage[task_id]["quality_report"] = validated_audio_result[0].get("quality_validation", {}) # 품질 보고서 저장
-        update_task_status(task_id, progress=50, current_step="나레이션 음성 생성 및 검증 완료") # 상태 업데이트 (50%)
-
-        # 3. CogVideoX-2b 비디오 및 Riffusion BGM 생성: 텍스트 프롬프트로 비디오와 BGM 생성.
-        update_task_status(task_id, progress=55, current_step="AI 비디오 및 BGM 생성 중...") # 상태 업데이트 (55%)
-        
-        video_dir_output = os.path.join(os.getcwd(), "generated", "videos", task_id) # 비디오 저장 디렉토리
-        bgm_dir_output = os.path.join(os.getcwd(), "generated", "bgm", task_id) # BGM 저장 디렉토리
-        os.makedirs(video_dir_output, exist_ok=True) # 디렉토리 생성
-        os.makedirs(bgm_dir_output, exist_ok=True) # 디렉토리 생성
-        
-        video_path = None # 비디오 경로 초기화
-        bgm_path = None # BGM 경로 초기화
-
-        if COGVIDEODX_AVAILABLE: # CogVideoX가 사용 가능한 경우
-            try:
-                optimized_prompt = optimize_zeroscope_prompt_enhanced( # CogVideoX용 최적화 프롬프트 생성
-                    request_data["brand"],
-                    ad_concept["visual_description"], 
-                    keywords_str,
-                    request_data["style_preference"]
-                )
-                
-                validated_prompt = validate_brand_prompt(request_data["brand"], optimized_prompt) # 프롬프트 최종 검증 (브랜드 관련 요소 포함 확인)
-                
-                print(f"🎯 CogVideoX-2b 최적화된 비디오 프롬프트: {validated_prompt}")
-                
-                # CogVideoXGenerator 인스턴스 생성 시 'cog_utils.' 접두사 사용
-                cogvideox_generator = cog_utils.CogVideoXGenerator(output_dir=video_dir_output, bgm_dir=bgm_dir_output) # CogVideoX 생성기 인스턴스 생성
-                
-                video_path, bgm_path = await cogvideox_generator.generate_video_from_prompt( # 비디오/BGM 생성 실행 (await 필요)
-                    prompt=validated_prompt, # 비디오 생성 프롬프트
-                    duration=request_data["duration"], # 영상 길이
-                    quality=request_data.get("video_quality", "balanced"), # 비디오 품질
-                    enable_bgm=request_data.get("enable_bgm", False), # BGM 생성 활성화 여부
-                    bgm_prompt=request_data.get("bgm_prompt", keywords_str) # BGM 프롬프트
-                )
-                
-                if video_path and os.path.exists(video_path): # 비디오 생성 성공 여부 확인
-                    print(f"✅ CogVideoX-2b 비디오 생성 성공: {video_path}")
-                    if bgm_path: # BGM 생성 성공 여부 확인
-                        print(f"✅ Riffusion BGM 생성 성공: {bgm_path}")
+        voice = request_data.get("voice", "nova")
+        scene_cache = scene_graph.SceneCache(on_access=artifact_manager.touch) # 씬 클립/나레이션 캐시 (작업 간 공유, 별도 LRU 풀로 정리)
+
+        def narrate_scene(scene: scene_graph.Scene) -> Dict[str, Any]: # 동기 TTS + Whisper 검증 (워커 스레드, 재시도 사이에 취소 확인)
+            cache_key = scene_graph.content_key(text=scene.narration, voice=voice, model="tts-1")
+            cached_path = scene_cache.lookup("narrations", cache_key, ".mp3")
+            if cached_path: # 같은 문장/음성의 검증된 나레이션 재사용
+                print(f"♻️ 씬 '{scene.name}' 나레이션 캐시 사용")
+                return {"scene": scene.name, "file": cached_path, "duration": timing.probe_duration(cached_path),
+                        "duration_source": "probed", "cached": True}
+            results = audio_agent.generate_narrations_with_validation(
+                {"scenes": [{"name": f"{scene.index + 1:02d} {scene.name}", "narration": scene.narration, "description": scene.visual_description}]}, # 번호 접두어: 동시 실행 씬의 파일명 충돌 방지
+                voice=voice,
+                min_quality_score=quality_options["min_quality_score"],
+                cancel_event=ctx
+            )
+            ctx.check("나레이션 생성") # 재시도 도중 취소된 경우
+            if not results or not results[0].get("file"):
+                raise Exception(f"씬 '{scene.name}' 나레이션 음성 생성 또는 품질 검증 실패.")
+            narration = results[0]
+            narration["file"] = scene_cache.store("narrations", cache_key, narration["file"])
+            uploads.submit(narration["file"], skip_existing=True) # 콘텐츠 주소 키: 다른 작업이 이미 올렸으면 건너뜀
+            return narration
+
+        def traced_narration(scene: scene_graph.Scene) -> Dict[str, Any]: # 워커 스레드 (to_thread가 현재 스팬 컨텍스트를 복사)
+            with tracing.span("tts.scene", scene=scene.name) as scene_span:
+                narration = narrate_scene(scene)
+                scene_span.set_attribute("cached", bool(narration.get("cached")))
+                return narration
+
+        async def narrate_all() -> List[Dict[str, Any]]:
+            stage_started = time.perf_counter()
+            narrations = await asyncio.gather(*(asyncio.to_thread(traced_narration, scene) for scene in scenes))
+            if not all(narration.get("cached") for narration in narrations): # 캐시 적중만 있으면 비용 이력을 왜곡하므로 기록하지 않음
+                admission_controller.record_stage(task_id, "tts", time.perf_counter() - stage_started)
+            return list(narrations)
+
+        narration_task = asyncio.ensure_future(narrate_all()) # 아래 영상 생성과 동시 실행
+        try:
+            # 3. 씬별 CogVideoX-2b 클립 및 Riffusion BGM 생성: GPU는 하나이므로 클립은 순차 생성 (GPU 없는 노드는 스틸 이미지).
+            update_task_status(task_id, progress=55, current_step="씬별 AI 비디오 및 BGM 생성 중...") # 상태 업데이트 (55%)
+
+            video_dir_output = os.path.join(os.getcwd(), "generated", "videos", task_id) # 비디오 저장 디렉토리
+            bgm_dir_output = os.path.join(os.getcwd(), "generated", "bgm", task_id) # BGM 저장 디렉토리
+            os.makedirs(video_dir_output, exist_ok=True) # 디렉토리 생성
+            os.makedirs(bgm_dir_output, exist_ok=True) # 디렉토리 생성
+
+            bgm_path = None # BGM 경로 초기화
+            use_generative_bgm = request_data.get("enable_bgm", False) and request_data.get("bgm_mode", "library") == "generative" # Riffusion은 명시적 선택 시에만
+            video_quality = request_data.get("video_quality", "balanced")
+            video_stage = f"video:{video_quality}" # 어드미션 비용 키
+            video_engine = request_data.get("video_engine", "cogvideox") # 엔드포인트에서 auto를 해석해 전달
+
+            clip_stats: List[Dict[str, Any]] = [{} for _ in scenes] # 새로 생성한 클립의 생성 통계 (스틸/캐시 적중 씬은 빈 값)
+            if video_engine == "stills": # GPU 없는 노드: 씬별 DALL·E 스틸 → 최종 합성에서 Ken Burns 모션으로 한 번에 렌더링
+                update_task_status(task_id, progress=55, current_step=f"씬별 스틸 이미지 생성 중... ({len(scenes)}개 씬)")
+                from app.utils.image_engine import get_image_engine # 워커에서만 로드 (openai/httpx 임포트 비용)
+                image_engine = get_image_engine() # 프로세스 공용 엔진: 이벤트 루프의 커넥션 풀 재사용
+                clip_paths: List[Optional[str]] = [] # 씬 순서대로의 스틸 경로
+                pending_images: List[Dict[str, Any]] = [] # 캐시에 없는 씬만 생성
+                for scene in scenes:
+                    image_prompt = (f"{validate_brand_prompt(request_data['brand'], scene.visual_description)}, " # 브랜드/로고 요소 보강
+                                    f"in a {request_data['style_preference']} style. High quality, detailed, realistic, suitable for advertisement.")
+                    cache_key = scene_graph.content_key(prompt=image_prompt, model=image_engine.model, size=image_engine.size)
+                    clip_paths.append(scene_cache.lookup("stills", cache_key, ".png"))
+                    if clip_paths[-1]:
+                        print(f"♻️ 씬 '{scene.name}' 스틸 이미지 캐시 사용")
                     else:
-                        print("⚠️ Riffusion BGM 생성 실패 또는 비활성화됨.")
+                        pending_images.append({"name": scene.name, "prompt": image_prompt, "filename": f"scene_{scene.index + 1:02d}.png",
+                                               "index": scene.index, "cache_key": cache_key})
+
+                if pending_images:
+                    stage_started = time.perf_counter()
+                    with tracing.span("images.generate", count=len(pending_images)):
+                        images = await ctx.guard(image_engine.generate_many( # 모든 씬 동시 요청 (취소 시 진행 중인 HTTP 요청도 중단)
+                            pending_images, os.path.join(os.getcwd(), "generated", "images", task_id)
+                        ), stage="스틸 이미지 생성")
+                    for item, image in zip(pending_images, images):
+                        if not image.get("file"):
+                            raise Exception(f"씬 '{item['name']}' 스틸 이미지 생성 실패: {image.get('error')}")
+                        clip_paths[item["index"]] = scene_cache.store("stills", item["cache_key"], image["file"])
+                        uploads.submit(clip_paths[item["index"]], skip_existing=True)
+                    tasks_storage[task_id]["image_stats"] = dict(image_engine.last_stats, per_image=[image["latency"] for image in images])
+                    admission_controller.record_stage(task_id, "images", time.perf_counter() - stage_started)
+                print(f"✅ 스틸 이미지 {len(clip_paths)}개 준비 완료 (Ken Burns 모션으로 합성)")
+                if image_derivatives.PIL_AVAILABLE: # 미리보기용 썸네일/웹 변형 (실패해도 광고 생성은 계속)
+                    try:
+                        with tracing.span("images.derivatives", count=len(clip_paths)):
+                            derived = await ctx.guard(image_derivatives.get_image_store().ingest(clip_paths, source=task_id), stage="이미지 후처리")
+                        tasks_storage[task_id]["preview_images"] = [
+                            {"scene": scene.name, "phash": item["phash"], "deduplicated": item["deduplicated"],
+                             "variants": {name: f"/images/{item['phash']}/{name}" for name in item["variants"]}}
+                            for scene, item in zip(scenes, derived)
+                        ]
+                    except TaskCancelledError:
+                        raise
+                    except Exception as e:
+                        print(f"⚠️ 이미지 후처리 실패 (미리보기 없이 계속): {e}")
+            else:
+                clip_paths = [] # 씬 순서대로의 클립 경로
+                clip_prompts: List[str] = []
+                clip_keys: List[str] = []
+                for scene in scenes:
+                    optimized_prompt = optimize_zeroscope_prompt_enhanced( # CogVideoX용 최적화 프롬프트 생성
+                        request_data["brand"],
+                        scene.visual_description,
+                        keywords_str,
+                        request_data["style_preference"]
+                    )
+                    clip_prompts.append(validate_brand_prompt(request_data["brand"], optimized_prompt)) # 프롬프트 최종 검증 (브랜드 관련 요소 포함 확인)
+                    clip_keys.append(scene_graph.content_key(prompt=clip_prompts[-1], quality=video_quality,
+                                                             duration=math.ceil(scene.duration_s), model="CogVideoX-2b"))
+                    clip_paths.append(scene_cache.lookup("clips", clip_keys[-1], ".mp4"))
+                pending = [scene for scene in scenes if clip_paths[scene.index] is None] # 다시 렌더링할 씬
+                if len(pending) < len(scenes):
+                    print(f"♻️ 씬 클립 캐시 사용: {len(scenes) - len(pending)}/{len(scenes)}개 씬")
+
+                if pending:
+                    if COGVIDEODX_AVAILABLE and cog_utils is None: # 첫 영상 생성 시 torch/diffusers 지연 로드 (이벤트 루프 블로킹 방지)
+                        update_task_status(task_id, progress=55, current_step="영상 생성 모듈 로드 중...")
+                        with tracing.span("module.load", module="CogVideoX_2b_utils"):
+                            await ctx.guard(asyncio.to_thread(load_cog_utils), stage="모듈 로드")
+                    if not (COGVIDEODX_AVAILABLE and cog_utils is not None): # CogVideoX 사용 불가 시 에러
+                        raise Exception("CogVideoX-2b 모듈을 로드할 수 없어 비디오 생성 기능을 사용할 수 없습니다. `enable_t2v`를 False로 설정하거나 환경을 확인하세요.")
+                    ahead = admission_controller.gpu_queue_position(task_id)
+                    if ahead:
+                        update_task_status(task_id, progress=55, current_step=f"GPU 대기 중... (앞선 작업 {ahead}개)")
+                    with tracing.span("gpu.wait", queued_ahead=ahead):
+                        await ctx.guard(admission_controller.acquire_gpu(task_id), stage="GPU 대기") # GPU 슬롯 획득 (대기 중 취소 가능)
+                    try:
+                        # CogVideoXGenerator 인스턴스 생성 시 'cog_utils.' 접두사 사용
+                        cogvideox_generator = cog_utils.CogVideoXGenerator(output_dir=video_dir_output, bgm_dir=bgm_dir_output) # CogVideoX 생성기 인스턴스 생성
+                        video_elapsed, rendered_s = 0.0, 0
+                        for k, scene in enumerate(pending):
+                            print(f"🎯 씬 {scene.index + 1}/{len(scenes)} '{scene.name}' CogVideoX-2b 프롬프트: {clip_prompts[scene.index]}")
+
+                            def on_denoise_step(info: Dict[str, Any], k=k, scene=scene): # 디노이징 단계별 진행률 보고 (워커 스레드에서 호출됨)
+                                step_progress = 55 + int(25 * (k + info["step"] / max(1, info["total_steps"])) / len(pending)) # 55% ~ 80% 구간을 씬 수로 분할
+                                tasks_storage[task_id]["denoising"] = dict(info, scene=scene.name) # 단계/경과/남은 시간/메모리 기록
+                                remaining_s = info["eta_s"] + (len(pending) - k - 1) * (info["elapsed_s"] + info["eta_s"]) # 남은 씬은 현재 씬 소요 시간으로 추정
+                                admission_controller.update_remaining(task_id, video_stage, remaining_s) # 실측 ETA로 예상 완료 시각 갱신
+                                update_task_status(
+                                    task_id,
+                                    progress=step_progress,
+                                    current_step=f"AI 비디오 생성 중... (씬 {k + 1}/{len(pending)}, {info['step']}/{info['total_steps']}단계, 남은 시간 약 {int(remaining_s)}초)"
+                                )
+
+                            with_bgm = use_generative_bgm and k == 0 # Riffusion BGM은 첫 클립과 함께 광고 전체 길이로 한 번만 생성
+                            clip_started = time.perf_counter()
+                            with tracing.span("video.clip", scene=scene.name, quality=video_quality, with_bgm=with_bgm):
+                                clip_path, generated_bgm = await cogvideox_generator.generate_video_from_prompt( # 비디오/BGM 생성 실행 (await 필요)
+                                    prompt=clip_prompts[scene.index], # 씬 비디오 생성 프롬프트
+                                    duration=math.ceil(scene.duration_s), # 씬 길이 (부족분은 합성 시 리타이밍/패딩)
+                                    quality=video_quality, # 비디오 품질
+                                    enable_bgm=with_bgm, # Riffusion은 generative 모드에서만 사용
+                                    bgm_prompt=request_data.get("bgm_prompt", keywords_str), # BGM 프롬프트
+                                    bgm_duration=request_data["duration"], # BGM은 광고 전체 길이
+                                    progress_callback=on_denoise_step, # 단계별 진행 콜백
+                                    cancel_event=ctx # 디노이징/Riffusion 세그먼트 사이 취소 확인
+                                )
+                            if not clip_path or not os.path.exists(clip_path): # 비디오 생성 성공 여부 확인
+                                raise Exception(f"씬 '{scene.name}' CogVideoX-2b 비디오 생성 실패 또는 파일 없음")
+                            stats = dict(cogvideox_generator.last_generation_stats) # 생성기는 씬마다 통계를 덮어쓰므로 복사
+                            clip_stats[scene.index] = stats
+                            clip_paths[scene.index] = scene_cache.store("clips", clip_keys[scene.index], clip_path)
+                            uploads.submit(clip_paths[scene.index], skip_existing=True) # 다음 씬 디노이징과 동시 업로드
+                            video_elapsed += stats.get("denoise_total_s", time.perf_counter() - clip_started)
+                            rendered_s += math.ceil(scene.duration_s)
+                            print(f"✅ 씬 '{scene.name}' 비디오 생성 성공: {clip_path}")
+                            if with_bgm:
+                                bgm_path = generated_bgm
+                                bgm_stats = stats.get("bgm") or {}
+                                if bgm_path: # BGM 실측 시간 기록 (디노이징과 동시 실행 시에도 BGM 자체 소요 시간)
+                                    print(f"✅ Riffusion BGM 생성 성공: {bgm_path}")
+                                    if "wall_s" in bgm_stats:
+                                        admission_controller.record_stage(task_id, "bgm", bgm_stats["wall_s"], request_data["duration"])
+                                else:
+                                    print("⚠️ Riffusion BGM 생성 실패 → 라이브러리 BGM으로 대체합니다.")
+                        admission_controller.record_stage(task_id, video_stage, video_elapsed, rendered_s)
+                        tasks_storage[task_id]["generation_stats"] = clip_stats # 씬별 단계 타이밍 통계 저장 (캐시 적중 씬은 빈 값)
+
+                    except cog_utils.GenerationCancelled: # 단계 사이 취소 감지 → 작업 취소로 전환
+                        raise TaskCancelledError(ctx.reason or "cancelled", "AI 비디오 및 BGM 생성")
+                    except Exception as e: # 비디오/BGM 생성 중 예외 처리
+                        print(f"❌ CogVideoX-2b 또는 Riffusion BGM 생성 실패: {e}. 전체 작업을 실패 처리합니다.")
+                        raise Exception(f"비디오 및 BGM 생성 실패 (CogVideoX 오류): {e}")
+                    finally:
+                        admission_controller.release_gpu(task_id) # 다음 대기 작업에 GPU 슬롯 양보
+
+            if request_data.get("enable_bgm", False) and not bgm_path: # 라이브러리 BGM (기본) → 라이브러리 없으면 CPU 절차적 신디사이저
+                from app.utils import bgm_library, bgm_synth # 워커에서만 로드 (API 시작 시간에 영향 없음)
+                library = bgm_library.get_library()
+                bgm_entry = library.select(
+                    request_data.get("style_preference"),
+                    request_data.get("bgm_style"),
+                    request_data.get("bgm_prompt"),
+                    seed=task_id # 작업마다 같은 스타일 내 다른 변형 선택
+                )
+                metrics.record_cache_lookup("bgm_library", bool(bgm_entry)) # 미스 = 신디사이저 폴백
+                if bgm_entry:
+                    with tracing.span("bgm.library", style=bgm_entry["style"]):
+                        bgm_path = await ctx.guard(asyncio.to_thread(
+                            library.render,
+                            bgm_entry,
+                            int(request_data["duration"] * 1000), # 밀리초 단위 정확한 길이
+                            os.path.join(bgm_dir_output, "library_bgm.wav")
+                        ), stage="BGM 라이브러리")
+                    print(f"🎵 라이브러리 BGM 선택: {bgm_entry['style']} {bgm_entry['bpm']}bpm (키 {bgm_entry['key_shift']:+d}) → {bgm_path}")
                 else:
-                    raise Exception("CogVideoX-2b 비디오 생성 실패 또는 파일 없음") # 비디오 파일 생성 실패 시 에러
-                    
-            except Exception as e: # 비디오/BGM 생성 중 예외 처리
-                print(f"❌ CogVideoX-2b 또는 Riffusion BGM 생성 실패: {e}. 전체 작업을 실패 처리합니다.")
-                raise Exception(f"비디오 및 BGM 생성 실패 (CogVideoX 오류): {e}")
-        else: # CogVideoX 사용 불가 시 에러
-            raise Exception("CogVideoX-2b 모듈을 로드할 수 없어 비디오 생성 기능을 사용할 수 없습니다. `enable_t2v`를 False로 설정하거나 환경을 확인하세요.")
-
-        tasks_storage[task_id]["video_path"] = video_path # 생성된 비디오 경로 저장
-        tasks_storage[task_id]["bgm_path"] = bgm_path # 생성된 BGM 경로 저장
-        update_task_status(task_id, progress=80, current_step="AI 비디오 및 BGM 생성 완료") # 상태 업데이트 (80%)
-
-        # 4. 최종 영상 합성: 생성된 비디오, 나레이션 오디오, BGM을 합쳐 최종 광고 영상 생성.
+                    with tracing.span("bgm.synth"):
+                        bgm_path = await ctx.guard(asyncio.to_thread(
+                            bgm_synth.write_bgm,
+                            os.path.join(bgm_dir_output, "synth_bgm.wav"),
+                            request_data["duration"],
+                            request_data.get("style_preference")
+                        ), stage="BGM 합성")
+                    print(f"🎵 CPU 신디사이저 BGM 생성 완료 (라이브러리 미빌드): {bgm_path}")
+
+            uploads.submit(bgm_path)
+            tasks_storage[task_id]["video_path"] = clip_paths[0] # 첫 씬 클립 (하위 호환)
+            tasks_storage[task_id]["scene_clips"] = clip_paths # 씬별 클립 경로
+            tasks_storage[task_id]["bgm_path"] = bgm_path # 생성된 BGM 경로 저장
+            update_task_status(task_id, progress=80, current_step="AI 비디오 및 BGM 생성 완료, 나레이션 대기 중...") # 상태 업데이트 (80%)
+
+            narrations = await ctx.guard(narration_task, stage="나레이션 생성") # 대부분 영상 생성 중에 이미 완료
+        except BaseException:
+            if not narration_task.done():
+                narration_task.cancel() # 나레이션 대기 중단 (스레드는 취소 신호로 재시도 사이에 종료)
+            elif not narration_task.cancelled():
+                narration_task.exception() # 이미 실패한 나레이션 예외 회수 (미회수 경고 방지)
+            raise
+
+        narration_paths = [narration["file"] for narration in narrations] # 씬 순서대로의 나레이션 경로
+        tasks_storage[task_id]["audio_path"] = narration_paths[0] # 첫 씬 나레이션 (하위 호환)
+        tasks_storage[task_id]["scene_narrations"] = narration_paths
+        tasks_storage[task_id]["quality_report"] = narrations[0].get("quality_validation", {}) # 품질 보고서 저장
+        tasks_storage[task_id]["scene_quality_reports"] = [narration.get("quality_validation", {}) for narration in narrations]
+
+        # 4. 최종 영상 합성: 씬 클립 전환 + 씬별 나레이션 배치 + BGM 더킹을 한 번의 FFmpeg 인코딩으로 처리.
         update_task_status(task_id, progress=90, current_step="최종 광고 영상 합성 중...") # 상태 업데이트 (90%)
         
         final_dir = os.path.join(os.getcwd(), "generated", "final", task_id) # 최종 영상 저장 디렉토리
@@ -1000,53 +1421,126 @@ async def process_complete_ad_generation(task_id: str, request_data: dict):
         brand_safe = request_data["brand"].replace(" ", "_").replace("/", "_") # 안전한 브랜드명 (파일 경로용)
         final_output = os.path.join(final_dir, f"final_ad_{brand_safe}_{request_data['duration']}s_{final_timestamp}.mp4") # 최종 출력 경로
                 
+        stage_started = time.perf_counter()
+        has_bgm = bool(bgm_path and os.path.exists(bgm_path))
+        # 나레이션/BGM 라우드니스 측정 (병렬, 사이드카 캐시): 측정값은 최종 합성의 고정 게인으로만 사용해 추가 인코딩 없음
+        with tracing.span("audio.loudness", tracks=len(narration_paths) + int(has_bgm)):
+            measured = await ctx.guard(asyncio.gather(
+                *(asyncio.to_thread(audio_mixer.measure_loudness, path) for path in narration_paths),
+                asyncio.to_thread(audio_mixer.measure_loudness, bgm_path) if has_bgm else asyncio.sleep(0)
+            ), stage="라우드니스 측정")
+        narration_loudness, bgm_loudness = list(measured[:-1]), measured[-1]
+        tasks_storage[task_id]["audio_mix"] = audio_mixer.mix_report(narration_loudness, bgm_loudness)
+
+        def narration_length(narration: Dict[str, Any]) -> float: # 검증 시 디코딩한 길이 우선, 없으면 헤더 측정, 그래도 없으면 추정치
+            if narration.get("duration") and narration.get("duration_source") in ("decoded", "probed"):
+                return narration["duration"]
+            return timing.probe_duration(narration["file"]) or narration.get("duration") or 0.0
+
+        def clip_length(index: int) -> Optional[float]: # 생성 통계의 실제 길이 우선 (캐시 적중 씬은 헤더 측정, 스틸은 길이 없음)
+            if video_engine == "stills":
+                return None
+            return clip_stats[index].get("video_duration_s") or timing.probe_duration(clip_paths[index])
+
+        lengths = await asyncio.gather(
+            *(asyncio.to_thread(narration_length, narration) for narration in narrations),
+            *(asyncio.to_thread(clip_length, scene.index) for scene in scenes)
+        )
+        media = [
+            scene_graph.SceneMedia(scene, clip_paths[scene.index], lengths[len(scenes) + scene.index],
+                                   narration_paths[scene.index], lengths[scene.index], narration_loudness[scene.index],
+                                   motion=ken_burns.motion_for(scene.index) if video_engine == "stills" else None)
+            for scene in scenes
+        ]
+        composition = scene_graph.CompositionSettings(
+            fps=ken_burns.DEFAULT_FPS if video_engine == "stills" # 스틸 모션은 프레임레이트가 낮으면 끊겨 보임
+            else next((stats["video_fps"] for stats in clip_stats if stats.get("video_fps")), scene_graph.CompositionSettings.fps)
+        )
+        input_args, filter_graph, scene_plans = scene_graph.build_scene_graph(
+            media, total_s, bgm_path if has_bgm else None, bgm_loudness, composition
+        )
+        tasks_storage[task_id]["timing"] = scene_plans # 씬별 나레이션/영상 길이 정렬 계획
+        packaging = None
+        if request_data.get("stream_formats"): # 같은 FFmpeg 실행에서 합성 결과를 분기해 스트리밍 렌디션도 인코딩 (디코딩/필터 한 번)
+            stream_dir = os.path.join(os.getcwd(), "generated", "streams", task_id)
+            os.makedirs(stream_dir, exist_ok=True)
+            packaging = streaming.plan_packaging(
+                "video_out", "audio_mix", composition.height, composition.fps, request_data["duration"], stream_dir,
+                streaming.PackagingSettings(formats=tuple(request_data["stream_formats"]))
+            )
+            filter_graph = f"{filter_graph};{packaging.filter}"
+            print(f"📡 스트리밍 패키징: {', '.join(packaging.manifests)} / 렌디션 {', '.join(r.name for r in packaging.renditions)}")
+        for plan in scene_plans:
+            print(f"⏱️ 씬 '{plan['scene']}' ({plan['start_s']:.1f}초~): 나레이션 {plan['narration_s']:.2f}초 → atempo {plan['tempo']}, "
+                  + (f"모션 {plan['motion']} " if plan["motion"] else f"영상 x{plan['video_retime']} + 패딩 {plan['video_pad_s']:.1f}초 ")
+                  + " / ".join(plan["notes"]))
+        if artifact_store.remote: # 원격 저장소: 인코딩 중에 최종 영상 업로드 시작 (조각화 MP4는 파일 끝에 덧붙이기만 함)
+            tail_upload = storage.TailUpload(artifact_store, final_output, artifact_store.key_for(final_output), "video/mp4")
+            tail_future = asyncio.ensure_future(asyncio.to_thread(tail_upload.run))
         try: # FFmpeg를 이용한 최종 합성
-                    ffmpeg_cmd = [
-                        "ffmpeg", "-y", # 덮어쓰기 허용
-                        "-i", video_path, # 입력 비디오
-                        "-i", audio_path, # 입력 나레이션 오디오
-                    ]
-                    
-                    if bgm_path and os.path.exists(bgm_path): # BGM이 있다면
-                        ffmpeg_cmd.extend([
-                            "-i", bgm_path, # 입력 BGM 오디오
-                            "-filter_complex", # 복합 필터 시작
-                            "[1:a]volume=1.0[voice];[2:a]volume=0.3[bgm];[voice][bgm]amix=inputs=2:duration=shortest[audio_mix]", # 나레이션과 BGM 믹싱
-                            "-map", "0:v", # 첫 번째 입력(비디오)의 영상 스트림 선택
-                            "-map", "[audio_mix]", # 믹싱된 오디오 스트림 선택
-                        ])
-                    else: # BGM이 없으면 나레이션만 사용
-                        ffmpeg_cmd.extend([
-                            "-filter_complex", # 복합 필터 시작
-                            "[1:a]volume=1.0[audio_mix]", # 나레이션만 사용
-                            "-map", "0:v", # 첫 번째 입력(비디오)의 영상 스트림 선택
-                            "-map", "[audio_mix]", # 오디오 스트림 선택
-                        ])
-
-                    ffmpeg_cmd.extend([ # 공통 인코딩 옵션
-                        "-c:v", "libx264", "-c:a", "aac", # 비디오/오디오 코덱 지정
-                        "-preset", "medium", "-crf", "23", # 인코딩 품질 설정
-                        "-movflags", "+faststart", # 웹 최적화
-                        "-t", str(request_data["duration"]), # 최종 영상 길이
-                        final_output # 최종 출력 파일
-                    ])
-                    
-                    print(f"🎬 FFmpeg 명령어: {' '.join(ffmpeg_cmd)}")  # 디버깅용 출력
-                    
-                    result_ffmpeg = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, check=True, timeout=300) # FFmpeg 실행 및 타임아웃 300초
-                    
-                    if not os.path.exists(final_output): # 최종 파일 생성 여부 확인
-                        raise Exception("최종 영상 파일이 생성되지 않았습니다.")
-                    
-                    file_size = os.path.getsize(final_output) / (1024*1024) # 파일 크기 계산 (MB 단위)
-                    print(f"✅ 최종 광고 영상 생성 완료: {final_output} ({file_size:.1f}MB)")
-                    
+            ffmpeg_cmd = ["ffmpeg", "-y"] + input_args + [ # 덮어쓰기 허용, 입력: 씬 클립 → 씬 나레이션 → BGM(무한 반복)
+                "-filter_complex", filter_graph, # 복합 필터 (클립 정렬/전환 + 나레이션 배치 + BGM 더킹)
+                "-map", packaging.main_video if packaging else "[video_out]", # 전환이 적용된 영상 스트림 선택
+                "-map", packaging.main_audio if packaging else "[audio_mix]", # 믹싱된 오디오 스트림 선택
+            ]
+
+            ffmpeg_cmd.extend([ # 공통 인코딩 옵션
+                "-c:v", "libx264", "-c:a", "aac", # 비디오/오디오 코덱 지정
+                "-preset", "medium", "-crf", "23", # 인코딩 품질 설정
+                "-movflags", "+frag_keyframe+empty_moov+default_base_moof" if tail_upload else "+faststart", # 웹 최적화 (원격 업로드 시 moov 재배치 없는 조각화 MP4)
+                "-t", str(request_data["duration"]), # 최종 영상 길이
+                final_output # 최종 출력 파일
+            ])
+            if packaging: # 두 번째 출력: 스트리밍 렌디션 (dash 먹서 + HLS 플레이리스트)
+                ffmpeg_cmd.extend(packaging.output_args)
+            
+            print(f"🎬 FFmpeg 명령어: {' '.join(ffmpeg_cmd)}")  # 디버깅용 출력
+            
+            result_ffmpeg = await ctx.run_process(ffmpeg_cmd, timeout=600 if packaging else 300, stage="최종 합성") # FFmpeg 실행 (취소 시 프로세스 종료, 렌디션 인코딩 포함 시 타임아웃 2배)
+            
+            if not os.path.exists(final_output): # 최종 파일 생성 여부 확인
+                raise Exception("최종 영상 파일이 생성되지 않았습니다.")
+            
+            file_size = os.path.getsize(final_output) / (1024*1024) # 파일 크기 계산 (MB 단위)
+            print(f"✅ 최종 광고 영상 생성 완료: {final_output} ({file_size:.1f}MB)")
+            
         except subprocess.CalledProcessError as e: # FFmpeg 실행 중 에러
             print(f"❌ FFmpeg 합성 실패: {e.stderr}")
             raise Exception(f"영상 합성 실패: {e.stderr}")
         except subprocess.TimeoutExpired: # FFmpeg 시간 초과
             print("❌ FFmpeg 합성 시간 초과")
             raise Exception("영상 합성 시간 초과")
+        admission_controller.record_stage(task_id, admission_controller.compose_stage(request_data), time.perf_counter() - stage_started) # 스틸은 모션 렌더링, 패키징은 렌디션 인코딩 포함
+        with tracing.span("media.register"):
+            media_entry = await media_index.register( # 다운로드용 메타데이터/내용 해시를 완료 시점에 한 번 계산
+                task_id, final_output, "video/mp4", download_filename({"request_data": request_data}, task_id)
+            )
+        artifact_manager.track(final_dir) # 최종 산출물을 작업 풀에 등록 (접근 시각 = 지금)
+        if packaging:
+            artifact_manager.track(stream_dir)
+            uploads.submit_dir(stream_dir, streaming.MEDIA_TYPES)
+        upload_report = None
+        if artifact_store.remote:
+            with tracing.span("upload.wait", backend=artifact_store.backend):
+                tail_upload.finish()
+                tail_result = await ctx.guard(tail_future, stage="최종 영상 업로드")
+                if tail_result.get("sha256") != media_entry.sha256: # 인코딩 후 파일이 다시 쓰인 경우: 완성 파일을 다시 업로드
+                    print("⚠️ 인코딩 중 업로드 내용이 최종 파일과 달라 다시 업로드합니다.")
+                    uploads.submit(final_output, "video/mp4")
+                upload_report = await ctx.guard(uploads.wait(), stage="산출물 업로드") # 중간 산출물 삭제 전에 업로드 확정
+                upload_report["final_tail"] = tail_result
+                print(f"☁️ 산출물 업로드 완료: {upload_report['uploaded']}/{upload_report['objects']}개 "
+                      f"(최종 영상: 첫 파트 {tail_result.get('first_part_s')}초, 인코딩 종료 후 {tail_result.get('after_finish_s')}초에 확정)")
+        await asyncio.to_thread(storage.write_delivery_record, artifact_store, task_id, { # 다른 API 노드가 작업 기록 없이 다운로드 제공
+            "key": artifact_store.key_for(final_output), "filename": media_entry.filename, "media_type": media_entry.media_type,
+            "size": media_entry.size, "sha256": media_entry.sha256,
+            "streams": {fmt: artifact_store.key_for(os.path.join(stream_dir, name)) for fmt, name in packaging.manifests.items()} if packaging else {}
+        })
+        released_bytes = 0
+        if RELEASE_INTERMEDIATES: # 최종 영상을 fsync로 확정한 뒤 씬 클립/나레이션/BGM 작업 디렉토리 삭제 (씬 캐시는 하드 링크로 유지)
+            with tracing.span("artifacts.release"):
+                released_bytes = await asyncio.to_thread(artifact_manager.release_intermediates, task_id, final_output)
+            print(f"🧹 중간 산출물 정리: {released_bytes / (1024 * 1024):.1f}MB")
 
         # 최종 결과 저장: 작업 완료 후 결과 데이터 정리 및 저장.
         result = {
@@ -1056,10 +1550,13 @@ async def process_complete_ad_generation(task_id: str, request_data: dict):
                 "final_video": final_output, # 최종 비디오 파일 경로
                 "ad_concept": ad_concept, # 생성된 광고 컨셉
                 "components": { # 개별 구성 요소 경로
-                    "video_path": video_path,
-                    "audio_path": audio_path,
-                    "bgm_path": bgm_path
-                }
+                    "video_path": clip_paths[0],
+                    "audio_path": narration_paths[0],
+                    "bgm_path": bgm_path,
+                    "scene_clips": clip_paths, # 씬 순서대로의 클립
+                    "scene_narrations": narration_paths # 씬 순서대로의 나레이션
+                },
+                "streams": {fmt: f"/stream/{task_id}/{name}" for fmt, name in packaging.manifests.items()} if packaging else {} # HLS/DASH 매니페스트 URL
             },
             "metadata": { # 생성 메타데이터
                 "brand": request_data["brand"],
@@ -1068,9 +1565,18 @@ async def process_complete_ad_generation(task_id: str, request_data: dict):
                 "voice": request_data.get("voice", "nova"),
                 "video_quality": request_data.get("video_quality", "balanced"),
                 "bgm_enabled": bool(bgm_path), # BGM 활성화 여부
-                "file_size_mb": round(os.path.getsize(final_output) / (1024*1024), 1), # 최종 파일 크기
+                "audio_mix": tasks_storage[task_id].get("audio_mix"), # 라우드니스 측정값 및 적용 게인
+                "timing": tasks_storage[task_id].get("timing"), # 씬별 나레이션/영상 길이 정렬 계획
+                "preview_images": tasks_storage[task_id].get("preview_images"), # 스틸 씬 썸네일/웹 변형 URL (콘텐츠 주소)
+                "scene_count": len(scenes),
+                "file_size_mb": round(media_entry.size / (1024*1024), 1), # 최종 파일 크기
+                "content_sha256": media_entry.sha256, # 최종 영상 내용 해시 (다운로드 ETag)
+                "stream_renditions": [r.name for r in packaging.renditions] if packaging else [], # 스트리밍 렌디션 (낮은 화질부터)
+                "artifact_storage": dict(artifact_store.describe(), uploads=upload_report), # 저장소 백엔드 및 업로드 결과
+                "intermediates_released_mb": round(released_bytes / (1024 * 1024), 1) if RELEASE_INTERMEDIATES else None, # 완료 후 삭제한 중간 산출물 (components 경로 중 작업 디렉토리 파일은 더 이상 없음)
                 "generation_time": datetime.now().isoformat(), # 생성 완료 시간
-                "model_used": "CogVideoX-2b + OpenAI TTS + Riffusion BGM" # 사용된 모델 정보
+                "video_engine": video_engine,
+                "model_used": "DALL-E 3 + Ken Burns + OpenAI TTS" if video_engine == "stills" else "CogVideoX-2b + OpenAI TTS + Riffusion BGM" # 사용된 모델 정보
             }
         }
 
@@ -1085,6 +1591,25 @@ async def process_complete_ad_generation(task_id: str, request_data: dict):
         
         print(f"🎉 30초 완성 광고 생성 성공: {task_id}")
 
+    except TaskCancelledError as e: # 사용자 취소 또는 데드라인 초과: 부분 산출물 정리 및 확보 용량 보고
+        media_index.invalidate(task_id)
+        media_index.invalidate_prefix(f"stream/{task_id}/")
+        await uploads.drain() # 진행 중인 업로드가 끝난 뒤 삭제해야 객체가 남지 않음 (업로드 중인 로컬 파일도 유지)
+        freed_bytes = await asyncio.to_thread(remove_artifact_dirs, get_task_artifact_dirs(task_id)) # rmtree는 이벤트 루프 밖에서
+        try: # 이미 올린 작업 객체 삭제 (씬 캐시 객체는 유지)
+            await asyncio.to_thread(delete_remote_task_artifacts, task_id)
+        except Exception as cleanup_error:
+            print(f"⚠️ 원격 산출물 삭제 실패: {cleanup_error}")
+        report = build_cancellation_report(tasks_storage.get(task_id, {}), freed_bytes, e.reason)
+        update_task_status(
+            task_id,
+            status="cancelled" if e.reason == "cancelled" else "failed",
+            error=str(e),
+            current_step="취소됨" if e.reason == "cancelled" else "데드라인 초과",
+            cancellation=report
+        )
+        print(f"🛑 광고 생성 중단: {task_id} - {e} (디스크 {report['freed_disk_mb']}MB 확보)")
+
     except Exception as e: # 작업 중 예기치 못한 에러 발생 시 처리
         import traceback # 상세 에러 스택 트레이스 얻기 위함
         error_details = traceback.format_exc() # 에러 상세 내용
@@ -1097,6 +1622,22 @@ async def process_complete_ad_generation(task_id: str, request_data: dict):
         )
         print(f"❌ 30초 완성 광고 생성 실패: {task_id} - {e}") # 콘솔 출력
 
+    finally:
+        if tail_upload is not None:
+            tail_upload.abort() # 실패/취소 시 올린 파트 폐기 (이미 확정된 업로드에는 영향 없음)
+        uploads.cancel() # 아직 시작하지 않은 업로드 취소
+        task = tasks_storage.get(task_id, {})
+        outcome = {"completed": "ok", "cancelled": "cancelled"}.get(task.get("status"), "error")
+        JOBS_FINISHED.inc(status=task.get("status") or "unknown")
+        breakdown = tracing.end_trace(trace, outcome, task.get("error")) # 단계별 소요 시간 분해 (동시 실행 단계는 겹쳐 합산)
+        if task:
+            task["trace"] = breakdown
+            if task.get("result"):
+                task["result"]["metadata"]["stage_timings"] = {"total_s": breakdown["total_s"], "stages": breakdown["stages"]}
+        admission_controller.release(task_id) # GPU 백로그에서 제거
+        ctx.finished = True # DELETE 요청이 정리 완료를 기다릴 수 있도록 표시
+        task_contexts.pop(task_id, None)
+
 # ─────────────────────────────────────────────
 # 8) 광고 생성 요청 및 상태/결과 조회 엔드포인트
 # ─────────────────────────────────────────────
@@ -1131,9 +1672,14 @@ async def create_complete_advertisement(request: CompleteAdRequest, background_t
     missing_services = [] # 필수 서비스 가용성 체크 리스트
     if not os.getenv("OPENAI_API_KEY"):
         missing_services.append("OpenAI API (TTS용)")
-    if not COGVIDEODX_AVAILABLE:
+    request_data = request.dict()
+    if request.video_engine == "auto": # GPU 텍스트-투-비디오가 없으면 스틸 + Ken Burns로 폴백
+        request_data["video_engine"] = "cogvideox" if COGVIDEODX_AVAILABLE else "stills"
+    if request_data["video_engine"] == "cogvideox" and not COGVIDEODX_AVAILABLE:
         missing_services.append("CogVideoX-2b (텍스트-투-비디오용)")
-    if not check_ffmpeg_availability():
+    if request_data["video_engine"] == "stills" and not IMAGE_ENGINE_AVAILABLE:
+        missing_services.append("OpenAI SDK (스틸 이미지 생성용)")
+    if not capability_registry.get("ffmpeg"): # 캐시된 조사 결과 사용 (요청마다 프로세스 실행하지 않음)
         missing_services.append("FFmpeg (영상 처리용)")
     
     if missing_services: # 누락된 서비스 있으면 에러 반환
@@ -1143,22 +1689,40 @@ async def create_complete_advertisement(request: CompleteAdRequest, background_t
         )
 
     task_id = str(uuid.uuid4()) # 고유 작업 ID 생성
+    decision = admission_controller.admit(task_id, request_data) # 예상 비용 기반 수락/거절 판단
+    if not decision.accepted: # GPU 백로그 예산 초과: 부하 차단
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "message": "서버 작업량이 많아 요청을 받을 수 없습니다. 잠시 후 다시 시도해주세요.",
+                "retry_after_seconds": decision.retry_after,
+                "estimated_cost_gpu_seconds": round(decision.cost_gpu_seconds, 1),
+                "backlog_gpu_seconds": round(decision.backlog_gpu_seconds, 1),
+                "estimated_completion_if_queued": decision.estimated_completion
+            },
+            headers={"Retry-After": str(decision.retry_after)}
+        )
+
     tasks_storage[task_id] = { # 작업 저장소에 초기 정보 등록
         "task_id": task_id,
         "status": "queued",
         "progress": 0,
         "current_step": "대기 중...",
         "created_at": datetime.now().isoformat(),
-        "request_data": request.dict() # 요청 데이터 저장
+        "estimated_completion": decision.estimated_completion, # 백로그 + 단계별 실측 비용 기반 예상 완료 시각
+        "request_data": request_data # 요청 데이터 저장 (해석된 video_engine 포함)
     }
+    task_contexts[task_id] = TaskContext(task_id, request.deadline_seconds or DEFAULT_TASK_DEADLINE_SECONDS) # 데드라인은 접수 시점부터 계산
     
     # process_complete_ad_generation 함수 호출: 백그라운드 태스크로 광고 생성 로직 실행.
-    background_tasks.add_task(process_complete_ad_generation, task_id, request.dict()) # 비동기 백그라운드 작업으로 등록
+    background_tasks.add_task(process_complete_ad_generation, task_id, request_data) # 비동기 백그라운드 작업으로 등록
     
     return TaskResponse( # 응답 반환
         task_id=task_id,
         status="queued",
-        message=f"🎬 '{request.brand}' 브랜드 {request.duration}초 완성 광고 생성이 시작되었습니다! (v3.3 CogVideoX-2b + 향상된 BGM + 브랜드 최적화) 작업 ID: {task_id}"
+        message=f"🎬 '{request.brand}' 브랜드 {request.duration}초 완성 광고 생성이 시작되었습니다! (v3.3 CogVideoX-2b + 향상된 BGM + 브랜드 최적화) 작업 ID: {task_id}",
+        estimated_completion=decision.estimated_completion,
+        queue_position=decision.queue_position
     )
 
 @app.get("/api/v1/ads/status/{task_id}", response_model=TaskStatusResponse) # 작업 상태 조회 엔드포인트
@@ -1168,6 +1732,47 @@ async def get_task_status(task_id: str):
         raise HTTPException(status_code=404, detail="요청된 작업을 찾을 수 없습니다.") # 404 Not Found 에러 반환
     return TaskStatusResponse(**tasks_storage[task_id]) # 작업 상태 정보 반환
 
+@app.get("/api/v1/ads/trace/{task_id}") # 작업 단계 추적 조회 엔드포인트
+async def get_task_trace(task_id: str):
+    """종료된 작업의 단계별 소요 시간 분해와 스팬 목록 (부모/자식, 시작 오프셋, 상태)."""
+    if task_id not in tasks_storage:
+        raise HTTPException(status_code=404, detail="요청된 작업을 찾을 수 없습니다.")
+    trace = tasks_storage[task_id].get("trace")
+    if trace is None:
+        raise HTTPException(status_code=400, detail=f"작업이 아직 종료되지 않았습니다. 현재 상태: {tasks_storage[task_id].get('status')}")
+    return {"task_id": task_id, "status": tasks_storage[task_id].get("status"), "trace": trace}
+
+@app.delete("/api/v1/ads/{task_id}") # 작업 취소/삭제 엔드포인트
+async def cancel_task(task_id: str):
+    """진행 중인 작업 취소 (완료된 작업은 산출물 삭제). 확보된 용량 보고."""
+    if task_id not in tasks_storage: # 작업 ID 없으면 에러
+        raise HTTPException(status_code=404, detail="요청된 작업을 찾을 수 없습니다.")
+
+    ctx = task_contexts.get(task_id)
+    if ctx is not None and not ctx.finished: # 진행/대기 중인 작업: 취소 신호 전파 후 정리 완료까지 잠시 대기
+        ctx.cancel()
+        for _ in range(100): # 최대 10초 (디노이징 한 단계 + 정리 시간)
+            if ctx.finished:
+                break
+            await asyncio.sleep(0.1)
+        task = tasks_storage[task_id]
+        if not ctx.finished: # 워커가 아직 단계 경계에 도달하지 못함: 신호는 전달됨
+            return {"task_id": task_id, "status": "cancelling", "message": "취소 요청이 전달되었습니다. 현재 단계가 끝나는 즉시 중단됩니다."}
+        return {"task_id": task_id, "status": task.get("status"), "message": "작업이 취소되었습니다.", "cancellation": task.get("cancellation")}
+
+    # 이미 종료된 작업: 산출물과 작업 기록 삭제
+    task = tasks_storage.pop(task_id)
+    media_index.invalidate(task_id)
+    media_index.invalidate_prefix(f"stream/{task_id}/")
+    freed_bytes = await asyncio.to_thread(remove_artifact_dirs, get_task_artifact_dirs(task_id)) # rmtree는 이벤트 루프 밖에서
+    await asyncio.to_thread(delete_remote_task_artifacts, task_id)
+    return {
+        "task_id": task_id,
+        "status": "deleted",
+        "message": f"작업({task.get('status')})과 산출물이 삭제되었습니다.",
+        "cancellation": build_cancellation_report(task, freed_bytes, "deleted")
+    }
+
 @app.get("/api/v1/ads/result/{task_id}") # 작업 결과 조회 엔드포인트
 async def get_task_result(task_id: str):
     """작업 결과 조회"""
@@ -1201,9 +1806,21 @@ async def list_tasks(limit: int = 10, offset: int = 0):
 # ─────────────────────────────────────────────
 # 10) 다운로드 엔드포인트
 # ─────────────────────────────────────────────
-@app.get("/download/{task_id}") # 최종 광고 영상 다운로드 엔드포인트
+@app.api_route("/download/{task_id}", methods=["GET", "HEAD"]) # 최종 광고 영상 다운로드 엔드포인트 (Range/조건부 GET 지원)
 async def download_final_video(task_id: str):
-    """최종 광고 영상 다운로드."""
+    """최종 광고 영상 다운로드. 인덱스에 있으면 파일 시스템 조회 없이 바로 전송 (원격 저장소는 사전 서명 URL로 리다이렉트)."""
+    if artifact_store.remote: # 영상 바이트는 API 노드를 거치지 않음 (Range/조건부 요청은 저장소가 처리)
+        record = await get_delivery_record(task_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+        url = artifact_store.presigned_url(record["key"], record.get("filename"), record.get("media_type"))
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": "no-store"}) # URL에 만료 시각이 있으므로 캐시 금지
+
+    entry = media_index.get(task_id)
+    if entry is not None: # 빠른 경로: 완료 시 등록된 메타데이터 (미리보기 탐색 Range 요청마다 반복됨)
+        artifact_manager.touch(entry.path) # LRU 접근 시각 (메모리)
+        return delivery.MediaFileResponse(entry)
+
     if task_id not in tasks_storage: # 작업 ID 없으면 에러
         raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
     
@@ -1212,32 +1829,77 @@ async def download_final_video(task_id: str):
         raise HTTPException(status_code=400, detail="작업이 완료되지 않았습니다.")
     
     if "final_video" in task["result"]["content"]: # 최종 광고 (CogVideoX로 생성된 것)
-        final_video = task["result"]["content"]["final_video"] # 최종 비디오 경로
-        if not os.path.exists(final_video): # 파일 없으면 에러
-            raise HTTPException(status_code=404, detail="영상 파일을 찾을 수 없습니다.")
-        
-        filename = f"{task['request_data']['brand']}_{task['request_data']['duration']}sec_ad_{task_id[:8]}.mp4" # 다운로드 파일명 생성
-        return FileResponse( # 파일 응답 반환
-            final_video,
-            media_type="video/mp4", # 미디어 타입 지정
-            filename=filename # 다운로드 파일명 지정
-        )
-    
+        video_path = task["result"]["content"]["final_video"] # 최종 비디오 경로
+        filename = download_filename(task, task_id) # 다운로드 파일명 생성
     elif "videos" in task["result"]["content"] and task["result"]["content"]["videos"]: # 기존 광고 (첫 번째 비디오 반환)
         video_path = task["result"]["content"]["videos"][0] # 첫 번째 비디오 경로
-        if not os.path.exists(video_path): # 파일 없으면 에러
-            raise HTTPException(status_code=404, detail="영상 파일을 찾을 수 없습니다.")
-        
         filename = f"{task['request_data']['brand']}_ad_{task_id[:8]}.mp4" # 다운로드 파일명 생성
-        return FileResponse( # 파일 응답 반환
-            video_path,
-            media_type="video/mp4",
-            filename=filename
-        )
-    
     else: # 다운로드 가능한 영상 파일이 없을 때
         raise HTTPException(status_code=404, detail="다운로드 가능한 영상 파일이 없습니다.")
 
+    try: # 인덱스에 없는 완료 작업 (기존 광고 등): 첫 요청에서 한 번 등록
+        entry = await media_index.register(task_id, video_path, "video/mp4", filename)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="영상 파일을 찾을 수 없습니다.")
+    return delivery.MediaFileResponse(entry)
+
+_STREAM_FILE_PATTERN = re.compile(r"^[A-Za-z0-9_]+(\.[A-Za-z0-9]+)+$") # 매니페스트/세그먼트 파일명 (경로 구분자 불가)
+
+@app.api_route("/stream/{task_id}/{file_name}", methods=["GET", "HEAD"]) # HLS/DASH 매니페스트와 세그먼트
+async def get_stream_file(task_id: str, file_name: str):
+    """스트리밍 렌디션 파일 제공. 세그먼트는 작업별 주소에서 바뀌지 않으므로 영구 캐시, 매니페스트는 작업 산출물 캐시."""
+    if artifact_store.remote: # 매니페스트는 이 서버가 전달 (상대 경로 세그먼트가 다시 이 엔드포인트로 오도록), 세그먼트는 사전 서명 URL
+        extension = os.path.splitext(file_name)[1]
+        record = await get_delivery_record(task_id)
+        if (not record or not record.get("streams") or extension not in streaming.MEDIA_TYPES
+                or not _STREAM_FILE_PATTERN.match(file_name)):
+            raise HTTPException(status_code=404, detail="스트리밍 파일을 찾을 수 없습니다.")
+        object_key = f"{next(iter(record['streams'].values())).rsplit('/', 1)[0]}/{file_name}"
+        if extension == ".m4s":
+            return RedirectResponse(artifact_store.presigned_url(object_key, content_type=streaming.MEDIA_TYPES[extension]),
+                                    status_code=307, headers={"Cache-Control": "no-store"})
+        content = await asyncio.to_thread(artifact_store.read_bytes, object_key)
+        if content is None:
+            raise HTTPException(status_code=404, detail="스트리밍 파일을 찾을 수 없습니다.")
+        return Response(content, media_type=streaming.MEDIA_TYPES[extension], headers={"Cache-Control": delivery.TASK_CACHE_CONTROL})
+
+    key = f"stream/{task_id}/{file_name}"
+    entry = media_index.get(key)
+    if entry is None:
+        task = tasks_storage.get(task_id)
+        extension = os.path.splitext(file_name)[1]
+        if (not task or task.get("status") != "completed" or extension not in streaming.MEDIA_TYPES
+                or not _STREAM_FILE_PATTERN.match(file_name)):
+            raise HTTPException(status_code=404, detail="스트리밍 파일을 찾을 수 없습니다.")
+        try:
+            entry = await media_index.register(key, os.path.join(os.getcwd(), "generated", "streams", task_id, file_name),
+                                               streaming.MEDIA_TYPES[extension])
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="스트리밍 파일을 찾을 수 없습니다.")
+    artifact_manager.touch(entry.path)
+    if entry.path.endswith(".m4s"):
+        return delivery.MediaFileResponse(entry, delivery.IMMUTABLE_CACHE_CONTROL)
+    return delivery.MediaFileResponse(entry)
+
+_IMAGE_MEDIA_TYPES = {".webp": "image/webp", ".avif": "image/avif", ".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg"}
+
+@app.api_route("/images/{phash}/{variant}", methods=["GET", "HEAD"]) # 콘텐츠 주소 이미지 변형 (썸네일/미리보기/원본)
+async def get_image_variant(phash: str, variant: str):
+    """지각 해시 주소의 이미지 변형 제공. 내용이 바뀌지 않으므로 영구 캐시 가능."""
+    key = f"images/{phash}/{variant}"
+    entry = media_index.get(key)
+    if entry is None:
+        if not image_derivatives.PIL_AVAILABLE:
+            raise HTTPException(status_code=404, detail="이미지 후처리가 비활성화되어 있습니다.")
+        path = image_derivatives.get_image_store().variant_path(phash, variant)
+        if not path:
+            raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+        try:
+            entry = await media_index.register(key, path, _IMAGE_MEDIA_TYPES.get(os.path.splitext(path)[1], "application/octet-stream"))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+    return delivery.MediaFileResponse(entry, delivery.IMMUTABLE_CACHE_CONTROL) # 주소가 곧 내용 (phash)
+
 @app.get("/api/v1/brands/presets") # 브랜드 프리셋 조회 엔드포인트
 async def get_brand_presets():
     """지원하는 브랜드 프리셋 목록 조회."""
@@ -1250,11 +1912,14 @@ async def get_brand_presets():
 
 @app.get("/api/v1/bgm/styles") # BGM 스타일 조회 엔드포인트
 async def get_bgm_styles():
-    """지원하는 BGM 스타일 목록 조회."""
+    """지원하는 BGM 스타일 목록 및 사전 렌더링 라이브러리 현황 조회."""
+    from app.utils import bgm_library # 지연 로드 (NumPy는 첫 조회 시에만 임포트)
     return { # BGM 스타일 정보 반환
         "supported_styles": ["모던하고 깔끔한", "따뜻하고 아늑한", "미니멀하고 프리미엄한", "역동적이고 에너지", "감성적이고 로맨틱"], # 지원 스타일 목록
-        "enhanced_musical_bgm": check_ffmpeg_availability(), # 향상된 BGM(FFmpeg 기반) 가능 여부
+        "enhanced_musical_bgm": True, # 향상된 BGM(NumPy 절차적 신디사이저) 가능 여부
         "riffusion_available": RIFFUSION_AVAILABLE, # Riffusion BGM 가능 여부
+        "modes": ["library", "generative"], # bgm_mode 값 (기본 library, generative는 Riffusion 사용)
+        "library": bgm_library.get_library().summary(), # 사전 렌더링 BGM 라이브러리 인덱스 요약
         "features": { # BGM 기능 특징
             "chord_progressions": True, # 코드 진행 지원
             "rhythm_patterns": True, # 리듬 패턴 지원
@@ -1285,8 +1950,10 @@ if __name__ == "__main__": # 스크립트 직접 실행 시 Uvicorn 서버 시
     print("     - GET       /                  : 웹 인터페이스")
     print("     - POST      /api/v1/ads/create-complete : 🆕 30초 완성 광고 생성 v3.3")
     print("     - POST      /api/v1/ads/generate    : 기존 광고 생성 (T2V 폴백)")
+    print("     - DELETE    /api/v1/ads/{task_id}   : 🆕 작업 취소 (부분 산출물 정리)")
     print("     - GET       /api/v1/brands/presets  : 🆕 브랜드 프리셋 조회")
     print("     - GET       /api/v1/bgm/styles      : 🆕 BGM 스타일 조회")
+    print("     - GET       /health/live, /health/ready : 🆕 라이브니스/레디니스 체크")
     print("     - GET       /docs                   : API 문서")
     print("     - GET       /download/{task_id}     : 완성된 30초 영상 다운로드")
     print("🎬 v3.3 개선사항: CogVideoX-2b 통합, Riffusion BGM, 엔디비아 최적화, 품질검증 강화") # 버전별 개선사항 요약
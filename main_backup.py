@@ -72,6 +72,9 @@ except ImportError as e:
     RIFFUSION_AVAILABLE = False # 로드 실패 시 플래그를 False로 설정합니다.
     print(f"⚠️ Riffusion BGM 모듈 로드 실패: {e}")
 
+# 절차적 BGM 신디사이저 로드 (NumPy 기반, FFmpeg lavfi 화음 그래프 대체)
+from app.utils import bgm_synth # 코드 진행/리듬/에코를 float32 블록 단위로 렌더링합니다.
+
 # ─────────────────────────────────────────────
 # 2) FastAPI 애플리케이션 초기화
 # ─────────────────────────────────────────────
@@ -317,127 +320,19 @@ def validate_brand_prompt(brand, prompt):
 
 # 🆕 [새로 추가] 향상된 음악적 BGM 생성 함수
 def generate_enhanced_musical_bgm(duration: int, style_preference: str, output_dir: str):
-    """🎵 향상된 음악적 BGM 생성 - 화음과 리듬 패턴 추가"""
+    """🎵 향상된 음악적 BGM 생성 - 화음과 리듬 패턴 (NumPy 절차적 신디사이저, FFmpeg 프로세스 없음)"""
     os.makedirs(output_dir, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     bgm_path = os.path.join(output_dir, f"enhanced_bgm_{style_preference}_{timestamp}.wav")
     
-    # 🎼 스타일별 음악 이론 기반 설정
-    musical_styles = {
-        "모던하고 깔끔한": {
-            "chord_progression": [
-                {"root": 261.63, "third": 329.63, "fifth": 392.00},  # C major
-                {"root": 220.00, "third": 277.18, "fifth": 329.63},  # A minor
-                {"root": 196.00, "third": 246.94, "fifth": 293.66},  # G major
-                {"root": 261.63, "third": 329.63, "fifth": 392.00}   # C major
-            ],
-            "rhythm_pattern": [1.0, 0.7, 0.5, 0.7] * (duration // 4),
-            "effects": "aecho=0.6:0.8:500:0.15,highpass=f=120,lowpass=f=8000,chorus=0.5:0.9:50:0.4:0.25:2",
-            "base_volume": 0.25
-        },
-        "따뜻하고 아늑한": {
-            "chord_progression": [
-                {"root": 220.00, "third": 277.18, "fifth": 329.63},  # A minor
-                {"root": 196.00, "third": 246.94, "fifth": 293.66},  # G major  
-                {"root": 261.63, "third": 329.63, "fifth": 392.00},  # C major
-                {"root": 174.61, "third": 220.00, "fifth": 261.63}   # F major
-            ],
-            "rhythm_pattern": [1.0, 0.8, 0.6, 0.8] * (duration // 4),
-            "effects": "aecho=0.8:0.9:800:0.25,highpass=f=80,lowpass=f=6000,chorus=0.6:0.8:60:0.5:0.3:2",
-            "base_volume": 0.3
-        },
-        "미니멀하고 프리미엄한": {
-            "chord_progression": [
-                {"root": 130.81, "third": 164.81, "fifth": 196.00},  # C3 major
-                {"root": 146.83, "third": 185.00, "fifth": 220.00},  # D major
-                {"root": 164.81, "third": 207.65, "fifth": 246.94},  # E major
-                {"root": 130.81, "third": 164.81, "fifth": 196.00}   # C3 major
-            ],
-            "rhythm_pattern": [1.0, 0.6, 0.4, 0.6] * (duration // 4),
-            "effects": "aecho=0.5:0.7:400:0.1,highpass=f=150,lowpass=f=10000,reverb",
-            "base_volume": 0.2
-        },
-        "역동적이고 에너지": {
-            "chord_progression": [
-                {"root": 146.83, "third": 185.00, "fifth": 220.00},  # D major
-                {"root": 164.81, "third": 207.65, "fifth": 246.94},  # E major
-                {"root": 196.00, "third": 246.94, "fifth": 293.66},  # G major
-                {"root": 146.83, "third": 185.00, "fifth": 220.00}   # D major
-            ],
-            "rhythm_pattern": [1.0, 0.9, 0.8, 0.9] * (duration // 4),
-            "effects": "aecho=0.4:0.6:300:0.2,highpass=f=90,lowpass=f=12000,chorus=0.4:0.7:40:0.3:0.2:3",
-            "base_volume": 0.35
-        },
-        "감성적이고 로맨틱": {
-            "chord_progression": [
-                {"root": 174.61, "third": 220.00, "fifth": 261.63},  # F major
-                {"root": 196.00, "third": 246.94, "fifth": 293.66},  # G major
-                {"root": 220.00, "third": 277.18, "fifth": 329.63},  # A minor
-                {"root": 174.61, "third": 220.00, "fifth": 261.63}   # F major
-            ],
-            "rhythm_pattern": [1.0, 0.7, 0.5, 0.7] * (duration // 4),
-            "effects": "aecho=0.9:0.95:1000:0.3,highpass=f=70,lowpass=f=5000,chorus=0.7:0.9:80:0.6:0.4:2",
-            "base_volume": 0.28
-        }
-    }
-    
-    # 기본 설정 (스타일별 설정이 없는 경우)
-    style_config = musical_styles.get(style_preference, musical_styles["모던하고 깔끔한"])
-    
     try:
-        # 🎵 화음 기반 BGM 생성
-        chord_progression = style_config["chord_progression"]
-        rhythm_pattern = style_config["rhythm_pattern"][:duration]  # 길이에 맞게 조정
-        
-        # 각 화음별 사인파 생성
-        chord_inputs = []
-        volume_filters = []
-        
-        chord_duration = duration / len(chord_progression)
-        
-        for chord_idx, chord in enumerate(chord_progression):
-            start_time = chord_idx * chord_duration
-            
-            # 화음의 각 음 (근음, 3음, 5음) 생성
-            for note_idx, (note_name, frequency) in enumerate(chord.items()):
-                input_name = f"chord{chord_idx}_{note_name}"
-                volume_level = style_config["base_volume"] * (1.0 - note_idx * 0.1)  # 근음이 가장 크게
-                
-                chord_inputs.append(f"sine=frequency={frequency}:duration={chord_duration}")
-                volume_filters.append(f"[{len(chord_inputs)-1}]volume={volume_level}[{input_name}]")
-        
-        # 🎼 리듬 패턴 적용 (볼륨 조절)
-        rhythm_filters = []
-        for i, vol_mult in enumerate(rhythm_pattern):
-            if i < len(volume_filters):
-                original_vol = float(volume_filters[i].split('=')[1].split('[')[0])
-                new_vol = original_vol * vol_mult
-                volume_filters[i] = volume_filters[i].replace(f'={original_vol}', f'={new_vol}')
-        
-        # 모든 화음 믹싱
-        all_inputs = [f"[chord{i//3}_{list(chord.keys())[i%3]}]" for i, chord in enumerate(chord_progression) for _ in range(3)]
-        
-        # 최종 FFmpeg 명령어 구성
-        full_filter = f"{''.join(volume_filters)};{''.join(all_inputs[:min(len(all_inputs), 8)])}amix=inputs={min(len(all_inputs), 8)}:duration=longest,{style_config['effects']}"
-        
-        command = [
-            "ffmpeg",
-            "-f", "lavfi",
-            "-i", ";".join(chord_inputs),
-            "-filter_complex", full_filter,
-            "-ac", "2",
-            "-ar", "44100",
-            "-t", str(duration),
-            "-y",
-            bgm_path
-        ]
-        
-        subprocess.run(command, capture_output=True, text=True, check=True)
+        # 🎼 스타일별 코드 진행/리듬 패턴/에코는 bgm_synth.STYLE_PRESETS에 정의 (없는 스타일은 기본 스타일)
+        bgm_synth.write_bgm(bgm_path, duration, style_preference=style_preference)
         print(f"✅ 🎵 향상된 {style_preference} 스타일 음악적 BGM 생성 성공: {bgm_path}")
         return bgm_path
         
-    except subprocess.CalledProcessError as e:
-        print(f"❌ 향상된 BGM 생성 실패: {e.stderr}")
+    except Exception as e:
+        print(f"❌ 향상된 BGM 생성 실패: {e}")
         # 폴백: 간단한 BGM 생성
         return generate_simple_fallback_bgm(duration, style_preference, output_dir)
 
@@ -1055,7 +950,7 @@ async def process_ad_generation(task_id: str, request_data: dict):
         images_dir = os.path.join(os.getcwd(), "generated/images")
         image_agent = ImageGeneratorAgent(openai_api_key=api_key, images_dir=images_dir)
         
-        tasks_storage[task_id]["images"] = image_agent.generate_images(
+        tasks_storage[task_id]["images"] = await image_agent.generate_images_async(
             storyboard,
             request_data.get("style_preference", "모던하고 깔끔한")
         )
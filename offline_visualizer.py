@@ -296,6 +296,13 @@ def generate_enhanced_html(result, metadata):
                 overflow: hidden;
             }}
             
+            .image-thumb {{ 
+                width: 100%; 
+                height: 280px; 
+                object-fit: cover;
+                display: block;
+            }}
+            
             .image-placeholder::before {{
                 content: '🎬';
                 font-size: 3em;
@@ -441,15 +448,22 @@ def generate_enhanced_html(result, metadata):
     
     for i, img in enumerate(result['images']):
         emoji = scene_emojis.get(img['scene'], "🎬")
-        html_content += f"""
-                    <div class="image-card">
-                        <div class="image-placeholder">
+        variants = img.get('variants') or {} # 이미지 후처리 변형 URL (예: {"thumb.webp": "/images/<phash>/thumb.webp"})
+        if "thumb.webp" in variants: # 원본 대신 썸네일 삽입 (AVIF 지원 브라우저는 더 작은 AVIF 사용, 고해상도 화면은 미리보기 크기)
+            avif_source = (f'<source type="image/avif" srcset="{variants["thumb.avif"]} 1x, {variants.get("preview.avif", variants["thumb.avif"])} 2x">'
+                           if "thumb.avif" in variants else "")
+            visual = f"""<picture>{avif_source}<img class="image-thumb" src="{variants['thumb.webp']}" srcset="{variants['thumb.webp']} 1x, {variants.get('preview.webp', variants['thumb.webp'])} 2x" alt="{img['scene']}" loading="lazy" decoding="async"></picture>"""
+        else:
+            visual = f"""<div class="image-placeholder">
                             <div>
                                 {emoji} {img['scene'].upper()}<br><br>
                                 📐 {img['dimensions']}<br>
                                 🎨 {img['style']}
                             </div>
-                        </div>
+                        </div>"""
+        html_content += f"""
+                    <div class="image-card">
+                        {visual}
                         <div class="card-body">
                             <h3 class="card-title">{emoji} {img['scene']}</h3>
                             <div class="card-prompt">
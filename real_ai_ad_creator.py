@@ -1,11 +1,13 @@
 import os
 import openai
-import requests
 import webbrowser
 from datetime import datetime
 from io import BytesIO
 from PIL import Image
 
+from app.utils.image_engine import ImageEngine
+from app.utils.image_derivatives import ImageStore
+
 # Optional: ElevenLabs for voice
 try:
     from elevenlabs.client import ElevenLabs
@@ -37,46 +39,48 @@ class RealAIAdCreator:
             self.eleven_client = None
 
     def generate_images(self, brand_name, scenes):
-        results = []
-        for idx, scene in enumerate(scenes, 1):
-            prompt = scene['prompt']
-            print(f"⏳ Generating image {idx}/{len(scenes)}: {prompt}")
-            resp = openai.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                n=1,
-                size="1024x1024"
-            )
-            url = resp.data[0].url
-            img_data = requests.get(url).content
-            filename = f"{brand_name.lower()}_{idx}.png"
-            path = os.path.join(images_dir, filename)
-            with open(path, 'wb') as f:
-                f.write(img_data)
-            results.append({'scene': scene['name'], 'file': path})
-        return results
-
-
-def generate_voice(self, script, brand_name):
-    if not getattr(self, 'eleven_client', None):
-        print("⚠️ ElevenLabs not configured or missing key, skipping voice generation.")
-        return None
+        # All scenes are requested concurrently through the shared async image engine
+        items = [
+            {'name': scene['name'], 'prompt': scene['prompt'], 'filename': f"{brand_name.lower()}_{idx}.png"}
+            for idx, scene in enumerate(scenes, 1)
+        ]
+        print(f"⏳ Generating {len(items)} images concurrently...")
+        results = ImageEngine(api_key=self.openai_api_key).generate_many_sync(items, images_dir)
+        for result in results:
+            if result.get('file'):
+                print(f"✅ {result['scene']}: {result['file']} ({result['latency']['total_s']}s)")
+        return [{'scene': r['scene'], 'file': r['file']} for r in results if r.get('file')]
 
-    print("⏳ Generating voice narration...")
-    response = self.eleven_client.text_to_speech.convert(
-        voice_id="Anna Kim",
-        text=script,
-        model_id="eleven_multilingual_v2",
-        output_format="mp3_44100_128"
-    )
-    filename = f"{brand_name.lower()}_narration.mp3"
-    path = os.path.join(audio_dir, filename)
-    with open(path, 'wb') as f:
-        for chunk in response:
-            f.write(chunk)
-    return path
+    def generate_voice(self, script, brand_name):
+        if not getattr(self, 'eleven_client', None):
+            print("⚠️ ElevenLabs not configured or missing key, skipping voice generation.")
+            return None
 
+        print("⏳ Generating voice narration...")
+        response = self.eleven_client.text_to_speech.convert(
+            voice_id="Anna Kim",
+            text=script,
+            model_id="eleven_multilingual_v2",
+            output_format="mp3_44100_128"
+        )
+        filename = f"{brand_name.lower()}_narration.mp3"
+        path = os.path.join(audio_dir, filename)
+        with open(path, 'wb') as f:
+            for chunk in response:
+                f.write(chunk)
+        return path
 
+    def build_thumbnails(self, brand_name, images):
+        # Thumbnails/WebP variants are stored once per perceptual hash, so re-runs reuse them
+        store = ImageStore()
+        try:
+            results = store.ingest_sync([img['file'] for img in images], source=brand_name)
+        except Exception as e:
+            print(f"⚠️ Thumbnail generation failed, embedding originals: {e}")
+            return [None] * len(images)
+        finally:
+            store.shutdown()
+        return [{name: store.variant_path(r['phash'], name) for name in r['variants'] if 'webp' in name} or None for r in results]
 
     def build_html(self, brand_name, images, voice_path):
         timestamp = datetime.utcnow().isoformat()
@@ -84,8 +88,15 @@ def generate_voice(self, script, brand_name):
         with open(html_path, 'w', encoding='utf-8') as f:
             f.write(f"<html><head><meta charset='utf-8'><title>{brand_name} Ad Preview</title></head><body>\n")
             f.write(f"<h1>{brand_name} Advertisement</h1>\n<p>Generated: {timestamp}</p>\n<hr>\n")
-            for img in images:
-                f.write(f"<h2>{img['scene']}</h2><img src='../generated/images/{os.path.basename(img['file'])}' style='max-width:100%;'><br>\n")
+            for img, derived in zip(images, self.build_thumbnails(brand_name, images)):
+                if derived:
+                    # Embed the content-addressed thumbnail instead of the full-size original
+                    thumb = os.path.relpath(derived['thumb.webp'], generated_dir)
+                    preview = os.path.relpath(derived.get('preview.webp', derived['thumb.webp']), generated_dir)
+                    f.write(f"<h2>{img['scene']}</h2><a href='{preview}'><img src='{thumb}' srcset='{thumb} 1x, {preview} 2x' "
+                            f"loading='lazy' style='max-width:100%;'></a><br>\n")
+                else:
+                    f.write(f"<h2>{img['scene']}</h2><img src='../generated/images/{os.path.basename(img['file'])}' style='max-width:100%;'><br>\n")
             if voice_path:
                 f.write(f"<h2>Voice Narration</h2><audio controls src='../generated/audio/{os.path.basename(voice_path)}'></audio>\n")
             f.write("</body></html>")